@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""自適應掃描排程器 - 根據廣播活躍度動態調整掃描間隔"""
+
+import numpy as np
+from PIL import Image
+
+
+class AdaptiveScanScheduler:
+    """自適應掃描間隔排程器
+
+    畫面變化率或新文字出現時縮短間隔，長時間無變化時指數退避，
+    並以CPU預算限制掃描佔用的時間比例。
+    """
+
+    THUMBNAIL_WIDTH = 96  # 計算畫面差異時使用的縮圖寬度
+
+    def __init__(self, base_interval: float = 2.0, config: dict = None):
+        config = config or {}
+        self.enabled = config.get("ENABLED", True)
+        self.base_interval = float(base_interval)
+        self.min_interval = float(config.get("MIN_INTERVAL", 0.5))
+        self.max_interval = float(config.get("MAX_INTERVAL", 8.0))
+        self.backoff_factor = float(config.get("BACKOFF_FACTOR", 1.5))
+        self.speedup_factor = float(config.get("SPEEDUP_FACTOR", 0.5))
+        self.frame_diff_threshold = float(config.get("FRAME_DIFF_THRESHOLD", 0.01))
+        self.pixel_diff_threshold = int(config.get("PIXEL_DIFF_THRESHOLD", 24))
+        self.cpu_budget = float(config.get("CPU_BUDGET", 0.6))
+
+        self.current_interval = self._clamp(self.base_interval)
+        self.previous_thumbnail = None
+        self.previous_text = None
+        self.last_frame_diff = 0.0
+        self.last_text_changed = False
+
+    def _clamp(self, interval: float) -> float:
+        """將間隔限制在上下限之間"""
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def _make_thumbnail(self, image) -> np.ndarray:
+        """將畫面縮小為灰度縮圖以便快速比較"""
+        if isinstance(image, np.ndarray):
+            image = Image.fromarray(image)
+        gray = image.convert('L')
+        width, height = gray.size
+        if width > self.THUMBNAIL_WIDTH:
+            new_height = max(1, round(height * self.THUMBNAIL_WIDTH / width))
+            gray = gray.resize((self.THUMBNAIL_WIDTH, new_height), Image.Resampling.BILINEAR)
+        return np.asarray(gray, dtype=np.int16)
+
+    def measure_frame_diff(self, image) -> float:
+        """計算與上一幀相比的像素變化率（0~1）"""
+        thumbnail = self._make_thumbnail(image)
+        previous = self.previous_thumbnail
+        self.previous_thumbnail = thumbnail
+
+        if previous is None or previous.shape != thumbnail.shape:
+            return 1.0
+
+        changed = np.abs(thumbnail - previous) > self.pixel_diff_threshold
+        return float(changed.mean())
+
+    def detect_new_text(self, full_text: str) -> bool:
+        """檢查辨識出的廣播文字是否與上一次不同"""
+        normalized = ' '.join((full_text or '').split())
+        previous = self.previous_text
+        self.previous_text = normalized
+        return bool(normalized) and normalized != previous
+
+    def next_interval(self, image=None, result=None, scan_duration: float = 0.0) -> float:
+        """根據本次掃描的畫面與結果計算下一次掃描間隔"""
+        if not self.enabled:
+            return self.base_interval
+
+        self.last_frame_diff = self.measure_frame_diff(image) if image is not None else 0.0
+        full_text = getattr(result, 'full_text', '') if result is not None else ''
+        self.last_text_changed = self.detect_new_text(full_text)
+
+        active = self.last_frame_diff >= self.frame_diff_threshold or self.last_text_changed
+        if active:
+            interval = self.current_interval * self.speedup_factor
+        else:
+            interval = self.current_interval * self.backoff_factor
+        interval = self._clamp(interval)
+
+        # CPU預算：掃描時間 / (掃描時間 + 休眠時間) 不可超過預算
+        if 0 < self.cpu_budget < 1 and scan_duration > 0:
+            budget_interval = scan_duration * (1.0 / self.cpu_budget - 1.0)
+            interval = max(interval, min(budget_interval, self.max_interval))
+
+        self.current_interval = interval
+        return interval
+
+    def describe(self) -> str:
+        """返回本次排程決策的日誌字串"""
+        return (f"[SCHED] 下次掃描間隔: {self.current_interval:.2f}s "
+                f"(畫面變化率: {self.last_frame_diff:.3f}, "
+                f"新文字: {'是' if self.last_text_changed else '否'})")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""非阻塞匹配提醒分派器 - 在獨立執行緒中顯示提醒，掃描迴圈不需等待"""
+
+import queue
+import threading
+import time
+
+try:
+    from plyer import notification as plyer_notification
+    PLYER_AVAILABLE = True
+except ImportError:
+    PLYER_AVAILABLE = False
+    plyer_notification = None
+
+
+class ConsoleNotificationBackend:
+    """終端機輸出提醒"""
+
+    def show(self, title, message):
+        print(f"[ALERT] {title}\n{message}")
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class DesktopNotificationBackend:
+    """系統桌面通知（需要安裝plyer）"""
+
+    def __init__(self, timeout=10):
+        if not PLYER_AVAILABLE:
+            raise ImportError("plyer未安裝。請執行: pip install plyer")
+        self.timeout = timeout
+
+    def show(self, title, message):
+        # 桌面通知內容長度有限制，只保留開頭部分
+        plyer_notification.notify(title=title, message=message[:250], timeout=self.timeout)
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TkNotificationBackend:
+    """常駐的Tk提醒視窗，新的提醒會更新內容而不是彈出新對話框
+
+    所有Tk操作都在分派器執行緒中進行。
+    """
+
+    def __init__(self):
+        self.root = None
+        self.text_widget = None
+
+    def _ensure_window(self):
+        """延遲創建提醒視窗"""
+        if self.root is not None:
+            return
+        import tkinter as tk
+
+        self.root = tk.Tk()
+        self.root.title("匹配提醒")
+        self.root.attributes('-topmost', True)
+        self.root.protocol("WM_DELETE_WINDOW", self.root.withdraw)  # 關閉視窗只隱藏，不結束執行緒
+        self.text_widget = tk.Text(self.root, width=60, height=16, wrap='word')
+        self.text_widget.pack(fill='both', expand=True)
+        tk.Button(self.root, text="隱藏", command=self.root.withdraw).pack()
+
+    def show(self, title, message):
+        self._ensure_window()
+        timestamp = time.strftime("%H:%M:%S")
+        self.text_widget.insert('1.0', f"[{timestamp}] {title}\n{message}\n{'-' * 40}\n")
+        self.root.deiconify()
+        self.root.lift()
+
+    def poll(self):
+        if self.root is not None:
+            self.root.update()
+
+    def close(self):
+        if self.root is not None:
+            self.root.destroy()
+            self.root = None
+
+
+def create_notification_backend(backend_name: str):
+    """根據名稱創建提醒後端，失敗時退回終端機輸出"""
+    try:
+        if backend_name == "desktop":
+            return DesktopNotificationBackend()
+        if backend_name == "tk":
+            return TkNotificationBackend()
+    except Exception as e:
+        print(f"[WARN] 無法使用提醒後端 {backend_name}: {e}，改用終端機輸出")
+    return ConsoleNotificationBackend()
+
+
+class AlertDispatcher:
+    """在背景執行緒顯示匹配提醒，並合併時間窗內的重複提醒"""
+
+    def __init__(self, backend_name: str = "tk", coalesce_window: float = 60.0, max_queue_size: int = 100,
+                 backend=None):
+        self.backend_name = backend_name
+        self.backend = backend
+        self.coalesce_window = coalesce_window
+        self.alert_queue = queue.Queue(maxsize=max_queue_size)
+        self.recent_alerts = {}  # key -> {"last_shown": 時間, "count": 重複次數}
+        self.dropped_count = 0
+        self.shown_count = 0
+        self.coalesced_count = 0
+        self.running = False
+        self.worker_thread = None
+
+    def start(self):
+        """啟動分派器執行緒"""
+        if self.running:
+            return
+        self.running = True
+        self.worker_thread = threading.Thread(target=self._run, name="AlertDispatcher", daemon=True)
+        self.worker_thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止分派器執行緒"""
+        if not self.running:
+            return
+        self.running = False
+        try:
+            self.alert_queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.worker_thread:
+            self.worker_thread.join(timeout)
+
+    @staticmethod
+    def make_alert_key(result) -> tuple:
+        """以玩家名稱和匹配商品組成合併用的鍵"""
+        if result is None:
+            return None
+        player_name = str(getattr(result, 'player_name', '') or '').strip().lower()
+        items = getattr(result, 'matched_items', None) or []
+        item_names = frozenset(item.get('item_name', '') for item in items if isinstance(item, dict))
+        return (player_name, item_names)
+
+    def submit(self, message: str, result=None, title: str = "匹配提醒") -> bool:
+        """提交提醒（永不阻塞），佇列已滿時丟棄並返回False"""
+        try:
+            self.alert_queue.put_nowait((title, message, self.make_alert_key(result), time.time()))
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+
+    def _should_show(self, key, submitted_at) -> tuple:
+        """判斷提醒是否需要顯示，返回(是否顯示, 累計重複次數)"""
+        if key is None:
+            return True, 1
+
+        entry = self.recent_alerts.get(key)
+        if entry and submitted_at - entry["last_shown"] < self.coalesce_window:
+            entry["count"] += 1
+            return False, entry["count"]
+
+        self.recent_alerts[key] = {"last_shown": submitted_at, "count": 1}
+
+        # 清理過期的記錄避免長時間運行時無限增長
+        expired = [k for k, v in self.recent_alerts.items() if submitted_at - v["last_shown"] >= self.coalesce_window]
+        for k in expired:
+            if k != key:
+                del self.recent_alerts[k]
+        return True, 1
+
+    def _run(self):
+        """分派器執行緒主迴圈"""
+        if self.backend is None:
+            self.backend = create_notification_backend(self.backend_name)
+
+        while self.running:
+            try:
+                item = self.alert_queue.get(timeout=0.1)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                break
+
+            if item:
+                title, message, key, submitted_at = item
+                show, count = self._should_show(key, submitted_at)
+                try:
+                    if show:
+                        self.backend.show(title, message)
+                        self.shown_count += 1
+                    else:
+                        self.coalesced_count += 1
+                        print(f"[ALERT] 合併重複提醒 (同一玩家/商品第 {count} 次)")
+                except Exception as e:
+                    print(f"[WARN] 顯示提醒失敗: {e}")
+
+            try:
+                self.backend.poll()
+            except Exception as e:
+                print(f"[WARN] 提醒視窗更新失敗: {e}")
+
+        try:
+            self.backend.close()
+        except Exception:
+            pass
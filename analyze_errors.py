@@ -1,7 +1,7 @@
 import os
 import json
 import glob
-from collections import Counter
+from session_stats import value_counts
 
 def analyze_test_errors(test_folder):
     """分析測試資料夾中的錯誤"""
@@ -41,18 +41,18 @@ def analyze_test_errors(test_folder):
     print(f"{'='*50}")
     
     print(f"錯誤類型統計:")
-    type_counts = Counter(error_types)
-    for error_type, count in type_counts.most_common():
+    type_counts = value_counts(error_types)
+    for error_type, count in type_counts:
         print(f"  - {error_type}: {count} 次")
     
     print(f"\n常見問題統計:")
-    issue_counts = Counter(common_issues)
-    for issue, count in issue_counts.most_common():
+    issue_counts = value_counts(common_issues)
+    for issue, count in issue_counts:
         print(f"  - {issue}: {count} 次")
     
     print(f"\n錯誤訊息統計:")
-    message_counts = Counter(error_messages)
-    for message, count in message_counts.most_common(10):  # 只顯示前10個
+    message_counts = value_counts(error_messages, limit=10)  # 只顯示前10個
+    for message, count in message_counts:
         print(f"  - {message}: {count} 次")
     
     # 分析第一個錯誤的詳細資訊
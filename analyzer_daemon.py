@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""常駐分析服務 - 讓 EasyOCR 模型只載入一次，供多個監控程式共用
+
+服務在 Unix domain socket 上接受請求，畫面以共享記憶體交給服務（socket 只傳遞形狀與
+共享記憶體名稱），結果以 msgpack（已安裝時）或 JSON 返回。screen_monitor、
+integration_test（以及 mock_test）建立 OCR 分析器時若偵測到服務正在執行，會改用
+RemoteAnalyzer，不需重新載入模型。
+
+訊息格式: 4 位元組長度（big-endian）+ 1 位元組編碼（b'J' JSON / b'M' msgpack）+ 內容，
+服務以請求的編碼回覆。
+
+同類型的分析器在服務中只有一個實例，請求依序處理；每個連線的商品設定與白框檢測器
+（上一幀的白框位置快取）在分析前換到分析器上，多個監控程式之間不共用畫面狀態。客戶端啟用計時時，服務以
+pipeline_timer.capture() 收集該次分析的各階段耗時一併回傳，由客戶端記錄到自己的
+pipeline_timer（/metrics 與 pipeline_metrics.jsonl）。服務中斷且無法重新連線時，
+RemoteAnalyzer 改為本機載入分析器繼續執行。需要本機調試圖像的呼叫端不使用服務。
+
+用法:
+    python analyzer_daemon.py                        # 預載 ANALYZER_DAEMON_CONFIG["PRELOAD"]
+    python analyzer_daemon.py --analyzers ocr_rectangle ocr
+    python analyzer_daemon.py --status
+    python analyzer_daemon.py --stop
+"""
+
+import argparse
+import atexit
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+import numpy as np
+from PIL import Image
+
+try:
+    from multiprocessing import shared_memory
+    SHARED_MEMORY_AVAILABLE = True
+except ImportError:
+    SHARED_MEMORY_AVAILABLE = False
+    shared_memory = None
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+    msgpack = None
+
+from pipeline_timing import pipeline_timer
+from text_analyzer import AnalysisResult, TextAnalyzer
+
+try:
+    from config import ANALYZER_DAEMON_CONFIG
+except ImportError:
+    ANALYZER_DAEMON_CONFIG = {}
+
+DEFAULT_CONFIG = {
+    "ENABLED": True,
+    "SOCKET_PATH": None,
+    "PRELOAD": ["ocr_rectangle"],
+    "CONNECT_TIMEOUT": 0.5,
+    "REQUEST_TIMEOUT": 60,
+}
+
+REMOTE_ANALYZER_TYPES = ["ocr_rectangle", "ocr"]
+HEADER = struct.Struct(">I")
+CODEC_JSON = b"J"
+CODEC_MSGPACK = b"M"
+MIN_SHM_BYTES = 1024 * 1024   # 共享記憶體最小配置，避免 ROI 稍微變大就重新配置
+
+# 本程序的客戶端建立的共享記憶體（服務與客戶端在同一程序時不可取消追蹤）
+_owned_segments = set()
+
+
+def load_config(overrides: dict = None) -> dict:
+    return {**DEFAULT_CONFIG, **ANALYZER_DAEMON_CONFIG, **(overrides or {})}
+
+
+def default_socket_path() -> str:
+    """未設定時放在暫存資料夾，每個使用者一個"""
+    user = os.environ.get("USER") or os.environ.get("USERNAME") or "user"
+    return os.path.join(tempfile.gettempdir(), f"maple_analyzer_{user}.sock")
+
+
+def daemon_supported() -> bool:
+    """需要 Unix domain socket 與共享記憶體（Windows 上不支援）"""
+    return hasattr(socket, "AF_UNIX") and SHARED_MEMORY_AVAILABLE
+
+
+def to_serializable(obj):
+    """將 numpy 型別轉為可編碼的內建型別"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, dict):
+        return {key: to_serializable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_serializable(item) for item in obj]
+    return obj
+
+
+def encode_message(message: dict, codec: bytes = CODEC_JSON) -> bytes:
+    if codec == CODEC_MSGPACK:
+        payload = msgpack.packb(to_serializable(message), use_bin_type=True, default=str)
+    else:
+        payload = json.dumps(to_serializable(message), ensure_ascii=False, default=str).encode('utf-8')
+    return HEADER.pack(len(payload) + 1) + codec + payload
+
+
+def recv_exact(sock, size: int) -> bytes:
+    """讀取指定長度，連線關閉時返回 None"""
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_message(sock):
+    """讀取一則訊息，返回 (內容, 編碼)；連線關閉時返回 (None, None)"""
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None, None
+    body = recv_exact(sock, HEADER.unpack(header)[0])
+    if body is None:
+        return None, None
+    codec, payload = body[:1], body[1:]
+    if codec == CODEC_MSGPACK:
+        return msgpack.unpackb(payload, raw=False), codec
+    return json.loads(payload.decode('utf-8')), codec
+
+
+def attach_shared_memory(name: str):
+    """附加到客戶端建立的共享記憶體，不交由本程序的 resource_tracker 清除"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if shm.name in _owned_segments:
+            return shm
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def create_local_analyzer(analyzer_type: str):
+    """以 screen_monitor 的設定建立本機分析器"""
+    from screen_monitor import create_analyzer
+    return create_analyzer(analyzer_type, use_daemon=False)
+
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """每個客戶端連線一個執行緒，依序處理請求"""
+
+    def handle(self):
+        daemon = self.server.analyzer_daemon
+        state = {"shm": None, "items": {}, "detectors": {}}
+        daemon.client_connected(1)
+        try:
+            while True:
+                message, codec = read_message(self.request)
+                if message is None:
+                    break
+                try:
+                    reply = daemon.handle_message(message, state)
+                except Exception as e:
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                self.request.sendall(encode_message(reply, codec))
+                if message.get("op") == "shutdown":
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            if state["shm"] is not None:
+                state["shm"].close()
+            daemon.client_connected(-1)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class AnalyzerDaemon:
+    """保留已預熱的分析器，處理 ping / status / configure / analyze / parse / error_type / shutdown 請求"""
+
+    def __init__(self, socket_path: str = None, analyzer_factory=None):
+        self.socket_path = socket_path or load_config()["SOCKET_PATH"] or default_socket_path()
+        self.analyzer_factory = analyzer_factory or create_local_analyzer
+        self.analyzers = {}
+        self.analyzer_locks = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+        self.started_at = time.time()
+        self.stats = {"requests": 0, "frames": 0, "clients": 0, "analyze_ms": 0.0}
+
+    def get_analyzer(self, analyzer_type: str):
+        """取得分析器，第一次使用時建立並預熱"""
+        with self.lock:
+            if analyzer_type not in self.analyzers:
+                if analyzer_type not in REMOTE_ANALYZER_TYPES:
+                    raise ValueError(f"不支援的分析器類型: {analyzer_type}")
+                analyzer = self.analyzer_factory(analyzer_type)
+                if analyzer is None:
+                    raise RuntimeError(f"無法建立分析器: {analyzer_type}")
+                from startup_profile import warmup_frame
+                analyzer.warm_up(warmup_frame())
+                self.analyzers[analyzer_type] = analyzer
+                self.analyzer_locks[analyzer_type] = threading.Lock()
+                print(f"[OK] 分析器已載入: {analyzer_type}")
+            return self.analyzers[analyzer_type], self.analyzer_locks[analyzer_type]
+
+    def client_connected(self, delta: int):
+        with self.lock:
+            self.stats["clients"] += delta
+
+    def status(self) -> dict:
+        with self.lock:
+            return {"ok": True, "pid": os.getpid(), "socket": self.socket_path,
+                    "uptime_seconds": round(time.time() - self.started_at, 1),
+                    "analyzers": sorted(self.analyzers), **self.stats}
+
+    def read_frame(self, message: dict, state: dict) -> Image.Image:
+        """從客戶端的共享記憶體讀出畫面（複製一份，分析期間客戶端可覆寫下一幀）"""
+        if state["shm"] is None or state["shm"].name.lstrip("/") != message["shm"].lstrip("/"):
+            if state["shm"] is not None:
+                state["shm"].close()
+            state["shm"] = attach_shared_memory(message["shm"])
+        shape = tuple(message["shape"])
+        pixels = np.ndarray(shape, dtype=np.uint8, buffer=state["shm"].buf).copy()
+        return Image.fromarray(pixels, message.get("mode", "RGB"))
+
+    def handle_message(self, message: dict, state: dict) -> dict:
+        op = message.get("op")
+        with self.lock:
+            self.stats["requests"] += 1
+        if op in ("ping", "status"):
+            return self.status()
+        if op == "shutdown":
+            return {"ok": True}
+
+        analyzer_type = message.get("analyzer", "ocr_rectangle")
+        analyzer, analyzer_lock = self.get_analyzer(analyzer_type)
+        if op == "configure":
+            state["items"][analyzer_type] = (message.get("selling_items"), message.get("buying_items"))
+            return {"ok": True, "strategy_type": analyzer.strategy_type,
+                    "analyzer_class": analyzer.analyzer_name,
+                    "error_type": analyzer.get_error_type("")}
+        if op == "error_type":
+            error_message = message.get("message", "")
+            return {"ok": True, "error_type": analyzer.get_error_type(error_message),
+                    "quota_error": analyzer.is_quota_error(error_message)}
+
+        selling_items, buying_items = state["items"].get(analyzer_type, (None, None))
+        if op == "analyze":
+            image = self.read_frame(message, state)
+            capture = pipeline_timer.capture() if message.get("timing") else nullcontext([])
+            with analyzer_lock, capture as stages:
+                self.apply_items(analyzer, selling_items, buying_items)
+                self.apply_detector(analyzer, analyzer_type, state)
+                start = time.perf_counter()
+                result, raw = analyzer.analyze(image)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.stats["frames"] += 1
+                self.stats["analyze_ms"] = round(self.stats["analyze_ms"] + elapsed_ms, 1)
+            return {"ok": True, "result": result.to_dict(), "raw": raw, "elapsed_ms": round(elapsed_ms, 2),
+                    "stages": stages}
+        if op == "parse":
+            with analyzer_lock:
+                self.apply_items(analyzer, selling_items, buying_items)
+                result = analyzer.parse_result(message.get("raw"))
+            return {"ok": True, "result": result.to_dict()}
+        return {"ok": False, "error": f"未知的請求: {op}"}
+
+    @staticmethod
+    def apply_detector(analyzer, analyzer_type: str, state: dict):
+        """換上該連線自己的白框檢測器，避免以其他監控程式的上一幀快取比對本連線的畫面"""
+        detector = getattr(analyzer, "box_detector", None)
+        if detector is None:
+            return
+        if analyzer_type not in state["detectors"]:
+            state["detectors"][analyzer_type] = type(detector)(detector.config)
+        analyzer.box_detector = state["detectors"][analyzer_type]
+
+    @staticmethod
+    def apply_items(analyzer, selling_items, buying_items):
+        """套用該連線的商品設定（未設定時保留服務啟動時的設定）"""
+        if selling_items is not None:
+            analyzer.selling_items = selling_items
+        if buying_items is not None:
+            analyzer.buying_items = buying_items
+
+    def bind(self):
+        """建立 socket；舊的 socket 檔若已無服務回應則移除"""
+        if os.path.exists(self.socket_path):
+            if DaemonClient(self.socket_path).ping():
+                raise RuntimeError(f"分析服務已在執行: {self.socket_path}")
+            os.unlink(self.socket_path)
+        self.server = _UnixServer(self.socket_path, _ConnectionHandler)
+        self.server.analyzer_daemon = self
+        os.chmod(self.socket_path, 0o600)
+
+    def start(self):
+        """在背景執行緒提供服務（測試與嵌入使用）"""
+        self.bind()
+        self.thread = threading.Thread(target=self.server.serve_forever, name="analyzer-daemon", daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.bind()
+        print(f"[OK] 分析服務已啟動: {self.socket_path} (pid {os.getpid()})")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+        self.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class DaemonClient:
+    """分析服務的客戶端，畫面透過共享記憶體傳遞"""
+
+    def __init__(self, socket_path: str = None, connect_timeout: float = None, request_timeout: float = None):
+        config = load_config()
+        self.socket_path = socket_path or config["SOCKET_PATH"] or default_socket_path()
+        self.connect_timeout = connect_timeout if connect_timeout is not None else config["CONNECT_TIMEOUT"]
+        self.request_timeout = request_timeout if request_timeout is not None else config["REQUEST_TIMEOUT"]
+        self.codec = CODEC_MSGPACK if MSGPACK_AVAILABLE else CODEC_JSON
+        self.sock = None
+        self.shm = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(self.request_timeout)
+            self.sock = sock
+        return self.sock
+
+    def request(self, message: dict) -> dict:
+        """送出請求並等待回覆，服務返回錯誤時拋出 RuntimeError"""
+        with self.lock:
+            sock = self.connect()
+            try:
+                sock.sendall(encode_message(message, self.codec))
+                reply, _ = read_message(sock)
+            except OSError:
+                self.disconnect()
+                raise
+            if reply is None:
+                self.disconnect()
+                raise ConnectionError("分析服務已關閉連線")
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "分析服務錯誤"))
+        return reply
+
+    def ping(self) -> dict:
+        """服務可用時返回狀態，否則返回 None"""
+        if not daemon_supported() or not os.path.exists(self.socket_path):
+            return None
+        try:
+            return self.request({"op": "ping"})
+        except (OSError, RuntimeError):
+            return None
+
+    def write_frame(self, image) -> dict:
+        """將畫面寫入共享記憶體（空間不足時重新配置），返回請求中的畫面描述"""
+        pixels = np.asarray(image.convert('RGB') if hasattr(image, 'convert') else image, dtype=np.uint8)
+        if self.shm is None or self.shm.size < pixels.nbytes:
+            self.release_shared_memory()
+            self.shm = shared_memory.SharedMemory(create=True, size=max(pixels.nbytes, MIN_SHM_BYTES))
+            _owned_segments.add(self.shm.name)
+            atexit.register(self.release_shared_memory)
+        np.ndarray(pixels.shape, dtype=np.uint8, buffer=self.shm.buf)[...] = pixels
+        return {"shm": self.shm.name, "shape": list(pixels.shape), "mode": "RGB" if pixels.ndim == 3 else "L"}
+
+    def analyze(self, image, analyzer_type: str, timing: bool = False) -> dict:
+        return self.request({"op": "analyze", "analyzer": analyzer_type, "timing": timing, **self.write_frame(image)})
+
+    def disconnect(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def release_shared_memory(self):
+        if self.shm is not None:
+            _owned_segments.discard(self.shm.name)
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self.disconnect()
+        self.release_shared_memory()
+
+
+class RemoteAnalyzer(TextAnalyzer):
+    """以分析服務執行的分析器，介面與本機分析器相同
+
+    fallback_factory 為建立本機分析器的函式；服務中斷且重新連線失敗時改用本機分析器。
+    """
+
+    def __init__(self, client: DaemonClient, analyzer_type: str, selling_items: dict, buying_items: dict = None,
+                 fallback_factory=None):
+        super().__init__(selling_items)
+        self.client = client
+        self.analyzer_type = analyzer_type
+        self.buying_items = buying_items or {}
+        self.fallback_factory = fallback_factory
+        self.local_analyzer = None
+        self._last_raw = None
+        self._last_result = None
+        self.configure()
+
+    @property
+    def analyzer_name(self) -> str:
+        if self.local_analyzer is not None:
+            return self.local_analyzer.analyzer_name
+        return self.remote_class
+
+    def configure(self):
+        """送出本程序的商品設定，記錄服務端分析器的類型"""
+        reply = self.client.request({"op": "configure", "analyzer": self.analyzer_type,
+                                     "selling_items": self.selling_items, "buying_items": self.buying_items})
+        self.strategy_type = reply["strategy_type"]
+        self.remote_class = reply["analyzer_class"]
+        self.remote_error_type = reply.get("error_type", "ANALYSIS_ERROR")
+
+    def fall_back(self, error):
+        """改用本機分析器（無 fallback_factory 或建立失敗時拋出原本的錯誤）"""
+        self.client.close()
+        if self.fallback_factory is None:
+            raise error
+        print(f"[WARN] 分析服務無法連線（{error}），改為本機載入 {self.analyzer_type} 分析器")
+        analyzer = self.fallback_factory()
+        if analyzer is None:
+            raise error
+        self.local_analyzer = analyzer
+        self._last_raw = self._last_result = None
+        return analyzer
+
+    def request_analysis(self, image) -> dict:
+        """連線中斷時重新連線並重送設定一次"""
+        timing = pipeline_timer.enabled
+        try:
+            return self.client.analyze(image, self.analyzer_type, timing)
+        except (OSError, ConnectionError):
+            self.configure()
+            return self.client.analyze(image, self.analyzer_type, timing)
+
+    def analyze(self, image) -> tuple[AnalysisResult, str]:
+        if self.local_analyzer is None:
+            try:
+                reply = self.request_analysis(image)
+            except (OSError, ConnectionError) as e:
+                self.fall_back(e)
+            else:
+                for stage, duration_ms in reply.get("stages", []):
+                    pipeline_timer.record(stage, duration_ms)
+                self._last_raw, self._last_result = reply["raw"], AnalysisResult(**reply["result"])
+                return self._last_result, self._last_raw
+        return self.local_analyzer.analyze(image)
+
+    def analyze_image(self, image):
+        return self.analyze(image)[1]
+
+    def parse_result(self, raw_result) -> AnalysisResult:
+        if self.local_analyzer is not None:
+            return self.local_analyzer.parse_result(raw_result)
+        if raw_result is self._last_raw and self._last_result is not None:
+            return self._last_result
+        return AnalysisResult(**self.client.request({"op": "parse", "analyzer": self.analyzer_type,
+                                                     "raw": raw_result})["result"])
+
+    def classify_error(self, error_message: str) -> dict:
+        """由服務端分析器判斷錯誤類型，服務無法連線時使用設定時取得的類型"""
+        try:
+            return self.client.request({"op": "error_type", "analyzer": self.analyzer_type,
+                                        "message": error_message})
+        except (OSError, RuntimeError):
+            return {"error_type": self.remote_error_type, "quota_error": False}
+
+    def get_error_type(self, error_message: str) -> str:
+        if self.local_analyzer is not None:
+            return self.local_analyzer.get_error_type(error_message)
+        return self.classify_error(error_message)["error_type"]
+
+    def is_quota_error(self, error_message: str) -> bool:
+        if self.local_analyzer is not None:
+            return self.local_analyzer.is_quota_error(error_message)
+        return self.classify_error(error_message)["quota_error"]
+
+    def close(self):
+        self.client.close()
+
+
+def connect_analyzer(analyzer_type: str, selling_items: dict, buying_items: dict = None, socket_path: str = None,
+                     fallback_factory=None):
+    """分析服務正在執行時返回 RemoteAnalyzer，否則返回 None（呼叫端改為本機載入）
+
+    fallback_factory 建立本機分析器，在服務於監控途中停止時使用。
+    """
+    if not load_config()["ENABLED"] or analyzer_type not in REMOTE_ANALYZER_TYPES:
+        return None
+    client = DaemonClient(socket_path)
+    status = client.ping()
+    if status is None:
+        client.close()
+        return None
+    try:
+        analyzer = RemoteAnalyzer(client, analyzer_type, selling_items, buying_items, fallback_factory)
+    except (OSError, RuntimeError) as e:
+        print(f"[WARN] 分析服務無法提供 {analyzer_type}，改為本機載入: {e}")
+        client.close()
+        return None
+    print(f"[INFO] 使用常駐分析服務 (pid {status['pid']}, {client.socket_path})")
+    return analyzer
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="常駐OCR分析服務")
+    parser.add_argument("--analyzers", nargs="+", default=None, choices=REMOTE_ANALYZER_TYPES,
+                        help="啟動時預載的分析器")
+    parser.add_argument("--socket", default=None, help="Unix socket 路徑")
+    parser.add_argument("--status", action="store_true", help="顯示執行中服務的狀態")
+    parser.add_argument("--stop", action="store_true", help="停止執行中的服務")
+    args = parser.parse_args()
+
+    if not daemon_supported():
+        print("[ERROR] 此平台不支援 Unix domain socket，無法啟動分析服務")
+        return 1
+
+    client = DaemonClient(args.socket)
+    if args.status or args.stop:
+        status = client.ping()
+        if status is None:
+            print("[INFO] 分析服務未執行")
+            return 1
+        if args.stop:
+            client.request({"op": "shutdown"})
+            print(f"[OK] 已停止分析服務 (pid {status['pid']})")
+        else:
+            print(json.dumps(status, ensure_ascii=False, indent=2))
+        client.close()
+        return 0
+
+    daemon = AnalyzerDaemon(args.socket)
+    for analyzer_type in args.analyzers or load_config()["PRELOAD"]:
+        daemon.get_analyzer(analyzer_type)
+    daemon.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""效能基準測試套件 - 使用合成廣播影像，不需要遊戲畫面即可量測分析器效能"""
+
+from .synthetic_broadcast import BroadcastSpec, render_broadcast, generate_broadcast_set
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""OCR辨識後端比較
+
+以相同的重播資料（monitoring_session_* / integration_test_* 資料夾）分別執行各個辨識後端，
+比較 analyze_image 與 ocr_recognize 階段的延遲，以及結果與 EasyOCR 預設後端（torch）
+和原始記錄的一致程度。
+
+用法:
+    python -m benchmarks.compare_ocr_backends monitoring_session_20250101_120000 --limit 50
+    python -m benchmarks.compare_ocr_backends folder1 folder2 --backends torch onnx_int8 --output cmp.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_backends import RECOGNIZER_BACKENDS
+from session_replay import SessionReplayer, diff_results
+
+BASELINE_BACKEND = "torch"
+
+
+def replay_backend(backend: str, folders, limit: int, analyzer_type: str) -> dict:
+    """以指定後端重播所有資料夾，返回每個資料夾的報告與逐幀結果"""
+    from config import SELLING_ITEMS, BUYING_ITEMS
+    if analyzer_type == "ocr":
+        from ocr_analyzer import OCRAnalyzer
+        analyzer = OCRAnalyzer(SELLING_ITEMS, BUYING_ITEMS, recognizer_backend=backend)
+    else:
+        from ocr_rectangle_analyzer import OCRRectangleAnalyzer
+        analyzer = OCRRectangleAnalyzer(SELLING_ITEMS, BUYING_ITEMS, recognizer_backend=backend)
+    # 後端無法使用時 create_reader 會退回預設，記錄實際使用的後端
+    actual = getattr(analyzer.reader, "recognizer_backend", backend)
+
+    replayer = SessionReplayer(analyzer)
+    reports = [replayer.replay(folder, limit, keep_results=True) for folder in folders]
+    results = {(report["folder"], frame["frame_id"]): frame["result"] for report in reports for frame in report["frames"]}
+    return {"backend": backend, "actual_backend": actual, "reports": reports, "results": results}
+
+
+def merge_latency(reports, stage: str, source: str = "stage_latency") -> dict:
+    """合併多個資料夾的延遲摘要（以畫面數加權的p50/p95平均）"""
+    entries = [r[source][stage] for r in reports if r.get(source, {}).get(stage, {}).get("count")]
+    total = sum(e["count"] for e in entries)
+    if not total:
+        return {"count": 0}
+    return {
+        "count": total,
+        "p50_ms": round(sum(e["p50_ms"] * e["count"] for e in entries) / total, 3),
+        "p95_ms": round(sum(e["p95_ms"] * e["count"] for e in entries) / total, 3),
+    }
+
+
+def compare_backends(runs: list) -> dict:
+    """以 torch 後端為基準比較各後端的延遲與結果一致性"""
+    baseline = next((run for run in runs if run["backend"] == BASELINE_BACKEND), runs[0])
+    summary = {}
+    for run in runs:
+        reports = run["reports"]
+        compared = sum(r["comparison"]["frames_compared"] for r in reports)
+        changed = sum(r["comparison"]["frames_changed"] for r in reports)
+        same_as_baseline = sum(1 for key, result in run["results"].items()
+                               if key in baseline["results"] and not diff_results(baseline["results"][key], result))
+        summary[run["backend"]] = {
+            "actual_backend": run["actual_backend"],
+            "frames": len(run["results"]),
+            "analyze_image": merge_latency(reports, "analyze_image"),
+            "ocr_recognize": merge_latency(reports, "ocr_recognize", "pipeline_stages"),
+            "matches_recorded": round(1 - changed / compared, 4) if compared else None,
+            "matches_baseline": round(same_as_baseline / len(run["results"]), 4) if run["results"] else None,
+        }
+    return summary
+
+
+def print_comparison(summary: dict):
+    """在終端機顯示比較表"""
+    print(f"\n{'='*78}")
+    print("OCR辨識後端比較")
+    print(f"{'='*78}")
+    print(f"{'後端':<12}{'實際':<12}{'畫面':>6}{'analyze p50':>13}{'recognize p50':>15}{'=記錄':>9}{'=torch':>9}")
+    for backend, row in summary.items():
+        analyze = row["analyze_image"].get("p50_ms", "-")
+        recognize = row["ocr_recognize"].get("p50_ms", "-")
+        recorded = f"{row['matches_recorded'] * 100:.1f}%" if row["matches_recorded"] is not None else "-"
+        baseline = f"{row['matches_baseline'] * 100:.1f}%" if row["matches_baseline"] is not None else "-"
+        print(f"{backend:<12}{row['actual_backend']:<12}{row['frames']:>6}{analyze:>13}{recognize:>15}{recorded:>9}{baseline:>9}")
+    print(f"{'='*78}")
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="比較OCR辨識後端的延遲與準確度")
+    parser.add_argument("folders", nargs="+", help="monitoring_session_* 或 integration_test_* 資料夾")
+    parser.add_argument("--backends", nargs="+", default=RECOGNIZER_BACKENDS, choices=RECOGNIZER_BACKENDS)
+    parser.add_argument("--analyzer", default="ocr_rectangle", choices=["ocr_rectangle", "ocr"])
+    parser.add_argument("--limit", type=int, default=None, help="每個資料夾最多重播的畫面數")
+    parser.add_argument("--output", default=None, help="比較結果JSON輸出路徑")
+    args = parser.parse_args()
+
+    runs = [replay_backend(backend, args.folders, args.limit, args.analyzer) for backend in args.backends]
+    summary = compare_backends(runs)
+    print_comparison(summary)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"比較結果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
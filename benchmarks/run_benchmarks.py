@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""分析器效能基準測試
+
+使用合成廣播影像（不需要截圖）量測 OCRAnalyzer、OCRRectangleAnalyzer、
+SingleRectangleAnalyzer、白框檢測以及關鍵字匹配的耗時，輸出可跨提交比較的JSON。
+
+用法:
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --skip-ocr --compare old_bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_broadcast import generate_broadcast_set, DEFAULT_MESSAGES
+from session_replay import summarize_latencies
+
+DEFAULT_ROI_SIZES = [(400, 30), (800, 40), (1280, 120)]
+DEFAULT_NOISE_LEVELS = [0.0, 8.0, 20.0]
+
+
+def get_git_commit():
+    """取得目前的git提交，用於跨提交比較"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def time_callable(func, args_list, iterations: int, warmup: int = 1):
+    """重複執行func並返回每次呼叫的耗時（毫秒）"""
+    for args in args_list[:warmup]:
+        func(*args)
+
+    samples = []
+    for _ in range(iterations):
+        for args in args_list:
+            start = time.perf_counter()
+            func(*args)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def load_items():
+    """讀取監控商品設定"""
+    try:
+        from config import SELLING_ITEMS, BUYING_ITEMS
+        return SELLING_ITEMS, BUYING_ITEMS
+    except ImportError:
+        return {"母礦": ["母礦", "青銅母礦"]}, {}
+
+
+def build_image_benchmarks(selling_items, buying_items, skip_ocr: bool):
+    """建立需要影像輸入的基準項目，依賴缺失時標記為略過"""
+    benchmarks = {}
+    skipped = {}
+
+    try:
+        from rectangle_detector import RectangleDetectionStrategy
+        strategy = RectangleDetectionStrategy()
+        benchmarks["rectangle_detector.detect_white_rectangles"] = strategy.detect_white_rectangles
+    except ImportError as e:
+        skipped["rectangle_detector.detect_white_rectangles"] = str(e)
+
+    try:
+        from white_box_detector import WhiteBoxDetector
+        # 不重用上一幀、每次全圖搜尋，作為快取效果的對照組
+        full_search = WhiteBoxDetector({"REUSE_PREVIOUS_FRAME": False, "FULL_SEARCH_EVERY": 0})
+        benchmarks["WhiteBoxDetector.detect_full_search"] = full_search.detect
+    except ImportError as e:
+        skipped["WhiteBoxDetector.detect_full_search"] = str(e)
+
+    try:
+        from white_box_detector import WhiteBoxDetector
+        # 不做縮小粗略定位，作為候選區域搜尋的對照組
+        full_resolution = WhiteBoxDetector({"REUSE_PREVIOUS_FRAME": False, "FULL_SEARCH_EVERY": 0, "COARSE_SCALE": 1})
+        benchmarks["WhiteBoxDetector.detect_full_resolution"] = full_resolution.detect
+    except ImportError as e:
+        skipped["WhiteBoxDetector.detect_full_resolution"] = str(e)
+
+    try:
+        from single_rectangle_detector import SingleRectangleDetector
+        detector = SingleRectangleDetector()
+        benchmarks["SingleRectangleDetector.detect_single_rectangle"] = detector.detect_single_rectangle
+    except ImportError as e:
+        skipped["SingleRectangleDetector.detect_single_rectangle"] = str(e)
+
+    if skip_ocr:
+        for name in ["OCRAnalyzer.analyze", "OCRRectangleAnalyzer.analyze",
+                     "SingleRectangleAnalyzer.analyze_single_rectangle_image"]:
+            skipped[name] = "skip-ocr"
+        return benchmarks, skipped
+
+    try:
+        from ocr_analyzer import OCRAnalyzer
+        benchmarks["OCRAnalyzer.analyze"] = OCRAnalyzer(selling_items, buying_items).analyze
+    except Exception as e:
+        skipped["OCRAnalyzer.analyze"] = str(e)
+
+    try:
+        from ocr_rectangle_analyzer import OCRRectangleAnalyzer
+        benchmarks["OCRRectangleAnalyzer.analyze"] = OCRRectangleAnalyzer(selling_items, buying_items).analyze
+    except Exception as e:
+        skipped["OCRRectangleAnalyzer.analyze"] = str(e)
+
+    try:
+        from single_rectangle_detector import SingleRectangleAnalyzer
+        single_analyzer = SingleRectangleAnalyzer()
+        benchmarks["SingleRectangleAnalyzer.analyze_single_rectangle_image"] = single_analyzer.analyze_single_rectangle_image
+    except Exception as e:
+        skipped["SingleRectangleAnalyzer.analyze_single_rectangle_image"] = str(e)
+
+    return benchmarks, skipped
+
+
+def build_matcher_benchmarks(selling_items, buying_items):
+    """建立純文字的關鍵字匹配基準項目（不需要OCR模型）"""
+    from text_analyzer import TextAnalyzer
+
+    class _MatcherOnly(TextAnalyzer):
+        """只使用父類文字匹配方法的分析器"""
+        def analyze_image(self, image):
+            return ""
+
+        def parse_result(self, raw_result):
+            return None
+
+    base_matcher = _MatcherOnly(selling_items)
+    benchmarks = {
+        "TextAnalyzer.find_matching_items": base_matcher.find_matching_items,
+        "TextAnalyzer.extract_player_name": base_matcher.extract_player_name,
+    }
+
+    try:
+        from ocr_rectangle_analyzer import OCRRectangleAnalyzer
+        # 只使用文字匹配方法，不需要初始化OCR模型
+        rectangle_matcher = OCRRectangleAnalyzer.__new__(OCRRectangleAnalyzer)
+        TextAnalyzer.__init__(rectangle_matcher, selling_items)
+        rectangle_matcher.buying_items = buying_items
+        benchmarks["OCRRectangleAnalyzer.analyze_context_matching"] = rectangle_matcher.analyze_context_matching
+        benchmarks["OCRRectangleAnalyzer.process_rear_segment"] = rectangle_matcher.process_rear_segment
+    except ImportError:
+        pass
+
+    return benchmarks
+
+
+def run_benchmarks(iterations: int = 3, roi_sizes=None, noise_levels=None, samples_per_case: int = 3,
+                   skip_ocr: bool = False) -> dict:
+    """執行所有基準測試並返回結果字典"""
+    roi_sizes = roi_sizes or DEFAULT_ROI_SIZES
+    noise_levels = noise_levels if noise_levels is not None else DEFAULT_NOISE_LEVELS
+    selling_items, buying_items = load_items()
+
+    results = []
+
+    # 影像類基準：每個ROI尺寸 × 雜訊強度 一組
+    image_benchmarks, skipped = build_image_benchmarks(selling_items, buying_items, skip_ocr)
+    for roi_width, roi_height in roi_sizes:
+        for noise_level in noise_levels:
+            samples = generate_broadcast_set([(roi_width, roi_height)], [noise_level], count=samples_per_case)
+            images = [(image,) for _, image in samples]
+            for name, func in image_benchmarks.items():
+                print(f"  {name} @ {roi_width}x{roi_height} noise={noise_level}")
+                latencies = time_callable(func, images, iterations)
+                results.append({
+                    "benchmark": name,
+                    "roi_size": f"{roi_width}x{roi_height}",
+                    "noise_level": noise_level,
+                    "iterations": iterations,
+                    **summarize_latencies(latencies)
+                })
+
+    # 文字匹配基準
+    texts = [(f"hihi5217 1623 : {message}",) for message in DEFAULT_MESSAGES]
+    for name, func in build_matcher_benchmarks(selling_items, buying_items).items():
+        print(f"  {name}")
+        latencies = time_callable(func, texts, iterations * 100)
+        results.append({
+            "benchmark": name,
+            "roi_size": None,
+            "noise_level": None,
+            "iterations": iterations * 100,
+            **summarize_latencies(latencies)
+        })
+
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "git_commit": get_git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "results": results,
+        "skipped": skipped
+    }
+
+
+def result_key(entry: dict) -> str:
+    """基準項目的唯一鍵（名稱 + ROI尺寸 + 雜訊）"""
+    return f"{entry['benchmark']}|{entry.get('roi_size')}|{entry.get('noise_level')}"
+
+
+def compare_results(baseline: dict, current: dict) -> list:
+    """比較兩次基準結果的p50延遲，返回變化列表（ratio > 1 表示變慢）"""
+    baseline_map = {result_key(r): r for r in baseline.get("results", [])}
+    comparisons = []
+    for entry in current.get("results", []):
+        old = baseline_map.get(result_key(entry))
+        if not old or not old.get("p50_ms"):
+            continue
+        comparisons.append({
+            "key": result_key(entry),
+            "baseline_p50_ms": old["p50_ms"],
+            "current_p50_ms": entry["p50_ms"],
+            "ratio": round(entry["p50_ms"] / old["p50_ms"], 3)
+        })
+    return comparisons
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="分析器效能基準測試（合成影像）")
+    parser.add_argument("--iterations", type=int, default=3, help="每組影像重複次數")
+    parser.add_argument("--samples", type=int, default=3, help="每組ROI/雜訊產生的影像數")
+    parser.add_argument("--skip-ocr", action="store_true", help="略過需要EasyOCR模型的分析器")
+    parser.add_argument("--output", default="benchmark_results.json", help="結果輸出路徑")
+    parser.add_argument("--compare", default=None, help="與先前的結果JSON比較")
+    args = parser.parse_args()
+
+    print("開始執行效能基準測試...")
+    report = run_benchmarks(args.iterations, samples_per_case=args.samples, skip_ocr=args.skip_ocr)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n基準結果已保存: {args.output} (commit {report['git_commit']})")
+
+    for entry in report["results"]:
+        print(f"  {result_key(entry)}: p50={entry['p50_ms']}ms p95={entry['p95_ms']}ms")
+    for name, reason in report["skipped"].items():
+        print(f"  [SKIP] {name}: {reason}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n與 {args.compare} (commit {baseline.get('git_commit', '?')}) 比較:")
+        for comparison in compare_results(baseline, report):
+            marker = "[SLOWER]" if comparison["ratio"] > 1.1 else "[FASTER]" if comparison["ratio"] < 0.9 else "[SAME]"
+            print(f"  {marker} {comparison['key']}: {comparison['baseline_p50_ms']}ms -> "
+                  f"{comparison['current_p50_ms']}ms (x{comparison['ratio']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""合成楓之谷風格廣播影像產生器
+
+每行廣播由「玩家名稱 + 白色頻道框 + 中英混合訊息」組成，
+可指定ROI尺寸和雜訊強度，並以固定亂數種子確保結果可重現。
+"""
+
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# 依序嘗試的CJK字型（Windows / Linux / macOS）
+CJK_FONT_CANDIDATES = [
+    "msjh.ttc",
+    "C:/Windows/Fonts/msjh.ttc",
+    "C:/Windows/Fonts/mingliu.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+]
+
+DEFAULT_PLAYERS = ["hihi5217", "楓葉商人", "Trader88", "小小盜賊", "WTBking"]
+DEFAULT_MESSAGES = [
+    "收購 青銅母礦 鋼鐵母礦 大量收 價格私訊",
+    "WTB 盾牌防禦力60% 卷軸 x3",
+    "賣 披風 收 催化劑 歡迎密",
+    "收 雙手棍攻擊力60% 弓攻60 高價收",
+    "WTS 乾淨披風 便宜賣 CH快來",
+]
+
+_font_cache = {}
+
+
+def load_font(size: int = 12):
+    """載入可顯示中文的字型，找不到時使用PIL預設字型"""
+    if size in _font_cache:
+        return _font_cache[size]
+
+    font = None
+    for candidate in CJK_FONT_CANDIDATES:
+        try:
+            font = ImageFont.truetype(candidate, size)
+            break
+        except (OSError, IOError):
+            continue
+    if font is None:
+        try:
+            font = ImageFont.load_default(size=size)
+        except TypeError:
+            font = ImageFont.load_default()
+
+    _font_cache[size] = font
+    return font
+
+
+class BroadcastSpec:
+    """單行廣播影像的規格"""
+
+    def __init__(self,
+                 player_name: str = "hihi5217",
+                 channel_number: str = "1623",
+                 message: str = "收購 青銅母礦 鋼鐵母礦 大量收",
+                 roi_width: int = 800,
+                 roi_height: int = 40,
+                 noise_level: float = 0.0,
+                 font_size: int = 12,
+                 seed: int = 0):
+        self.player_name = player_name
+        self.channel_number = channel_number
+        self.message = message
+        self.roi_width = roi_width
+        self.roi_height = roi_height
+        self.noise_level = noise_level  # 高斯雜訊標準差（0~255）
+        self.font_size = font_size
+        self.seed = seed
+
+    def to_dict(self):
+        """轉換為字典格式"""
+        return dict(self.__dict__)
+
+
+def render_broadcast(spec: BroadcastSpec) -> Image.Image:
+    """依規格渲染廣播影像，返回RGB PIL影像"""
+    font = load_font(spec.font_size)
+    image = Image.new('RGB', (spec.roi_width, spec.roi_height), (30, 30, 60))
+    draw = ImageDraw.Draw(image)
+
+    line_height = spec.font_size + 6
+    top = max(0, (spec.roi_height - line_height) // 2)
+    x = 6
+
+    # 玩家名稱
+    draw.text((x, top + 2), spec.player_name, fill=(255, 220, 120), font=font)
+    x += int(draw.textlength(spec.player_name, font=font)) + 6
+
+    # 白色頻道框（內含深色頻道編號）
+    box_width = int(draw.textlength(spec.channel_number, font=font)) + 10
+    draw.rectangle([x, top, x + box_width, top + line_height], fill=(255, 255, 255))
+    draw.text((x + 5, top + 2), spec.channel_number, fill=(40, 40, 40), font=font)
+    x += box_width + 6
+
+    # 廣播訊息
+    draw.text((x, top + 2), f": {spec.message}", fill=(240, 240, 240), font=font)
+
+    if spec.noise_level > 0:
+        rng = np.random.default_rng(spec.seed)
+        pixels = np.asarray(image, dtype=np.float32)
+        pixels += rng.normal(0, spec.noise_level, pixels.shape)
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    return image
+
+
+def generate_broadcast_set(roi_sizes, noise_levels, count: int = 5, seed: int = 42):
+    """產生不同ROI尺寸與雜訊強度的影像集合
+
+    返回 [(spec, image), ...]，相同參數下輸出固定。
+    """
+    rng = random.Random(seed)
+    samples = []
+    for roi_width, roi_height in roi_sizes:
+        for noise_level in noise_levels:
+            for i in range(count):
+                spec = BroadcastSpec(
+                    player_name=rng.choice(DEFAULT_PLAYERS),
+                    channel_number=str(rng.randint(100, 3000)),
+                    message=rng.choice(DEFAULT_MESSAGES),
+                    roi_width=roi_width,
+                    roi_height=roi_height,
+                    noise_level=noise_level,
+                    seed=seed + i
+                )
+                samples.append((spec, render_broadcast(spec)))
+    return samples
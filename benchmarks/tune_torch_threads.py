@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""torch 執行緒數調校
+
+在本機以合成廣播影像重複執行分析器，逐一套用不同的 intra-op 執行緒數並量測延遲，
+建議在最快結果 TOLERANCE 範圍內、使用最少執行緒的設定（其餘核心留給截圖、報告與API執行緒），
+並輸出可貼到 config.py TORCH_RUNTIME_CONFIG 的設定。
+
+inter-op 執行緒數每個程序只能設定一次，請以 --inter-op 分別執行比較。
+
+用法:
+    python -m benchmarks.tune_torch_threads
+    python -m benchmarks.tune_torch_threads --analyzer ocr --threads 1 2 4 --iterations 5 --output tune.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.run_benchmarks import load_items, time_callable
+from benchmarks.synthetic_broadcast import generate_broadcast_set
+from session_replay import summarize_latencies
+
+TOLERANCE = 0.1
+ANALYZER_PROFILES = {"ocr_rectangle": "OCR_RECTANGLE", "ocr": "OCR"}
+
+
+def default_thread_counts(cpu_count: int = None) -> list:
+    """1、2、4…直到CPU核心數"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    counts = []
+    value = 1
+    while value < cpu_count:
+        counts.append(value)
+        value *= 2
+    counts.append(cpu_count)
+    return counts
+
+
+def recommend_threads(sweep: list, tolerance: float = TOLERANCE) -> dict:
+    """在最快p50的 (1 + tolerance) 倍內選擇執行緒最少的設定"""
+    measured = [entry for entry in sweep if entry.get("p50_ms") is not None]
+    if not measured:
+        return {}
+    best = min(entry["p50_ms"] for entry in measured)
+    candidates = [entry for entry in measured if entry["p50_ms"] <= best * (1 + tolerance)]
+    return min(candidates, key=lambda entry: entry["threads"])
+
+
+def build_analyzer(analyzer_type: str):
+    """建立要調校的分析器（OCR模型只載入一次）"""
+    selling_items, buying_items = load_items()
+    if analyzer_type == "ocr":
+        from ocr_analyzer import OCRAnalyzer
+        return OCRAnalyzer(selling_items, buying_items)
+    from ocr_rectangle_analyzer import OCRRectangleAnalyzer
+    return OCRRectangleAnalyzer(selling_items, buying_items)
+
+
+def sweep_threads(analyzer, thread_counts, iterations: int, images) -> list:
+    """逐一套用執行緒數並量測 analyze 的延遲"""
+    from ocr_backends import apply_torch_runtime
+    sweep = []
+    for threads in thread_counts:
+        apply_torch_runtime({"INTRA_OP_THREADS": threads})
+        print(f"  intra-op threads = {threads}")
+        latencies = time_callable(analyzer.analyze, images, iterations)
+        sweep.append({"threads": threads, **summarize_latencies(latencies)})
+    return sweep
+
+
+def print_sweep(sweep: list, recommended: dict, profile: str, inter_op: int):
+    """顯示調校結果與建議設定"""
+    print(f"\n{'='*56}")
+    print(f"torch 執行緒數調校 ({profile})")
+    print(f"{'='*56}")
+    print(f"{'threads':>8}{'p50 ms':>12}{'p95 ms':>12}{'mean ms':>12}")
+    for entry in sweep:
+        marker = "  <= 建議" if entry is recommended else ""
+        print(f"{entry['threads']:>8}{entry['p50_ms']:>12}{entry['p95_ms']:>12}{entry['mean_ms']:>12}{marker}")
+    print(f"{'='*56}")
+    if recommended:
+        print("建議設定（config.py）:")
+        settings = {"INTRA_OP_THREADS": recommended["threads"]}
+        if inter_op:
+            settings["INTER_OP_THREADS"] = inter_op
+        print(f'TORCH_RUNTIME_CONFIG["{profile}"] = {settings}')
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="量測不同torch執行緒數的OCR延遲並建議設定")
+    parser.add_argument("--analyzer", default="ocr_rectangle", choices=list(ANALYZER_PROFILES))
+    parser.add_argument("--threads", type=int, nargs="+", default=None, help="要測試的 intra-op 執行緒數")
+    parser.add_argument("--inter-op", type=int, default=0, help="本次執行使用的 inter-op 執行緒數")
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=3, help="合成影像數量")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="容許比最快結果慢的比例")
+    parser.add_argument("--output", default=None, help="調校結果JSON輸出路徑")
+    args = parser.parse_args()
+
+    from ocr_backends import apply_torch_runtime
+    if args.inter_op:
+        apply_torch_runtime({"INTER_OP_THREADS": args.inter_op})
+
+    profile = ANALYZER_PROFILES[args.analyzer]
+    analyzer = build_analyzer(args.analyzer)
+    images = [(image,) for _, image in generate_broadcast_set([(800, 40)], [8.0], count=args.samples)]
+    sweep = sweep_threads(analyzer, args.threads or default_thread_counts(), args.iterations, images)
+    recommended = recommend_threads(sweep, args.tolerance)
+    print_sweep(sweep, recommended, profile, args.inter_op)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"profile": profile, "inter_op_threads": args.inter_op, "cpu_count": os.cpu_count(),
+                       "sweep": sweep, "recommended": recommended}, f, ensure_ascii=False, indent=2)
+        print(f"調校結果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""重複廣播去重索引 - 合併同一玩家在時間窗內重複發送的相同廣播"""
+
+import hashlib
+import re
+import time
+
+SIMHASH_BITS = 64
+
+
+def normalize_text(text: str) -> str:
+    """正規化廣播文字：轉小寫並移除空白與標點，降低OCR雜訊影響"""
+    text = (text or '').lower()
+    return re.sub(r'[\s\W_]+', '', text)
+
+
+def simhash(text: str) -> int:
+    """計算文字的64位元SimHash（以字元雙字組為特徵）"""
+    normalized = normalize_text(text)
+    if not normalized:
+        return 0
+
+    if len(normalized) == 1:
+        features = [normalized]
+    else:
+        features = [normalized[i:i + 2] for i in range(len(normalized) - 1)]
+
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if digest >> bit & 1 else -1
+
+    value = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            value |= 1 << bit
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """計算兩個雜湊值的漢明距離"""
+    return bin(a ^ b).count('1')
+
+
+class BroadcastDeduplicator:
+    """以(玩家, 頻道, 匹配商品, 文字模糊雜湊)為鍵的滑動時間窗去重索引"""
+
+    def __init__(self, window_seconds: float = 600, max_hamming_distance: int = 6):
+        self.window_seconds = window_seconds
+        self.max_hamming_distance = max_hamming_distance
+        self.index = {}  # (player, channel, items) -> [entry, ...]
+        self.duplicate_count = 0
+
+    @staticmethod
+    def make_key(result) -> tuple:
+        """從分析結果建立正規化的索引鍵"""
+        player_name = normalize_text(str(getattr(result, 'player_name', '')))
+        channel_number = normalize_text(str(getattr(result, 'channel_number', '')))
+        items = getattr(result, 'matched_items', None) or []
+        item_names = tuple(sorted(item.get('item_name', '') for item in items if isinstance(item, dict)))
+        return (player_name, channel_number, item_names)
+
+    def prune(self, now: float = None):
+        """移除超出時間窗的記錄"""
+        now = time.time() if now is None else now
+        cutoff = now - self.window_seconds
+        for key in list(self.index.keys()):
+            entries = [entry for entry in self.index[key] if entry['last_seen'] >= cutoff]
+            if entries:
+                self.index[key] = entries
+            else:
+                del self.index[key]
+
+    def check(self, result, test_id, screenshot_path: str = None, now: float = None):
+        """檢查分析結果是否為重複廣播
+
+        重複時更新既有記錄的次數與最後出現時間並返回該記錄；
+        否則登記為新記錄並返回None。
+        """
+        now = time.time() if now is None else now
+        self.prune(now)
+
+        key = self.make_key(result)
+        text_hash = simhash(getattr(result, 'full_text', ''))
+
+        for entry in self.index.get(key, []):
+            if hamming_distance(entry['text_hash'], text_hash) <= self.max_hamming_distance:
+                entry['count'] += 1
+                entry['last_seen'] = now
+                self.duplicate_count += 1
+                return entry
+
+        self.index.setdefault(key, []).append({
+            'test_id': test_id,
+            'screenshot_path': screenshot_path,
+            'text_hash': text_hash,
+            'first_seen': now,
+            'last_seen': now,
+            'count': 1
+        })
+        return None
+
+    def clear(self):
+        """清除所有記錄（記憶體不足時使用），返回清除的筆數"""
+        cleared = len(self)
+        self.index = {}
+        return cleared
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.index.values())
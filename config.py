@@ -51,6 +51,106 @@ TRADING_KEYWORDS = {
 
 SCAN_INTERVAL = 2
 
+# 自適應掃描間隔設定 - 廣播活躍時縮短間隔，畫面無變化時指數退避
+ADAPTIVE_SCAN_CONFIG = {
+    "ENABLED": True,                     # Enable adaptive scan interval (False = fixed SCAN_INTERVAL)
+    "MIN_INTERVAL": 0.5,                 # Minimum interval in seconds
+    "MAX_INTERVAL": 8.0,                 # Maximum interval in seconds
+    "BACKOFF_FACTOR": 1.5,               # Interval multiplier when nothing changes
+    "SPEEDUP_FACTOR": 0.5,               # Interval multiplier when activity is detected
+    "FRAME_DIFF_THRESHOLD": 0.01,        # Changed-pixel ratio that counts as activity
+    "PIXEL_DIFF_THRESHOLD": 24,          # Grayscale delta for a pixel to count as changed
+    "CPU_BUDGET": 0.6,                   # Max fraction of wall time spent scanning
+}
+
+# 匹配提醒設定 - 提醒在獨立執行緒顯示，不會阻塞掃描迴圈
+ALERT_CONFIG = {
+    "BACKEND": "tk",                     # Alert backend: "tk" (persistent window), "desktop" (plyer), "console"
+    "COALESCE_WINDOW": 60,               # Seconds to merge repeated alerts for the same player/items
+    "MAX_QUEUE_SIZE": 100,               # Pending alerts beyond this are dropped
+}
+
+# 重複廣播去重設定 - 同一玩家重複發送的相同廣播只更新次數，不產生新的截圖/JSON/提醒
+DEDUP_CONFIG = {
+    "ENABLED": True,                     # Enable duplicate broadcast suppression
+    "WINDOW_SECONDS": 600,               # Sliding window measured from the last sighting
+    "MAX_HAMMING_DISTANCE": 6,           # Max SimHash distance for texts to count as the same broadcast
+}
+
+# 流程計時設定 - 記錄擷取、預處理、白框檢測、OCR、匹配、保存、報告、提醒各階段耗時
+TIMING_CONFIG = {
+    "ENABLED": True,                     # Enable per-stage timing (negligible overhead when disabled)
+    "WINDOW_SIZE": 1000,                 # Rolling sample window per stage for p50/p95/p99
+    "METRICS_INTERVAL": 60,              # Seconds between metrics lines in pipeline_metrics.jsonl
+}
+
+# 取樣分析器設定 - 由配置API (POST /api/profile) 或 SIGUSR1 觸發，結果輸出到會話資料夾
+PROFILER_CONFIG = {
+    "DEFAULT_DURATION": 30,              # Seconds to sample when no duration is given
+    "SAMPLE_INTERVAL": 0.005,            # Seconds between stack samples of the scan thread
+    "INCLUDE_LINES": False,              # Record frames as module:function:line instead of module:function
+    "SIGNAL_ENABLED": True,              # Allow SIGUSR1 to start a profile (POSIX only)
+}
+
+# 會話儲存設定 - 截圖與JSON分段寫入 segment_XXXX/，舊分段在背景清理與壓縮（需手動開啟：會刪除或壓縮未匹配的截圖，見 USER_MANUAL.md）
+STORAGE_CONFIG = {
+    "ENABLED": False,
+    "SEGMENT_MAX_FILES": 500,            # Rotate after this many files in a segment
+    "SEGMENT_MAX_MB": 200,               # Rotate after this many megabytes in a segment
+    "SEGMENT_MAX_HOURS": 1,              # Rotate after this many hours
+    "NON_MATCH_KEEP_EVERY": 10,          # Keep 1 of every N non-matching scans in closed segments (0 = none)
+    "COMPRESS_CLOSED_SEGMENTS": True,    # Zip kept non-matching files of closed segments
+    "DISK_BUDGET_MB": 5120,              # Budget for all monitoring_session_* folders (None = unlimited)
+}
+
+# 掃描索引設定 - 每次掃描與匹配寫入SQLite資料庫，可用 scan_index.py 跨會話查詢（需手動開啟）
+SCAN_INDEX_CONFIG = {
+    "ENABLED": False,
+    "DB_PATH": "monitor_index.db",       # Shared across sessions; relative paths are under the monitoring_session_* parent folder
+    "BATCH_SIZE": 50,                    # Rows buffered before a commit
+    "FLUSH_INTERVAL": 5,                 # Max seconds between commits
+    "STATS_INTERVAL": 60,                # Seconds between session stats refreshes for /metrics
+}
+
+# 記憶體監看設定 - 定期記錄記憶體用量，超過上限時釋放影像或將舊記錄寫到磁碟
+MEMORY_WATCHDOG_CONFIG = {
+    "ENABLED": True,
+    "SAMPLE_INTERVAL": 60,               # Seconds between memory samples (memory_samples.jsonl)
+    "TRACEMALLOC": False,                # Trace allocations for the whole session (slow, diagnostics only)
+    "TRACEMALLOC_ON_LIMIT": True,        # Start tracing after the first soft/hard limit breach
+    "TRACEMALLOC_FRAMES": 1,             # Traceback depth kept by tracemalloc
+    "TOP_ALLOCATORS": 10,                # Allocation sites logged per sample
+    "SOFT_LIMIT_MB": 1024,               # Release inline base64 images of older records
+    "HARD_LIMIT_MB": 2048,               # Spill older records to disk and clear caches
+    "KEEP_RECENT_RECORDS": 50,           # Records always kept fully in memory
+}
+
+# 版面裁切設定 - 前幾幀學習文字與白框實際出現的區域，之後只分析該文字帶（需手動開啟：文字帶外的新文字最多延遲 REVALIDATE_EVERY 幀才會被分析）
+LAYOUT_CALIBRATION_CONFIG = {
+    "ENABLED": False,
+    "CALIBRATION_FRAMES": 20,            # Full-ROI frames used to learn the text band
+    "REVALIDATE_EVERY": 10,              # Check the full ROI every N cropped frames
+    "MARGIN": 6,                         # Pixels kept around the learned band
+    "MIN_ACTIVE_FRACTION": 0.02,         # Row/column foreground fraction counted as text
+    "DIFF_THRESHOLD": 40,                # Gray-level distance from background median for foreground
+}
+
+# 啟動設定 - 使用者選取ROI時在背景載入分析器並以合成畫面預熱，第一次掃描後輸出 startup_report.json
+STARTUP_CONFIG = {
+    "BACKGROUND_LOAD": True,             # Create the analyzer while settings/ROI are being chosen
+    "WARMUP": True,                      # Run one inference on a synthetic frame before the first scan
+    "SAVE_REPORT": True,                 # Write import/milestone timings to the session folder
+}
+
+# 常駐分析服務 - 以 python analyzer_daemon.py 啟動後，監控與測試程式直接使用已載入的模型（僅支援Linux/macOS）
+ANALYZER_DAEMON_CONFIG = {
+    "ENABLED": True,                     # Use a running daemon when one is found
+    "SOCKET_PATH": None,                 # Unix socket path (None = <tempdir>/maple_analyzer_<user>.sock)
+    "PRELOAD": ["ocr_rectangle"],        # Analyzers loaded and warmed up when the daemon starts
+    "CONNECT_TIMEOUT": 0.5,              # Seconds to wait when probing for the daemon
+    "REQUEST_TIMEOUT": 60,               # Seconds to wait for one analysis
+}
+
 # 截圖保存設定
 SAVE_SCREENSHOTS = False  # 是否保存截圖
 SCREENSHOT_FOLDER = "screenshots"  # 截圖保存資料夾
@@ -62,8 +162,58 @@ RECTANGLE_DETECTION_CONFIG = {
     "MAX_RECTANGLE_AREA": 5000,          # Maximum rectangle area
     "MIN_ASPECT_RATIO": 0.2,             # Minimum aspect ratio
     "MAX_ASPECT_RATIO": 10,              # Maximum aspect ratio
-    "FILL_RATIO_THRESHOLD": 0.7,         # Rectangle fill ratio threshold
+    "FILL_RATIO_THRESHOLD": 0.7,         # Rectangle fill ratio threshold (0 = bbox area/aspect only; OCR_Rectangle uses 0)
     "TEXT_ASSIGNMENT_TOLERANCE": 5,      # Text assignment tolerance in pixels
+    "MORPHOLOGY_KERNEL_SIZE": 3,         # Close/open kernel size (0 = no morphology; OCR_Rectangle uses 1)
+    "REUSE_PREVIOUS_FRAME": True,        # Reuse last result when the box region is unchanged
+    "REUSE_MAX_DIFF": 2.0,               # Max mean abs pixel diff of the box region to reuse
+    "SEARCH_BAND_MARGIN": 20,            # Pixels around the last box searched before a full search
+    "FULL_SEARCH_EVERY": 30,             # Force a full-frame search after this many cached/band frames
+    "COARSE_SCALE": 2,                   # Downscale factor for locating candidates (1 = full resolution only)
+}
+
+# OCR辨識模型後端 - torch: EasyOCR預設, torch_fp32: 不量化, onnx / onnx_int8: ONNX Runtime（需 pip install onnxruntime）
+OCR_BACKEND_CONFIG = {
+    "RECOGNIZER": "torch",               # torch / torch_fp32 / onnx / onnx_int8
+    "CACHE_DIR": "ocr_model_cache",      # Exported ONNX models, keyed by languages and EasyOCR version
+    "ONNX_THREADS": 0,                   # ONNX Runtime intra-op threads (0 = INTRA_OP_THREADS below / runtime default)
+}
+
+# torch執行設定 - DEFAULT 套用於所有分析器，再以分析器類型（OCR / OCR_RECTANGLE / SINGLE_RECTANGLE）覆寫
+# 建議值可用 python -m benchmarks.tune_torch_threads 在本機測得
+TORCH_RUNTIME_CONFIG = {
+    "DEFAULT": {
+        "INTRA_OP_THREADS": 0,           # torch.set_num_threads (0 = torch default, all cores)
+        "INTER_OP_THREADS": 0,           # torch.set_num_interop_threads (0 = torch default)
+        "CPU_AFFINITY": None,            # e.g. [2, 3, 4, 5]: process-wide cap for every monitor thread, not OCR only (Linux only)
+        "INFERENCE_MODE": True,          # Run readtext under torch.inference_mode (False = no_grad)
+        "MKLDNN": True,                  # torch.backends.mkldnn.enabled
+        "CUDNN_BENCHMARK": False,        # torch.backends.cudnn.benchmark (GPU only)
+    },
+    "OCR_RECTANGLE": {},
+    "OCR": {},
+    "SINGLE_RECTANGLE": {},
+}
+
+# 白框數字辨識 - 以遊戲字型模板讀取白框內的數字，只在EasyOCR沒有讀到頻道時補上
+LATIN_OCR_CONFIG = {
+    "ENABLED": False,                    # Only takes effect when FONT_PATH is set
+    "CHARSET": "0123456789",             # Characters rendered as templates
+    "FONT_PATH": None,                   # Game font file (required; other fonts misread digits)
+    "FONT_SIZES": [11, 12, 13],          # Rendered template sizes in pixels
+    "MIN_CONFIDENCE": 0.8,               # Min per-glyph correlation to accept a reading
+}
+
+# 字元模板辨識 - 從高信心度的EasyOCR結果學習遊戲字型，所有字元都認得時不呼叫EasyOCR
+GLYPH_RECOGNIZER_CONFIG = {
+    "ENABLED": False,
+    "ATLAS_PATH": "glyph_atlas.npz",     # Learned glyph templates, shared across sessions
+    "HARVEST_MIN_CONFIDENCE": 0.9,       # EasyOCR confidence required to learn from a fragment
+    "MIN_SAMPLES": 2,                    # Samples before a glyph is used for recognition
+    "MIN_SCORE": 0.85,                   # Min glyph correlation, otherwise fall back to EasyOCR
+    "VERIFY_EVERY": 20,                  # Run EasyOCR every N template frames to check agreement
+    "SAVE_EVERY": 50,                    # New samples between atlas saves
+    "DIFF_THRESHOLD": 40,                # Gray-level distance from background median for text
 }
 
 # OCR Debug settings for OCR_Rectangle analyzer
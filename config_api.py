@@ -12,6 +12,9 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import re
 
+from runtime_metrics import runtime_metrics
+from sampling_profiler import profiler_controller
+
 
 class ConfigManager:
     """配置文件管理器"""
@@ -281,10 +284,33 @@ class ConfigManager:
         return False
 
 
+def open_scan_index():
+    """開啟掃描索引（供全文搜尋使用），未啟用或開啟失敗時返回None"""
+    try:
+        import config
+        index_config = getattr(config, 'SCAN_INDEX_CONFIG', {})
+        if not index_config.get('ENABLED', False):
+            return None
+        from scan_index import ScanIndex, resolve_db_path
+        # 配置API與監控程式在同一個工作目錄（會話根目錄）執行
+        return ScanIndex(resolve_db_path(index_config.get('DB_PATH')))
+    except Exception as e:
+        print(f"[WARN] 無法開啟掃描索引: {e}")
+        return None
+
+
 class ConfigAPIHandler(BaseHTTPRequestHandler):
     """配置API請求處理器"""
     
     config_manager = ConfigManager()
+    scan_index = None
+    
+    @classmethod
+    def get_scan_index(cls):
+        """延遲開啟掃描索引"""
+        if cls.scan_index is None:
+            cls.scan_index = open_scan_index()
+        return cls.scan_index
     
     def _send_json_response(self, data, status_code=200):
         """發送JSON響應"""
@@ -302,6 +328,15 @@ class ConfigAPIHandler(BaseHTTPRequestHandler):
         """發送錯誤響應"""
         self._send_json_response({'error': message, 'success': False}, status_code)
     
+    def _send_text_response(self, text, content_type='text/plain; version=0.0.4; charset=utf-8'):
+        """發送純文字響應"""
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_OPTIONS(self):
         """處理CORS預檢請求"""
         self.send_response(200)
@@ -325,19 +360,66 @@ class ConfigAPIHandler(BaseHTTPRequestHandler):
             items = config.get('SELLING_ITEMS', {})
             self._send_json_response({'items': items, 'success': True})
             
+        elif parsed_path.path == '/api/search':
+            # 搜尋歷史廣播全文
+            query_params = parse_qs(parsed_path.query)
+            text = query_params.get('q', [''])[0].strip()
+            if not text:
+                self._send_error_response('搜尋字串不能為空')
+                return
+            index = self.get_scan_index()
+            if index is None:
+                self._send_error_response('掃描索引未啟用', 503)
+                return
+            try:
+                from scan_index import parse_since
+                since = query_params.get('since', [None])[0]
+                truncated = []
+                results = index.search_text(
+                    text,
+                    since=parse_since(since) if since else None,
+                    matches_only=query_params.get('matchesOnly', ['0'])[0] in ('1', 'true'),
+                    limit=min(int(query_params.get('limit', ['50'])[0]), 500),
+                    truncated=truncated
+                )
+                self._send_json_response({'results': results, 'count': len(results), 'truncatedTerms': truncated,
+                                          'success': True})
+            except ValueError as e:
+                self._send_error_response(f'搜尋參數錯誤: {e}')
+            
+        elif parsed_path.path == '/api/profile':
+            # 取樣分析器狀態
+            self._send_json_response({'profile': profiler_controller.status(), 'success': True})
+            
+        elif parsed_path.path == '/metrics':
+            # Prometheus 文字格式的執行期指標
+            self._send_text_response(runtime_metrics.render_prometheus())
+            
         else:
             self._send_error_response('Not Found', 404)
     
     def do_POST(self):
         """處理POST請求"""
         try:
-            content_length = int(self.headers['Content-Length'])
+            content_length = int(self.headers.get('Content-Length', 0))
             post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
+            data = json.loads(post_data.decode('utf-8')) if post_data else {}
             
             parsed_path = urlparse(self.path)
             
-            if parsed_path.path == '/api/items/add':
+            if parsed_path.path == '/api/profile':
+                # 開始取樣掃描執行緒
+                try:
+                    success, message = profiler_controller.start(data.get('duration'))
+                except ValueError as e:
+                    self._send_error_response(str(e), 400)
+                    return
+                if success:
+                    self._send_json_response({'message': message, 'success': True})
+                else:
+                    self._send_error_response(message, 409)
+            
+            elif parsed_path.path == '/api/items/add':
                 # 添加新物品
                 item_name = data.get('itemName', '').strip()
                 keywords = data.get('keywords', [])
@@ -469,6 +551,10 @@ def start_config_api_server(port=8899):
         print("API端點:")
         print(f"   GET  http://localhost:{port}/api/config")
         print(f"   GET  http://localhost:{port}/api/items")
+        print(f"   GET  http://localhost:{port}/metrics")
+        print(f"   GET  http://localhost:{port}/api/search?q=...")
+        print(f"   GET  http://localhost:{port}/api/profile")
+        print(f"   POST http://localhost:{port}/api/profile")
         print(f"   POST http://localhost:{port}/api/items/add")
         print(f"   POST http://localhost:{port}/api/items/update")
         print(f"   POST http://localhost:{port}/api/items/pause")
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""白框檢測調試資料 - 分析時只記錄精簡的中繼資料，疊加圖像事後再產生
+
+調試模式下每幀只在 debug_metadata.jsonl 追加一行（白框座標、使用的閾值、畫面雜湊），
+原始畫面交給背景執行緒以雜湊命名保存（相同畫面只保存一次）。二值化、遮罩與白框疊加
+圖像由 render_overlays() 或命令列依中繼資料重新產生：
+
+    python debug_artifacts.py rectangle_debug [--output 目錄] [--limit N]
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance
+
+METADATA_FILE = "debug_metadata.jsonl"
+FRAMES_DIR = "frames"
+
+
+def frame_hash(image) -> str:
+    """以畫面像素計算短雜湊，用於命名與去重"""
+    array = np.ascontiguousarray(np.asarray(image))
+    digest = hashlib.blake2b(array.tobytes(), digest_size=8)
+    digest.update(str(array.shape).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class DebugArtifactRecorder:
+    """記錄調試中繼資料，並在背景執行緒保存原始畫面"""
+
+    def __init__(self, debug_folder: str, max_queue_size: int = 32):
+        self.debug_folder = debug_folder
+        self.frames_folder = os.path.join(debug_folder, FRAMES_DIR)
+        os.makedirs(self.frames_folder, exist_ok=True)
+        self.metadata_path = os.path.join(debug_folder, METADATA_FILE)
+        self.frame_queue = queue.Queue(maxsize=max_queue_size)
+        self.saved_hashes = set(name[:-4] for name in os.listdir(self.frames_folder) if name.endswith('.png'))
+        self.recorded_count = 0
+        self.dropped_count = 0
+        self.lock = threading.Lock()
+        self.worker_thread = None
+
+    def record(self, image, rectangles, threshold: int, **extra) -> dict:
+        """記錄一幀的調試資料，rectangles 為 [(x, y, w, h), ...]"""
+        digest = frame_hash(image)
+        entry = {
+            "timestamp": int(time.time() * 1000),
+            "frame_hash": digest,
+            "threshold": int(threshold),
+            "rectangles": [[int(v) for v in rect] for rect in rectangles],
+            **extra
+        }
+        with self.lock:
+            with open(self.metadata_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.recorded_count += 1
+            if digest not in self.saved_hashes:
+                self._enqueue_frame(digest, image)
+        return entry
+
+    def _enqueue_frame(self, digest, image):
+        """將畫面交給背景執行緒保存，佇列已滿時丟棄"""
+        if self.worker_thread is None:
+            self.worker_thread = threading.Thread(target=self._run, name="DebugArtifactWriter", daemon=True)
+            self.worker_thread.start()
+            atexit.register(self.close)
+        frame = image.copy() if hasattr(image, 'copy') else np.array(image)
+        try:
+            self.frame_queue.put_nowait((digest, frame))
+            self.saved_hashes.add(digest)
+        except queue.Full:
+            self.dropped_count += 1
+
+    def _run(self):
+        """背景執行緒主迴圈"""
+        while True:
+            item = self.frame_queue.get()
+            if item is None:
+                break
+            digest, frame = item
+            try:
+                image = frame if isinstance(frame, Image.Image) else Image.fromarray(frame)
+                image.save(os.path.join(self.frames_folder, f"{digest}.png"))
+            except Exception as e:
+                print(f"[WARN] 保存調試畫面失敗: {e}")
+
+    def close(self, timeout: float = 5.0):
+        """等待尚未寫入的畫面完成"""
+        if self.worker_thread is None:
+            return
+        self.frame_queue.put(None)
+        self.worker_thread.join(timeout)
+        self.worker_thread = None
+        if self.dropped_count:
+            print(f"[WARN] 調試畫面佇列已滿，略過 {self.dropped_count} 張畫面")
+
+
+def load_metadata(debug_folder: str) -> list:
+    """讀取調試中繼資料"""
+    path = os.path.join(debug_folder, METADATA_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def render_entry(entry: dict, frame: Image.Image) -> dict:
+    """依中繼資料重建二值化、遮罩與白框疊加圖像"""
+    processed = frame
+    if entry.get("contrast"):
+        processed = ImageEnhance.Contrast(processed).enhance(entry["contrast"])
+    if entry.get("sharpness"):
+        processed = ImageEnhance.Sharpness(processed).enhance(entry["sharpness"])
+
+    gray = np.asarray(processed.convert('L'))
+    # 與 cv2.THRESH_BINARY 相同：大於閾值才算白色
+    binary = np.where(gray > entry["threshold"], 255, 0).astype(np.uint8)
+
+    masked = np.array(processed)
+    overlay = frame.convert('RGB')
+    draw = ImageDraw.Draw(overlay)
+    for x, y, w, h in entry["rectangles"]:
+        masked[y:y + h, x:x + w] = 0
+        draw.rectangle((x, y, x + w, y + h), outline=(255, 0, 0), width=2)
+
+    return {
+        "binary": Image.fromarray(binary),
+        "masked": Image.fromarray(masked),
+        "rectangle_debug": overlay
+    }
+
+
+def render_overlays(debug_folder: str, output_dir: str = None, limit: int = None) -> int:
+    """將中繼資料轉換為調試圖像，返回產生的畫面數"""
+    output_dir = output_dir or debug_folder
+    os.makedirs(output_dir, exist_ok=True)
+    rendered = 0
+    for entry in load_metadata(debug_folder)[:limit]:
+        frame_path = os.path.join(debug_folder, FRAMES_DIR, f"{entry['frame_hash']}.png")
+        if not os.path.exists(frame_path):
+            print(f"[WARN] 找不到畫面 {entry['frame_hash']}，略過")
+            continue
+        with Image.open(frame_path) as img:
+            images = render_entry(entry, img.convert('RGB'))
+        for kind, image in images.items():
+            image.save(os.path.join(output_dir, f"{entry['timestamp']}_{kind}.png"))
+        rendered += 1
+    return rendered
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="依調試中繼資料產生白框檢測圖像")
+    parser.add_argument("folder", help="調試資料夾（例如 rectangle_debug）")
+    parser.add_argument("--output", default=None, help="圖像輸出資料夾（預設為調試資料夾）")
+    parser.add_argument("--limit", type=int, default=None, help="最多產生的畫面數")
+    args = parser.parse_args()
+
+    rendered = render_overlays(args.folder, args.output, args.limit)
+    print(f"[OK] 已產生 {rendered} 組調試圖像: {args.output or args.folder}")
+
+
+if __name__ == "__main__":
+    main()
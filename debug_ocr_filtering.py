@@ -54,12 +54,16 @@ def test_analyzer_filtering():
     print("=== 測試OCR分析器過濾 ===")
     
     from ocr_analyzer import OCRAnalyzer
+    from analyzer_daemon import connect_analyzer
     from config import SELLING_ITEMS
     
     test_image_path = r"C:\Users\User\Desktop\螢幕監控程式\monitoring_session_20250810_085346\monitor_001_20250810_085346_670.png"
     
     try:
-        analyzer = OCRAnalyzer(SELLING_ITEMS)
+        # 常駐分析服務執行中時使用服務中已載入的模型
+        analyzer = connect_analyzer("ocr", SELLING_ITEMS, fallback_factory=lambda: OCRAnalyzer(SELLING_ITEMS))
+        if analyzer is None:
+            analyzer = OCRAnalyzer(SELLING_ITEMS)
         image = Image.open(test_image_path)
         
         # 調用analyze_image方法，獲得原始OCR結果
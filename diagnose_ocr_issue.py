@@ -157,17 +157,22 @@ def diagnose_ocr_analyzer():
     
     try:
         from ocr_analyzer import OCRAnalyzer
+        from analyzer_daemon import RemoteAnalyzer, connect_analyzer
         from config import SELLING_ITEMS
         
         print("[OK] 成功導入OCR分析器")
         
-        # 測試初始化
-        analyzer = OCRAnalyzer(SELLING_ITEMS)
+        # 測試初始化（常駐分析服務執行中時使用服務中已載入的模型）
+        analyzer = connect_analyzer("ocr", SELLING_ITEMS, fallback_factory=lambda: OCRAnalyzer(SELLING_ITEMS))
+        if analyzer is None:
+            analyzer = OCRAnalyzer(SELLING_ITEMS)
         print(f"[OK] OCR分析器初始化成功")
         print(f"[OK] 策略類型: {analyzer.strategy_type}")
         
         # 檢查語言設定
-        if hasattr(analyzer, 'reader') and analyzer.reader:
+        if isinstance(analyzer, RemoteAnalyzer):
+            print(f"[OK] EasyOCR讀取器由常駐分析服務提供 ({analyzer.analyzer_name})")
+        elif hasattr(analyzer, 'reader') and analyzer.reader:
             print(f"[OK] EasyOCR讀取器已初始化")
         else:
             print("[ERROR] EasyOCR讀取器初始化失敗")
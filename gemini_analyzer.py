@@ -2,6 +2,7 @@ import google.generativeai as genai
 import json
 import io
 from text_analyzer import TextAnalyzer, AnalysisResult
+from pipeline_timing import pipeline_timer
 
 class GeminiAnalyzer(TextAnalyzer):
     """使用Gemini API的文字分析器"""
@@ -17,9 +18,10 @@ class GeminiAnalyzer(TextAnalyzer):
         """使用Gemini分析圖片"""
         try:
             # 將PIL圖片轉換為bytes
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='PNG')
-            img_byte_arr = img_byte_arr.getvalue()
+            with pipeline_timer.span("preprocess"):
+                img_byte_arr = io.BytesIO()
+                image.save(img_byte_arr, format='PNG')
+                img_byte_arr = img_byte_arr.getvalue()
             
             # 生成商品清單文字
             selling_list = '\n'.join([f"- {item_name}: {', '.join(keywords)}" 
@@ -70,13 +72,14 @@ class GeminiAnalyzer(TextAnalyzer):
             """
             
             # 使用新的API格式
-            response = self.model.generate_content([
-                prompt,
-                {
-                    "mime_type": "image/png",
-                    "data": img_byte_arr
-                }
-            ])
+            with pipeline_timer.span("gemini_request"):
+                response = self.model.generate_content([
+                    prompt,
+                    {
+                        "mime_type": "image/png",
+                        "data": img_byte_arr
+                    }
+                ])
             return response.text.strip()
             
         except Exception as e:
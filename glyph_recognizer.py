@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""遊戲固定字型的字元模板辨識 - 由高信心度的 EasyOCR 結果自動建立字元模板庫
+
+廣播文字使用固定字型與字級，因此每個字元的外觀幾乎不變：
+    1. 學習：EasyOCR 信心度高於 HARVEST_MIN_CONFIDENCE 的片段，若切出的字元數與文字長度
+       相同，每個字元的正規化影像累加到該字的模板（GlyphAtlas，保存為 .npz）
+    2. 辨識：前景遮罩依列投影分行、連通元件切出字元片段，相鄰片段的所有合併組合一次與
+       模板矩陣相乘求相關分數，再以動態規劃選出總分最高的切割
+    3. 任何字元低於 MIN_SCORE 時返回None，由 EasyOCR 辨識並繼續學習；每 VERIFY_EVERY
+       幀也改用 EasyOCR 並與模板結果比對，追蹤一致率
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from latin_ocr import normalize_glyph
+
+try:
+    from config import GLYPH_RECOGNIZER_CONFIG
+except ImportError:
+    GLYPH_RECOGNIZER_CONFIG = {}
+
+DEFAULT_CONFIG = {
+    "ENABLED": False,
+    "ATLAS_PATH": "glyph_atlas.npz",
+    "HARVEST_MIN_CONFIDENCE": 0.9,
+    "MIN_SAMPLES": 2,
+    "MIN_SCORE": 0.85,
+    "VERIFY_EVERY": 20,
+    "SAVE_EVERY": 50,
+    "DIFF_THRESHOLD": 40,
+}
+
+MAX_PARTS = 3            # 一個字元最多由幾個連通片段組成
+MAX_GLYPH_WIDTH = 1.3    # 合併後的寬度上限（相對於行高）
+SPACE_RATIO = 0.35       # 字元間距超過行高的此比例視為空格
+MIN_LINE_HEIGHT = 5
+
+
+class GlyphAtlas:
+    """每個字元的模板向量累加與持久化"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.sums = {}
+        self.counts = {}
+        self._cache = None
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, char: str, vector: np.ndarray):
+        """加入一個字元樣本"""
+        if char in self.sums:
+            self.sums[char] += vector
+        else:
+            self.sums[char] = vector.astype(np.float32).copy()
+        self.counts[char] = self.counts.get(char, 0) + 1
+        self._cache = None
+
+    def matrix(self, min_samples: int):
+        """返回 (字元列表, [字元數, 維度] 正規化模板矩陣)，只包含樣本數足夠的字元"""
+        if self._cache and self._cache[0] == min_samples:
+            return self._cache[1], self._cache[2]
+        chars = [c for c, n in self.counts.items() if n >= min_samples]
+        if chars:
+            matrix = np.stack([self.sums[c] / self.counts[c] for c in chars])
+            matrix -= matrix.mean(axis=1, keepdims=True)
+            matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-6)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        self._cache = (min_samples, chars, matrix)
+        return chars, matrix
+
+    def save(self):
+        """寫入 .npz（先寫暫存檔再取代）"""
+        if not self.path or not self.counts:
+            return
+        chars = list(self.counts)
+        temp_path = self.path + ".tmp.npz"
+        np.savez_compressed(temp_path, chars=np.array(chars), sums=np.stack([self.sums[c] for c in chars]),
+                            counts=np.array([self.counts[c] for c in chars]))
+        os.replace(temp_path, self.path)
+
+    def load(self):
+        """讀取 .npz"""
+        with np.load(self.path) as data:
+            for char, vector, count in zip(data["chars"], data["sums"], data["counts"]):
+                self.sums[str(char)] = vector.astype(np.float32)
+                self.counts[str(char)] = int(count)
+        self._cache = None
+
+
+def line_bands(mask: np.ndarray) -> list:
+    """以列投影分出文字行，返回 [(y1, y2), ...]"""
+    rows = np.append(mask.any(axis=1), False)
+    bands, start = [], None
+    for y, has_ink in enumerate(rows):
+        if has_ink and start is None:
+            start = y
+        elif not has_ink and start is not None:
+            if y - start >= MIN_LINE_HEIGHT:
+                bands.append((start, y))
+            start = None
+    return bands
+
+
+def component_cells(mask: np.ndarray) -> list:
+    """連通元件依水平範圍合併（上下堆疊的部件屬於同一片段），返回由左到右的 [x1, x2]"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask.astype(np.uint8), connectivity=8)
+    boxes = sorted((int(x), int(x + w)) for x, _, w, _, area in stats[1:count] if area >= 2)
+    cells = []
+    for x1, x2 in boxes:
+        if cells and x1 < cells[-1][1]:
+            cells[-1][1] = max(cells[-1][1], x2)
+        else:
+            cells.append([x1, x2])
+    return cells
+
+
+def is_cjk(char: str) -> bool:
+    """CJK 字元（含全形符號）為等寬字"""
+    return ord(char) >= 0x2E80
+
+
+def align_cells(cells: list, chars: list):
+    """將片段對應到字元，無法可靠對應時返回None
+
+    片段數與字數相同時一對一；全為 CJK 字時依等寬字距把片段中心分配到各字。
+    """
+    if len(cells) == len(chars):
+        return cells
+    if len(cells) < len(chars) or not all(is_cjk(c) for c in chars):
+        return None
+    left, right = cells[0][0], cells[-1][1]
+    pitch = (right - left) / len(chars)
+    groups = [None] * len(chars)
+    for x1, x2 in cells:
+        index = min(len(chars) - 1, int(((x1 + x2) / 2 - left) // pitch))
+        groups[index] = [x1, x2] if groups[index] is None else [groups[index][0], x2]
+    return None if any(group is None for group in groups) else groups
+
+
+def glyph_vector(mask: np.ndarray, intensity: np.ndarray, x1: int, x2: int) -> np.ndarray:
+    """裁切到墨水範圍後正規化為模板向量"""
+    rows = np.flatnonzero(mask[:, x1:x2].any(axis=1))
+    return normalize_glyph(intensity[rows[0]:rows[-1] + 1, x1:x2])
+
+
+class GlyphRecognizer:
+    """以字元模板庫辨識廣播文字，辨識不了時交給 EasyOCR 並從其結果學習"""
+
+    def __init__(self, config: dict = None):
+        self.config = {**DEFAULT_CONFIG, **GLYPH_RECOGNIZER_CONFIG, **(config or {})}
+        self.atlas = GlyphAtlas(self.config["ATLAS_PATH"])
+        self.frames = 0
+        self.unsaved_samples = 0
+        self.pending_verification = None
+        self.stats = {"template": 0, "fallback": 0, "harvested": 0, "verified": 0, "agreed": 0}
+
+    def foreground(self, image):
+        """返回 (前景遮罩, 0~1 前景強度)；遮罩取對比度一半以上的像素，避免反鋸齒邊緣讓字元相連"""
+        gray = np.asarray(image.convert('L') if hasattr(image, 'convert') else image)
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+        distance = np.abs(gray.astype(np.float32) - float(np.median(gray)))
+        peak = max(float(distance.max()), 1.0)
+        mask = distance > max(self.config["DIFF_THRESHOLD"], peak / 2)
+        return mask, distance / peak
+
+    def read_line(self, mask: np.ndarray, intensity: np.ndarray, chars, matrix):
+        """辨識一行，返回 [(字元, 分數, x1, x2), ...]"""
+        cells = component_cells(mask)
+        if not cells:
+            return []
+        height = mask.shape[0]
+        candidates = [(i, j) for j in range(len(cells)) for i in range(max(0, j - MAX_PARTS + 1), j + 1)
+                      if i == j or cells[j][1] - cells[i][0] <= MAX_GLYPH_WIDTH * height]
+        vectors = np.stack([glyph_vector(mask, intensity, cells[i][0], cells[j][1]) for i, j in candidates])
+        scores = vectors @ matrix.T
+        best_label = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(candidates)), best_label]
+
+        # 動態規劃：以寬度加權的分數總和選出最佳切割
+        total = np.full(len(cells) + 1, -np.inf)
+        total[0] = 0.0
+        choice = [None] * (len(cells) + 1)
+        for k, (i, j) in enumerate(candidates):
+            value = total[i] + best_score[k] * (cells[j][1] - cells[i][0])
+            if value > total[j + 1]:
+                total[j + 1] = value
+                choice[j + 1] = k
+        glyphs, end = [], len(cells)
+        while end > 0:
+            k = choice[end]
+            i, j = candidates[k]
+            glyphs.append((chars[best_label[k]], float(best_score[k]), cells[i][0], cells[j][1]))
+            end = i
+        return glyphs[::-1]
+
+    def recognize(self, image):
+        """返回與 EasyOCR 相同格式的結果列表；有未知字元或需要驗證時返回None"""
+        self.frames += 1
+        chars, matrix = self.atlas.matrix(self.config["MIN_SAMPLES"])
+        if not chars:
+            self.stats["fallback"] += 1
+            return None
+
+        mask, intensity = self.foreground(image)
+        results = []
+        for y1, y2 in line_bands(mask):
+            glyphs = self.read_line(mask[y1:y2], intensity[y1:y2], chars, matrix)
+            if any(score < self.config["MIN_SCORE"] for _, score, _, _ in glyphs):
+                self.stats["fallback"] += 1
+                return None
+            results.extend(self.group_words(glyphs, y1, y2))
+        results.sort(key=lambda r: r['bbox'][0][0])
+
+        verify_every = self.config["VERIFY_EVERY"]
+        if verify_every and self.frames % verify_every == 0:
+            self.pending_verification = "".join(r['text'] for r in results)
+            self.stats["fallback"] += 1
+            return None
+        self.stats["template"] += 1
+        return results
+
+    @staticmethod
+    def group_words(glyphs, y1: int, y2: int) -> list:
+        """依字元間距分成詞，返回 EasyOCR 格式的 {'text', 'confidence', 'bbox'}"""
+        words = []
+        for char, score, x1, x2 in glyphs:
+            if words and x1 - words[-1]['x2'] <= SPACE_RATIO * (y2 - y1):
+                word = words[-1]
+                word['text'] += char
+                word['x2'] = x2
+                word['confidence'] = min(word['confidence'], score)
+            else:
+                words.append({'text': char, 'confidence': score, 'x1': x1, 'x2': x2})
+        return [{'text': w['text'], 'confidence': w['confidence'],
+                 'bbox': [[w['x1'], y1], [w['x2'], y1], [w['x2'], y2], [w['x1'], y2]]} for w in words]
+
+    def learn(self, image, ocr_results: list):
+        """從 EasyOCR 結果學習字元模板，並與待驗證的模板結果比對"""
+        if self.pending_verification is not None:
+            self.stats["verified"] += 1
+            easyocr_text = "".join(r['text'] for r in ocr_results).replace(" ", "")
+            if easyocr_text == self.pending_verification.replace(" ", ""):
+                self.stats["agreed"] += 1
+            self.pending_verification = None
+
+        mask, intensity = self.foreground(image)
+        height, width = mask.shape
+        for result in ocr_results:
+            chars = [c for c in result['text'] if not c.isspace()]
+            if result['confidence'] < self.config["HARVEST_MIN_CONFIDENCE"] or not chars:
+                continue
+            xs = [int(p[0]) for p in result['bbox']]
+            ys = [int(p[1]) for p in result['bbox']]
+            x1, x2 = max(0, min(xs)), min(width, max(xs))
+            y1, y2 = max(0, min(ys)), min(height, max(ys))
+            region_mask, region_intensity = mask[y1:y2, x1:x2], intensity[y1:y2, x1:x2]
+            bands = line_bands(region_mask)
+            if len(bands) != 1:
+                continue
+            by1, by2 = bands[0]
+            # 無法可靠對應片段與字元時不學習，避免錯誤的模板
+            cells = align_cells(component_cells(region_mask[by1:by2]), chars)
+            if cells is None:
+                continue
+            for char, (cx1, cx2) in zip(chars, cells):
+                self.atlas.add(char, glyph_vector(region_mask[by1:by2], region_intensity[by1:by2], cx1, cx2))
+            self.stats["harvested"] += len(chars)
+            self.unsaved_samples += len(chars)
+
+        if self.unsaved_samples >= self.config["SAVE_EVERY"]:
+            self.save()
+
+    def save(self):
+        """保存模板庫"""
+        try:
+            self.atlas.save()
+            self.unsaved_samples = 0
+        except OSError as e:
+            print(f"[WARN] 保存字元模板庫失敗: {e}")
+
+    def describe(self) -> str:
+        """返回模板庫與辨識統計摘要"""
+        verified = self.stats["verified"]
+        agreement = f"{self.stats['agreed'] / verified * 100:.0f}%" if verified else "-"
+        return (f"字元模板: {len(self.atlas)} 字, 模板辨識 {self.stats['template']} 次, "
+                f"EasyOCR {self.stats['fallback']} 次, 驗證一致率 {agreement}")
@@ -80,8 +80,15 @@ class IntegrationTester:
             else:
                 print("請輸入 1, 2 或 3")
     
-    def create_analyzer(self, analyzer_type: str):
-        """創建分析器實例"""
+    def create_analyzer(self, analyzer_type: str, use_daemon: bool = True):
+        """創建分析器實例（常駐分析服務執行中時使用服務；OCR_Rectangle 需在本機寫出調試圖像，不使用服務）"""
+        if use_daemon and analyzer_type != "ocr_rectangle":
+            from analyzer_daemon import connect_analyzer
+            remote_analyzer = connect_analyzer(analyzer_type, SELLING_ITEMS,
+                                               fallback_factory=lambda: self.create_analyzer(analyzer_type, use_daemon=False))
+            if remote_analyzer is not None:
+                return remote_analyzer
+        
         if analyzer_type == "gemini":
             if GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
                 print("錯誤：請先在 config.py 中設置您的 Gemini API Key")
@@ -431,7 +438,7 @@ class IntegrationTester:
             summary = json.load(f)
         summary["roi_coordinates"] = roi_coordinates
         summary["analyzer_type"] = analyzer_type
-        summary["analyzer_class"] = analyzer.__class__.__name__
+        summary["analyzer_class"] = analyzer.analyzer_name
         with open(summary_file, 'w', encoding='utf-8') as f:
             json.dump(convert_to_json_serializable(summary), f, ensure_ascii=False, indent=2)
         
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""拉丁字母/數字欄位的輕量辨識 - 以自行渲染的字型模板比對，不經過 CJK EasyOCR 模型
+
+頻道編號等欄位只含 ASCII 字元。引擎以 FONT_PATH 指定的遊戲字型在 FONT_SIZES 各尺寸
+渲染 CHARSET 的每個字元作為模板（未設定字型時引擎不啟用：其他字型的數字即使高相關也常讀錯），
+辨識時：
+    1. Otsu 二值化後以行投影切出字元
+    2. 每個字元保持長寬比置中縮放，與所有模板做正規化相關（一次矩陣乘法）
+    3. 返回文字與最低的字元相關分數作為信心度，低於 MIN_CONFIDENCE 時視為讀取失敗
+"""
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    from config import LATIN_OCR_CONFIG
+except ImportError:
+    LATIN_OCR_CONFIG = {}
+
+DEFAULT_CONFIG = {
+    "ENABLED": False,
+    "CHARSET": "0123456789",
+    "FONT_PATH": None,
+    "FONT_SIZES": [11, 12, 13],
+    "MIN_CONFIDENCE": 0.8,
+}
+
+GLYPH_SIZE = 16          # 字元正規化後的邊長
+MIN_GLYPH_PIXELS = 3     # 少於此像素數的連續行視為雜訊
+
+
+def load_font(font_path, size: int):
+    """載入模板字型，未指定或讀取失敗時使用Pillow內建字型"""
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except (OSError, IOError):
+            print(f"[WARN] 無法載入字型 {font_path}，改用內建字型")
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """以類間變異數最大化求二值化閾值"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = histogram.sum()
+    if total == 0:
+        return 127
+    levels = np.arange(256)
+    weight_background = np.cumsum(histogram)
+    weight_foreground = total - weight_background
+    cumulative_mean = np.cumsum(histogram * levels)
+    mean_background = cumulative_mean / np.maximum(weight_background, 1)
+    mean_foreground = (cumulative_mean[-1] - cumulative_mean) / np.maximum(weight_foreground, 1)
+    between = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+    return int(np.argmax(between))
+
+
+def normalize_glyph(ink: np.ndarray) -> np.ndarray:
+    """將字元墨水強度（0~1）置中補成正方形後縮放，返回零均值單位長度向量"""
+    height, width = ink.shape
+    side = max(height, width)
+    square = np.zeros((side, side), dtype=np.float32)
+    top, left = (side - height) // 2, (side - width) // 2
+    square[top:top + height, left:left + width] = ink
+    resized = np.asarray(Image.fromarray((square * 255).astype(np.uint8)).resize(
+        (GLYPH_SIZE, GLYPH_SIZE), Image.BILINEAR), dtype=np.float32).ravel()
+    resized -= resized.mean()
+    norm = np.linalg.norm(resized)
+    return resized / norm if norm > 0 else resized
+
+
+def ink_intensity(gray: np.ndarray, dark_text: bool = True):
+    """返回 (Otsu 二值化遮罩, 0~1 的墨水強度)，強度保留反鋸齒邊緣"""
+    threshold = otsu_threshold(gray)
+    span = max(int(gray.max()) - int(gray.min()), 1)
+    if dark_text:
+        return gray <= threshold, (float(gray.max()) - gray.astype(np.float32)) / span
+    return gray > threshold, (gray.astype(np.float32) - float(gray.min())) / span
+
+
+class LatinGlyphEngine:
+    """以字型模板辨識單行拉丁字母/數字"""
+
+    def __init__(self, config: dict = None):
+        self.config = {**DEFAULT_CONFIG, **LATIN_OCR_CONFIG, **(config or {})}
+        self.labels, self.templates = self.build_templates()
+
+    @property
+    def enabled(self) -> bool:
+        """需同時啟用並指定遊戲字型，內建字型的模板與遊戲字型差異太大"""
+        return bool(self.config["ENABLED"] and self.config["FONT_PATH"])
+
+    @property
+    def min_confidence(self) -> float:
+        return self.config["MIN_CONFIDENCE"]
+
+    def build_templates(self):
+        """渲染所有字元與尺寸的模板，返回 (標籤列表, [模板數, GLYPH_SIZE²] 矩陣)"""
+        labels, vectors = [], []
+        for size in self.config["FONT_SIZES"]:
+            font = load_font(self.config["FONT_PATH"], size)
+            for char in self.config["CHARSET"]:
+                canvas = Image.new('L', (size * 3, size * 3), 0)
+                ImageDraw.Draw(canvas).text((size // 2, size // 2), char, fill=255, font=font)
+                # 與辨識時相同的切割方式，確保裁切範圍一致
+                glyphs = self.segment(np.asarray(canvas), dark_text=False)
+                if len(glyphs) != 1:
+                    continue
+                labels.append(char)
+                vectors.append(normalize_glyph(glyphs[0]))
+        return labels, np.stack(vectors)
+
+    def segment(self, gray: np.ndarray, dark_text: bool = True) -> list:
+        """以行投影切出字元，返回每個字元的墨水強度陣列（由左到右）"""
+        mask, intensity = ink_intensity(gray, dark_text)
+
+        columns = mask.any(axis=0)
+        glyphs = []
+        start = None
+        for x, has_ink in enumerate(np.append(columns, False)):
+            if has_ink and start is None:
+                start = x
+            elif not has_ink and start is not None:
+                if mask[:, start:x].sum() >= MIN_GLYPH_PIXELS:
+                    rows = np.flatnonzero(mask[:, start:x].any(axis=1))
+                    glyphs.append(intensity[rows[0]:rows[-1] + 1, start:x])
+                start = None
+        return glyphs
+
+    def match(self, glyphs: list):
+        """一次比對所有字元，返回 (最佳模板索引, 相關分數)"""
+        scores = np.stack([normalize_glyph(glyph) for glyph in glyphs]) @ self.templates.T
+        best = scores.argmax(axis=1)
+        return best, scores[np.arange(len(glyphs)), best]
+
+    def split_touching(self, glyph: np.ndarray, score: float) -> list:
+        """相鄰字元黏在一起時，在中段墨水最少的行切開，兩半的分數都更高才採用"""
+        width = glyph.shape[1]
+        if width < 4:
+            return [glyph]
+        lo, hi = width // 4, width - width // 4
+        cut = lo + int(np.argmin(glyph[:, lo:hi].sum(axis=0)))
+        halves = [glyph[:, :cut], glyph[:, cut:]]
+        _, half_scores = self.match(halves)
+        return halves if half_scores.min() > score else [glyph]
+
+    def recognize(self, image, dark_text: bool = True):
+        """辨識單行文字，返回 (文字, 信心度)；沒有字元時返回 ("", 0.0)"""
+        gray = np.asarray(image.convert('L') if hasattr(image, 'convert') else image)
+        if gray.ndim == 3:
+            gray = gray.mean(axis=2).astype(np.uint8)
+        glyphs = self.segment(gray, dark_text)
+        if not glyphs:
+            return "", 0.0
+        best, scores = self.match(glyphs)
+        if scores.min() < self.min_confidence:
+            glyphs = [part for glyph, score in zip(glyphs, scores)
+                      for part in (self.split_touching(glyph, score) if score < self.min_confidence else [glyph])]
+            best, scores = self.match(glyphs)
+        text = "".join(self.labels[i] for i in best)
+        return text, float(scores.min())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ROI版面學習 - 自動裁切出實際出現文字與白框的區域
+
+使用者框選的ROI通常比廣播文字大很多。前 N 幀（校正階段）完整分析，同時將每幀
+二值化（與背景中位數差異大的像素或接近純白的像素），累計各列/各行出現前景的次數。
+校正完成後只把文字帶（外擴 MARGIN 像素）交給分析器；每隔 REVALIDATE_EVERY 幀
+檢查完整畫面，文字出現在文字帶外時擴大裁切範圍。
+"""
+
+import numpy as np
+from PIL import Image
+
+
+def foreground_mask(gray: np.ndarray, diff_threshold: float, white_threshold: int) -> np.ndarray:
+    """標記與背景差異大或接近純白的像素"""
+    background = np.median(gray)
+    return (np.abs(gray.astype(np.int16) - background) > diff_threshold) | (gray >= white_threshold)
+
+
+def active_span(profile: np.ndarray, min_fraction: float):
+    """返回投影中超過比例的第一個與最後一個索引，沒有時返回None"""
+    active = np.flatnonzero(profile > min_fraction)
+    if not active.size:
+        return None
+    return int(active[0]), int(active[-1]) + 1
+
+
+class LayoutCalibrator:
+    """學習文字帶位置並裁切分析用影像"""
+
+    def __init__(self, calibration_frames: int = 20, revalidate_every: int = 10, margin: int = 6,
+                 min_active_fraction: float = 0.02, diff_threshold: float = 40, white_threshold: int = 245):
+        self.calibration_frames = calibration_frames
+        self.revalidate_every = revalidate_every
+        self.margin = margin
+        self.min_active_fraction = min_active_fraction
+        self.diff_threshold = diff_threshold
+        self.white_threshold = white_threshold
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """依 LAYOUT_CALIBRATION_CONFIG 建立"""
+        return cls(calibration_frames=config.get("CALIBRATION_FRAMES", 20),
+                   revalidate_every=config.get("REVALIDATE_EVERY", 10),
+                   margin=config.get("MARGIN", 6),
+                   min_active_fraction=config.get("MIN_ACTIVE_FRACTION", 0.02),
+                   diff_threshold=config.get("DIFF_THRESHOLD", 40))
+
+    def reset(self):
+        """重新開始校正（例如ROI改變時）"""
+        self.frame_shape = None
+        self.row_hits = None
+        self.col_hits = None
+        self.observed = 0
+        self.band = None  # (x1, y1, x2, y2)
+        self.frames_since_check = 0
+        self.expansions = 0
+        self.analysis_ms = {"full": [], "cropped": []}
+
+    @property
+    def calibrated(self) -> bool:
+        return self.band is not None
+
+    def _to_gray(self, image) -> np.ndarray:
+        array = np.asarray(image.convert('L') if hasattr(image, 'convert') else image)
+        return array if array.ndim == 2 else array.mean(axis=2)
+
+    def _spans(self, gray):
+        """返回本幀前景的 (列範圍, 行範圍)"""
+        mask = foreground_mask(gray, self.diff_threshold, self.white_threshold)
+        return (active_span(mask.mean(axis=1), self.min_active_fraction),
+                active_span(mask.mean(axis=0), self.min_active_fraction))
+
+    def observe(self, gray):
+        """校正階段：累計一幀的列/行前景投影"""
+        if self.frame_shape != gray.shape:
+            self.frame_shape = gray.shape
+            self.row_hits = np.zeros(gray.shape[0], dtype=np.int32)
+            self.col_hits = np.zeros(gray.shape[1], dtype=np.int32)
+            self.observed = 0
+        mask = foreground_mask(gray, self.diff_threshold, self.white_threshold)
+        self.row_hits += mask.mean(axis=1) > self.min_active_fraction
+        self.col_hits += mask.mean(axis=0) > self.min_active_fraction
+        self.observed += 1
+        if self.observed >= self.calibration_frames:
+            self._finish_calibration()
+
+    def _finish_calibration(self):
+        """依累計投影決定文字帶，偶發雜訊（少於10%的幀）不計入"""
+        min_hits = max(1, int(self.observed * 0.1))
+        rows = active_span(self.row_hits, min_hits - 1)
+        cols = active_span(self.col_hits, min_hits - 1)
+        if rows is None or cols is None:
+            # 校正期間沒有任何文字，繼續觀察
+            self.observed = 0
+            self.row_hits[:] = 0
+            self.col_hits[:] = 0
+            return
+        self.band = self._with_margin(cols[0], rows[0], cols[1], rows[1])
+        band_pixels = (self.band[2] - self.band[0]) * (self.band[3] - self.band[1])
+        print(f"[LAYOUT] 校正完成: 文字帶 {self.band}，分析像素減少 "
+              f"{(1 - band_pixels / (self.frame_shape[0] * self.frame_shape[1])) * 100:.0f}%")
+
+    def _with_margin(self, x1, y1, x2, y2):
+        height, width = self.frame_shape
+        return (max(0, x1 - self.margin), max(0, y1 - self.margin),
+                min(width, x2 + self.margin), min(height, y2 + self.margin))
+
+    def revalidate(self, gray) -> bool:
+        """檢查完整畫面，文字出現在文字帶外時擴大範圍，返回是否擴大"""
+        rows, cols = self._spans(gray)
+        if rows is None or cols is None:
+            return False
+        x1, y1, x2, y2 = self._with_margin(cols[0], rows[0], cols[1], rows[1])
+        bx1, by1, bx2, by2 = self.band
+        expanded = (min(bx1, x1), min(by1, y1), max(bx2, x2), max(by2, y2))
+        if expanded == self.band:
+            return False
+        print(f"[LAYOUT] 文字超出文字帶，擴大範圍: {self.band} -> {expanded}")
+        self.band = expanded
+        self.expansions += 1
+        return True
+
+    def prepare(self, image):
+        """返回要交給分析器的影像與是否已裁切"""
+        gray = self._to_gray(image)
+        if gray.shape != self.frame_shape and self.calibrated:
+            self.reset()
+        if not self.calibrated:
+            self.observe(gray)
+            return image, False
+
+        self.frames_since_check += 1
+        if self.frames_since_check >= self.revalidate_every:
+            self.frames_since_check = 0
+            self.revalidate(gray)
+        if isinstance(image, Image.Image):
+            return image.crop(self.band), True
+        x1, y1, x2, y2 = self.band
+        return image[y1:y2, x1:x2], True
+
+    def record_analysis(self, elapsed_ms: float, cropped: bool):
+        """記錄一次分析耗時，用於比較裁切前後"""
+        self.analysis_ms["cropped" if cropped else "full"].append(elapsed_ms)
+
+    def report(self) -> dict:
+        """返回裁切效果：像素與分析時間的減少比例"""
+        report = {"calibrated": self.calibrated, "band": self.band, "expansions": self.expansions}
+        if self.calibrated and self.frame_shape:
+            x1, y1, x2, y2 = self.band
+            report["pixel_reduction"] = round(1 - (x2 - x1) * (y2 - y1) / (self.frame_shape[0] * self.frame_shape[1]), 3)
+        full, cropped = self.analysis_ms["full"], self.analysis_ms["cropped"]
+        if full and cropped:
+            report["full_ms"] = round(float(np.median(full)), 1)
+            report["cropped_ms"] = round(float(np.median(cropped)), 1)
+            report["time_reduction"] = round(1 - report["cropped_ms"] / report["full_ms"], 3) if report["full_ms"] else 0.0
+        return report
+
+    def describe(self) -> str:
+        """返回裁切效果摘要"""
+        report = self.report()
+        if not report["calibrated"]:
+            return f"版面裁切: 校正中 ({self.observed}/{self.calibration_frames})"
+        text = f"版面裁切: 文字帶 {report['band']}，像素減少 {report['pixel_reduction'] * 100:.0f}%"
+        if "time_reduction" in report:
+            text += (f"，分析時間 {report['full_ms']:.0f}ms -> {report['cropped_ms']:.0f}ms "
+                     f"(減少 {report['time_reduction'] * 100:.0f}%)")
+        return text
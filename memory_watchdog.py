@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""記憶體監看 - 長時間監控會話的記憶體統計與上限處理
+
+定期記錄 RSS、tracemalloc 前幾名配置位置以及已註冊結構（合併器記錄、
+去重快取、佇列等）的大小到會話資料夾的 memory_samples.jsonl。
+超過軟上限時執行 soft 動作（例如釋放記錄內的 base64 影像），
+超過硬上限時再執行 hard 動作（例如將舊記錄寫到磁碟、清除快取）。
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+MB = 1024 * 1024
+
+
+def get_rss_bytes():
+    """取得目前程序的常駐記憶體大小，無法取得時返回None"""
+    if PSUTIL_AVAILABLE:
+        try:
+            return psutil.Process().memory_info().rss
+        except Exception:
+            pass
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def estimate_size(obj, seen=None) -> int:
+    """遞迴估算容器物件的大小（位元組）"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    return size
+
+
+def release_framework_caches() -> str:
+    """執行垃圾回收並釋放 torch 的 GPU 快取（若已載入）"""
+    collected = gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except Exception:
+            pass
+    return f"gc回收 {collected} 個物件"
+
+
+class MemoryWatchdog:
+    """定期取樣記憶體並在超過上限時執行釋放動作"""
+
+    def __init__(self, session_folder: str = None, soft_limit_mb: float = 1024, hard_limit_mb: float = 2048,
+                 sample_interval: float = 60, use_tracemalloc: bool = False, tracemalloc_frames: int = 1,
+                 top_allocators: int = 10, tracemalloc_on_limit: bool = True):
+        self.session_folder = session_folder
+        self.soft_limit_bytes = soft_limit_mb * MB if soft_limit_mb else None
+        self.hard_limit_bytes = hard_limit_mb * MB if hard_limit_mb else None
+        self.sample_interval = sample_interval
+        self.use_tracemalloc = use_tracemalloc
+        self.tracemalloc_on_limit = tracemalloc_on_limit
+        self.tracemalloc_frames = tracemalloc_frames
+        self.top_allocators = top_allocators
+        self.structures = {}
+        self.actions = {"soft": [], "hard": []}
+        self.last_sample_time = 0.0
+        self.started_tracemalloc = False
+        self.sample_count = 0
+
+    def start(self):
+        """開始追蹤配置（若啟用tracemalloc）"""
+        if self.use_tracemalloc:
+            self.start_tracemalloc()
+        self.last_sample_time = time.time()
+
+    def start_tracemalloc(self):
+        """啟動tracemalloc（已在追蹤時不重複啟動）"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+            self.started_tracemalloc = True
+
+    def stop(self):
+        """停止由本監看器啟動的tracemalloc"""
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def register_structure(self, name: str, size_fn):
+        """註冊要記錄大小的結構，size_fn 返回位元組數或項目數"""
+        self.structures[name] = size_fn
+
+    def register_action(self, level: str, name: str, action_fn):
+        """註冊超過上限時的處理動作（level: soft / hard）"""
+        self.actions[level].append((name, action_fn))
+
+    def measure_structures(self) -> dict:
+        """返回各結構大小，量測失敗的結構記錄為None"""
+        sizes = {}
+        for name, size_fn in self.structures.items():
+            try:
+                sizes[name] = size_fn()
+            except Exception:
+                sizes[name] = None
+        return sizes
+
+    def top_allocations(self) -> list:
+        """返回tracemalloc前幾名配置位置"""
+        if not tracemalloc.is_tracing():
+            return []
+        statistics = tracemalloc.take_snapshot().statistics("lineno")[:self.top_allocators]
+        return [{"location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_kb": round(stat.size / 1024, 1),
+                 "count": stat.count} for stat in statistics]
+
+    def current_usage(self):
+        """返回目前用量：優先使用RSS，無法取得時使用tracemalloc統計"""
+        rss = get_rss_bytes()
+        if rss is not None:
+            return rss
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return None
+
+    def run_actions(self, level: str) -> list:
+        """執行指定層級的動作，返回執行結果"""
+        results = []
+        for name, action_fn in self.actions[level]:
+            try:
+                results.append({"action": name, "result": action_fn()})
+            except Exception as e:
+                results.append({"action": name, "error": str(e)})
+        return results
+
+    def sample(self) -> dict:
+        """取樣一次並在超過上限時執行處理動作"""
+        self.sample_count += 1
+        usage = self.current_usage()
+        level = None
+        if usage is not None and self.hard_limit_bytes and usage >= self.hard_limit_bytes:
+            level = "hard"
+        elif usage is not None and self.soft_limit_bytes and usage >= self.soft_limit_bytes:
+            level = "soft"
+
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "rss_mb": round(usage / MB, 1) if usage is not None else None,
+            "traced_mb": round(tracemalloc.get_traced_memory()[0] / MB, 1) if tracemalloc.is_tracing() else None,
+            "structures": self.measure_structures(),
+            "top_allocations": self.top_allocations(),
+            "limit_level": level,
+            "actions": []
+        }
+
+        if level:
+            print(f"[MEM] 記憶體 {record['rss_mb']}MB 超過{'硬' if level == 'hard' else '軟'}上限，執行釋放動作")
+            # 硬上限時先執行軟上限動作
+            record["actions"] = self.run_actions("soft")
+            if level == "hard":
+                record["actions"] += self.run_actions("hard")
+            record["rss_after_mb"] = round((self.current_usage() or 0) / MB, 1)
+            # 平時不追蹤配置（會拖慢整個程序），超過上限後才開始，之後的取樣記錄配置位置
+            if self.tracemalloc_on_limit and not tracemalloc.is_tracing():
+                self.start_tracemalloc()
+                print("[MEM] 已啟動tracemalloc，下次取樣將記錄主要配置位置")
+
+        self.write_record(record)
+        return record
+
+    def maybe_sample(self, now: float = None):
+        """距離上次取樣超過間隔時取樣，否則返回None"""
+        now = time.time() if now is None else now
+        if now - self.last_sample_time < self.sample_interval:
+            return None
+        self.last_sample_time = now
+        return self.sample()
+
+    def write_record(self, record: dict):
+        """追加一行到會話資料夾的 memory_samples.jsonl"""
+        if not self.session_folder:
+            return
+        try:
+            with open(os.path.join(self.session_folder, "memory_samples.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            print(f"[WARN] 寫入記憶體統計失敗: {e}")
@@ -6,13 +6,16 @@ except ImportError:
     easyocr = None
 
 from text_analyzer import TextAnalyzer, AnalysisResult
+from ocr_backends import create_reader, warm_up_reader
+from pipeline_timing import pipeline_timer, timed_readtext
 import re
 from typing import List, Tuple
 
 class OCRAnalyzer(TextAnalyzer):
     """使用EasyOCR的文字分析器"""
     
-    def __init__(self, selling_items: dict, buying_items: dict = None, languages: List[str] = None):
+    def __init__(self, selling_items: dict, buying_items: dict = None, languages: List[str] = None,
+                 recognizer_backend: str = None):
         super().__init__(selling_items)
         self.strategy_type = "OCR"
         self.buying_items = buying_items or {}
@@ -24,12 +27,17 @@ class OCRAnalyzer(TextAnalyzer):
             languages = ['ch_tra', 'en']  # 繁體中文和英文
         
         try:
-            self.reader = easyocr.Reader(languages)
+            # 辨識後端依 OCR_BACKEND_CONFIG（或 recognizer_backend 參數）選擇
+            self.reader = create_reader(languages, recognizer_backend, profile=self.strategy_type)
             print(f"OCR初始化成功，支援語言: {languages}")
         except Exception as e:
             print(f"OCR初始化失敗: {e}")
             raise
     
+    def warm_up(self, image) -> None:
+        """預熱EasyOCR偵測與辨識模型"""
+        warm_up_reader(self.reader, image)
+    
     def analyze_image(self, image) -> str:
         """使用OCR分析圖片"""
         if self.reader is None:
@@ -38,10 +46,11 @@ class OCRAnalyzer(TextAnalyzer):
         try:
             # 將PIL圖片轉換為numpy array
             import numpy as np
-            image_array = np.array(image)
+            with pipeline_timer.span("preprocess"):
+                image_array = np.array(image)
             
             # 使用EasyOCR進行文字識別，降低整體閾值以提高覆蓋範圍
-            results = self.reader.readtext(image_array, min_size=5, text_threshold=0.6, low_text=0.3)
+            results = timed_readtext(self.reader, image_array, min_size=5, text_threshold=0.6, low_text=0.3)
             
             # 提取文字內容 - 大幅降低閾值以捕獲所有可能的文字
             extracted_text = []
@@ -546,7 +555,7 @@ class OCRAnalyzer(TextAnalyzer):
         try:
             import numpy as np
             image_array = np.array(image)
-            results = self.reader.readtext(image_array, detail=1)
+            results = timed_readtext(self.reader, image_array, detail=1)
             
             text_regions = []
             for (bbox, text, confidence) in results:
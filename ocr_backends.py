@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""EasyOCR 辨識模型後端 - 以 ONNX Runtime 取代 PyTorch 執行文字辨識
+
+EasyOCR 的 CRNN 辨識模型在 CPU 上佔大部分單幀耗時。可選的後端：
+    torch       EasyOCR 預設（CPU 上已使用 int8 動態量化的 PyTorch 模型）
+    torch_fp32  不量化的 PyTorch 模型（對照組）
+    onnx        匯出為 ONNX 後以 ONNX Runtime 執行
+    onnx_int8   ONNX 模型再經 onnxruntime 動態量化為 int8
+
+匯出的模型依語言與 EasyOCR 版本存放在 CACHE_DIR，之後啟動直接載入。文字偵測（CRAFT）
+仍由 EasyOCR 執行。
+
+建立 Reader 時同時套用 TORCH_RUNTIME_CONFIG 的執行緒/推論設定（依分析器類型覆寫 DEFAULT；
+CPU_AFFINITY 限制的是整個程序的所有執行緒，包含截圖、報告與API執行緒），
+timed_readtext 以 inference_context 包住 readtext，避免建立自動微分圖。
+"""
+
+import os
+from contextlib import nullcontext
+
+try:
+    import easyocr
+    EASYOCR_AVAILABLE = True
+except ImportError:
+    EASYOCR_AVAILABLE = False
+    easyocr = None
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+    torch = None
+
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+    onnxruntime = None
+
+try:
+    from config import OCR_BACKEND_CONFIG
+except ImportError:
+    OCR_BACKEND_CONFIG = {}
+
+try:
+    from config import TORCH_RUNTIME_CONFIG
+except ImportError:
+    TORCH_RUNTIME_CONFIG = {}
+
+DEFAULT_TORCH_RUNTIME = {
+    "INTRA_OP_THREADS": 0,        # 0 = torch 預設
+    "INTER_OP_THREADS": 0,
+    "CPU_AFFINITY": None,         # 整個程序可用的CPU編號列表，None = 不限制
+    "INFERENCE_MODE": True,
+    "MKLDNN": True,
+    "CUDNN_BENCHMARK": False,
+}
+
+RECOGNIZER_BACKENDS = ["torch", "torch_fp32", "onnx", "onnx_int8"]
+EXPORT_HEIGHT = 64       # EasyOCR 辨識模型的輸入高度
+EXPORT_WIDTH = 256       # 匯出時的範例寬度（實際寬度為動態軸）
+OPSET_VERSION = 13
+
+
+def cached_model_path(cache_dir: str, languages, variant: str) -> str:
+    """依語言、EasyOCR 版本與變體命名快取檔"""
+    version = getattr(easyocr, "__version__", "unknown") if easyocr else "unknown"
+    name = f"recognizer_{'_'.join(languages)}_{version}"
+    if variant == "onnx_int8":
+        name += "_int8"
+    return os.path.join(cache_dir, f"{name}.onnx")
+
+
+def unwrap_model(model):
+    """取出 DataParallel 包裝內的模型"""
+    return getattr(model, "module", model)
+
+
+def export_recognizer(languages, cache_dir: str) -> str:
+    """將未量化的辨識模型匯出為 ONNX，已存在時直接返回路徑"""
+    path = cached_model_path(cache_dir, languages, "onnx")
+    if os.path.exists(path):
+        return path
+    if not (EASYOCR_AVAILABLE and TORCH_AVAILABLE):
+        raise ImportError("匯出ONNX需要EasyOCR與PyTorch。請執行: pip install easyocr")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # 只載入辨識模型，且不做動態量化（量化後的模型無法匯出）
+    reader = easyocr.Reader(languages, gpu=False, detector=False, quantize=False, verbose=False)
+    model = unwrap_model(reader.recognizer).eval()
+    dummy_image = torch.zeros(1, 1, EXPORT_HEIGHT, EXPORT_WIDTH)
+    dummy_text = torch.zeros(1, 1, dtype=torch.long)
+    temp_path = path + ".tmp"
+    torch.onnx.export(model, (dummy_image, dummy_text), temp_path,
+                      input_names=["image", "text"], output_names=["preds"],
+                      dynamic_axes={"image": {0: "batch", 3: "width"}, "preds": {0: "batch", 1: "steps"}},
+                      opset_version=OPSET_VERSION)
+    os.replace(temp_path, path)
+    print(f"[OK] 辨識模型已匯出: {path}")
+    return path
+
+
+def quantize_recognizer(languages, cache_dir: str) -> str:
+    """以 onnxruntime 動態量化匯出的模型，已存在時直接返回路徑"""
+    path = cached_model_path(cache_dir, languages, "onnx_int8")
+    if os.path.exists(path):
+        return path
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    source = export_recognizer(languages, cache_dir)
+    quantize_dynamic(source, path, weight_type=QuantType.QInt8)
+    print(f"[OK] 辨識模型已量化: {path}")
+    return path
+
+
+class OnnxRecognizer:
+    """以 ONNX Runtime 執行辨識，介面與 EasyOCR 呼叫的 PyTorch 模型相同"""
+
+    def __init__(self, model_path: str, threads: int = 0):
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.model_path = model_path
+
+    def eval(self):
+        return self
+
+    def to(self, device):
+        return self
+
+    def __call__(self, image, text=None):
+        """image 為 [batch, 1, 64, width] 張量，返回 [batch, steps, classes] 張量"""
+        feeds = {"image": image.detach().cpu().numpy()}
+        # 匯出時若 text 未被使用，ONNX 圖中不會有該輸入
+        if "text" in self.input_names and text is not None:
+            feeds["text"] = text.detach().cpu().numpy()
+        preds = self.session.run(["preds"], feeds)[0]
+        return torch.from_numpy(preds)
+
+
+def resolve_torch_runtime(profile: str = None, overrides: dict = None) -> dict:
+    """合併預設值、TORCH_RUNTIME_CONFIG 的 DEFAULT 與分析器類型的設定"""
+    return {**DEFAULT_TORCH_RUNTIME, **TORCH_RUNTIME_CONFIG.get("DEFAULT", {}),
+            **TORCH_RUNTIME_CONFIG.get(profile or "", {}), **(overrides or {})}
+
+
+def set_process_affinity(cpus) -> list:
+    """將整個程序（所有現有執行緒）限制在指定CPU上，返回生效的CPU列表（不支援時為空列表）
+
+    sched_setaffinity(0) 只影響呼叫的執行緒，而 Reader 是在背景載入執行緒中建立的，
+    因此逐一設定 /proc/self/task 下的每個執行緒；之後建立的執行緒會繼承建立者的設定。
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return []
+    cpus = set(cpus)
+    try:
+        thread_ids = [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        thread_ids = [0]
+    try:
+        for tid in thread_ids:
+            try:
+                os.sched_setaffinity(tid, cpus)
+            except ProcessLookupError:
+                pass  # 執行緒已結束
+        return sorted(os.sched_getaffinity(0))
+    except OSError as e:
+        print(f"[WARN] 設定CPU親和性失敗: {e}")
+        return []
+
+
+def apply_torch_runtime(settings: dict) -> dict:
+    """套用執行緒數、CPU親和性與後端旗標，返回實際生效的值
+
+    這些設定是整個程序共用的；inter-op 執行緒數只能在第一次平行運算前設定一次。
+    """
+    applied = {}
+    if settings.get("CPU_AFFINITY"):
+        cpus = set_process_affinity(settings["CPU_AFFINITY"])
+        if cpus:
+            applied["cpu_affinity"] = cpus
+    if not TORCH_AVAILABLE:
+        return applied
+
+    if settings.get("INTRA_OP_THREADS"):
+        torch.set_num_threads(settings["INTRA_OP_THREADS"])
+    if settings.get("INTER_OP_THREADS"):
+        try:
+            torch.set_num_interop_threads(settings["INTER_OP_THREADS"])
+        except RuntimeError as e:
+            print(f"[WARN] inter-op 執行緒數已無法變更: {e}")
+    torch.backends.mkldnn.enabled = bool(settings.get("MKLDNN", True))
+    if torch.backends.cudnn.is_available():
+        torch.backends.cudnn.benchmark = bool(settings.get("CUDNN_BENCHMARK", False))
+    applied.update(intra_op_threads=torch.get_num_threads(), inter_op_threads=torch.get_num_interop_threads(),
+                   mkldnn=torch.backends.mkldnn.enabled)
+    return applied
+
+
+def inference_context(reader):
+    """返回 reader 推論時使用的上下文（inference_mode / no_grad / 不處理）"""
+    if not TORCH_AVAILABLE:
+        return nullcontext()
+    settings = getattr(reader, "torch_runtime", None) or DEFAULT_TORCH_RUNTIME
+    if not settings.get("INFERENCE_MODE", True):
+        return torch.no_grad()
+    return torch.inference_mode() if hasattr(torch, "inference_mode") else torch.no_grad()
+
+
+def warm_up_reader(reader, image):
+    """以合成畫面執行一次 readtext（不記錄計時與指標），完成模型的延遲初始化"""
+    import numpy as np
+    with inference_context(reader):
+        reader.readtext(np.asarray(image))
+
+
+def create_reader(languages, backend: str = None, cache_dir: str = None, threads: int = None,
+                  profile: str = None):
+    """建立 EasyOCR Reader 並套用設定的辨識後端，後端無法使用時退回 EasyOCR 預設
+
+    profile 為分析器類型（如 OCR_RECTANGLE），用於選擇 TORCH_RUNTIME_CONFIG 的設定。
+    """
+    torch_runtime = resolve_torch_runtime(profile)
+    applied = apply_torch_runtime(torch_runtime)
+    backend = backend or OCR_BACKEND_CONFIG.get("RECOGNIZER", "torch")
+    cache_dir = cache_dir or OCR_BACKEND_CONFIG.get("CACHE_DIR", "ocr_model_cache")
+    threads = OCR_BACKEND_CONFIG.get("ONNX_THREADS", 0) if threads is None else threads
+    threads = threads or torch_runtime.get("INTRA_OP_THREADS", 0)
+    if backend not in RECOGNIZER_BACKENDS:
+        print(f"[WARN] 未知的辨識後端 {backend}，改用 torch")
+        backend = "torch"
+
+    reader = easyocr.Reader(languages, quantize=(backend != "torch_fp32"))
+    if backend.startswith("onnx"):
+        if not ONNXRUNTIME_AVAILABLE:
+            print("[WARN] onnxruntime未安裝，使用EasyOCR預設辨識模型。請執行: pip install onnxruntime")
+            backend = "torch"
+        else:
+            try:
+                path = quantize_recognizer(languages, cache_dir) if backend == "onnx_int8" else export_recognizer(languages, cache_dir)
+                reader.recognizer = OnnxRecognizer(path, threads)
+            except Exception as e:
+                print(f"[WARN] 載入ONNX辨識模型失敗，使用EasyOCR預設辨識模型: {e}")
+                backend = "torch"
+    reader.recognizer_backend = backend
+    reader.torch_runtime = torch_runtime
+    print(f"[INFO] OCR辨識後端: {backend}")
+    if applied:
+        print(f"[INFO] torch執行設定: {applied}")
+    return reader
@@ -13,6 +13,10 @@ except ImportError:
     cv2 = None
 
 from text_analyzer import TextAnalyzer, AnalysisResult
+from ocr_backends import create_reader, warm_up_reader
+from pipeline_timing import pipeline_timer, timed_readtext
+from runtime_metrics import runtime_metrics
+from latin_ocr import LatinGlyphEngine
 import numpy as np
 from PIL import Image, ImageEnhance
 import os
@@ -22,8 +26,15 @@ import re
 class OCRRectangleAnalyzer(TextAnalyzer):
     """使用白框檢測的OCR分析策略"""
     
+    # 預處理的對比度與銳利度增強倍數（調試圖像重建時使用相同數值）
+    CONTRAST_FACTOR = 1.5
+    SHARPNESS_FACTOR = 1.2
+    
+    # 白框只以外接矩形面積與長寬比過濾，不做形態學處理與填充比率過濾（與原本的檢測結果相同）
+    BOX_DETECTOR_CONFIG = {"MORPHOLOGY_KERNEL_SIZE": 1, "FILL_RATIO_THRESHOLD": 0}
+    
     def __init__(self, selling_items: dict, buying_items: dict = None, languages: List[str] = None, 
-                 save_debug_images: bool = False, debug_folder: str = "rectangle_debug"):
+                 save_debug_images: bool = False, debug_folder: str = "rectangle_debug", recognizer_backend: str = None):
         super().__init__(selling_items)
         self.strategy_type = "OCR_RECTANGLE"
         self.buying_items = buying_items or {}
@@ -36,19 +47,45 @@ class OCRRectangleAnalyzer(TextAnalyzer):
         if not OPENCV_AVAILABLE:
             raise ImportError("OpenCV未安裝。請執行: pip install opencv-python")
         
+        # 白框檢測引擎（重用上一幀結果、只搜尋上次位置附近）
+        from white_box_detector import WhiteBoxDetector
+        self.box_detector = WhiteBoxDetector(self.BOX_DETECTOR_CONFIG)
+        
         if languages is None:
             languages = ['ch_tra', 'en']  # 繁體中文和英文
         
         try:
-            self.reader = easyocr.Reader(languages)
+            # 辨識後端依 OCR_BACKEND_CONFIG（或 recognizer_backend 參數）選擇
+            self.reader = create_reader(languages, recognizer_backend, profile=self.strategy_type)
             print(f"OCR_Rectangle初始化成功，支援語言: {languages}")
         except Exception as e:
             print(f"OCR_Rectangle初始化失敗: {e}")
             raise
         
-        # 創建調試資料夾
-        if self.save_debug_images and not os.path.exists(self.debug_folder):
-            os.makedirs(self.debug_folder)
+        # 白框內的數字（EasyOCR看不到，白框已被遮罩）以字型模板辨識（LATIN_OCR_CONFIG，需指定遊戲字型）
+        self.latin_engine = LatinGlyphEngine()
+        if not self.latin_engine.enabled:
+            if self.latin_engine.config["ENABLED"]:
+                print("[WARN] LATIN_OCR_CONFIG 未設定 FONT_PATH（遊戲字型），白框數字辨識不啟用")
+            self.latin_engine = None
+        
+        # 可選的字元模板辨識（GLYPH_RECOGNIZER_CONFIG），由EasyOCR結果學習遊戲字型
+        self.glyph_recognizer = None
+        from glyph_recognizer import GlyphRecognizer
+        glyph_recognizer = GlyphRecognizer()
+        if glyph_recognizer.config["ENABLED"]:
+            self.glyph_recognizer = glyph_recognizer
+            print(f"[INFO] 字元模板辨識已啟用，模板庫: {len(glyph_recognizer.atlas)} 字")
+        
+        # 調試模式只記錄中繼資料，圖像以 debug_artifacts.py 事後產生
+        self.debug_recorder = None
+        if self.save_debug_images:
+            from debug_artifacts import DebugArtifactRecorder
+            self.debug_recorder = DebugArtifactRecorder(self.debug_folder)
+    
+    def warm_up(self, image) -> None:
+        """預熱EasyOCR偵測與辨識模型（不經過白框檢測，避免影響上一幀快取）"""
+        warm_up_reader(self.reader, image)
     
     def analyze_image(self, image) -> dict:
         """使用白框檢測的OCR分析圖片"""
@@ -56,31 +93,48 @@ class OCRRectangleAnalyzer(TextAnalyzer):
             return {"error": "OCR未正確初始化"}
         
         try:
-            # 1. 圖像預處理和二值化
-            binary_image, processed_image = self.preprocess_image(image)
-            
-            # 2. 白框檢測
-            white_rectangles = self.detect_white_rectangles(binary_image)
+            # 1. 圖像預處理
+            with pipeline_timer.span("preprocess"):
+                gray_image, processed_image = self.preprocess_image(image)
             
-            # 3. 創建遮罩（挖除白框區域）
-            masked_image = self.create_masked_image(processed_image, white_rectangles)
+            with pipeline_timer.span("rectangle_detect"):
+                # 2. 白框檢測（由檢測器二值化）
+                white_rectangles = self.detect_white_rectangles(gray_image)
+                
+                # 3. 創建遮罩（挖除白框區域）
+                masked_image = self.create_masked_image(processed_image, white_rectangles)
             
-            # 4. 保存調試圖像
-            if self.save_debug_images:
-                self.save_debug_images_func(image, binary_image, masked_image, white_rectangles)
+            # 4. 記錄調試資料
+            if self.debug_recorder:
+                self.record_debug_metadata(image, white_rectangles)
             
-            # 5. 對遮罩後的圖像進行OCR
-            ocr_results = self.perform_ocr_on_masked_image(masked_image)
+            # 5. 對遮罩後的圖像進行OCR（模板辨識有未知字元時使用EasyOCR並學習）
+            ocr_results = None
+            if self.glyph_recognizer:
+                with pipeline_timer.span("glyph_recognize"):
+                    ocr_results = self.glyph_recognizer.recognize(masked_image)
+            if ocr_results is None:
+                ocr_results = self.perform_ocr_on_masked_image(masked_image)
+                if self.glyph_recognizer:
+                    self.glyph_recognizer.learn(masked_image, ocr_results)
             
             # 6. 分析OCR結果，分割前後兩段文字
             front_text, rear_text = self.segment_ocr_results(ocr_results)
             
+            # 7. 以模板引擎讀取白框內的數字（額外資訊，不取代上面的EasyOCR）
+            channel_text, channel_confidence = "", 0.0
+            if self.latin_engine and white_rectangles:
+                with pipeline_timer.span("latin_ocr"):
+                    channel_text, channel_confidence = self.read_channel_box(image, white_rectangles[0])
+            
             return {
                 "front_text": front_text,
                 "rear_text": rear_text,
                 "full_text": f"{front_text} {rear_text}".strip(),
                 "ocr_results": ocr_results,
-                "white_rectangles": white_rectangles
+                "white_rectangles": white_rectangles,
+                "channel_box_text": channel_text,
+                "channel_box_confidence": channel_confidence
             }
             
         except Exception as e:
@@ -107,6 +161,9 @@ class OCRRectangleAnalyzer(TextAnalyzer):
             # 從後段文字提取頻道編號和商品匹配
             channel_number, has_purchase_intent, matched_items, matched_keywords = self.process_rear_segment(rear_text)
             
+            # 頻道以EasyOCR讀到的後段文字為準，只在沒有讀到頻道時使用白框內的數字
+            channel_number = self.resolve_channel_number(channel_number, raw_result.get("channel_box_text"))
+            
             # 計算平均信心度
             avg_confidence = self.calculate_average_confidence(raw_result.get("ocr_results", []))
             
@@ -133,7 +190,7 @@ class OCRRectangleAnalyzer(TextAnalyzer):
             )
     
     def preprocess_image(self, image) -> Tuple[np.ndarray, Image.Image]:
-        """圖像預處理和二值化"""
+        """圖像預處理，返回增強後的灰階陣列（供白框檢測）與增強後的圖像（供OCR）"""
         # 轉換為PIL圖像以便處理
         if isinstance(image, np.ndarray):
             pil_image = Image.fromarray(image)
@@ -142,41 +199,49 @@ class OCRRectangleAnalyzer(TextAnalyzer):
         
         # 增強對比度和銳利度
         enhancer = ImageEnhance.Contrast(pil_image)
-        enhanced = enhancer.enhance(1.5)
+        enhanced = enhancer.enhance(self.CONTRAST_FACTOR)
         enhancer = ImageEnhance.Sharpness(enhanced)
-        processed_image = enhancer.enhance(1.2)
+        processed_image = enhancer.enhance(self.SHARPNESS_FACTOR)
         
-        # 轉換為numpy array進行二值化
+        # 轉換為灰階numpy array，白色閾值（RECTANGLE_DETECTION_CONFIG）由白框檢測器套用
         img_array = np.array(processed_image)
         if len(img_array.shape) == 3:
             gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
         else:
             gray = img_array
         
-        # 二值化處理（門檻值255，只保留純白色）
-        _, binary = cv2.threshold(gray, 245, 255, cv2.THRESH_BINARY)
-        
-        return binary, processed_image
+        return gray, processed_image
     
-    def detect_white_rectangles(self, binary_image: np.ndarray) -> List[Tuple]:
-        """檢測白色矩形邊界"""
-        # 尋找輪廓
-        contours, _ = cv2.findContours(binary_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        rectangles = []
-        for contour in contours:
-            # 計算輪廓的邊界矩形
-            x, y, w, h = cv2.boundingRect(contour)
-            area = w * h
-            
-            # 過濾太小或太大的矩形
-            if 100 < area < 5000:
-                # 檢查是否接近矩形（縱橫比合理）
-                aspect_ratio = w / h if h > 0 else 0
-                if 0.2 < aspect_ratio < 10:
-                    rectangles.append((x, y, w, h))
-        
-        return rectangles
+    def detect_white_rectangles(self, gray_image: np.ndarray) -> List[Tuple]:
+        """檢測白色矩形邊界，返回 [(x, y, w, h), ...]"""
+        rectangles = self.box_detector.detect(gray_image)
+        return [(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in (r['bbox'] for r in rectangles)]
+    
+    def resolve_channel_number(self, ocr_channel: str, box_text: str) -> str:
+        """合併EasyOCR頻道與白框數字：EasyOCR沒有頻道時才使用白框數字，兩者不一致時沿用EasyOCR"""
+        if not box_text:
+            return ocr_channel
+        if ocr_channel in (None, "", "未知"):
+            runtime_metrics.inc("latin_ocr_total", outcome="filled")
+            return box_text
+        if re.sub(r'\D', '', ocr_channel) != box_text:
+            runtime_metrics.inc("latin_ocr_total", outcome="disagreed")
+        return ocr_channel
+    
+    def read_channel_box(self, image, rectangle: Tuple) -> Tuple[str, float]:
+        """辨識白框內的深色數字，信心度不足時返回空字串，由EasyOCR結果提取頻道"""
+        x, y, w, h = rectangle
+        gray = np.asarray(image.convert('L') if hasattr(image, 'convert') else Image.fromarray(image).convert('L'))
+        # 內縮1像素避開白框邊緣
+        region = gray[y + 1:y + h - 1, x + 1:x + w - 1]
+        if region.size == 0:
+            return "", 0.0
+        text, confidence = self.latin_engine.recognize(region, dark_text=True)
+        if text and confidence >= self.latin_engine.min_confidence:
+            runtime_metrics.inc("latin_ocr_total", outcome="accepted")
+            return text, confidence
+        runtime_metrics.inc("latin_ocr_total", outcome="fallback")
+        return "", confidence
     
     def create_masked_image(self, processed_image: Image.Image, white_rectangles: List[Tuple]) -> Image.Image:
         """創建遮罩圖像，挖除白框區域"""
@@ -202,7 +267,7 @@ class OCRRectangleAnalyzer(TextAnalyzer):
         img_array = np.array(masked_image)
         
         # 使用EasyOCR進行文字識別
-        results = self.reader.readtext(img_array, min_size=5, text_threshold=0.6, low_text=0.3)
+        results = timed_readtext(self.reader, img_array, min_size=5, text_threshold=0.6, low_text=0.3)
         
         ocr_results = []
         for (bbox, text, confidence) in results:
@@ -587,34 +652,13 @@ class OCRRectangleAnalyzer(TextAnalyzer):
         total_confidence = sum(result['confidence'] for result in ocr_results)
         return total_confidence / len(ocr_results)
     
-    def save_debug_images_func(self, original_image, binary_image, masked_image, white_rectangles):
-        """保存調試圖像"""
-        import time
-        timestamp = int(time.time() * 1000)
-        
+    def record_debug_metadata(self, original_image, white_rectangles):
+        """記錄白框座標、閾值與畫面雜湊，調試圖像由 debug_artifacts.py 事後產生"""
         try:
-            # 保存二值化圖像
-            binary_pil = Image.fromarray(binary_image)
-            binary_path = os.path.join(self.debug_folder, f"{timestamp}_binary.png")
-            binary_pil.save(binary_path)
-            
-            # 保存遮罩圖像
-            masked_path = os.path.join(self.debug_folder, f"{timestamp}_masked.png")
-            masked_image.save(masked_path)
-            
-            # 保存白框檢測結果圖像
-            debug_image = np.array(original_image.copy() if hasattr(original_image, 'copy') else Image.fromarray(original_image))
-            for x, y, w, h in white_rectangles:
-                cv2.rectangle(debug_image, (x, y), (x+w, y+h), (255, 0, 0), 2)
-            
-            debug_pil = Image.fromarray(debug_image)
-            debug_path = os.path.join(self.debug_folder, f"{timestamp}_rectangle_debug.png")
-            debug_pil.save(debug_path)
-            
-            print(f"調試圖像已保存到 {self.debug_folder}")
-            
+            self.debug_recorder.record(original_image, white_rectangles, self.box_detector.threshold,
+                                       contrast=self.CONTRAST_FACTOR, sharpness=self.SHARPNESS_FACTOR)
         except Exception as e:
-            print(f"保存調試圖像失敗: {e}")
+            print(f"記錄調試資料失敗: {e}")
     
     def get_error_type(self, error_message: str) -> str:
         """OCR_Rectangle策略的錯誤類型"""
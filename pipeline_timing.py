@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""監控流程各階段計時工具
+
+用法:
+    from pipeline_timing import pipeline_timer
+    with pipeline_timer.span("ocr_detect"):
+        ...
+
+停用時 span() 直接返回共用的空上下文管理器，幾乎沒有額外開銷。
+capture() 收集單一執行緒的階段耗時（停用時也計時、不計入統計），分析服務以此將OCR各階段耗時回傳給客戶端。
+"""
+
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from runtime_metrics import runtime_metrics
+
+# 監控流程的標準階段名稱
+PIPELINE_STAGES = [
+    "capture", "preprocess", "rectangle_detect", "ocr_detect", "ocr_recognize",
+    "parse_match", "persist", "report", "alert"
+]
+
+# 累積直方圖的桶上限（毫秒），供指標輸出使用
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+# 公開的 Reader.detect / Reader.recognize（含 reformat 參數）可用的最低 EasyOCR 版本
+MIN_SPLIT_EASYOCR_VERSION = (1, 4)
+
+
+class _NullSpan:
+    """停用計時時使用的空上下文管理器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """單次計時區段"""
+
+    __slots__ = ("timer", "stage", "start")
+
+    def __init__(self, timer, stage):
+        self.timer = timer
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.record(self.stage, (time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class StageStats:
+    """單一階段的滾動樣本與累積直方圖"""
+
+    def __init__(self, window_size: int):
+        self.samples = deque(maxlen=window_size)
+        self.count = 0
+        self.total_ms = 0.0
+        self.bucket_counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)  # 最後一格為 +Inf
+
+    def add(self, duration_ms: float):
+        self.samples.append(duration_ms)
+        self.count += 1
+        self.total_ms += duration_ms
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def summary(self) -> dict:
+        """返回滾動視窗內的百分位數"""
+        if not self.samples:
+            return {"count": self.count}
+        values = np.fromiter(self.samples, dtype=np.float64, count=len(self.samples))
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            "count": self.count,
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(values.max()), 3)
+        }
+
+
+class PipelineTimer:
+    """收集各階段耗時並定期輸出指標"""
+
+    def __init__(self, enabled: bool = False, window_size: int = 1000, metrics_interval: float = 60.0):
+        self.enabled = enabled
+        self.window_size = window_size
+        self.metrics_interval = metrics_interval
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.last_metrics_time = time.time()
+        self._capture = threading.local()
+
+    def configure(self, enabled: bool = None, window_size: int = None, metrics_interval: float = None):
+        """更新計時設定（視窗大小變更時重設已收集的樣本）"""
+        if enabled is not None:
+            self.enabled = enabled
+        if metrics_interval is not None:
+            self.metrics_interval = metrics_interval
+        if window_size is not None and window_size != self.window_size:
+            self.window_size = window_size
+            self.reset()
+
+    def reset(self):
+        """清除所有統計"""
+        with self.lock:
+            self.stages = {}
+            self.last_metrics_time = time.time()
+
+    def span(self, stage: str):
+        """返回計時上下文管理器"""
+        if not self.is_active():
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def is_active(self) -> bool:
+        """計時已啟用，或本執行緒正在 capture() 區塊內"""
+        return self.enabled or getattr(self._capture, "stages", None) is not None
+
+    @contextmanager
+    def capture(self):
+        """收集本執行緒在區塊內的 [(階段, 毫秒)]，改由呼叫端記錄（不計入本計時器的統計）"""
+        previous = getattr(self._capture, "stages", None)
+        self._capture.stages = stages = []
+        try:
+            yield stages
+        finally:
+            self._capture.stages = previous
+
+    def record(self, stage: str, duration_ms: float):
+        """記錄一次階段耗時"""
+        captured = getattr(self._capture, "stages", None)
+        if captured is not None:
+            captured.append((stage, round(duration_ms, 3)))
+            return
+        with self.lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats(self.window_size)
+            stats.add(duration_ms)
+
+    def snapshot(self) -> dict:
+        """返回各階段的百分位數摘要"""
+        with self.lock:
+            return {stage: stats.summary() for stage, stats in self.stages.items()}
+
+    def histograms(self) -> dict:
+        """返回各階段的累積直方圖 {stage: (bucket_counts, count, total_ms)}"""
+        with self.lock:
+            return {stage: (list(stats.bucket_counts), stats.count, stats.total_ms)
+                    for stage, stats in self.stages.items()}
+
+    def maybe_write_metrics(self, session_folder: str, extra: dict = None, force: bool = False) -> bool:
+        """距離上次輸出超過間隔時，在會話資料夾追加一行指標"""
+        if not self.enabled or not session_folder:
+            return False
+        now = time.time()
+        if not force and now - self.last_metrics_time < self.metrics_interval:
+            return False
+        self.last_metrics_time = now
+
+        line = {"timestamp": datetime.now().isoformat(), "stages": self.snapshot()}
+        if extra:
+            line.update(extra)
+        try:
+            with open(os.path.join(session_folder, "pipeline_metrics.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+            return True
+        except Exception as e:
+            print(f"[WARN] 寫入效能指標失敗: {e}")
+            return False
+
+    def format_summary(self) -> str:
+        """返回人類可讀的階段耗時摘要"""
+        lines = []
+        snapshot = self.snapshot()
+        ordered = [s for s in PIPELINE_STAGES if s in snapshot] + [s for s in snapshot if s not in PIPELINE_STAGES]
+        for stage in ordered:
+            stats = snapshot[stage]
+            if "p50_ms" in stats:
+                lines.append(f"  - {stage}: p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                             f"p99={stats['p99_ms']}ms (n={stats['count']})")
+        return '\n'.join(lines)
+
+
+# 全域計時器，由 ScreenMonitor 依 TIMING_CONFIG 啟用
+pipeline_timer = PipelineTimer()
+
+
+def timed_readtext(reader, image, **readtext_kwargs):
+    """執行EasyOCR readtext，啟用計時時拆成偵測與辨識兩個階段分別計時"""
+    runtime_metrics.inc("ocr_calls_total")
+    from ocr_backends import inference_context
+    with inference_context(reader):
+        return _readtext(reader, image, **readtext_kwargs)
+
+
+@lru_cache(maxsize=1)
+def _easyocr_version():
+    """返回已安裝的 EasyOCR 版本字串（未安裝時為 None）"""
+    try:
+        import easyocr
+    except ImportError:
+        return None
+    return getattr(easyocr, "__version__", None)
+
+
+def _parse_version(version) -> tuple:
+    """將 "1.7.1" 之類的版本字串轉為 (1, 7, 1)，無法解析時返回 ()"""
+    match = re.match(r"(\d+(?:\.\d+)*)", str(version or ""))
+    return tuple(int(part) for part in match.group(1).split(".")) if match else ()
+
+
+def _can_split(reader) -> bool:
+    """EasyOCR 版本與 reader 都支援公開的 detect / recognize 時才分段計時"""
+    version = _parse_version(_easyocr_version())
+    return (bool(version) and version >= MIN_SPLIT_EASYOCR_VERSION
+            and callable(getattr(reader, "detect", None)) and callable(getattr(reader, "recognize", None)))
+
+
+def _readtext(reader, image, **readtext_kwargs):
+    """執行readtext，啟用計時時以公開的 detect / recognize 分別記錄偵測與辨識"""
+    if not pipeline_timer.is_active():
+        return reader.readtext(image, **readtext_kwargs)
+
+    if not _can_split(reader):
+        with pipeline_timer.span("ocr_recognize"):
+            return reader.readtext(image, **readtext_kwargs)
+
+    detect_keys = inspect.signature(reader.detect).parameters
+    detect_kwargs = {k: v for k, v in readtext_kwargs.items() if k in detect_keys}
+    recognize_kwargs = {k: v for k, v in readtext_kwargs.items() if k not in detect_keys}
+
+    with pipeline_timer.span("ocr_detect"):
+        horizontal_list, free_list = reader.detect(image, **detect_kwargs)
+    with pipeline_timer.span("ocr_recognize"):
+        return reader.recognize(image, horizontal_list[0], free_list[0], **recognize_kwargs)
@@ -8,6 +8,13 @@ import base64
 from datetime import datetime
 from pathlib import Path
 from html_template_with_real_config import get_enhanced_html_template, get_current_config
+from session_stats import match_rate as session_match_rate
+
+def _json_default(obj):
+    """numpy數值與陣列轉為Python原生型別"""
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
 
 class RealTimeMerger:
     """實時測試結果合併器"""
@@ -16,6 +23,9 @@ class RealTimeMerger:
         self.test_folder = Path(test_folder)
         self.merged_results = []
         self.output_file = self.test_folder / "combined_results.json"
+        self.spill_file = self.test_folder / "spilled_results.jsonl"
+        self.spilled_count = 0
+        self.spilled_image_count = 0
         
     def add_test_result(self, test_id, screenshot_path, analysis_result=None, error_info=None):
         """添加單個測試結果"""
@@ -31,12 +41,14 @@ class RealTimeMerger:
             combined_record = {
                 "test_id": test_id,
                 "timestamp": datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3],
-                "screenshot_filename": os.path.basename(screenshot_path) if screenshot_path else None,
+                "screenshot_filename": self.relative_path(screenshot_path) if screenshot_path else None,
                 "image_base64": image_base64,
                 "analysis_result": analysis_result,
                 "error_info": error_info,
                 "has_match": False,
-                "match_details": None
+                "match_details": None,
+                "duplicate_count": 1,
+                "last_seen": None
             }
             
             # 檢查是否有匹配
@@ -59,13 +71,80 @@ class RealTimeMerger:
             print(f"警告：添加測試結果失敗 - {e}")
             return False
     
+    def update_duplicate(self, test_id, duplicate_count, last_seen=None):
+        """更新重複廣播的次數和最後出現時間，而不新增記錄"""
+        for record in reversed(self.merged_results):
+            if record.get('test_id') == test_id:
+                record['duplicate_count'] = duplicate_count
+                if last_seen is not None:
+                    record['last_seen'] = datetime.fromtimestamp(last_seen).strftime("%Y%m%d_%H%M%S_%f")[:-3]
+                self.save_combined_results()
+                return True
+        return False
+    
+    def relative_path(self, path):
+        """返回相對於會話資料夾的路徑（分段儲存時包含 segment_XXXX/）"""
+        try:
+            relative = Path(path).resolve().relative_to(self.test_folder.resolve())
+            return relative.as_posix()
+        except ValueError:
+            return os.path.basename(path)
+    
+    def total_count(self):
+        """包含已寫到磁碟的記錄總數"""
+        return len(self.merged_results) + self.spilled_count
+    
+    def release_images(self, keep_recent=50, matches_only=False):
+        """釋放較舊記錄內的base64影像（截圖仍保留在會話資料夾），返回釋放的位元組數
+
+        matches_only: 分段儲存會刪除或壓縮未匹配的截圖，此時只釋放匹配記錄，避免HTML報告圖片失效
+        """
+        released = 0
+        for record in self.merged_results[:-keep_recent] if keep_recent else self.merged_results:
+            if matches_only and not record.get('has_match'):
+                continue
+            if record.get('image_base64') and record.get('screenshot_filename'):
+                released += len(record['image_base64'])
+                record['image_base64'] = None
+                self.spilled_image_count += 1
+        return released
+    
+    def spill_records(self, keep_recent=50):
+        """將較舊的未匹配記錄寫到 spilled_results.jsonl 並從記憶體移除，返回移除筆數"""
+        older = self.merged_results[:-keep_recent] if keep_recent else list(self.merged_results)
+        to_spill = [r for r in older if not r.get('has_match')]
+        if not to_spill:
+            return 0
+        
+        with open(self.spill_file, 'a', encoding='utf-8') as f:
+            for record in to_spill:
+                record['image_base64'] = None
+                f.write(json.dumps(record, ensure_ascii=False, default=_json_default) + "\n")
+        
+        spilled_ids = {id(r) for r in to_spill}
+        self.merged_results = [r for r in self.merged_results if id(r) not in spilled_ids]
+        self.spilled_count += len(to_spill)
+        return len(to_spill)
+    
+    def all_results(self):
+        """返回所有記錄（包含已寫到磁碟的記錄），按記錄順序"""
+        if not self.spilled_count or not self.spill_file.exists():
+            return list(self.merged_results)
+        spilled = []
+        with open(self.spill_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    spilled.append(json.loads(line))
+        return spilled + self.merged_results
+    
     def save_combined_results(self):
         """保存合併結果到文件"""
         try:
             combined_data = {
                 "generation_info": {
                     "created_at": datetime.now().isoformat(),
-                    "total_tests": len(self.merged_results),
+                    "total_tests": self.total_count(),
+                    "spilled_tests": self.spilled_count,
                     "successful_tests": len([r for r in self.merged_results if r['analysis_result']]),
                     "error_tests": len([r for r in self.merged_results if r['error_info']]),
                     "matched_tests": len([r for r in self.merged_results if r['has_match']])
@@ -88,10 +167,10 @@ class RealTimeMerger:
         html_file = self.test_folder / "quick_view.html"
         
         # 統計信息
-        total_tests = len(self.merged_results)
+        total_tests = self.total_count()
         matched_results = [r for r in self.merged_results if r['has_match']]
         matched_count = len(matched_results)
-        match_rate = (matched_count / total_tests * 100) if total_tests > 0 else 0
+        match_rate = session_match_rate(matched_count, total_tests)
         
         # 按時間倒序排列匹配結果
         matched_results.reverse()  # 最新的在上面
@@ -180,6 +259,21 @@ class RealTimeMerger:
             else:
                 time_display = '未知'
             
+            # 重複廣播次數
+            duplicate_count = result.get('duplicate_count', 1) or 1
+            duplicate_html = ""
+            if duplicate_count > 1:
+                last_seen = result.get('last_seen') or ''
+                last_seen_display = last_seen.split('_')[1] if '_' in last_seen else last_seen
+                if len(last_seen_display) >= 6:
+                    last_seen_display = f"{last_seen_display[:2]}:{last_seen_display[2:4]}:{last_seen_display[4:6]}"
+                duplicate_html = f"""
+                <div class="field-row">
+                    <span class="field-label">重複廣播:</span>
+                    <span class="field-value">{duplicate_count} 次 (最後出現 {last_seen_display})</span>
+                </div>
+                """
+            
             card_html = f"""
         <div class="match-card">
             <div class="match-header">
@@ -187,7 +281,7 @@ class RealTimeMerger:
                 <span class="timestamp">{time_display}</span>
             </div>
             <div class="match-content">
-                {"<img class='screenshot' src='data:image/png;base64," + result['image_base64'] + "' alt='交易截圖'>" if result['image_base64'] else ""}
+                {"<img class='screenshot' src='data:image/png;base64," + result['image_base64'] + "' alt='交易截圖'>" if result['image_base64'] else "<img class='screenshot' src='" + result['screenshot_filename'] + "' alt='交易截圖'>" if result.get('screenshot_filename') else ""}
                 
                 <div class="field-row">
                     <span class="field-label">玩家:</span>
@@ -208,7 +302,7 @@ class RealTimeMerger:
                     <span class="field-label">匹配時間:</span>
                     <span class="field-value" style="color: #3498db; font-weight: bold;">{formatted_time}</span>
                 </div>
-                
+                {duplicate_html}
                 <div class="field-row">
                     <span class="field-label">完整廣播:</span>
                 </div>
@@ -1,133 +1,28 @@
-import cv2
 import numpy as np
 from typing import List, Dict, Tuple
 import os
 import json
 from datetime import datetime
 from PIL import Image, ImageDraw
+from white_box_detector import DEFAULT_CONFIG, RECTANGLE_DETECTION_CONFIG, WhiteBoxDetector
+from debug_artifacts import frame_hash
 
 class RectangleDetectionStrategy:
-    """白色矩形框檢測策略"""
+    """白色矩形框檢測策略（使用共用的 WhiteBoxDetector）"""
     
     def __init__(self, config=None):
         """初始化檢測參數"""
-        self.config = config or self._get_default_config()
-    
-    def _get_default_config(self):
-        """默認檢測參數"""
-        return {
-            "WHITE_THRESHOLD": 240,
-            "MIN_RECTANGLE_AREA": 100,
-            "MAX_RECTANGLE_AREA": 5000,
-            "MIN_ASPECT_RATIO": 0.2,
-            "MAX_ASPECT_RATIO": 10,
-            "FILL_RATIO_THRESHOLD": 0.7,
-            "TEXT_ASSIGNMENT_TOLERANCE": 5,
-            "MORPHOLOGY_KERNEL_SIZE": 3,
-            "CONTOUR_AREA_FILTER": True
-        }
+        self.detector = WhiteBoxDetector(config)
+        self.config = self.detector.config
     
     def detect_white_rectangles(self, image):
-        """檢測圖片中的白色矩形框"""
+        """檢測圖片中的白色矩形框（從左到右排序）"""
         try:
-            # 轉換為OpenCV格式
-            cv_image = self._convert_to_cv_format(image)
-            gray = self._convert_to_grayscale(cv_image)
-            
-            # 1. 檢測白色區域
-            white_mask = self._detect_white_regions(gray)
-            
-            # 2. 尋找輪廓
-            contours = self._find_contours(white_mask)
-            
-            # 3. 過濾矩形輪廓
-            rectangles = self._filter_rectangles(contours)
-            
-            # 4. 排序矩形（從左到右）
-            sorted_rectangles = self._sort_rectangles(rectangles)
-            
-            return sorted_rectangles
-            
+            return self.detector.detect(image)
         except Exception as e:
             print(f"矩形框檢測失敗: {e}")
             return []
     
-    def _convert_to_cv_format(self, image):
-        """轉換PIL圖片為OpenCV格式"""
-        if hasattr(image, 'convert'):
-            # PIL圖片
-            return np.array(image.convert('RGB'))
-        else:
-            # 假設已經是numpy array
-            return image
-    
-    def _convert_to_grayscale(self, cv_image):
-        """轉換為灰度圖"""
-        if len(cv_image.shape) == 3:
-            return cv2.cvtColor(cv_image, cv2.COLOR_RGB2GRAY)
-        else:
-            return cv_image
-    
-    def _detect_white_regions(self, gray_image):
-        """檢測白色區域"""
-        # 白色閾值
-        threshold = self.config["WHITE_THRESHOLD"]
-        _, white_mask = cv2.threshold(gray_image, threshold, 255, cv2.THRESH_BINARY)
-        
-        # 形態學處理：去除噪點，連接斷開的區域
-        kernel_size = self.config["MORPHOLOGY_KERNEL_SIZE"]
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
-        
-        # 先閉運算連接近似區域，再開運算去除噪點
-        white_mask = cv2.morphologyEx(white_mask, cv2.MORPH_CLOSE, kernel)
-        white_mask = cv2.morphologyEx(white_mask, cv2.MORPH_OPEN, kernel)
-        
-        return white_mask
-    
-    def _find_contours(self, mask):
-        """尋找輪廓"""
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        return contours
-    
-    def _filter_rectangles(self, contours):
-        """過濾出矩形輪廓"""
-        rectangles = []
-        
-        min_area = self.config["MIN_RECTANGLE_AREA"]
-        max_area = self.config["MAX_RECTANGLE_AREA"]
-        min_aspect_ratio = self.config["MIN_ASPECT_RATIO"]
-        max_aspect_ratio = self.config["MAX_ASPECT_RATIO"]
-        fill_threshold = self.config["FILL_RATIO_THRESHOLD"]
-        
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            if min_area < area < max_area:
-                # 計算邊界矩形
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if min_aspect_ratio < aspect_ratio < max_aspect_ratio:
-                    # 檢查是否接近矩形
-                    rect_area = w * h
-                    fill_ratio = area / rect_area if rect_area > 0 else 0
-                    
-                    if fill_ratio > fill_threshold:
-                        rectangles.append({
-                            'bbox': (x, y, x+w, y+h),
-                            'center': (x + w//2, y + h//2),
-                            'area': area,
-                            'aspect_ratio': aspect_ratio,
-                            'fill_ratio': fill_ratio,
-                            'contour': contour
-                        })
-        
-        return rectangles
-    
-    def _sort_rectangles(self, rectangles):
-        """按從左到右排序矩形"""
-        return sorted(rectangles, key=lambda r: r['center'][0])
-    
     def is_text_in_rectangle(self, text_bbox, rect_bbox):
         """檢查文字邊界框是否在矩形框內"""
         # 計算文字中心點
@@ -196,18 +91,21 @@ class RectangleDetectionDebugger:
         return vis_image
     
     @staticmethod
-    def save_detection_report(image, rectangles, ocr_results, segments, output_dir):
-        """保存檢測報告"""
+    def save_detection_report(image, rectangles, ocr_results, segments, output_dir, config=None, render_visual=False):
+        """保存檢測報告（只記錄座標與畫面雜湊，render_visual=True 時才繪製可視化圖片）"""
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        parameters = {**DEFAULT_CONFIG, **RECTANGLE_DETECTION_CONFIG, **(config or {})}
         
-        # 1. 保存可視化圖片
-        vis_image = RectangleDetectionDebugger.visualize_rectangles(
-            image, rectangles, ocr_results)
-        vis_path = os.path.join(output_dir, f"detection_visual_{timestamp}.png")
-        vis_image.save(vis_path)
+        # 1. 可視化圖片預設不在檢測時產生，可之後以 visualize_rectangles 繪製
+        vis_path = None
+        if render_visual:
+            vis_image = RectangleDetectionDebugger.visualize_rectangles(
+                image, rectangles, ocr_results)
+            vis_path = os.path.join(output_dir, f"detection_visual_{timestamp}.png")
+            vis_image.save(vis_path)
         
         # 2. 保存詳細報告
         # 轉換數據確保JSON序列化兼容性
@@ -226,6 +124,7 @@ class RectangleDetectionDebugger:
         
         report = {
             'timestamp': timestamp,
+            'frame_hash': frame_hash(image),
             'detection_summary': {
                 'rectangles_detected': len(rectangles),
                 'ocr_texts_found': len(ocr_results) if ocr_results else 0,
@@ -234,12 +133,12 @@ class RectangleDetectionDebugger:
                 'fallback_used': len(rectangles) == 0
             },
             'detection_parameters': {
-                'white_threshold': 240,
-                'min_rectangle_area': 100,
-                'max_rectangle_area': 5000,
-                'min_aspect_ratio': 0.2,
-                'max_aspect_ratio': 10,
-                'fill_ratio_threshold': 0.7
+                'white_threshold': parameters["WHITE_THRESHOLD"],
+                'min_rectangle_area': parameters["MIN_RECTANGLE_AREA"],
+                'max_rectangle_area': parameters["MAX_RECTANGLE_AREA"],
+                'min_aspect_ratio': parameters["MIN_ASPECT_RATIO"],
+                'max_aspect_ratio': parameters["MAX_ASPECT_RATIO"],
+                'fill_ratio_threshold': parameters["FILL_RATIO_THRESHOLD"]
             },
             'rectangles': [
                 {
@@ -295,7 +194,8 @@ class RectangleDetectionDebugger:
             json.dump(report, f, ensure_ascii=False, indent=2)
         
         print(f"檢測報告已保存:")
-        print(f"  視覺化圖片: {vis_path}")
+        if vis_path:
+            print(f"  視覺化圖片: {vis_path}")
         print(f"  詳細報告: {report_path}")
         
         return vis_path, report_path
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""執行期指標收集 - 以 Prometheus 文字格式輸出
+
+用法:
+    from runtime_metrics import runtime_metrics
+    runtime_metrics.inc("scans_total")
+    runtime_metrics.inc("errors_total", error_type="API_QUOTA_EXCEEDED")
+    runtime_metrics.register_gauge("writer_backlog", queue.qsize, writer="alert")
+
+配置API服務器的 /metrics 端點會呼叫 render_prometheus() 輸出所有計數器、
+量測值以及 pipeline_timer 的各階段延遲直方圖。
+"""
+
+import threading
+
+METRIC_PREFIX = "maple_monitor_"
+
+# 指標名稱 -> (類型, 說明)
+METRIC_DEFINITIONS = {
+    "scans_total": ("counter", "Number of ROI scans performed"),
+    "ocr_calls_total": ("counter", "Number of OCR engine invocations"),
+    "cache_hits_total": ("counter", "Cache hits by cache name"),
+    "matches_total": ("counter", "Number of new matching broadcasts"),
+    "errors_total": ("counter", "Analysis errors by analyzer error type"),
+    "gemini_quota_exceeded": ("gauge", "1 when the last Gemini request hit the API quota"),
+    "writer_backlog": ("gauge", "Pending items in background writer queues"),
+    "scan_interval_seconds": ("gauge", "Current scan interval"),
+    "memory_rss_bytes": ("gauge", "Resident memory of the monitor process"),
+    "session_match_rate": ("gauge", "Share of non-duplicate scans with a new match in this session"),
+    "session_scan_latency_seconds": ("gauge", "Scan latency percentiles for this session"),
+    "latin_ocr_total": ("counter", "Channel box reads by the template engine, by outcome (accepted/fallback/filled/disagreed)"),
+}
+
+# 帶標籤的指標沒有資料時只輸出說明，不輸出樣本
+LABELED_METRICS = {"cache_hits_total", "errors_total", "writer_backlog", "session_scan_latency_seconds",
+                   "latin_ocr_total"}
+
+
+def _escape_label_value(value) -> str:
+    """跳脫標籤值中的特殊字元"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels) -> str:
+    """將 ((key, value), ...) 轉換為 {key="value",...}"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value) -> str:
+    """輸出整數時不帶小數點"""
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+class RuntimeMetrics:
+    """執行緒安全的計數器與量測值"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.gauge_callbacks = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """累加計數器"""
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """設定量測值"""
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def register_gauge(self, name: str, callback, **labels):
+        """註冊於輸出時才讀取的量測值（例如佇列長度）"""
+        with self.lock:
+            self.gauge_callbacks[self._key(name, labels)] = callback
+
+    def unregister_gauge(self, name: str, **labels):
+        """移除量測值回呼"""
+        with self.lock:
+            self.gauge_callbacks.pop(self._key(name, labels), None)
+
+    def get(self, name: str, **labels):
+        """讀取計數器或量測值，不存在時返回0"""
+        key = self._key(name, labels)
+        with self.lock:
+            if key in self.counters:
+                return self.counters[key]
+            return self.gauges.get(key, 0)
+
+    def reset(self):
+        """清除所有指標"""
+        with self.lock:
+            self.counters = {}
+            self.gauges = {}
+            self.gauge_callbacks = {}
+
+    def collect(self) -> dict:
+        """返回 {name: [(labels, value), ...]}，回呼失敗的量測值會被略過"""
+        with self.lock:
+            samples = list(self.counters.items()) + list(self.gauges.items())
+            callbacks = list(self.gauge_callbacks.items())
+
+        for key, callback in callbacks:
+            try:
+                samples.append((key, callback()))
+            except Exception:
+                continue
+
+        collected = {}
+        for (name, labels), value in samples:
+            collected.setdefault(name, []).append((labels, value))
+        return collected
+
+    def render_prometheus(self, timer=None) -> str:
+        """以 Prometheus 文字格式輸出所有指標"""
+        # 延遲匯入：pipeline_timing 本身會更新 OCR 呼叫計數
+        from pipeline_timing import pipeline_timer, HISTOGRAM_BUCKETS_MS
+        timer = timer or pipeline_timer
+        lines = []
+        collected = self.collect()
+
+        # 已定義的指標即使尚無資料也輸出0，方便收集端建立時間序列
+        for name in list(METRIC_DEFINITIONS) + sorted(n for n in collected if n not in METRIC_DEFINITIONS):
+            metric_type, help_text = METRIC_DEFINITIONS.get(name, ("untyped", name))
+            samples = collected.get(name)
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {metric_type}")
+            if not samples:
+                if name in LABELED_METRICS:
+                    continue
+                samples = [((), 0)]
+            for labels, value in sorted(samples, key=lambda s: s[0]):
+                lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {_format_value(value)}")
+
+        # 各階段延遲直方圖（毫秒轉換為秒）
+        histograms = timer.histograms()
+        if histograms:
+            name = f"{METRIC_PREFIX}stage_latency_seconds"
+            lines.append(f"# HELP {name} Pipeline stage latency")
+            lines.append(f"# TYPE {name} histogram")
+            for stage in sorted(histograms):
+                bucket_counts, count, total_ms = histograms[stage]
+                cumulative = 0
+                for bound, bucket_count in zip(HISTOGRAM_BUCKETS_MS, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {total_ms / 1000:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+# 全域指標，由 ScreenMonitor 與各分析器更新
+runtime_metrics = RuntimeMetrics()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""執行期取樣分析器 - 在運行中的監控會話內記錄掃描執行緒的堆疊
+
+每隔 sample_interval 秒讀取一次目標執行緒的堆疊（sys._current_frames），
+持續 duration 秒後在會話資料夾輸出 collapsed-stack 格式檔案，
+可直接交給 flamegraph.pl 或 speedscope 產生火焰圖。
+框架預設記為 模組:函式，同一函式的樣本合併；include_lines 時附加行號。
+
+觸發方式:
+    - 配置API: POST /api/profile {"duration": 30}
+    - 訊號: kill -USR1 <pid>（僅限支援 SIGUSR1 的平台）
+"""
+
+import math
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+def format_frame(frame, include_lines: bool = False) -> str:
+    """將堆疊框架格式化為 模組:函式（include_lines 時為 模組:函式:行號），直接執行的腳本以檔名為模組名"""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__")
+    if not module or module == "__main__":
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    if include_lines:
+        return f"{module}:{code.co_name}:{frame.f_lineno}"
+    return f"{module}:{code.co_name}"
+
+
+def collapse_stack(frame, max_depth: int = 128, include_lines: bool = False) -> str:
+    """將堆疊轉換為由外到內、以分號分隔的字串"""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        names.append(format_frame(frame, include_lines))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def validate_duration(value) -> float:
+    """將取樣秒數轉為正的有限浮點數，無效時拋出 ValueError"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"duration 必須是秒數，收到: {value!r}")
+    try:
+        duration = float(value)
+    except ValueError:
+        raise ValueError(f"duration 必須是秒數，收到: {value!r}") from None
+    if not math.isfinite(duration) or duration <= 0:
+        raise ValueError(f"duration 必須是大於0的秒數，收到: {value!r}")
+    return duration
+
+
+class SamplingProfiler:
+    """對單一執行緒進行定時堆疊取樣"""
+
+    def __init__(self, thread_id: int, sample_interval: float = 0.005, include_lines: bool = False):
+        self.thread_id = thread_id
+        self.sample_interval = sample_interval
+        self.include_lines = include_lines
+        self.stack_counts = Counter()
+        self.sample_count = 0
+
+    def sample_once(self) -> bool:
+        """讀取一次目標執行緒堆疊，執行緒不存在時返回False"""
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return False
+        self.stack_counts[collapse_stack(frame, include_lines=self.include_lines)] += 1
+        self.sample_count += 1
+        return True
+
+    def run(self, duration: float, stop_event: threading.Event = None):
+        """取樣直到時間到、目標執行緒結束或收到停止事件"""
+        stop_event = stop_event or threading.Event()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline and not stop_event.is_set():
+            if not self.sample_once():
+                break
+            stop_event.wait(self.sample_interval)
+
+    def write_collapsed(self, path: str):
+        """輸出 collapsed-stack 檔案（每行: 堆疊 次數）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stack_counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit: int = 10) -> list:
+        """返回最常出現在堆疊頂端的函式 [(函式, 次數), ...]"""
+        leaf_counts = Counter()
+        for stack, count in self.stack_counts.items():
+            leaf_counts[stack.rsplit(';', 1)[-1]] += count
+        return leaf_counts.most_common(limit)
+
+
+class ProfilerController:
+    """管理背景取樣工作，供配置API與訊號處理器共用"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread_id = None
+        self.output_folder = None
+        self.sample_interval = 0.005
+        self.default_duration = 30
+        self.include_lines = False
+        self.worker_thread = None
+        self.stop_event = threading.Event()
+        self.last_output = None
+        self.last_error = None
+
+    def attach(self, thread_id: int, output_folder: str, sample_interval: float = None, default_duration: float = None,
+               include_lines: bool = None):
+        """設定要取樣的執行緒與輸出資料夾"""
+        with self.lock:
+            self.thread_id = thread_id
+            self.output_folder = output_folder
+            if sample_interval:
+                self.sample_interval = sample_interval
+            if default_duration:
+                self.default_duration = default_duration
+            if include_lines is not None:
+                self.include_lines = include_lines
+
+    def is_running(self) -> bool:
+        return self.worker_thread is not None and self.worker_thread.is_alive()
+
+    def start(self, duration: float = None) -> tuple:
+        """開始一次取樣，返回(是否成功, 訊息)；duration 無效時拋出 ValueError"""
+        duration = validate_duration(self.default_duration if duration is None else duration)
+        with self.lock:
+            if self.thread_id is None or not self.output_folder:
+                return False, "監控尚未開始，沒有可取樣的執行緒"
+            if self.is_running():
+                return False, "取樣分析正在進行中"
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = os.path.join(self.output_folder, f"profile_{timestamp}.collapsed")
+            profiler = SamplingProfiler(self.thread_id, self.sample_interval, self.include_lines)
+            self.stop_event = threading.Event()
+            self.worker_thread = threading.Thread(target=self._run, args=(profiler, duration, output_path),
+                                                  name="SamplingProfiler", daemon=True)
+            self.worker_thread.start()
+            return True, f"開始取樣 {duration:g} 秒，輸出: {output_path}"
+
+    def stop(self, timeout: float = 2.0):
+        """提前結束取樣（仍會輸出已收集的樣本）"""
+        self.stop_event.set()
+        if self.worker_thread:
+            self.worker_thread.join(timeout)
+
+    def status(self) -> dict:
+        """返回目前狀態"""
+        return {
+            "attached": self.thread_id is not None,
+            "running": self.is_running(),
+            "sample_interval": self.sample_interval,
+            "default_duration": self.default_duration,
+            "include_lines": self.include_lines,
+            "last_output": self.last_output,
+            "last_error": self.last_error
+        }
+
+    def _run(self, profiler: SamplingProfiler, duration: float, output_path: str):
+        """背景工作：取樣並輸出結果"""
+        try:
+            profiler.run(duration, self.stop_event)
+            profiler.write_collapsed(output_path)
+            self.last_output = output_path
+            self.last_error = None
+            print(f"[PROFILE] 取樣完成 ({profiler.sample_count} 個樣本): {output_path}")
+            for function_name, count in profiler.top_functions(5):
+                print(f"  - {function_name}: {count / max(profiler.sample_count, 1) * 100:.1f}%")
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[WARN] 取樣分析失敗: {e}")
+
+    def install_signal_handler(self) -> bool:
+        """註冊 SIGUSR1 觸發取樣（需在主執行緒呼叫，Windows不支援）"""
+        if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+            return False
+        # 在訊號處理器內不取得鎖，改由新執行緒啟動以避免死結
+        signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=self.start, daemon=True).start())
+        return True
+
+
+# 全域控制器，由 ScreenMonitor 綁定掃描執行緒
+profiler_controller = ProfilerController()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""掃描與匹配索引 - SQLite (WAL) 資料庫，支援跨會話快速查詢
+
+監控時每次掃描寫入 scans 表，每個匹配商品寫入 matches 表（批次提交）。
+舊的 monitoring_session_* / integration_test_* 資料夾可用 import 子命令匯入。
+
+用法:
+    python scan_index.py query --item 青銅母礦 --intent WTB --since 6h
+    python scan_index.py query --item 母礦 --contains --since 2d --json
+    python scan_index.py search "青銅母礦 500" --since 1d
+    python scan_index.py import monitoring_session_20250101_120000
+    python scan_index.py stats
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_DB_PATH = "monitor_index.db"
+
+
+def resolve_db_path(db_path: str, session_root=None) -> str:
+    """相對路徑以會話根目錄（monitoring_session_* 所在的資料夾）為基準"""
+    db_path = db_path or DEFAULT_DB_PATH
+    if os.path.isabs(db_path):
+        return db_path
+    return os.path.join(os.path.abspath(session_root or os.getcwd()), db_path)
+
+
+def session_key(folder) -> str:
+    """會話在索引中的鍵：資料夾的絕對路徑（不同根目錄下同名的會話不會互相覆寫）"""
+    return str(Path(folder).resolve())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    scan_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    player TEXT,
+    channel TEXT,
+    is_match INTEGER NOT NULL DEFAULT 0,
+    is_duplicate INTEGER NOT NULL DEFAULT 0,
+    confidence REAL,
+    analysis_method TEXT,
+    error_type TEXT,
+    full_text TEXT,
+    screenshot TEXT,
+    latency_ms REAL,
+    UNIQUE (session, scan_id)
+);
+CREATE INDEX IF NOT EXISTS idx_scans_ts ON scans (ts);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    scan_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    player TEXT,
+    channel TEXT,
+    item TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    confidence REAL,
+    keywords TEXT,
+    screenshot TEXT,
+    UNIQUE (session, scan_id, item)
+);
+CREATE INDEX IF NOT EXISTS idx_matches_item_intent_ts ON matches (item, intent, ts);
+CREATE INDEX IF NOT EXISTS idx_matches_ts ON matches (ts);
+CREATE INDEX IF NOT EXISTS idx_matches_player ON matches (player);
+"""
+
+# 廣播全文索引：trigram 分詞支援中日韓子字串，contentless 表不重複儲存文字。
+# 每行文字結尾加兩個空白，讓位於結尾的1~2字詞也是某個trigram的前綴。
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS broadcast_fts USING fts5(body, tokenize='trigram', content='');
+CREATE VIRTUAL TABLE IF NOT EXISTS broadcast_vocab USING fts5vocab(broadcast_fts, 'row');
+CREATE TRIGGER IF NOT EXISTS scans_fts_insert AFTER INSERT ON scans BEGIN
+    INSERT INTO broadcast_fts (rowid, body) VALUES (new.id, coalesce(new.full_text, '') || '  ');
+END;
+CREATE TRIGGER IF NOT EXISTS scans_fts_update AFTER UPDATE OF full_text ON scans BEGIN
+    INSERT INTO broadcast_fts (broadcast_fts, rowid, body) VALUES ('delete', old.id, coalesce(old.full_text, '') || '  ');
+    INSERT INTO broadcast_fts (rowid, body) VALUES (new.id, coalesce(new.full_text, '') || '  ');
+END;
+CREATE TRIGGER IF NOT EXISTS scans_fts_delete AFTER DELETE ON scans BEGIN
+    INSERT INTO broadcast_fts (broadcast_fts, rowid, body) VALUES ('delete', old.id, coalesce(old.full_text, '') || '  ');
+END;
+"""
+
+# 短詞（少於3字）展開成的trigram數量上限，超過時搜尋結果可能不完整（回報於 truncated）
+MAX_SHORT_TERM_EXPANSION = 5000
+
+
+def infer_intent(item: dict, buying_items: dict = None) -> str:
+    """推斷廣播者的交易意圖：WTB（對方收購，我方賣出）或 WTS（對方出售，我方收購）"""
+    trade_type = item.get("trade_type")
+    if trade_type == "buy":
+        return "WTS"
+    if trade_type == "sell":
+        return "WTB"
+    if buying_items and item.get("item_name") in buying_items:
+        return "WTS"
+    return "WTB"
+
+
+def parse_since(value: str) -> float:
+    """解析 30m / 6h / 2d 或 ISO 日期，返回 epoch 秒"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd])\s*', value or '')
+    if match:
+        seconds = float(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+        return time.time() - seconds
+    return datetime.fromisoformat(value).timestamp()
+
+
+def parse_record_timestamp(timestamp: str) -> float:
+    """解析記錄中的 YYYYMMDD_HHMMSS_mmm 時間戳，失敗時返回目前時間"""
+    for fmt in ("%Y%m%d_%H%M%S_%f", "%Y%m%d_%H%M%S"):
+        try:
+            return datetime.strptime(timestamp, fmt).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return time.time()
+
+
+class ScanIndex:
+    """掃描與匹配索引（執行緒安全，批次寫入）"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, batch_size: int = 50, flush_interval: float = 5.0,
+                 buying_items: dict = None):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buying_items = buying_items or {}
+        self.lock = threading.Lock()
+        self.pending_scans = []
+        self.pending_matches = []
+        self.last_flush_time = time.time()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+        self.fts_enabled = self._setup_fts()
+        self.connection.commit()
+
+    def _migrate(self):
+        """為舊資料庫補上新增的欄位"""
+        columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(scans)")}
+        if "latency_ms" not in columns:
+            self.connection.execute("ALTER TABLE scans ADD COLUMN latency_ms REAL")
+
+    def _setup_fts(self) -> bool:
+        """建立全文索引，SQLite不支援FTS5時返回False（搜尋改用逐行比對）"""
+        existed = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'broadcast_fts'").fetchone() is not None
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            print(f"[WARN] SQLite不支援FTS5 trigram，全文搜尋將使用逐行比對: {e}")
+            return False
+        if not existed:
+            # 舊資料庫補建索引
+            self.connection.execute("INSERT INTO broadcast_fts (rowid, body) "
+                                    "SELECT id, coalesce(full_text, '') || '  ' FROM scans")
+        return True
+
+    def pending_count(self) -> int:
+        """尚未寫入的記錄數"""
+        return len(self.pending_scans) + len(self.pending_matches)
+
+    def add_scan(self, session: str, scan_id: int, result: dict, screenshot: str = None, error_type: str = None,
+                 timestamp: float = None, is_duplicate: bool = False, latency_ms: float = None):
+        """加入一次掃描（重複廣播只記錄掃描，不新增匹配），latency_ms 為擷取到分析完成的耗時"""
+        result = result or {}
+        ts = time.time() if timestamp is None else timestamp
+        is_match = bool(result.get("is_match"))
+        confidence = result.get("confidence")
+        scan_row = (session, scan_id, ts, result.get("player_name"), result.get("channel_number"),
+                    int(is_match), int(is_duplicate), float(confidence) if confidence is not None else None,
+                    result.get("analysis_method"), error_type, result.get("full_text"), screenshot, latency_ms)
+
+        match_rows = []
+        if is_match and not is_duplicate:
+            for item in result.get("matched_items") or []:
+                if not isinstance(item, dict) or not item.get("item_name"):
+                    continue
+                match_rows.append((session, scan_id, ts, result.get("player_name"), result.get("channel_number"),
+                                   item["item_name"], infer_intent(item, self.buying_items), scan_row[7],
+                                   json.dumps(item.get("keywords_found", []), ensure_ascii=False), screenshot))
+
+        with self.lock:
+            # 同一掃描在批次內重送時，只保留最新一次的匹配
+            self.pending_matches = [row for row in self.pending_matches if row[:2] != (session, scan_id)]
+            self.pending_scans.append(scan_row)
+            self.pending_matches.extend(match_rows)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        """達到批次大小或間隔時寫入"""
+        if self.pending_count() >= self.batch_size or time.time() - self.last_flush_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """將暫存記錄寫入資料庫，返回寫入筆數"""
+        with self.lock:
+            scans, self.pending_scans = self.pending_scans, []
+            matches, self.pending_matches = self.pending_matches, []
+            self.last_flush_time = time.time()
+            if not scans and not matches:
+                return 0
+            with self.connection:
+                # 重新匯入或重送同一掃描時更新既有列（保留 id，全文索引由 UPDATE 觸發器同步）
+                self.connection.executemany(
+                    "INSERT INTO scans (session, scan_id, ts, player, channel, is_match, is_duplicate, "
+                    "confidence, analysis_method, error_type, full_text, screenshot, latency_ms) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (session, scan_id) DO UPDATE SET ts = excluded.ts, player = excluded.player, "
+                    "channel = excluded.channel, is_match = excluded.is_match, is_duplicate = excluded.is_duplicate, "
+                    "confidence = excluded.confidence, analysis_method = excluded.analysis_method, "
+                    "error_type = excluded.error_type, full_text = excluded.full_text, "
+                    "screenshot = excluded.screenshot, latency_ms = excluded.latency_ms", scans)
+                # 重新掃描找到的商品可能較少，先刪除該掃描的舊匹配再寫入
+                self.connection.executemany("DELETE FROM matches WHERE session = ? AND scan_id = ?",
+                                            [row[:2] for row in scans])
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO matches (session, scan_id, ts, player, channel, item, intent, "
+                    "confidence, keywords, screenshot) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", matches)
+            return len(scans) + len(matches)
+
+    def query_matches(self, item: str = None, intent: str = None, player: str = None, channel: str = None,
+                      since: float = None, until: float = None, contains: bool = False, limit: int = 1000) -> list:
+        """查詢匹配記錄，按時間倒序"""
+        conditions, params = [], []
+        if item:
+            if contains:
+                conditions.append("item LIKE ?")
+                params.append(f"%{item}%")
+            else:
+                conditions.append("item = ?")
+                params.append(item)
+        if intent:
+            conditions.append("intent = ?")
+            params.append(intent.upper())
+        if player:
+            conditions.append("player = ?")
+            params.append(player)
+        if channel:
+            conditions.append("channel = ?")
+            params.append(channel)
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("ts < ?")
+            params.append(until)
+
+        sql = "SELECT * FROM matches"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def _expand_short_term(self, term: str):
+        """將少於3字的詞展開為以它開頭的trigram，返回 (trigram列表, 是否超過上限而截斷)"""
+        rows = self.connection.execute(
+            "SELECT term FROM broadcast_vocab WHERE term >= ? AND term < ? LIMIT ?",
+            (term, term + "\U0010ffff", MAX_SHORT_TERM_EXPANSION + 1)).fetchall()
+        return [row[0] for row in rows[:MAX_SHORT_TERM_EXPANSION]], len(rows) > MAX_SHORT_TERM_EXPANSION
+
+    def build_match_expression(self, query: str, truncated: list = None):
+        """將搜尋字串轉為FTS5查詢（空白分隔的詞皆須出現），無可能結果時返回None
+
+        truncated: 若提供列表，展開數超過 MAX_SHORT_TERM_EXPANSION 的短詞會加入其中
+        """
+        clauses = []
+        for term in query.lower().split():
+            if len(term) >= 3:
+                clauses.append('"' + term.replace('"', '""') + '"')
+                continue
+            trigrams, was_truncated = self._expand_short_term(term)
+            if was_truncated and truncated is not None:
+                truncated.append(term)
+            if not trigrams:
+                return None
+            clauses.append("(" + " OR ".join('"' + t.replace('"', '""') + '"' for t in trigrams) + ")")
+        return " AND ".join(clauses) if clauses else None
+
+    def search_text(self, query: str, since: float = None, matches_only: bool = False, limit: int = 50,
+                    truncated: list = None) -> list:
+        """搜尋廣播全文（支援中文子字串、價格、玩家名稱），按時間倒序
+
+        truncated: 若提供列表，因展開上限而可能漏掉結果的短詞會加入其中
+        """
+        if not query or not query.strip():
+            return []
+        columns = "s.id, s.session, s.scan_id, s.ts, s.player, s.channel, s.is_match, s.full_text, s.screenshot"
+        filters, filter_params = [], []
+        if since is not None:
+            filters.append("s.ts >= ?")
+            filter_params.append(since)
+        if matches_only:
+            filters.append("s.is_match = 1")
+
+        with self.lock:
+            if self.fts_enabled:
+                expression = self.build_match_expression(query, truncated)
+                if expression is None:
+                    return []
+                sql = (f"SELECT {columns} FROM broadcast_fts f JOIN scans s ON s.id = f.rowid "
+                       f"WHERE broadcast_fts MATCH ?" + "".join(f" AND {c}" for c in filters) +
+                       " ORDER BY f.rowid DESC LIMIT ?")
+                params = [expression] + filter_params + [limit]
+            else:
+                terms = query.lower().split()
+                conditions = ["instr(lower(s.full_text), ?) > 0"] * len(terms) + filters
+                sql = f"SELECT {columns} FROM scans s WHERE " + " AND ".join(conditions) + " ORDER BY s.id DESC LIMIT ?"
+                params = terms + filter_params + [limit]
+            return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def stats(self, since: float = None) -> dict:
+        """返回掃描、匹配與錯誤統計"""
+        where, params = ("WHERE ts >= ?", [since]) if since is not None else ("", [])
+        with self.lock:
+            scan_row = self.connection.execute(
+                f"SELECT COUNT(*), SUM(is_match), SUM(is_duplicate), COUNT(error_type), COUNT(DISTINCT session) "
+                f"FROM scans {where}", params).fetchone()
+            top_items = self.connection.execute(
+                f"SELECT item, intent, COUNT(*) AS n FROM matches {where} GROUP BY item, intent "
+                f"ORDER BY n DESC LIMIT 10", params).fetchall()
+        return {
+            "scans": scan_row[0],
+            "matches": scan_row[1] or 0,
+            "duplicates": scan_row[2] or 0,
+            "errors": scan_row[3],
+            "sessions": scan_row[4],
+            "top_items": [dict(row) for row in top_items]
+        }
+
+    def import_folder(self, folder) -> int:
+        """匯入已保存的會話或整合測試資料夾，返回匯入的掃描數"""
+        from session_replay import load_session_frames
+        folder = Path(folder)
+        count = 0
+        for frame in load_session_frames(folder):
+            result = frame["recorded_result"]
+            if result is None:
+                continue
+            self.add_scan(session_key(folder), frame["frame_id"], result, screenshot=str(frame["screenshot"]),
+                          timestamp=parse_record_timestamp(frame["timestamp"]))
+            count += 1
+        self.flush()
+        return count
+
+    def close(self):
+        """寫入剩餘記錄並關閉資料庫"""
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+
+def format_match_row(row: dict) -> str:
+    """格式化單筆匹配記錄"""
+    ts = datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{ts}  [{row['intent']}] {row['item']}  玩家: {row['player']}  頻道: {row['channel']}  ({os.path.basename(row['session'])} #{row['scan_id']})"
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="查詢掃描與匹配索引")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="索引資料庫路徑")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = subparsers.add_parser("query", help="查詢匹配記錄")
+    query_parser.add_argument("--item", help="商品名稱")
+    query_parser.add_argument("--contains", action="store_true", help="商品名稱部分匹配")
+    query_parser.add_argument("--intent", choices=["WTB", "WTS", "wtb", "wts"], help="交易意圖")
+    query_parser.add_argument("--player", help="玩家名稱")
+    query_parser.add_argument("--channel", help="頻道編號")
+    query_parser.add_argument("--since", help="起始時間，例如 6h、2d 或 2025-01-01T00:00")
+    query_parser.add_argument("--limit", type=int, default=100)
+    query_parser.add_argument("--json", action="store_true", help="以JSON輸出")
+
+    search_parser = subparsers.add_parser("search", help="搜尋廣播全文")
+    search_parser.add_argument("text", help="搜尋字串（空白分隔的詞皆須出現）")
+    search_parser.add_argument("--since", help="起始時間，例如 6h、2d")
+    search_parser.add_argument("--matches-only", action="store_true", help="只搜尋匹配的掃描")
+    search_parser.add_argument("--limit", type=int, default=50)
+    search_parser.add_argument("--json", action="store_true", help="以JSON輸出")
+
+    import_parser = subparsers.add_parser("import", help="匯入已保存的資料夾")
+    import_parser.add_argument("folders", nargs="+")
+
+    stats_parser = subparsers.add_parser("stats", help="顯示統計")
+    stats_parser.add_argument("--since", help="起始時間，例如 24h")
+
+    args = parser.parse_args()
+    index = ScanIndex(args.db)
+    try:
+        if args.command == "query":
+            start = time.perf_counter()
+            rows = index.query_matches(item=args.item, intent=args.intent, player=args.player, channel=args.channel,
+                                       since=parse_since(args.since) if args.since else None,
+                                       contains=args.contains, limit=args.limit)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if args.json:
+                print(json.dumps(rows, ensure_ascii=False, indent=2))
+            else:
+                for row in rows:
+                    print(format_match_row(row))
+                print(f"共 {len(rows)} 筆 ({elapsed_ms:.1f} ms)")
+        elif args.command == "search":
+            start = time.perf_counter()
+            truncated = []
+            rows = index.search_text(args.text, since=parse_since(args.since) if args.since else None,
+                                     matches_only=args.matches_only, limit=args.limit, truncated=truncated)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if args.json:
+                print(json.dumps(rows, ensure_ascii=False, indent=2))
+            else:
+                for row in rows:
+                    ts = datetime.fromtimestamp(row["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+                    print(f"{ts}  {row['player']}  {row['full_text']}  ({os.path.basename(row['session'])} #{row['scan_id']})")
+                print(f"共 {len(rows)} 筆 ({elapsed_ms:.1f} ms)")
+            for term in truncated:
+                print(f"[WARN] 短詞「{term}」符合超過 {MAX_SHORT_TERM_EXPANSION} 個trigram，結果可能不完整，請使用3字以上的詞",
+                      file=sys.stderr)
+        elif args.command == "import":
+            for folder in args.folders:
+                print(f"[OK] {folder}: 匯入 {index.import_folder(folder)} 次掃描")
+        elif args.command == "stats":
+            print(json.dumps(index.stats(parse_since(args.since) if args.since else None), ensure_ascii=False, indent=2))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,5 @@
-import pyautogui
+from startup_profile import startup_profiler, BackgroundAnalyzerLoader
 import time
-import tkinter as tk
-from tkinter import messagebox
 import os
 import json
 import numpy as np
@@ -13,16 +11,46 @@ if 'BUYING_ITEMS' not in globals():
     BUYING_ITEMS = {}
 if 'TRADING_KEYWORDS' not in globals():
     TRADING_KEYWORDS = {}
-from roi_selector import ROISelector
+if 'ADAPTIVE_SCAN_CONFIG' not in globals():
+    ADAPTIVE_SCAN_CONFIG = {"ENABLED": False}
+if 'ALERT_CONFIG' not in globals():
+    ALERT_CONFIG = {}
+if 'DEDUP_CONFIG' not in globals():
+    DEDUP_CONFIG = {"ENABLED": False}
+if 'TIMING_CONFIG' not in globals():
+    TIMING_CONFIG = {"ENABLED": False}
+if 'PROFILER_CONFIG' not in globals():
+    PROFILER_CONFIG = {}
+if 'STORAGE_CONFIG' not in globals():
+    STORAGE_CONFIG = {"ENABLED": False}
+if 'SCAN_INDEX_CONFIG' not in globals():
+    SCAN_INDEX_CONFIG = {"ENABLED": False}
+if 'MEMORY_WATCHDOG_CONFIG' not in globals():
+    MEMORY_WATCHDOG_CONFIG = {"ENABLED": False}
+if 'LAYOUT_CALIBRATION_CONFIG' not in globals():
+    LAYOUT_CALIBRATION_CONFIG = {"ENABLED": False}
+if 'STARTUP_CONFIG' not in globals():
+    STARTUP_CONFIG = {"BACKGROUND_LOAD": False, "WARMUP": False}
+# pyautogui、tkinter 與各分析器模組（easyocr/torch/cv2、google.generativeai）在使用時才載入
 from text_analyzer import AnalysisResult
-from gemini_analyzer import GeminiAnalyzer
-from ocr_analyzer import OCRAnalyzer
-from ocr_rectangle_analyzer import OCRRectangleAnalyzer
 from real_time_merger import RealTimeMerger, log_test_result
+from adaptive_scheduler import AdaptiveScanScheduler
+from alert_dispatcher import AlertDispatcher
+from broadcast_dedup import BroadcastDeduplicator
+from pipeline_timing import pipeline_timer
+from runtime_metrics import runtime_metrics
+from sampling_profiler import profiler_controller
+from session_storage import SessionStorage
+from scan_index import ScanIndex, resolve_db_path, session_key
+from session_stats import (columns_from_records, compute_session_stats, format_stats_summary,
+                           load_index_columns, publish_stats_metrics)
+from layout_calibrator import LayoutCalibrator
+from memory_watchdog import MemoryWatchdog, estimate_size, release_framework_caches
 from html_template_with_real_config import get_enhanced_html_template, get_current_config
 import webbrowser
 import threading
 from config_api import start_config_api_server
+startup_profiler.mark("modules_loaded")
 
 def convert_to_json_serializable(obj):
     """將物件轉換為JSON可序列化的格式"""
@@ -54,6 +82,30 @@ class ScreenMonitor:
         self.monitoring_session_folder = None
         self.html_opened = False
         self.api_server_thread = None
+        self.scan_scheduler = AdaptiveScanScheduler(SCAN_INTERVAL, ADAPTIVE_SCAN_CONFIG)
+        self.layout_calibrator = None
+        if LAYOUT_CALIBRATION_CONFIG.get("ENABLED", False):
+            self.layout_calibrator = LayoutCalibrator.from_config(LAYOUT_CALIBRATION_CONFIG)
+        pipeline_timer.configure(
+            enabled=TIMING_CONFIG.get("ENABLED", True),
+            window_size=TIMING_CONFIG.get("WINDOW_SIZE", 1000),
+            metrics_interval=TIMING_CONFIG.get("METRICS_INTERVAL", 60)
+        )
+        self.deduplicator = None
+        if DEDUP_CONFIG.get("ENABLED", True):
+            self.deduplicator = BroadcastDeduplicator(
+                window_seconds=DEDUP_CONFIG.get("WINDOW_SECONDS", 600),
+                max_hamming_distance=DEDUP_CONFIG.get("MAX_HAMMING_DISTANCE", 6)
+            )
+        self.alert_dispatcher = None
+        if self.show_alerts:
+            self.alert_dispatcher = AlertDispatcher(
+                backend_name=ALERT_CONFIG.get("BACKEND", "tk"),
+                coalesce_window=ALERT_CONFIG.get("COALESCE_WINDOW", 60),
+                max_queue_size=ALERT_CONFIG.get("MAX_QUEUE_SIZE", 100)
+            )
+            self.alert_dispatcher.start()
+            runtime_metrics.register_gauge("writer_backlog", self.alert_dispatcher.alert_queue.qsize, writer="alert")
         
         # 始終創建會話資料夾和實時合併器（為了支援HTML報告生成）
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -65,6 +117,19 @@ class ScreenMonitor:
         # 初始化實時合併器
         self.real_time_merger = RealTimeMerger(self.monitoring_session_folder)
         
+        # 分段儲存（截圖與JSON寫入 segment_XXXX/，舊分段自動清理）
+        self.session_storage = None
+        if STORAGE_CONFIG.get("ENABLED", False):
+            self.session_storage = SessionStorage(
+                self.monitoring_session_folder,
+                max_files=STORAGE_CONFIG.get("SEGMENT_MAX_FILES", 500),
+                max_mb=STORAGE_CONFIG.get("SEGMENT_MAX_MB", 200),
+                max_hours=STORAGE_CONFIG.get("SEGMENT_MAX_HOURS", 1),
+                non_match_keep_every=STORAGE_CONFIG.get("NON_MATCH_KEEP_EVERY", 10),
+                compress=STORAGE_CONFIG.get("COMPRESS_CLOSED_SEGMENTS", True),
+                disk_budget_mb=STORAGE_CONFIG.get("DISK_BUDGET_MB")
+            )
+        
         print(f"監控會話資料夾: {self.monitoring_session_folder}")
         if self.save_screenshots:
             print(f"檔案保存: 所有截圖和JSON將被保存（完整debug模式）")
@@ -72,12 +137,67 @@ class ScreenMonitor:
             print(f"檔案保存: 僅在匹配成功時保存截圖和JSON（精簡模式）")
         print(f"HTML合併報告將自動生成{'並開啟' if self.auto_open_html else ''}")
         
+        # 跨會話的掃描與匹配索引
+        self.scan_index = None
+        self.last_stats_time = time.time()
+        if SCAN_INDEX_CONFIG.get("ENABLED", False):
+            try:
+                session_root = os.path.dirname(os.path.abspath(self.monitoring_session_folder))
+                self.scan_index = ScanIndex(resolve_db_path(SCAN_INDEX_CONFIG.get("DB_PATH"), session_root),
+                                            batch_size=SCAN_INDEX_CONFIG.get("BATCH_SIZE", 50),
+                                            flush_interval=SCAN_INDEX_CONFIG.get("FLUSH_INTERVAL", 5),
+                                            buying_items=BUYING_ITEMS)
+                runtime_metrics.register_gauge("writer_backlog", self.scan_index.pending_count, writer="scan_index")
+            except Exception as e:
+                print(f"[WARN] 無法開啟掃描索引: {e}")
+        
+        self.memory_watchdog = None
+        if MEMORY_WATCHDOG_CONFIG.get("ENABLED", True):
+            self.setup_memory_watchdog()
+        
         # 啟動配置API服務器
         self.start_config_api_server()
         
         # 創建初始HTML文件
         self.create_initial_html()
         
+    def setup_memory_watchdog(self):
+        """建立記憶體監看並註冊要統計的結構與釋放動作"""
+        keep_recent = MEMORY_WATCHDOG_CONFIG.get("KEEP_RECENT_RECORDS", 50)
+        self.memory_watchdog = MemoryWatchdog(
+            session_folder=self.monitoring_session_folder,
+            soft_limit_mb=MEMORY_WATCHDOG_CONFIG.get("SOFT_LIMIT_MB", 1024),
+            hard_limit_mb=MEMORY_WATCHDOG_CONFIG.get("HARD_LIMIT_MB", 2048),
+            sample_interval=MEMORY_WATCHDOG_CONFIG.get("SAMPLE_INTERVAL", 60),
+            use_tracemalloc=MEMORY_WATCHDOG_CONFIG.get("TRACEMALLOC", False),
+            tracemalloc_on_limit=MEMORY_WATCHDOG_CONFIG.get("TRACEMALLOC_ON_LIMIT", True),
+            tracemalloc_frames=MEMORY_WATCHDOG_CONFIG.get("TRACEMALLOC_FRAMES", 1),
+            top_allocators=MEMORY_WATCHDOG_CONFIG.get("TOP_ALLOCATORS", 10)
+        )
+        merger = self.real_time_merger
+        self.memory_watchdog.register_structure("merger_records", lambda: len(merger.merged_results))
+        self.memory_watchdog.register_structure("merger_records_bytes", lambda: estimate_size(merger.merged_results))
+        self.memory_watchdog.register_structure("merger_spilled_records", lambda: merger.spilled_count)
+        if self.deduplicator:
+            self.memory_watchdog.register_structure("dedup_entries", lambda: len(self.deduplicator))
+            self.memory_watchdog.register_action("soft", "dedup_prune", lambda: self.deduplicator.prune())
+            self.memory_watchdog.register_action("hard", "dedup_clear", self.deduplicator.clear)
+        if self.alert_dispatcher:
+            self.memory_watchdog.register_structure("alert_queue", self.alert_dispatcher.alert_queue.qsize)
+        # 分段儲存的保留策略會刪除/壓縮未匹配截圖，這些記錄需保留base64
+        matches_only = self.session_storage is not None
+        self.memory_watchdog.register_action("soft", "release_images",
+                                             lambda: merger.release_images(keep_recent, matches_only))
+        self.memory_watchdog.register_action("hard", "spill_records", lambda: merger.spill_records(keep_recent))
+        self.memory_watchdog.register_action("hard", "release_framework_caches", release_framework_caches)
+        self.memory_watchdog.start()
+    
+    def storage_path(self, filename):
+        """返回掃描檔案的保存路徑（啟用分段儲存時位於目前分段）"""
+        if self.session_storage:
+            return self.session_storage.path_for(filename)
+        return os.path.join(self.monitoring_session_folder, filename)
+    
     def start_config_api_server(self):
         """啟動配置API服務器"""
         try:
@@ -140,6 +260,7 @@ class ScreenMonitor:
             print(f"[WARN] 開啟瀏覽器失敗 - {e}")
         
     def capture_roi(self):
+        import pyautogui
         try:
             # 截取ROI區域
             roi_screenshot = pyautogui.screenshot(
@@ -157,15 +278,21 @@ class ScreenMonitor:
             return None
     
     def analyze_with_strategy(self, image):
-        """使用策略模式進行分析"""
+        """使用策略模式進行分析（版面校正完成後只分析文字帶）"""
         try:
+            cropped = False
+            if self.layout_calibrator:
+                image, cropped = self.layout_calibrator.prepare(image)
+            start = time.perf_counter()
             result, raw_response = self.analyzer.analyze(image)
+            if self.layout_calibrator:
+                self.layout_calibrator.record_analysis((time.perf_counter() - start) * 1000, cropped)
             return result, raw_response
         except Exception as e:
             error_result = AnalysisResult(
                 full_text=f"分析錯誤: {str(e)}",
                 is_match=False,
-                analysis_method=self.analyzer.__class__.__name__
+                analysis_method=self.analyzer.analyzer_name
             )
             return error_result, f"ERROR: {str(e)}"
     
@@ -216,18 +343,19 @@ class ScreenMonitor:
             result_path = None
             if should_save_json:
                 # 保存結構化結果
-                result_path = os.path.join(self.monitoring_session_folder, f"analysis_{timestamp}.json")
-                analysis_data = {
-                    "monitoring_id": self.monitoring_counter,
-                    "timestamp": timestamp,
-                    "analysis_method": result.analysis_method,
-                    "result": convert_to_json_serializable(result.to_dict()),
-                    "raw_response": convert_to_json_serializable(raw_response),
-                    "screenshot_path": screenshot_path
-                }
-                
-                with open(result_path, 'w', encoding='utf-8') as f:
-                    json.dump(analysis_data, f, ensure_ascii=False, indent=2)
+                with pipeline_timer.span("persist"):
+                    result_path = self.storage_path(f"analysis_{timestamp}.json")
+                    analysis_data = {
+                        "monitoring_id": self.monitoring_counter,
+                        "timestamp": timestamp,
+                        "analysis_method": result.analysis_method,
+                        "result": convert_to_json_serializable(result.to_dict()),
+                        "raw_response": convert_to_json_serializable(raw_response),
+                        "screenshot_path": screenshot_path
+                    }
+                    
+                    with open(result_path, 'w', encoding='utf-8') as f:
+                        json.dump(analysis_data, f, ensure_ascii=False, indent=2)
             
             # 記錄到實時合併器（用於HTML報告生成）
             result_dict = result.to_dict() if hasattr(result, 'to_dict') else result
@@ -241,7 +369,12 @@ class ScreenMonitor:
                 }
                 result_dict = None
             
-            log_test_result(self.real_time_merger, self.monitoring_counter, screenshot_path, result_dict, error_info)
+            with pipeline_timer.span("report"):
+                log_test_result(self.real_time_merger, self.monitoring_counter, screenshot_path, result_dict, error_info)
+            
+            # 登記本次掃描的檔案，供分段保留策略使用
+            if self.session_storage:
+                self.session_storage.commit_scan([screenshot_path, result_path], result.is_match)
             
             # 生成狀態提示
             match_status = "匹配成功" if result.is_match else "未匹配"
@@ -253,12 +386,23 @@ class ScreenMonitor:
             else:
                 print(f"[SCAN] 分析 #{self.monitoring_counter}: {match_status} ({save_status}, {json_status})")
     
-    def show_alert(self, message):
-        if self.show_alerts:
-            root = tk.Tk()
-            root.withdraw()  
-            messagebox.showinfo("匹配提醒", f"找到符合條件的內容！\n\n{message}")
-            root.destroy()
+    def record_analysis_metrics(self, raw_response):
+        """依分析器的錯誤分類更新錯誤計數與Gemini配額狀態，返回錯誤類型"""
+        is_error = isinstance(raw_response, str) and raw_response.startswith("ERROR")
+        error_type = self.analyzer.get_error_type(raw_response) if is_error else None
+        if error_type:
+            runtime_metrics.inc("errors_total", error_type=error_type)
+        if getattr(self.analyzer, "strategy_type", None) == "GEMINI":
+            runtime_metrics.set_gauge("gemini_quota_exceeded", 1 if error_type == "API_QUOTA_EXCEEDED" else 0)
+        return error_type
+    
+    def show_alert(self, message, result=None):
+        """提交匹配提醒到背景分派器（不阻塞掃描迴圈）"""
+        if self.show_alerts and self.alert_dispatcher:
+            with pipeline_timer.span("alert"):
+                submitted = self.alert_dispatcher.submit(f"找到符合條件的內容！\n\n{message}", result)
+            if not submitted:
+                print("[WARN] 提醒佇列已滿，略過本次提醒")
         else:
             print("提示窗已關閉，跳過彈窗顯示")
     
@@ -266,84 +410,174 @@ class ScreenMonitor:
         """開始監控"""
         self.running = True
         print("開始監控螢幕...")
-        print(f"分析方法: {self.analyzer.__class__.__name__}")
+        print(f"分析方法: {self.analyzer.analyzer_name}")
         print(f"ROI區域: x={self.roi_coordinates['x']}, y={self.roi_coordinates['y']}, "
               f"寬度={self.roi_coordinates['width']}, 高度={self.roi_coordinates['height']}")
         print(f"截圖保存: {'開啟' if self.save_screenshots else '關閉'}")
         print(f"提示窗顯示: {'開啟' if self.show_alerts else '關閉'}")
+        if self.scan_scheduler.enabled:
+            print(f"掃描間隔: 自適應 ({self.scan_scheduler.min_interval}s ~ {self.scan_scheduler.max_interval}s)")
+        else:
+            print(f"掃描間隔: 固定 {SCAN_INTERVAL}s")
         print("按 Ctrl+C 停止監控")
         
+        # 綁定取樣分析器到掃描執行緒，可由配置API或訊號觸發
+        profiler_controller.attach(threading.get_ident(), self.monitoring_session_folder,
+                                   PROFILER_CONFIG.get("SAMPLE_INTERVAL"), PROFILER_CONFIG.get("DEFAULT_DURATION"),
+                                   PROFILER_CONFIG.get("INCLUDE_LINES", False))
+        if PROFILER_CONFIG.get("SIGNAL_ENABLED", True) and profiler_controller.install_signal_handler():
+            print(f"取樣分析: kill -USR1 {os.getpid()} 或 POST /api/profile")
+        
         # 自動開啟HTML報告
         if self.auto_open_html:
             self.open_html_in_browser()
         
         try:
             while self.running:
-                roi_image = self.capture_roi()
+                scan_start_time = time.time()
+                scan_interval = self.scan_scheduler.current_interval if self.scan_scheduler.enabled else SCAN_INTERVAL
+                with pipeline_timer.span("capture"):
+                    roi_image = self.capture_roi()
                 if roi_image:
                     self.monitoring_counter += 1
+                    runtime_metrics.inc("scans_total")
                     
                     # 保存截圖
                     screenshot_path = None
                     if self.save_screenshots:
                         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-                        screenshot_path = os.path.join(self.monitoring_session_folder, f"monitor_{self.monitoring_counter:03d}_{timestamp}.png")
-                        roi_image.save(screenshot_path)
+                        screenshot_path = self.storage_path(f"monitor_{self.monitoring_counter:03d}_{timestamp}.png")
+                        with pipeline_timer.span("persist"):
+                            roi_image.save(screenshot_path)
                     
                     result, raw_response = self.analyze_with_strategy(roi_image)
+                    error_type = self.record_analysis_metrics(raw_response)
+                    if self.monitoring_counter == 1:
+                        self.report_startup()
                     
-                    # 檢查是否匹配成功，如果未保存截圖但匹配成功，強制保存
-                    should_save_screenshot = self.save_screenshots or result.is_match
+                    # 重複廣播只更新既有記錄的次數，不再產生新的截圖、JSON和提醒
+                    duplicate_entry = None
+                    if result.is_match and self.deduplicator:
+                        duplicate_entry = self.deduplicator.check(result, self.monitoring_counter)
                     
-                    # 如果需要保存但還未保存，現在保存
-                    if should_save_screenshot and not screenshot_path:
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-                        screenshot_path = os.path.join(self.monitoring_session_folder, f"monitor_{self.monitoring_counter:03d}_{timestamp}.png")
-                        roi_image.save(screenshot_path)
+                    if duplicate_entry:
+                        runtime_metrics.inc("cache_hits_total", cache="dedup")
+                        self.real_time_merger.update_duplicate(duplicate_entry['test_id'], duplicate_entry['count'],
+                                                               duplicate_entry['last_seen'])
+                        if self.session_storage and screenshot_path:
+                            self.session_storage.commit_scan([screenshot_path], False)
+                        print(f"[#{self.monitoring_counter}] [DUP] 重複廣播 (玩家: {result.player_name}, "
+                              f"同分析 #{duplicate_entry['test_id']}, 第 {duplicate_entry['count']} 次)")
+                    else:
+                        # 檢查是否匹配成功，如果未保存截圖但匹配成功，強制保存
+                        should_save_screenshot = self.save_screenshots or result.is_match
+                        
+                        # 如果需要保存但還未保存，現在保存
+                        if should_save_screenshot and not screenshot_path:
+                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+                            screenshot_path = self.storage_path(f"monitor_{self.monitoring_counter:03d}_{timestamp}.png")
+                            with pipeline_timer.span("persist"):
+                                roi_image.save(screenshot_path)
+                        
+                        # 保存分析結果（始終保存以支援HTML報告）
+                        self.save_analysis_result(result, raw_response, screenshot_path, should_save_screenshot)
+                        
+                        # 格式化顯示資訊
+                        match_details = self.format_match_info(result)
+                        
+                        if result.is_match:
+                            print(f"[#{self.monitoring_counter}] [MATCH] 找到匹配！")
+                            runtime_metrics.inc("matches_total")
+                            print(f"玩家: {result.player_name}, 物品: {', '.join([item['item_name'] for item in result.matched_items])}")
+                            self.show_alert(match_details, result)
+                        else:
+                            print(f"[#{self.monitoring_counter}] [SCAN] 未找到匹配 (方法: {result.analysis_method}, 信心度: {result.confidence:.2f})")
                     
-                    # 保存分析結果（始終保存以支援HTML報告）
-                    self.save_analysis_result(result, raw_response, screenshot_path, should_save_screenshot)
+                    if self.scan_index:
+                        self.scan_index.add_scan(session_key(self.monitoring_session_folder), self.monitoring_counter,
+                                                 convert_to_json_serializable(result.to_dict()), screenshot_path,
+                                                 error_type, is_duplicate=duplicate_entry is not None,
+                                                 latency_ms=(time.time() - scan_start_time) * 1000)
                     
-                    # 格式化顯示資訊
-                    match_details = self.format_match_info(result)
+                    # 根據畫面變化與新文字調整下一次掃描間隔
+                    scan_interval = self.scan_scheduler.next_interval(roi_image, result, time.time() - scan_start_time)
+                    runtime_metrics.set_gauge("scan_interval_seconds", scan_interval)
+                    if self.scan_scheduler.enabled:
+                        print(self.scan_scheduler.describe())
                     
-                    if result.is_match:
-                        print(f"[#{self.monitoring_counter}] [MATCH] 找到匹配！")
-                        print(f"玩家: {result.player_name}, 物品: {', '.join([item['item_name'] for item in result.matched_items])}")
-                        self.show_alert(match_details)
-                    else:
-                        print(f"[#{self.monitoring_counter}] [SCAN] 未找到匹配 (方法: {result.analysis_method}, 信心度: {result.confidence:.2f})")
+                    # 定期將各階段耗時寫入會話資料夾
+                    pipeline_timer.maybe_write_metrics(self.monitoring_session_folder,
+                                                       {"scans": self.monitoring_counter, "scan_interval_s": scan_interval})
+                    
+                    # 定期記錄記憶體用量，超過上限時釋放資源
+                    if self.memory_watchdog:
+                        memory_sample = self.memory_watchdog.maybe_sample()
+                        if memory_sample and memory_sample["rss_mb"] is not None:
+                            runtime_metrics.set_gauge("memory_rss_bytes", int(memory_sample["rss_mb"] * 1024 * 1024))
+                    
+                    # 定期更新 /metrics 的會話匹配率與延遲
+                    if time.time() - self.last_stats_time >= SCAN_INDEX_CONFIG.get("STATS_INTERVAL", 60):
+                        publish_stats_metrics(self.compute_session_stats())
                 
-                time.sleep(SCAN_INTERVAL)
+                time.sleep(scan_interval)
                 
         except KeyboardInterrupt:
             print(f"\n監控已停止 (共執行 {self.monitoring_counter} 次分析)")
+            profiler_controller.stop()
             self.finalize_session()
+            if self.memory_watchdog:
+                self.memory_watchdog.stop()
             self.running = False
+            if self.alert_dispatcher:
+                self.alert_dispatcher.stop()
+    
+    def report_startup(self):
+        """第一次掃描完成後輸出啟動耗時（模組載入、分析器就緒、預熱、首次掃描）"""
+        startup_profiler.mark("first_scan")
+        print(startup_profiler.format_report())
+        if STARTUP_CONFIG.get("SAVE_REPORT", True) and self.monitoring_session_folder:
+            startup_profiler.save(self.monitoring_session_folder)
+    
+    def compute_session_stats(self):
+        """計算本次會話的統計（優先使用掃描索引，否則使用合併器記錄）"""
+        self.last_stats_time = time.time()
+        if self.scan_index:
+            self.scan_index.flush()
+            scans, matches = load_index_columns(self.scan_index, session=session_key(self.monitoring_session_folder))
+        else:
+            scans, matches = columns_from_records(self.real_time_merger.all_results() if self.real_time_merger else [])
+        return compute_session_stats(scans, matches)
     
     def finalize_session(self):
         """結束會話並生成報告"""
+        if self.session_storage:
+            self.session_storage.close()
+            print(self.session_storage.describe())
+        if self.scan_index:
+            self.scan_index.flush()
         if self.real_time_merger:
+            stats = self.compute_session_stats()
+            publish_stats_metrics(stats)
             print("\n正在生成HTML合併報告...")
             
             # 生成完整的HTML報告（不限制條目數量）
-            html_path = self.generate_complete_html_report()
+            html_path = self.generate_complete_html_report(stats)
             
             if html_path:
-                # 顯示統計信息
-                total_results = len(self.real_time_merger.merged_results)
-                matches = sum(1 for r in self.real_time_merger.merged_results 
-                            if r.get('has_match', False))
-                
                 print(f"\n{'='*50}")
                 print(f"監控會話完成報告")
                 print(f"{'='*50}")
                 print(f"會話資料夾: {self.monitoring_session_folder}")
-                print(f"總分析次數: {total_results}")
-                print(f"找到匹配: {matches} 次")
-                print(f"匹配率: {matches/total_results*100:.1f}%" if total_results > 0 else "匹配率: 0%")
-                print(f"分析方法: {self.analyzer.__class__.__name__}")
+                print(format_stats_summary(stats))
+                print(f"分析方法: {self.analyzer.analyzer_name}")
+                if self.layout_calibrator:
+                    print(self.layout_calibrator.describe())
                 print(f"HTML報告: {html_path}")
+                if pipeline_timer.enabled:
+                    pipeline_timer.maybe_write_metrics(self.monitoring_session_folder,
+                                                       {"scans": self.monitoring_counter}, force=True)
+                    print("各階段耗時:")
+                    print(pipeline_timer.format_summary())
                 print(f"{'='*50}")
                 
                 # 自動開啟HTML報告
@@ -356,14 +590,14 @@ class ScreenMonitor:
             else:
                 print("生成HTML報告失敗")
     
-    def generate_complete_html_report(self):
+    def generate_complete_html_report(self, stats=None):
         """生成完整的HTML報告，顯示所有結果"""
         if not self.real_time_merger:
             return None
             
         try:
             # 使用自定義HTML生成，不限制條目數量
-            html_content = self.create_unlimited_html_report()
+            html_content = self.create_unlimited_html_report(stats)
             
             html_path = os.path.join(self.monitoring_session_folder, "complete_monitoring_report.html")
             with open(html_path, 'w', encoding='utf-8') as f:
@@ -374,16 +608,17 @@ class ScreenMonitor:
             print(f"生成HTML報告錯誤: {e}")
             return None
     
-    def create_unlimited_html_report(self):
+    def create_unlimited_html_report(self, stats=None):
         """創建不限制條目數量的HTML報告"""
         import base64
         
-        total_results = len(self.real_time_merger.merged_results)
-        matches = sum(1 for r in self.real_time_merger.merged_results 
-                     if r.get('has_match', False))
+        # 包含記憶體不足時寫到磁碟的記錄
+        all_results = self.real_time_merger.all_results()
+        total_results = len(all_results)
+        stats = stats or compute_session_stats(*columns_from_records(all_results))
         
         # 按test_id排序
-        sorted_results = sorted(self.real_time_merger.merged_results, 
+        sorted_results = sorted(all_results, 
                               key=lambda x: x.get('test_id', 0))
         
         html_content = f"""<!DOCTYPE html>
@@ -562,19 +797,19 @@ class ScreenMonitor:
     
     <div class="stats">
         <div class="stat-card">
-            <div class="stat-number">{total_results}</div>
+            <div class="stat-number">{stats['analyzed']}</div>
             <div>總分析次數</div>
         </div>
         <div class="stat-card">
-            <div class="stat-number">{matches}</div>
+            <div class="stat-number">{stats['matches']}</div>
             <div>找到匹配</div>
         </div>
         <div class="stat-card">
-            <div class="stat-number">{matches/total_results*100:.1f}%</div>
+            <div class="stat-number">{stats['match_rate']:.1f}%</div>
             <div>匹配率</div>
         </div>
         <div class="stat-card">
-            <div class="stat-number">{self.analyzer.__class__.__name__}</div>
+            <div class="stat-number">{self.analyzer.analyzer_name}</div>
             <div>分析方法</div>
         </div>
     </div>
@@ -734,22 +969,38 @@ class ScreenMonitor:
     def stop_monitoring(self):
         """停止監控"""
         self.running = False
+        profiler_controller.stop()
+        if self.alert_dispatcher:
+            self.alert_dispatcher.stop()
         if self.save_screenshots:
             self.finalize_session()
+        if self.memory_watchdog:
+            self.memory_watchdog.stop()
 
 def get_analyzer_choice():
     """自動使用OCR_Rectangle分析器"""
     print("\n使用 OCR_Rectangle 分析引擎 (白框檢測視覺分割)")
     return "ocr_rectangle"
 
-def create_analyzer(analyzer_type: str):
-    """創建分析器實例"""
+def create_analyzer(analyzer_type: str, use_daemon: bool = True):
+    """創建分析器實例（常駐分析服務執行中時直接使用服務中已載入的模型）"""
+    # 調試圖像由分析器在本機寫出，開啟白框調試時不使用服務
+    if analyzer_type == "ocr_rectangle" and globals().get("OCR_DEBUG_CONFIG", {}).get("ENABLE_RECTANGLE_DEBUG"):
+        use_daemon = False
+    if use_daemon:
+        from analyzer_daemon import connect_analyzer
+        remote_analyzer = connect_analyzer(analyzer_type, SELLING_ITEMS, BUYING_ITEMS,
+                                           fallback_factory=lambda: create_analyzer(analyzer_type, use_daemon=False))
+        if remote_analyzer is not None:
+            return remote_analyzer
+    
     if analyzer_type == "ocr_rectangle":
         try:
             # 從config.py讀取調試設定
             from config import OCR_DEBUG_CONFIG
             save_debug = OCR_DEBUG_CONFIG.get("ENABLE_RECTANGLE_DEBUG", False)
             debug_dir = OCR_DEBUG_CONFIG.get("DEBUG_OUTPUT_DIR", "rectangle_debug")
+            OCRRectangleAnalyzer = startup_profiler.timed_import("ocr_rectangle_analyzer").OCRRectangleAnalyzer
             return OCRRectangleAnalyzer(SELLING_ITEMS, BUYING_ITEMS, save_debug_images=save_debug, debug_folder=debug_dir)
         except ImportError as e:
             print(f"❌ OCR_Rectangle依賴缺失: {e}")
@@ -767,6 +1018,7 @@ def create_analyzer(analyzer_type: str):
             print("錯誤：請先在 config.py 中設置您的 Gemini API Key")
             return None
         try:
+            GeminiAnalyzer = startup_profiler.timed_import("gemini_analyzer").GeminiAnalyzer
             return GeminiAnalyzer(GEMINI_API_KEY, SELLING_ITEMS, BUYING_ITEMS)
         except Exception as e:
             print(f"Gemini分析器初始化失敗: {e}")
@@ -774,6 +1026,7 @@ def create_analyzer(analyzer_type: str):
     
     elif analyzer_type == "ocr":
         try:
+            OCRAnalyzer = startup_profiler.timed_import("ocr_analyzer").OCRAnalyzer
             return OCRAnalyzer(SELLING_ITEMS, BUYING_ITEMS)
         except ImportError as e:
             print(f"❌ OCR依賴缺失: {e}")
@@ -788,13 +1041,14 @@ def create_analyzer(analyzer_type: str):
     
     return None
 
-def get_user_settings():
+def get_user_settings(analyzer_type: str = None):
     """獲取使用者設定"""
     print("螢幕監控程式 - 初始設定")
     print("=" * 40)
     
     # 選擇分析方法
-    analyzer_type = get_analyzer_choice()
+    if analyzer_type is None:
+        analyzer_type = get_analyzer_choice()
     
     # 詢問是否保存截圖
     while True:
@@ -828,8 +1082,10 @@ def get_user_settings():
     print("即將顯示全螢幕截圖，請用滑鼠拖拉選擇監控區域")
     input("按Enter開始選擇ROI...")
     
+    ROISelector = startup_profiler.timed_import("roi_selector").ROISelector
     selector = ROISelector()
     roi_coordinates = selector.select_roi()
+    startup_profiler.mark("roi_selected")
     
     if roi_coordinates is None:
         print("未選擇ROI區域，程式結束")
@@ -845,13 +1101,20 @@ def get_user_settings():
 
 def main():
     """主程式"""
+    analyzer_type = get_analyzer_choice()
+    
+    # 使用者回答設定與選取ROI的同時，在背景載入分析器並預熱模型
+    loader = BackgroundAnalyzerLoader(lambda: create_analyzer(analyzer_type), warmup=STARTUP_CONFIG.get("WARMUP", True))
+    if STARTUP_CONFIG.get("BACKGROUND_LOAD", True):
+        loader.start()
+    
     # 獲取使用者設定
-    roi_coordinates, analyzer_type, save_screenshots, show_alerts, auto_open_html = get_user_settings()
+    roi_coordinates, analyzer_type, save_screenshots, show_alerts, auto_open_html = get_user_settings(analyzer_type)
     if roi_coordinates is None:
         return
     
-    # 創建分析器
-    analyzer = create_analyzer(analyzer_type)
+    # 創建分析器（背景載入未啟用時在此建立）
+    analyzer = loader.result()
     if analyzer is None:
         return
     
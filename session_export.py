@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""會話歷史的欄式匯出 - 供離線分析市場活動
+
+將 monitoring_session_* / integration_test_* 資料夾中的分析結果轉為欄式格式，
+每個匹配商品一列（未匹配的掃描 item 為空）。玩家、頻道、商品等欄位使用字典編碼，
+字典只會追加，因此各分段檔案的編碼一致，可增量追加新會話。
+
+格式（auto 時依序選擇）:
+    parquet - 需要 pyarrow，欄位以 dictionary 型別寫入
+    arrow   - 需要 pyarrow，Arrow IPC 檔案，可零複製記憶體映射
+    numpy   - NumPy 結構化陣列 (.npy)，以 np.load(mmap_mode='r') 讀取
+
+用法:
+    python session_export.py monitoring_session_* --output market_history
+    python session_export.py --output market_history --summary
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+from scan_index import infer_intent, parse_record_timestamp
+
+MANIFEST_NAME = "manifest.json"
+DICTIONARY_COLUMNS = ["session", "player", "channel", "item", "intent"]
+ROW_DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("scan_id", "<i4"),
+    ("session", "<i4"),
+    ("player", "<i4"),
+    ("channel", "<i4"),
+    ("item", "<i4"),
+    ("intent", "<i4"),
+    ("is_match", "?"),
+    ("confidence", "<f4"),
+])
+PART_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "numpy": ".npy"}
+
+
+def choose_format(requested: str = "auto") -> str:
+    """依可用套件選擇輸出格式"""
+    if requested == "auto":
+        if PARQUET_AVAILABLE:
+            return "parquet"
+        return "arrow" if PYARROW_AVAILABLE else "numpy"
+    if requested in ("parquet", "arrow") and not PYARROW_AVAILABLE:
+        raise ImportError(f"{requested} 格式需要安裝 pyarrow")
+    if requested == "parquet" and not PARQUET_AVAILABLE:
+        raise ImportError("parquet 格式需要 pyarrow.parquet")
+    return requested
+
+
+def session_rows(folder, buying_items: dict = None) -> list:
+    """讀取資料夾內的分析結果，返回展開後的列（每個匹配商品一列）"""
+    from session_replay import load_session_frames
+    folder = Path(folder)
+    rows = []
+    for frame in load_session_frames(folder):
+        result = frame["recorded_result"]
+        if not result:
+            continue
+        base = {
+            "ts": parse_record_timestamp(frame["timestamp"]),
+            "scan_id": int(frame["frame_id"] or 0),
+            "session": folder.name,
+            "player": result.get("player_name") or None,
+            "channel": result.get("channel_number") or None,
+            "is_match": bool(result.get("is_match")),
+            "confidence": float(result.get("confidence") or 0.0),
+        }
+        items = [item for item in result.get("matched_items") or [] if isinstance(item, dict)]
+        if base["is_match"] and items:
+            for item in items:
+                rows.append(dict(base, item=item.get("item_name"), intent=infer_intent(item, buying_items)))
+        else:
+            rows.append(dict(base, item=None, intent=None))
+    return rows
+
+
+class ColumnarExporter:
+    """增量寫入欄式匯出資料夾"""
+
+    def __init__(self, export_dir, fmt: str = "auto"):
+        self.export_dir = Path(export_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.export_dir / MANIFEST_NAME
+        if self.manifest_path.exists():
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            # 既有匯出沿用原本的格式
+            choose_format(self.manifest["format"])
+        else:
+            self.manifest = {
+                "format": choose_format(fmt),
+                "sessions": [],
+                "parts": [],
+                "row_count": 0,
+                "dictionaries": {column: [] for column in DICTIONARY_COLUMNS}
+            }
+        self.format = self.manifest["format"]
+        self.lookup = {column: {value: code for code, value in enumerate(values)}
+                       for column, values in self.manifest["dictionaries"].items()}
+
+    def encode(self, column: str, value) -> int:
+        """返回值的字典編碼（空值為-1），新值追加到字典尾端"""
+        if value is None:
+            return -1
+        lookup = self.lookup[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(lookup)
+            self.manifest["dictionaries"][column].append(value)
+        return code
+
+    def encode_rows(self, rows: list) -> np.ndarray:
+        """將列轉為字典編碼後的結構化陣列"""
+        array = np.empty(len(rows), dtype=ROW_DTYPE)
+        for i, row in enumerate(rows):
+            array[i] = (row["ts"], row["scan_id"],
+                        *(self.encode(column, row[column]) for column in DICTIONARY_COLUMNS),
+                        row["is_match"], row["confidence"])
+        return array
+
+    def to_arrow_table(self, array: np.ndarray):
+        """結構化陣列轉為Arrow表（字典欄位使用完整的共用字典）"""
+        columns = {}
+        for name in ROW_DTYPE.names:
+            values = array[name]
+            if name in DICTIONARY_COLUMNS:
+                dictionary = pa.array(self.manifest["dictionaries"][name], type=pa.string())
+                indices = pa.array(values, type=pa.int32(), mask=values < 0)
+                columns[name] = pa.DictionaryArray.from_arrays(indices, dictionary)
+            else:
+                columns[name] = pa.array(values)
+        return pa.table(columns)
+
+    def write_part(self, array: np.ndarray) -> str:
+        """寫入一個分段檔案，返回檔名"""
+        part_name = f"part-{len(self.manifest['parts']) + 1:05d}{PART_EXTENSIONS[self.format]}"
+        path = self.export_dir / part_name
+        if self.format == "numpy":
+            np.save(path, array)
+        elif self.format == "arrow":
+            table = self.to_arrow_table(array)
+            with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(self.to_arrow_table(array), str(path))
+        return part_name
+
+    def append_sessions(self, folders, buying_items: dict = None) -> int:
+        """匯出尚未匯出過的資料夾，返回新增的列數"""
+        exported = set(self.manifest["sessions"])
+        new_folders = [Path(f) for f in folders if Path(f).name not in exported]
+        rows = []
+        for folder in new_folders:
+            rows.extend(session_rows(folder, buying_items))
+        if rows:
+            rows.sort(key=lambda row: row["ts"])
+            part_name = self.write_part(self.encode_rows(rows))
+            self.manifest["parts"].append(part_name)
+            self.manifest["row_count"] += len(rows)
+        self.manifest["sessions"].extend(folder.name for folder in new_folders)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        return len(rows)
+
+
+class ColumnarReader:
+    """以記憶體映射讀取匯出資料夾"""
+
+    def __init__(self, export_dir):
+        self.export_dir = Path(export_dir)
+        with open(self.export_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.format = self.manifest["format"]
+        self.dictionaries = self.manifest["dictionaries"]
+
+    def iter_parts(self):
+        """逐一返回各分段的欄位字典 {欄位: numpy陣列}，字典欄位為編碼值"""
+        for part_name in self.manifest["parts"]:
+            path = self.export_dir / part_name
+            if self.format == "numpy":
+                array = np.load(path, mmap_mode='r')
+                yield {name: array[name] for name in ROW_DTYPE.names}
+                continue
+            if self.format == "arrow":
+                table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+            else:
+                table = pq.read_table(str(path), memory_map=True)
+            yield {name: self._arrow_column_to_numpy(table.column(name), name) for name in ROW_DTYPE.names}
+
+    @staticmethod
+    def _arrow_column_to_numpy(column, name):
+        """Arrow欄位轉為numpy，字典欄位取編碼值（空值為-1）"""
+        if name in DICTIONARY_COLUMNS:
+            chunks = [chunk.indices.fill_null(-1).to_numpy(zero_copy_only=False) for chunk in column.chunks]
+            return np.concatenate(chunks).astype(np.int32) if chunks else np.empty(0, np.int32)
+        return column.to_numpy()
+
+    def read_columns(self, columns=None) -> dict:
+        """讀取所有分段並串接指定欄位"""
+        columns = columns or list(ROW_DTYPE.names)
+        parts = list(self.iter_parts())
+        if not parts:
+            return {name: np.empty(0, dtype=ROW_DTYPE[name]) for name in columns}
+        return {name: np.concatenate([np.asarray(part[name]) for part in parts]) for name in columns}
+
+    def decode(self, column: str, codes) -> list:
+        """將編碼值轉回原始字串"""
+        values = self.dictionaries[column]
+        return [values[code] if code >= 0 else None for code in codes]
+
+    def item_counts_by_channel(self, intent: str = None) -> dict:
+        """統計各頻道的商品出現次數 {(頻道, 商品): 次數}"""
+        data = self.read_columns(["channel", "item", "intent"])
+        mask = data["item"] >= 0
+        if intent:
+            intent_code = self.dictionaries["intent"].index(intent) if intent in self.dictionaries["intent"] else -2
+            mask &= data["intent"] == intent_code
+        pairs, counts = np.unique(np.stack([data["channel"][mask], data["item"][mask]], axis=1),
+                                  axis=0, return_counts=True)
+        channels = self.dictionaries["channel"]
+        items = self.dictionaries["item"]
+        return {(channels[c] if c >= 0 else None, items[i]): int(n) for (c, i), n in zip(pairs, counts)}
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="將會話歷史匯出為欄式格式")
+    parser.add_argument("folders", nargs="*", help="monitoring_session_* 或 integration_test_* 資料夾")
+    parser.add_argument("--output", default="market_history", help="匯出資料夾")
+    parser.add_argument("--format", default="auto", choices=["auto", "parquet", "arrow", "numpy"])
+    parser.add_argument("--summary", action="store_true", help="顯示各頻道商品統計")
+    args = parser.parse_args()
+
+    if args.folders:
+        try:
+            from config import BUYING_ITEMS
+        except ImportError:
+            BUYING_ITEMS = {}
+        exporter = ColumnarExporter(args.output, args.format)
+        added = exporter.append_sessions(args.folders, BUYING_ITEMS)
+        print(f"[OK] 新增 {added} 列 (格式: {exporter.format}, 總列數: {exporter.manifest['row_count']})")
+
+    if args.summary:
+        reader = ColumnarReader(args.output)
+        counts = sorted(reader.item_counts_by_channel().items(), key=lambda kv: -kv[1])
+        for (channel, item), count in counts[:20]:
+            print(f"  {channel or '未知頻道'}  {item}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""離線重播工具 - 將已保存的監控會話或測試資料夾重新送入分析器
+
+支援 monitoring_session_* (monitor_*.png + analysis_*.json) 和
+integration_test_* (test_*_screenshot.png + test_*_analysis.json) 兩種資料夾格式，
+輸出各階段延遲百分位數、吞吐量以及與原始記錄的結果差異。
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from pipeline_timing import pipeline_timer
+
+COMPARED_FIELDS = ["is_match", "player_name", "channel_number", "matched_items", "full_text"]
+
+
+def parse_timestamp(timestamp: str):
+    """解析 YYYYMMDD_HHMMSS_mmm 格式的時間戳，失敗時返回None"""
+    if not timestamp:
+        return None
+    for fmt in ("%Y%m%d_%H%M%S_%f", "%Y%m%d_%H%M%S"):
+        try:
+            return datetime.strptime(timestamp, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def load_session_frames(folder):
+    """載入資料夾中的所有畫面及其原始分析結果，按時間排序"""
+    folder = Path(folder)
+    frames = {}
+
+    # 監控會話：analysis_*.json 內記錄了對應的截圖路徑（分段儲存時位於 segment_XXXX/）
+    for json_file in folder.rglob("analysis_*.json"):
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[WARN] 無法讀取 {json_file.name}: {e}")
+            continue
+        screenshot_path = data.get("screenshot_path")
+        if not screenshot_path:
+            continue
+        screenshot_file = json_file.parent / os.path.basename(screenshot_path)
+        frames[screenshot_file.name] = {
+            "frame_id": data.get("monitoring_id", 0),
+            "screenshot": screenshot_file,
+            "timestamp": data.get("timestamp", ""),
+            "recorded_result": data.get("result")
+        }
+
+    # 整合測試：test_XXX_<timestamp>_screenshot.png + test_XXX_<timestamp>_analysis.json
+    for screenshot_file in folder.glob("test_*_screenshot.png"):
+        base_name = screenshot_file.name[:-len("_screenshot.png")]
+        match = re.search(r'test_(\d+)_(\d+_\d+_\d+)', base_name)
+        recorded_result = None
+        analysis_file = folder / f"{base_name}_analysis.json"
+        if analysis_file.exists():
+            try:
+                with open(analysis_file, 'r', encoding='utf-8') as f:
+                    recorded_result = json.load(f).get("parsed_result")
+            except Exception as e:
+                print(f"[WARN] 無法讀取 {analysis_file.name}: {e}")
+        frames[screenshot_file.name] = {
+            "frame_id": int(match.group(1)) if match else 0,
+            "screenshot": screenshot_file,
+            "timestamp": match.group(2) if match else "",
+            "recorded_result": recorded_result
+        }
+
+    # 沒有對應JSON的監控截圖（例如JSON被清理）仍然可以重播
+    for screenshot_file in folder.rglob("monitor_*.png"):
+        if screenshot_file.name in frames:
+            continue
+        match = re.search(r'monitor_(\d+)_(\d+_\d+_\d+)', screenshot_file.stem)
+        frames[screenshot_file.name] = {
+            "frame_id": int(match.group(1)) if match else 0,
+            "screenshot": screenshot_file,
+            "timestamp": match.group(2) if match else "",
+            "recorded_result": None
+        }
+
+    return sorted((f for f in frames.values() if f["screenshot"].exists()),
+                  key=lambda f: (f["timestamp"], f["frame_id"]))
+
+
+def summarize_latencies(samples_ms):
+    """計算延遲分佈（毫秒）"""
+    if not samples_ms:
+        return {"count": 0}
+    values = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+def _normalize_field(name, value):
+    """將欄位轉換為可比較的形式"""
+    if name == "matched_items":
+        return sorted(item.get("item_name", "") if isinstance(item, dict) else str(item) for item in (value or []))
+    if name == "full_text":
+        return ' '.join(str(value or '').split())
+    return value
+
+
+def diff_results(recorded: dict, replayed: dict) -> dict:
+    """比較原始記錄與重播結果，返回不同的欄位"""
+    differences = {}
+    for field in COMPARED_FIELDS:
+        old = _normalize_field(field, recorded.get(field))
+        new = _normalize_field(field, replayed.get(field))
+        if old != new:
+            differences[field] = {"recorded": old, "replayed": new}
+    return differences
+
+
+class SessionReplayer:
+    """將保存的畫面依序送入任意 TextAnalyzer 並收集效能與差異報告"""
+
+    def __init__(self, analyzer, cadence: str = "max", speed: float = 1.0, layout_calibrator=None):
+        self.analyzer = analyzer
+        self.cadence = cadence
+        self.speed = speed if speed > 0 else 1.0
+        self.layout_calibrator = layout_calibrator
+
+    def replay(self, folder, limit: int = None, keep_results: bool = False) -> dict:
+        """重播資料夾並返回報告，keep_results=True 時每幀附上完整分析結果"""
+        frames = load_session_frames(folder)
+        if limit:
+            frames = frames[:limit]
+        print(f"重播資料夾: {folder} (共 {len(frames)} 個畫面, 節奏: {self.cadence})")
+
+        stage_samples = {"load": [], "analyze_image": [], "parse_result": [], "total": []}
+        field_diff_counts = {field: 0 for field in COMPARED_FIELDS}
+        frame_reports = []
+        compared = 0
+        errors = 0
+        previous_time = None
+
+        # 重播期間啟用流程計時以取得分析器內部各階段耗時
+        timer_was_enabled = pipeline_timer.enabled
+        pipeline_timer.reset()
+        pipeline_timer.configure(enabled=True)
+
+        replay_start = time.perf_counter()
+        for frame in frames:
+            # 按照原始時間間隔重播
+            frame_time = parse_timestamp(frame["timestamp"])
+            if self.cadence == "recorded" and frame_time and previous_time:
+                delay = (frame_time - previous_time).total_seconds() / self.speed
+                if delay > 0:
+                    time.sleep(delay)
+            previous_time = frame_time or previous_time
+
+            t0 = time.perf_counter()
+            with Image.open(frame["screenshot"]) as img:
+                image = img.convert('RGB')
+            cropped = False
+            if self.layout_calibrator:
+                image, cropped = self.layout_calibrator.prepare(image)
+            t1 = time.perf_counter()
+            try:
+                raw_result = self.analyzer.analyze_image(image)
+                t2 = time.perf_counter()
+                if self.layout_calibrator:
+                    self.layout_calibrator.record_analysis((t2 - t1) * 1000, cropped)
+                result = self.analyzer.parse_result(raw_result).to_dict()
+                t3 = time.perf_counter()
+            except Exception as e:
+                errors += 1
+                print(f"[WARN] 畫面 {frame['screenshot'].name} 分析失敗: {e}")
+                continue
+
+            stage_samples["load"].append((t1 - t0) * 1000)
+            stage_samples["analyze_image"].append((t2 - t1) * 1000)
+            stage_samples["parse_result"].append((t3 - t2) * 1000)
+            stage_samples["total"].append((t3 - t0) * 1000)
+
+            differences = None
+            if frame["recorded_result"]:
+                compared += 1
+                differences = diff_results(frame["recorded_result"], result)
+                for field in differences:
+                    field_diff_counts[field] += 1
+
+            frame_report = {
+                "frame_id": frame["frame_id"],
+                "screenshot": frame["screenshot"].name,
+                "timestamp": frame["timestamp"],
+                "total_ms": round((t3 - t0) * 1000, 3),
+                "is_match": result.get("is_match", False),
+                "differences": differences
+            }
+            if keep_results:
+                frame_report["result"] = result
+            frame_reports.append(frame_report)
+
+        wall_time = time.perf_counter() - replay_start
+        pipeline_stages = pipeline_timer.snapshot()
+        pipeline_timer.configure(enabled=timer_was_enabled)
+        processed = len(stage_samples["total"])
+        busy_time = sum(stage_samples["total"]) / 1000
+
+        report = {
+            "folder": str(folder),
+            "analyzer": self.analyzer.analyzer_name,
+            "cadence": self.cadence,
+            "frames_total": len(frames),
+            "frames_processed": processed,
+            "errors": errors,
+            "wall_time_s": round(wall_time, 3),
+            "throughput_fps": round(processed / busy_time, 3) if busy_time > 0 else 0.0,
+            "stage_latency": {stage: summarize_latencies(samples) for stage, samples in stage_samples.items()},
+            "pipeline_stages": pipeline_stages,
+            "comparison": {
+                "frames_compared": compared,
+                "frames_changed": sum(1 for r in frame_reports if r["differences"]),
+                "field_diff_counts": field_diff_counts
+            },
+            "frames": frame_reports
+        }
+        if self.layout_calibrator:
+            report["layout"] = self.layout_calibrator.report()
+        return report
+
+
+def print_replay_report(report: dict):
+    """在終端機顯示重播摘要"""
+    print(f"\n{'='*50}")
+    print("離線重播報告")
+    print(f"{'='*50}")
+    print(f"分析器: {report['analyzer']}")
+    print(f"處理畫面: {report['frames_processed']}/{report['frames_total']} (錯誤 {report['errors']})")
+    print(f"吞吐量: {report['throughput_fps']} 幀/秒 (總耗時 {report['wall_time_s']}s)")
+    print("各階段延遲 (ms):")
+    for stage, stats in report["stage_latency"].items():
+        if stats.get("count"):
+            print(f"  - {stage}: p50={stats['p50_ms']} p95={stats['p95_ms']} p99={stats['p99_ms']} max={stats['max_ms']}")
+    for stage, stats in report.get("pipeline_stages", {}).items():
+        if "p50_ms" in stats:
+            print(f"  - {stage} (分析器內部): p50={stats['p50_ms']} p95={stats['p95_ms']} p99={stats['p99_ms']}")
+    comparison = report["comparison"]
+    print(f"結果差異: {comparison['frames_changed']}/{comparison['frames_compared']} 個畫面與原始記錄不同")
+    for field, count in comparison["field_diff_counts"].items():
+        if count:
+            print(f"  - {field}: {count} 次")
+    layout = report.get("layout")
+    if layout and layout.get("calibrated"):
+        print(f"版面裁切: 文字帶 {layout['band']}，像素減少 {layout['pixel_reduction'] * 100:.0f}%")
+        if "time_reduction" in layout:
+            print(f"  - analyze_image p50: {layout['full_ms']}ms -> {layout['cropped_ms']}ms "
+                  f"(減少 {layout['time_reduction'] * 100:.0f}%)")
+    print(f"{'='*50}")
+
+
+def main():
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="將保存的監控會話重新送入分析器")
+    parser.add_argument("folder", help="monitoring_session_* 或 integration_test_* 資料夾")
+    parser.add_argument("--analyzer", default="ocr_rectangle", choices=["ocr_rectangle", "ocr", "gemini"])
+    parser.add_argument("--cadence", default="max", choices=["max", "recorded"], help="max: 全速, recorded: 依原始時間間隔")
+    parser.add_argument("--speed", type=float, default=1.0, help="recorded節奏的加速倍數")
+    parser.add_argument("--limit", type=int, default=None, help="最多重播的畫面數")
+    parser.add_argument("--auto-crop", action="store_true", help="校正文字帶後只分析裁切區域，並報告像素與耗時減少")
+    parser.add_argument("--output", default=None, help="報告輸出路徑（預設為資料夾內的replay_report.json）")
+    args = parser.parse_args()
+
+    from screen_monitor import create_analyzer
+    # 重播需要在本程序內記錄各階段耗時，不使用常駐分析服務
+    analyzer = create_analyzer(args.analyzer, use_daemon=False)
+    if analyzer is None:
+        return
+
+    layout_calibrator = None
+    if args.auto_crop:
+        from layout_calibrator import LayoutCalibrator
+        try:
+            from config import LAYOUT_CALIBRATION_CONFIG
+        except ImportError:
+            LAYOUT_CALIBRATION_CONFIG = {}
+        layout_calibrator = LayoutCalibrator.from_config(LAYOUT_CALIBRATION_CONFIG)
+
+    report = SessionReplayer(analyzer, args.cadence, args.speed, layout_calibrator).replay(args.folder, args.limit)
+    print_replay_report(report)
+
+    output_path = args.output or os.path.join(args.folder, "replay_report.json")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    print(f"重播報告已保存: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
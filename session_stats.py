@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""會話統計 - 以 numpy 一次計算錯誤分布、匹配率、商品/頻道頻率與延遲分布
+
+資料來源為掃描索引（scan_index）或實時合併器的記錄，兩者先轉為欄位陣列，
+再由 compute_session_stats() 計算。終端摘要、HTML報告與 /metrics 使用同一份結果。
+
+匹配率 = 新匹配數 / 非重複掃描數（重複廣播另外計數，與合併器記錄一致）。
+"""
+
+import numpy as np
+
+from scan_index import infer_intent, parse_record_timestamp
+
+DEFAULT_WINDOW_SECONDS = 300
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LATENCY_QUANTILES = (50, 90, 99)
+
+
+def match_rate(matches: int, total: int) -> float:
+    """返回匹配率百分比，沒有資料時為0"""
+    return matches / total * 100 if total else 0.0
+
+
+def value_counts(values, limit: int = None) -> list:
+    """統計各值出現次數（略過None），返回 [(值, 次數), ...]，次數多的在前"""
+    array = np.asarray(values, dtype=object)
+    array = array[array != None]  # noqa: E711 - 逐元素比較
+    if not array.size:
+        return []
+    unique, counts = np.unique(array.astype(str), return_counts=True)
+    order = np.argsort(-counts, kind="stable")[:limit]
+    return [(str(unique[i]), int(counts[i])) for i in order]
+
+
+def empty_columns():
+    """返回空的掃描與匹配欄位"""
+    scans = {"ts": np.empty(0), "is_match": np.empty(0, dtype=bool), "is_duplicate": np.empty(0, dtype=bool),
+             "error_type": np.empty(0, dtype=object), "latency_ms": np.empty(0), "channel": np.empty(0, dtype=object)}
+    matches = {"item": np.empty(0, dtype=object), "channel": np.empty(0, dtype=object),
+               "intent": np.empty(0, dtype=object)}
+    return scans, matches
+
+
+def rows_to_columns(rows, names, float_columns=(), bool_columns=()) -> dict:
+    """將列資料轉為 {欄位: numpy陣列}"""
+    if not rows:
+        return None
+    table = np.array([tuple(row) for row in rows], dtype=object).reshape(len(rows), len(names))
+    columns = {}
+    for i, name in enumerate(names):
+        column = table[:, i]
+        if name in float_columns:
+            column = np.array([np.nan if v is None else v for v in column], dtype=float)
+        elif name in bool_columns:
+            column = column.astype(bool)
+        columns[name] = column
+    return columns
+
+
+def load_index_columns(scan_index, session: str = None, since: float = None):
+    """從掃描索引讀取 (掃描欄位, 匹配欄位)，可限定會話或起始時間"""
+    conditions, params = [], []
+    if session:
+        conditions.append("session = ?")
+        params.append(session)
+    if since is not None:
+        conditions.append("ts >= ?")
+        params.append(since)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    scan_names = ["ts", "is_match", "is_duplicate", "error_type", "latency_ms", "channel"]
+    match_names = ["item", "channel", "intent"]
+    with scan_index.lock:
+        scan_rows = scan_index.connection.execute(
+            f"SELECT {', '.join(scan_names)} FROM scans {where}", params).fetchall()
+        match_rows = scan_index.connection.execute(
+            f"SELECT {', '.join(match_names)} FROM matches {where}", params).fetchall()
+
+    empty_scans, empty_matches = empty_columns()
+    scans = rows_to_columns(scan_rows, scan_names, ("ts", "latency_ms"), ("is_match", "is_duplicate")) or empty_scans
+    matches = rows_to_columns(match_rows, match_names) or empty_matches
+    return scans, matches
+
+
+def columns_from_records(records):
+    """將實時合併器的記錄轉為 (掃描欄位, 匹配欄位)，重複廣播展開為重複掃描"""
+    scan_rows, match_rows = [], []
+    for record in records:
+        ts = parse_record_timestamp(record.get("timestamp"))
+        details = record.get("match_details") or {}
+        channel = details.get("channel_number") or (record.get("analysis_result") or {}).get("channel_number")
+        error_type = (record.get("error_info") or {}).get("error_type")
+        has_match = bool(record.get("has_match"))
+        scan_rows.append((ts, has_match, False, error_type, None, channel))
+        scan_rows.extend((ts, True, True, None, None, channel) for _ in range(record.get("duplicate_count", 1) - 1))
+        for item in details.get("matched_items") or []:
+            if isinstance(item, dict) and item.get("item_name"):
+                match_rows.append((item["item_name"], channel, infer_intent(item)))
+
+    empty_scans, empty_matches = empty_columns()
+    scans = rows_to_columns(scan_rows, ["ts", "is_match", "is_duplicate", "error_type", "latency_ms", "channel"],
+                            ("ts", "latency_ms"), ("is_match", "is_duplicate")) or empty_scans
+    matches = rows_to_columns(match_rows, ["item", "channel", "intent"]) or empty_matches
+    return scans, matches
+
+
+def match_rate_windows(ts, is_match, window_seconds: float = DEFAULT_WINDOW_SECONDS) -> list:
+    """按時間窗口計算掃描數、匹配數與匹配率"""
+    if not len(ts):
+        return []
+    start = np.floor(ts.min() / window_seconds) * window_seconds
+    bins = ((ts - start) // window_seconds).astype(int)
+    scan_counts = np.bincount(bins)
+    match_counts = np.bincount(bins, weights=is_match.astype(float))
+    return [{"start": float(start + i * window_seconds), "scans": int(scan_counts[i]),
+             "matches": int(match_counts[i]), "match_rate": round(match_rate(match_counts[i], scan_counts[i]), 1)}
+            for i in np.flatnonzero(scan_counts)]
+
+
+def latency_distribution(latency_ms) -> dict:
+    """計算延遲百分位數與直方圖（略過沒有記錄延遲的掃描）"""
+    latency_ms = latency_ms[~np.isnan(latency_ms)]
+    if not latency_ms.size:
+        return {"count": 0}
+    percentiles = np.percentile(latency_ms, LATENCY_QUANTILES)
+    # 與 Prometheus 的 le 相同：每個值計入第一個 >= 它的上界
+    counts = np.bincount(np.searchsorted(LATENCY_BUCKETS_MS, latency_ms), minlength=len(LATENCY_BUCKETS_MS) + 1)
+    distribution = {"count": int(latency_ms.size), "mean_ms": round(float(latency_ms.mean()), 1),
+                    "max_ms": round(float(latency_ms.max()), 1),
+                    "histogram": dict(zip([f"<={b}" for b in LATENCY_BUCKETS_MS] + ["inf"], counts.tolist()))}
+    for quantile, value in zip(LATENCY_QUANTILES, percentiles):
+        distribution[f"p{quantile}_ms"] = round(float(value), 1)
+    return distribution
+
+
+def compute_session_stats(scans: dict, matches: dict, window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                          top: int = 10) -> dict:
+    """由欄位陣列計算會話統計"""
+    is_duplicate = scans["is_duplicate"]
+    analyzed = ~is_duplicate
+    new_matches = scans["is_match"] & analyzed
+    analyzed_count = int(analyzed.sum())
+    match_count = int(new_matches.sum())
+    return {
+        "scans": int(len(scans["ts"])),
+        "analyzed": analyzed_count,
+        "matches": match_count,
+        "duplicates": int(is_duplicate.sum()),
+        "match_rate": round(match_rate(match_count, analyzed_count), 1),
+        "errors": int((scans["error_type"] != None).sum()),  # noqa: E711
+        "error_types": value_counts(scans["error_type"]),
+        "windows": match_rate_windows(scans["ts"][analyzed], new_matches[analyzed], window_seconds),
+        "top_items": value_counts(matches["item"], top),
+        "top_channels": value_counts(matches["channel"], top),
+        "latency": latency_distribution(scans["latency_ms"])
+    }
+
+
+def format_stats_summary(stats: dict) -> str:
+    """產生終端機顯示的統計摘要"""
+    lines = [f"總分析次數: {stats['analyzed']}" + (f" (另有 {stats['duplicates']} 次重複廣播)" if stats['duplicates'] else ""),
+             f"找到匹配: {stats['matches']} 次",
+             f"匹配率: {stats['match_rate']:.1f}%"]
+    if stats["errors"]:
+        lines.append(f"分析錯誤: {stats['errors']} 次 (" +
+                     ", ".join(f"{name}: {count}" for name, count in stats["error_types"]) + ")")
+    if stats["top_items"]:
+        lines.append("熱門商品: " + ", ".join(f"{name} x{count}" for name, count in stats["top_items"][:5]))
+    if stats["top_channels"]:
+        lines.append("熱門頻道: " + ", ".join(f"{name} x{count}" for name, count in stats["top_channels"][:5]))
+    latency = stats["latency"]
+    if latency["count"]:
+        lines.append(f"掃描延遲: p50 {latency['p50_ms']:.0f}ms / p90 {latency['p90_ms']:.0f}ms / "
+                     f"p99 {latency['p99_ms']:.0f}ms (最大 {latency['max_ms']:.0f}ms)")
+    return "\n".join(lines)
+
+
+def publish_stats_metrics(stats: dict, metrics=None):
+    """將統計結果寫入執行期指標，供 /metrics 輸出"""
+    if metrics is None:
+        from runtime_metrics import runtime_metrics as metrics
+    metrics.set_gauge("session_match_rate", round(stats["match_rate"] / 100, 4))
+    latency = stats["latency"]
+    if not latency["count"]:
+        return
+    for quantile in LATENCY_QUANTILES:
+        metrics.set_gauge("session_scan_latency_seconds", latency[f"p{quantile}_ms"] / 1000,
+                          quantile=f"{quantile / 100:g}")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""監控會話儲存管理 - 分段輪替、保留策略、背景壓縮與磁碟預算
+
+每次掃描的截圖與JSON寫入會話資料夾下的 segment_XXXX/ 子資料夾，
+分段達到檔案數、大小或時間上限時，在登記完一次掃描後輪替（同一次掃描的檔案一定在同一分段）。已關閉的分段會在背景執行：
+    1. 保留所有匹配檔案（HTML報告仍直接引用）
+    2. 未匹配的掃描只保留每 N 筆中的一筆，其餘刪除
+    3. 保留下來的未匹配檔案壓縮為 segment_XXXX/archive.zip
+所有 monitoring_session_* 資料夾總大小超過磁碟預算時，
+從最舊的壓縮檔和未匹配檔案開始刪除，匹配檔案永遠不會被刪除。
+"""
+
+import json
+import os
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+MB = 1024 * 1024
+ARCHIVE_NAME = "archive.zip"
+MANIFEST_NAME = "segment_manifest.json"
+
+
+def folder_size(folder) -> int:
+    """計算資料夾內所有檔案的總大小"""
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class Segment:
+    """單一儲存分段"""
+
+    def __init__(self, index: int, folder: Path):
+        self.index = index
+        self.folder = folder
+        self.created_at = time.time()
+        self.file_count = 0
+        self.byte_count = 0
+        self.scans = []  # [{"paths": [...], "is_match": bool}]
+
+    def to_dict(self):
+        """轉換為字典格式"""
+        return {
+            "index": self.index,
+            "created_at": self.created_at,
+            "file_count": self.file_count,
+            "byte_count": self.byte_count,
+            "scans": self.scans
+        }
+
+
+class SessionStorage:
+    """管理會話資料夾內的分段檔案"""
+
+    def __init__(self, session_folder, max_files: int = 500, max_mb: float = 200, max_hours: float = 1,
+                 non_match_keep_every: int = 10, compress: bool = True, disk_budget_mb: float = None,
+                 storage_root=None):
+        self.session_folder = Path(session_folder)
+        self.storage_root = Path(storage_root) if storage_root else self.session_folder.parent
+        self.max_files = max_files
+        self.max_bytes = max_mb * MB if max_mb else None
+        self.max_seconds = max_hours * 3600 if max_hours else None
+        self.non_match_keep_every = non_match_keep_every
+        self.compress = compress
+        self.disk_budget_bytes = disk_budget_mb * MB if disk_budget_mb else None
+        self.lock = threading.Lock()
+        self.worker_threads = []
+        self.segment = None
+        self.closed_segments = 0
+        self.deleted_bytes = 0
+        self._open_segment(1)
+
+    def _open_segment(self, index: int):
+        folder = self.session_folder / f"segment_{index:04d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        self.segment = Segment(index, folder)
+
+    def path_for(self, filename: str) -> str:
+        """返回新檔案在目前分段中的路徑（不輪替，輪替只發生在 commit_scan 之後）"""
+        with self.lock:
+            return str(self.segment.folder / filename)
+
+    def commit_scan(self, paths, is_match: bool):
+        """登記一次掃描寫出的檔案，供保留策略使用；達到上限時輪替，下一次掃描寫入新分段"""
+        paths = [str(p) for p in paths if p and os.path.exists(p)]
+        if not paths:
+            return
+        with self.lock:
+            self.segment.scans.append({"paths": paths, "is_match": bool(is_match)})
+            self.segment.file_count += len(paths)
+            self.segment.byte_count += sum(os.path.getsize(p) for p in paths)
+            if self._should_rotate():
+                self._rotate()
+
+    def _should_rotate(self) -> bool:
+        segment = self.segment
+        if not segment.scans:
+            return False
+        if self.max_files and segment.file_count >= self.max_files:
+            return True
+        if self.max_bytes and segment.byte_count >= self.max_bytes:
+            return True
+        return bool(self.max_seconds and time.time() - segment.created_at >= self.max_seconds)
+
+    def _rotate(self):
+        """關閉目前分段並在背景處理"""
+        closed = self.segment
+        self._open_segment(closed.index + 1)
+        self.closed_segments += 1
+        print(f"[STORAGE] 分段輪替: {closed.folder.name} ({closed.file_count} 個檔案, "
+              f"{closed.byte_count / MB:.1f}MB) -> {self.segment.folder.name}")
+        worker = threading.Thread(target=self.process_closed_segment, args=(closed,),
+                                  name=f"SegmentWorker-{closed.index}", daemon=True)
+        self.worker_threads = [t for t in self.worker_threads if t.is_alive()] + [worker]
+        worker.start()
+
+    def apply_retention(self, segment: Segment) -> list:
+        """刪除超出取樣比例的未匹配檔案，返回保留的未匹配檔案路徑"""
+        kept = []
+        non_match_index = 0
+        for scan in segment.scans:
+            if scan["is_match"]:
+                continue
+            keep = self.non_match_keep_every and non_match_index % self.non_match_keep_every == 0
+            non_match_index += 1
+            for path in scan["paths"]:
+                if keep:
+                    kept.append(path)
+                    continue
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    self.deleted_bytes += size
+                except OSError:
+                    continue
+        return kept
+
+    def compress_files(self, segment: Segment, paths) -> str:
+        """將檔案壓縮到分段的 archive.zip 並刪除原始檔案"""
+        paths = [p for p in paths if os.path.exists(p)]
+        if not paths:
+            return None
+        archive_path = segment.folder / ARCHIVE_NAME
+        with zipfile.ZipFile(archive_path, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            for path in paths:
+                archive.write(path, arcname=os.path.basename(path))
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        return str(archive_path)
+
+    def process_closed_segment(self, segment: Segment):
+        """背景處理已關閉的分段：保留策略、壓縮、寫出清單、檢查磁碟預算"""
+        try:
+            kept = self.apply_retention(segment)
+            if self.compress:
+                self.compress_files(segment, kept)
+            with open(segment.folder / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+                json.dump(segment.to_dict(), f, ensure_ascii=False, indent=2)
+            self.enforce_disk_budget()
+        except Exception as e:
+            print(f"[WARN] 處理分段 {segment.folder.name} 失敗: {e}")
+
+    def eviction_candidates(self) -> list:
+        """列出可刪除的檔案（最舊優先）：所有會話的壓縮檔與已關閉分段中的未匹配檔案"""
+        candidates = []
+        for session in sorted(self.storage_root.glob("monitoring_session_*")):
+            for segment_folder in sorted(session.glob("segment_*")):
+                if segment_folder == self.segment.folder:
+                    continue
+                archive = segment_folder / ARCHIVE_NAME
+                if archive.exists():
+                    candidates.append(archive)
+                manifest_path = segment_folder / MANIFEST_NAME
+                if not manifest_path.exists():
+                    continue
+                try:
+                    with open(manifest_path, 'r', encoding='utf-8') as f:
+                        manifest = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                for scan in manifest.get("scans", []):
+                    if scan.get("is_match"):
+                        continue
+                    for p in scan.get("paths", []):
+                        # 清單內可能是相對於當時工作目錄的路徑
+                        path = segment_folder / os.path.basename(p)
+                        if path.exists():
+                            candidates.append(path)
+        return candidates
+
+    def enforce_disk_budget(self) -> int:
+        """超過磁碟預算時刪除最舊的未匹配資料，返回刪除的位元組數"""
+        if not self.disk_budget_bytes:
+            return 0
+        total = sum(folder_size(session) for session in self.storage_root.glob("monitoring_session_*"))
+        if total <= self.disk_budget_bytes:
+            return 0
+
+        freed = 0
+        for path in self.eviction_candidates():
+            if total - freed <= self.disk_budget_bytes:
+                break
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                freed += size
+            except OSError:
+                continue
+        self.deleted_bytes += freed
+        if total - freed > self.disk_budget_bytes:
+            print(f"[WARN] 磁碟用量 {(total - freed) / MB:.0f}MB 仍超過預算 "
+                  f"{self.disk_budget_bytes / MB:.0f}MB（僅剩匹配檔案）")
+        else:
+            print(f"[STORAGE] 磁碟預算: 已刪除 {freed / MB:.1f}MB 舊的未匹配資料")
+        return freed
+
+    def close(self, timeout: float = 30.0):
+        """等待背景處理完成（目前分段保持原樣，方便檢視最近的掃描）"""
+        for worker in self.worker_threads:
+            worker.join(timeout)
+        with self.lock:
+            with open(self.segment.folder / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+                json.dump(self.segment.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def describe(self) -> str:
+        """返回儲存狀態摘要"""
+        return (f"儲存分段: {self.segment.folder.name} (已輪替 {self.closed_segments} 次, "
+                f"已清理 {self.deleted_bytes / MB:.1f}MB)")
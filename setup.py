@@ -108,6 +108,12 @@ RECTANGLE_DETECTION_CONFIG = {
     "MAX_ASPECT_RATIO": 10,              # Maximum aspect ratio
     "FILL_RATIO_THRESHOLD": 0.7,         # Rectangle fill ratio threshold
     "TEXT_ASSIGNMENT_TOLERANCE": 5,      # Text assignment tolerance in pixels
+    "MORPHOLOGY_KERNEL_SIZE": 3,         # Close/open kernel size (0 = no morphology)
+    "REUSE_PREVIOUS_FRAME": True,        # Reuse last result when the box region is unchanged
+    "REUSE_MAX_DIFF": 2.0,               # Max mean abs pixel diff of the box region to reuse
+    "SEARCH_BAND_MARGIN": 20,            # Pixels around the last box searched before a full search
+    "FULL_SEARCH_EVERY": 30,             # Force a full-frame search after this many cached/band frames
+    "COARSE_SCALE": 2,                   # Downscale factor for locating candidates (1 = full resolution only)
 }
 
 # OCR Debug settings for OCR_Rectangle analyzer
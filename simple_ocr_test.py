@@ -101,9 +101,13 @@ def test_current_ocr_analyzer():
     
     try:
         from ocr_analyzer import OCRAnalyzer
+        from analyzer_daemon import connect_analyzer
         from config import SELLING_ITEMS
         
-        analyzer = OCRAnalyzer(SELLING_ITEMS)
+        # 常駐分析服務執行中時使用服務中已載入的模型
+        analyzer = connect_analyzer("ocr", SELLING_ITEMS, fallback_factory=lambda: OCRAnalyzer(SELLING_ITEMS))
+        if analyzer is None:
+            analyzer = OCRAnalyzer(SELLING_ITEMS)
         print("[OK] OCR分析器創建成功")
         print(f"[OK] 策略類型: {analyzer.strategy_type}")
         
@@ -4,14 +4,16 @@
 專門用於處理一個裁剪影像中只有一個白色矩形框的情況
 """
 
-import cv2
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 import easyocr
 from PIL import Image
+from pipeline_timing import pipeline_timer, timed_readtext
+from white_box_detector import WhiteBoxDetector
+from ocr_backends import create_reader
 
 class SingleRectangleDetector:
-    """單白色矩形框檢測器"""
+    """單白色矩形框檢測器（使用共用的 WhiteBoxDetector）"""
     
     def __init__(self, config=None):
         """初始化檢測器"""
@@ -19,127 +21,42 @@ class SingleRectangleDetector:
         if config:
             # 合併配置，保留默認值
             default_config.update(config)
-        self.config = default_config
+        self.detector = WhiteBoxDetector(default_config)
+        self.config = self.detector.config
         
     def _get_default_config(self):
-        """默認檢測參數 - 針對單矩形框優化"""
+        """默認檢測參數 - 針對單矩形框優化（白色閾值使用 RECTANGLE_DETECTION_CONFIG）"""
         return {
-            "WHITE_THRESHOLD": 240,           # 白色閾值
             "MIN_RECTANGLE_AREA": 50,         # 最小矩形面積（更寬鬆）
             "MAX_RECTANGLE_AREA": 10000,      # 最大矩形面積
             "MIN_ASPECT_RATIO": 0.1,          # 最小長寬比（更寬鬆）
             "MAX_ASPECT_RATIO": 20,           # 最大長寬比（更寬鬆）
             "FILL_RATIO_THRESHOLD": 0.6,      # 填充比率閾值（更寬鬆）
             "MORPHOLOGY_KERNEL_SIZE": 2,      # 形態學核心大小
-            "CONTOUR_SIMPLIFICATION": 0.02   # 輪廓簡化係數
         }
     
     def detect_single_rectangle(self, image) -> Optional[Dict]:
         """檢測單個白色矩形框"""
         try:
-            # 轉換為OpenCV格式
-            cv_image = self._convert_to_cv_format(image)
-            gray = self._convert_to_grayscale(cv_image)
-            
-            # 檢測白色區域
-            white_mask = self._detect_white_regions(gray)
-            
-            # 尋找輪廓
-            contours = self._find_contours(white_mask)
-            
-            # 過濾並找到最佳矩形
-            best_rectangle = self._find_best_rectangle(contours)
-            
-            return best_rectangle
-            
+            return self._find_best_rectangle(self.detector.detect(image))
         except Exception as e:
             print(f"單矩形框檢測失敗: {e}")
             return None
     
-    def _convert_to_cv_format(self, image):
-        """轉換PIL圖片為OpenCV格式"""
-        if hasattr(image, 'convert'):
-            # PIL圖片
-            return cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
-        else:
-            # 假設已經是numpy array
-            return image
-    
-    def _convert_to_grayscale(self, cv_image):
-        """轉換為灰度圖"""
-        if len(cv_image.shape) == 3:
-            return cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-        else:
-            return cv_image
-    
-    def _detect_white_regions(self, gray_image):
-        """檢測白色區域"""
-        threshold = self.config["WHITE_THRESHOLD"]
-        _, white_mask = cv2.threshold(gray_image, threshold, 255, cv2.THRESH_BINARY)
-        
-        # 形態學處理：去除噪點，連接斷開的區域
-        kernel_size = self.config["MORPHOLOGY_KERNEL_SIZE"]
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
-        
-        # 先閉運算連接近似區域，再開運算去除噪點
-        white_mask = cv2.morphologyEx(white_mask, cv2.MORPH_CLOSE, kernel)
-        white_mask = cv2.morphologyEx(white_mask, cv2.MORPH_OPEN, kernel)
-        
-        return white_mask
-    
-    def _find_contours(self, mask):
-        """尋找輪廓"""
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        return contours
-    
-    def _find_best_rectangle(self, contours) -> Optional[Dict]:
-        """找到最佳的矩形候選"""
-        if not contours:
+    def _find_best_rectangle(self, rectangles) -> Optional[Dict]:
+        """從候選矩形中找到品質分數最高的一個"""
+        if not rectangles:
             return None
-            
-        candidates = []
-        
-        min_area = self.config["MIN_RECTANGLE_AREA"]
-        max_area = self.config["MAX_RECTANGLE_AREA"]
-        min_aspect_ratio = self.config["MIN_ASPECT_RATIO"]
-        max_aspect_ratio = self.config["MAX_ASPECT_RATIO"]
-        fill_threshold = self.config["FILL_RATIO_THRESHOLD"]
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            if min_area < area < max_area:
-                # 計算邊界矩形
-                x, y, w, h = cv2.boundingRect(contour)
-                aspect_ratio = w / h if h > 0 else 0
-                
-                if min_aspect_ratio < aspect_ratio < max_aspect_ratio:
-                    # 檢查是否接近矩形
-                    rect_area = w * h
-                    fill_ratio = area / rect_area if rect_area > 0 else 0
-                    
-                    if fill_ratio > fill_threshold:
-                        # 計算矩形的"品質分數"
-                        score = self._calculate_rectangle_score(area, aspect_ratio, fill_ratio)
-                        
-                        candidates.append({
-                            'bbox': (x, y, x+w, y+h),
-                            'center': (x + w//2, y + h//2),
-                            'area': area,
-                            'width': w,
-                            'height': h,
-                            'aspect_ratio': aspect_ratio,
-                            'fill_ratio': fill_ratio,
-                            'score': score,
-                            'contour': contour
-                        })
-        
-        if not candidates:
-            return None
+        candidates = []
+        for rectangle in rectangles:
+            x1, y1, x2, y2 = rectangle['bbox']
+            score = self._calculate_rectangle_score(rectangle['area'], rectangle['aspect_ratio'],
+                                                    rectangle['fill_ratio'])
+            candidates.append(dict(rectangle, width=x2 - x1, height=y2 - y1, score=score))
         
         # 返回得分最高的矩形
-        best_rectangle = max(candidates, key=lambda r: r['score'])
-        return best_rectangle
+        return max(candidates, key=lambda r: r['score'])
     
     def _calculate_rectangle_score(self, area, aspect_ratio, fill_ratio):
         """計算矩形品質分數"""
@@ -162,7 +79,7 @@ class SingleRectangleTextSplitter:
     
     def __init__(self, languages=['ch_tra', 'en']):
         """初始化OCR讀取器"""
-        self.reader = easyocr.Reader(languages)
+        self.reader = create_reader(languages, profile="SINGLE_RECTANGLE")
         
     def split_text_by_rectangle(self, image, rectangle_info=None) -> Dict:
         """根據矩形框分割文字為前後兩部分"""
@@ -174,7 +91,7 @@ class SingleRectangleTextSplitter:
             
             # 執行OCR獲取所有文字
             image_array = np.array(image)
-            ocr_results = self.reader.readtext(image_array)
+            ocr_results = timed_readtext(self.reader, image_array)
             
             if not ocr_results:
                 return {
@@ -291,7 +208,8 @@ class SingleRectangleAnalyzer:
         
         # 1. 檢測矩形框
         print("步驟1: 檢測白色矩形框...")
-        rectangle_info = self.detector.detect_single_rectangle(image)
+        with pipeline_timer.span("rectangle_detect"):
+            rectangle_info = self.detector.detect_single_rectangle(image)
         
         if rectangle_info:
             print(f"[成功] 檢測到矩形框: 位置{rectangle_info['bbox']}, 面積{rectangle_info['area']:.0f}")
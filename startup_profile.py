@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""啟動耗時記錄 - 模組載入時間、背景模型預熱與首次掃描時間
+
+screen_monitor 只在選定分析器後才以 timed_import 載入對應模組（easyocr/torch/cv2 等），
+並以 BackgroundAnalyzerLoader 在使用者回答設定問題與選取ROI的同時，於背景建立分析器、
+以合成畫面執行一次推論。各階段（模組載入、ROI選取、分析器就緒、預熱完成、第一次掃描）
+相對程序啟動的時間記錄在 startup_profiler，第一次掃描後輸出到會話資料夾的 startup_report.json。
+
+用法（只量測模組載入時間）:
+    python startup_profile.py
+    python startup_profile.py --modules ocr_analyzer gemini_analyzer
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from PIL import Image, ImageDraw
+
+PROCESS_START = time.perf_counter()
+
+# 報告中列出是否已載入的重量級模組
+HEAVY_MODULES = ["torch", "easyocr", "cv2", "onnxruntime", "pyautogui", "tkinter", "google.generativeai"]
+DEFAULT_MODULES = ["screen_monitor", "roi_selector", "ocr_rectangle_analyzer", "ocr_analyzer"]
+
+
+class StartupProfiler:
+    """記錄模組載入耗時、各階段時間點與區段耗時（毫秒）"""
+
+    def __init__(self, start: float = None):
+        self.start = PROCESS_START if start is None else start
+        self.imports = {}
+        self.milestones = {}
+        self.durations = {}
+        self.lock = threading.Lock()
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.start) * 1000, 1)
+
+    def mark(self, name: str):
+        """記錄階段時間點，同名階段只記錄第一次"""
+        with self.lock:
+            self.milestones.setdefault(name, self.elapsed_ms())
+
+    def timed_import(self, module_name: str):
+        """匯入模組並記錄耗時（已載入的模組不重複記錄）"""
+        already_loaded = module_name in sys.modules
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if not already_loaded:
+            with self.lock:
+                self.imports[module_name] = round((time.perf_counter() - start) * 1000, 1)
+        return module
+
+    @contextmanager
+    def section(self, name: str):
+        """記錄一段程式的耗時"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.durations[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def report(self) -> dict:
+        with self.lock:
+            return {
+                "imports_ms": dict(self.imports),
+                "milestones_ms": dict(sorted(self.milestones.items(), key=lambda item: item[1])),
+                "durations_ms": dict(self.durations),
+                "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+            }
+
+    def format_report(self) -> str:
+        """返回人類可讀的啟動耗時摘要"""
+        report = self.report()
+        lines = ["啟動耗時:"]
+        for name, ms in report["milestones_ms"].items():
+            lines.append(f"  - {name}: {ms / 1000:.2f}s")
+        for name, ms in sorted(report["imports_ms"].items(), key=lambda item: -item[1]):
+            lines.append(f"  - import {name}: {ms:.0f}ms")
+        for name, ms in report["durations_ms"].items():
+            lines.append(f"  - {name}: {ms:.0f}ms")
+        return '\n'.join(lines)
+
+    def save(self, folder: str, filename: str = "startup_report.json") -> str:
+        path = os.path.join(folder, filename)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            return path
+        except OSError as e:
+            print(f"[WARN] 寫入啟動耗時報告失敗: {e}")
+            return None
+
+
+# 全域記錄器，screen_monitor 於啟動各階段標記
+startup_profiler = StartupProfiler()
+
+
+def warmup_frame(width: int = 800, height: int = 40) -> Image.Image:
+    """產生含白色頻道框與文字的合成廣播畫面，用於預熱偵測與辨識模型"""
+    image = Image.new('RGB', (width, height), (40, 40, 70))
+    draw = ImageDraw.Draw(image)
+    box_top = height // 4
+    draw.rectangle((120, box_top, 170, height - box_top), fill=(255, 255, 255))
+    draw.text((8, box_top), "hihi5217", fill=(230, 230, 230))
+    draw.text((128, box_top), "1623", fill=(20, 20, 20))
+    draw.text((180, box_top), "WTB cape 100", fill=(230, 230, 230))
+    return image
+
+
+class BackgroundAnalyzerLoader:
+    """在背景執行緒建立分析器並以合成畫面預熱"""
+
+    def __init__(self, factory, warmup: bool = True, profiler: StartupProfiler = None):
+        self.factory = factory
+        self.warmup = warmup
+        self.profiler = profiler or startup_profiler
+        self.analyzer = None
+        self.error = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="analyzer-loader", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            with self.profiler.section("create_analyzer"):
+                self.analyzer = self.factory()
+            self.profiler.mark("analyzer_ready")
+            if self.analyzer is not None and self.warmup:
+                with self.profiler.section("warmup_inference"):
+                    self.analyzer.warm_up(warmup_frame())
+                self.profiler.mark("warmup_done")
+        except Exception as e:
+            self.error = e
+            print(f"[WARN] 背景預熱失敗: {e}")
+
+    def result(self, timeout: float = None):
+        """等待背景載入完成並返回分析器（建立失敗時為 None）"""
+        if self.thread is None:
+            self._run()
+        elif self.thread.is_alive():
+            print("[INFO] 等待分析器載入...")
+            self.thread.join(timeout)
+        return self.analyzer
+
+
+def main():
+    """量測各模組的冷啟動匯入耗時"""
+    parser = argparse.ArgumentParser(description="量測模組匯入耗時")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    for module_name in args.modules:
+        try:
+            startup_profiler.timed_import(module_name)
+        except Exception as e:
+            print(f"[WARN] 無法匯入 {module_name}: {e}")
+    startup_profiler.mark("imports_done")
+    print(startup_profiler.format_report())
+    print(f"已載入的重量級模組: {', '.join(startup_profiler.report()['heavy_modules_loaded']) or '無'}")
+
+
+if __name__ == "__main__":
+    main()
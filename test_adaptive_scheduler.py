@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試自適應掃描排程器"""
+
+import sys
+import os
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from PIL import Image, ImageDraw
+from adaptive_scheduler import AdaptiveScanScheduler
+from text_analyzer import AnalysisResult
+
+TEST_CONFIG = {
+    "ENABLED": True,
+    "MIN_INTERVAL": 0.5,
+    "MAX_INTERVAL": 8.0,
+    "BACKOFF_FACTOR": 2.0,
+    "SPEEDUP_FACTOR": 0.5,
+    "FRAME_DIFF_THRESHOLD": 0.01,
+    "PIXEL_DIFF_THRESHOLD": 24,
+    "CPU_BUDGET": 0.5,
+}
+
+
+def make_frame(text):
+    """創建帶有文字的測試畫面"""
+    image = Image.new('RGB', (400, 40), 'black')
+    ImageDraw.Draw(image).text((10, 10), text, fill='white')
+    return image
+
+
+def test_backoff_when_idle():
+    """測試畫面無變化時指數退避並受上限限制"""
+    scheduler = AdaptiveScanScheduler(2, TEST_CONFIG)
+    frame = make_frame("hihi5217 CH1623: WTB")
+    result = AnalysisResult(full_text="hihi5217 CH1623: WTB")
+
+    scheduler.next_interval(frame, result)  # 第一幀視為活躍
+    intervals = [scheduler.next_interval(frame, result) for _ in range(6)]
+
+    assert intervals[1] > intervals[0], "無變化時間隔應該增加"
+    assert intervals[-1] == TEST_CONFIG["MAX_INTERVAL"], "間隔不應超過上限"
+    print(f"OK 退避間隔: {intervals}")
+
+
+def test_speedup_on_activity():
+    """測試畫面變化或新文字時縮短間隔並受下限限制"""
+    scheduler = AdaptiveScanScheduler(4, TEST_CONFIG)
+    intervals = []
+    for i in range(6):
+        text = f"player{i}: 收購母礦 {i}"
+        intervals.append(scheduler.next_interval(make_frame(text), AnalysisResult(full_text=text)))
+
+    assert intervals[0] < 4, "活躍時間隔應該縮短"
+    assert intervals[-1] == TEST_CONFIG["MIN_INTERVAL"], "間隔不應低於下限"
+    print(f"OK 加速間隔: {intervals}")
+
+
+def test_cpu_budget():
+    """測試CPU預算會拉長過短的間隔"""
+    scheduler = AdaptiveScanScheduler(1, TEST_CONFIG)
+    interval = scheduler.next_interval(make_frame("a"), AnalysisResult(full_text="a"), scan_duration=3.0)
+
+    # 預算50%：掃描3秒後至少需休眠3秒
+    assert interval >= 3.0, f"CPU預算應限制間隔，實際: {interval}"
+    print(f"OK CPU預算間隔: {interval}")
+
+
+def test_disabled_uses_fixed_interval():
+    """測試停用時使用固定間隔"""
+    scheduler = AdaptiveScanScheduler(2, {"ENABLED": False})
+    assert scheduler.next_interval(make_frame("a"), None, 10.0) == 2.0
+    print("OK 停用時使用固定間隔")
+
+
+if __name__ == "__main__":
+    print("=== 自適應掃描排程器測試 ===")
+    test_backoff_when_idle()
+    test_speedup_on_activity()
+    test_cpu_budget()
+    test_disabled_uses_fixed_interval()
+    print("所有測試通過")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試非阻塞匹配提醒分派器"""
+
+import sys
+import os
+import time
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from alert_dispatcher import AlertDispatcher
+from text_analyzer import AnalysisResult
+
+
+class SlowRecordingBackend:
+    """模擬需要很久才能顯示的提醒後端"""
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+        self.shown = []
+
+    def show(self, title, message):
+        time.sleep(self.delay)
+        self.shown.append(message)
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_result(player, item):
+    return AnalysisResult(
+        full_text=f"{player}: 收購{item}",
+        is_match=True,
+        player_name=player,
+        matched_items=[{"item_name": item, "keywords_found": [item]}]
+    )
+
+
+def wait_for_queue(dispatcher, timeout=5.0):
+    """等待分派器處理完佇列"""
+    deadline = time.time() + timeout
+    while time.time() < deadline and not dispatcher.alert_queue.empty():
+        time.sleep(0.05)
+    time.sleep(0.5)
+
+
+def test_submit_does_not_block():
+    """測試提交提醒不會等待後端顯示"""
+    backend = SlowRecordingBackend(delay=0.5)
+    dispatcher = AlertDispatcher(backend=backend, coalesce_window=0)
+    dispatcher.start()
+    try:
+        start = time.time()
+        for i in range(5):
+            assert dispatcher.submit(f"alert {i}", make_result(f"player{i}", "母礦"))
+        elapsed = time.time() - start
+        assert elapsed < 0.1, f"提交提醒不應阻塞，耗時: {elapsed:.3f}s"
+        print(f"OK 提交5個提醒耗時 {elapsed*1000:.1f}ms")
+    finally:
+        dispatcher.stop(timeout=0.1)
+
+
+def test_coalesce_repeated_alerts():
+    """測試同一玩家/商品的重複提醒會被合併"""
+    backend = SlowRecordingBackend(delay=0)
+    dispatcher = AlertDispatcher(backend=backend, coalesce_window=60)
+    dispatcher.start()
+    try:
+        dispatcher.submit("first", make_result("hihi5217", "母礦"))
+        dispatcher.submit("repeat", make_result("HIHI5217", "母礦"))
+        dispatcher.submit("other item", make_result("hihi5217", "催化劑"))
+        wait_for_queue(dispatcher)
+
+        assert backend.shown == ["first", "other item"], f"重複提醒應該被合併: {backend.shown}"
+        assert dispatcher.coalesced_count == 1
+        print("OK 重複提醒已合併")
+    finally:
+        dispatcher.stop()
+
+
+def test_queue_full_drops_alert():
+    """測試佇列已滿時直接丟棄而不阻塞"""
+    dispatcher = AlertDispatcher(backend=SlowRecordingBackend(), max_queue_size=1)
+    assert dispatcher.submit("a")
+    assert not dispatcher.submit("b"), "佇列已滿時應返回False"
+    assert dispatcher.dropped_count == 1
+    print("OK 佇列已滿時丟棄提醒")
+
+
+if __name__ == "__main__":
+    print("=== 提醒分派器測試 ===")
+    test_submit_does_not_block()
+    test_coalesce_repeated_alerts()
+    test_queue_full_drops_alert()
+    print("所有測試通過")
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試常駐分析服務的socket協定、共享記憶體畫面傳遞與RemoteAnalyzer"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from analyzer_daemon import (AnalyzerDaemon, DaemonClient, RemoteAnalyzer, connect_analyzer,
+                             daemon_supported, encode_message, CODEC_JSON, HEADER)
+from pipeline_timing import pipeline_timer
+from text_analyzer import AnalysisResult, TextAnalyzer
+
+pytestmark = pytest.mark.skipif(not daemon_supported(), reason="需要 Unix domain socket")
+
+
+class _BrightnessAnalyzer(TextAnalyzer):
+    """以畫面平均亮度與尺寸作為「文字」的假分析器"""
+
+    def __init__(self, selling_items):
+        super().__init__(selling_items)
+        self.strategy_type = "OCR_RECTANGLE"
+        self.buying_items = {}
+        self.warmed = 0
+
+    def warm_up(self, image):
+        self.warmed += 1
+
+    def analyze_image(self, image):
+        with pipeline_timer.span("ocr_recognize"):
+            pixels = np.asarray(image)
+        return {"text": f"{pixels.shape[1]}x{pixels.shape[0]} {int(pixels.mean())}",
+                "mean": np.float32(pixels.mean())}
+
+    def parse_result(self, raw_result):
+        items = list(self.selling_items)
+        return AnalysisResult(full_text=raw_result["text"], is_match=bool(items), matched_keywords=items,
+                              analysis_method="_BrightnessAnalyzer")
+
+    def get_error_type(self, error_message):
+        return "QUOTA" if "quota" in error_message else "OCR_RECTANGLE_ERROR"
+
+    def is_quota_error(self, error_message):
+        return "quota" in error_message
+
+
+class _LocalAnalyzer(_BrightnessAnalyzer):
+    """服務中斷後本機建立的分析器"""
+
+
+class _BoxAnalyzer(TextAnalyzer):
+    """以白框檢測器的結果作為「文字」的假分析器"""
+
+    def __init__(self, selling_items):
+        super().__init__(selling_items)
+        from white_box_detector import WhiteBoxDetector
+        self.strategy_type = "OCR_RECTANGLE"
+        self.buying_items = {}
+        self.box_detector = WhiteBoxDetector()
+
+    def analyze_image(self, image):
+        return [list(r['bbox']) for r in self.box_detector.detect(image)]
+
+    def parse_result(self, raw_result):
+        return AnalysisResult(full_text=str(raw_result), is_match=False, analysis_method="_BoxAnalyzer")
+
+
+def box_frame(*lefts):
+    """深色背景上畫出左緣位於 lefts 的白框"""
+    pixels = np.full((40, 600, 3), 30, dtype=np.uint8)
+    for left in lefts:
+        pixels[10:26, left:left + 40] = 255
+    return Image.fromarray(pixels)
+
+
+def start_daemon(folder):
+    created = []
+
+    def factory(analyzer_type):
+        created.append(analyzer_type)
+        return _BrightnessAnalyzer({"預設": ["預設"]})
+    daemon = AnalyzerDaemon(os.path.join(folder, "analyzer.sock"), analyzer_factory=factory).start()
+    return daemon, created
+
+
+def test_remote_analyzer_round_trip():
+    """測試畫面經共享記憶體傳遞、各連線使用自己的商品設定、模型只建立一次"""
+    folder = tempfile.mkdtemp(prefix="test_daemon_")
+    daemon, created = start_daemon(folder)
+    try:
+        first = connect_analyzer("ocr_rectangle", {"母礦": ["母礦"]}, socket_path=daemon.socket_path)
+        second = connect_analyzer("ocr_rectangle", {"披風": ["披風"]}, socket_path=daemon.socket_path)
+        assert isinstance(first, RemoteAnalyzer) and first.strategy_type == "OCR_RECTANGLE"
+        assert created == ["ocr_rectangle"] and daemon.analyzers["ocr_rectangle"].warmed == 1
+
+        result, raw = first.analyze(Image.new('RGB', (400, 30), (100, 100, 100)))
+        assert result.full_text == "400x30 100" and result.matched_keywords == ["母礦"]
+        assert raw["mean"] == 100.0
+        assert first.parse_result(raw) is result
+
+        # 較大的畫面重新配置共享記憶體
+        result, raw = second.analyze(Image.new('RGB', (1200, 400), (20, 20, 20)))
+        assert result.full_text == "1200x400 20" and result.matched_keywords == ["披風"]
+        assert second.parse_result(dict(raw)).full_text == "1200x400 20"
+
+        status = first.client.ping()
+        assert status["frames"] == 2 and status["clients"] == 2 and status["analyzers"] == ["ocr_rectangle"]
+        assert connect_analyzer("gemini", {}, socket_path=daemon.socket_path) is None
+        first.close()
+        second.close()
+        print(f"OK 分析服務往返: {status['requests']} 個請求")
+    finally:
+        daemon.stop()
+        shutil.rmtree(folder)
+
+
+def test_daemon_lifecycle():
+    """測試服務不存在時返回None、舊socket檔清除、錯誤回覆與shutdown"""
+    folder = tempfile.mkdtemp(prefix="test_daemon_")
+    try:
+        socket_path = os.path.join(folder, "analyzer.sock")
+        assert connect_analyzer("ocr_rectangle", {}, socket_path=socket_path) is None
+
+        open(socket_path, 'w').close()
+        daemon, _ = start_daemon(folder)
+        client = DaemonClient(socket_path)
+        with pytest.raises(RuntimeError):
+            client.request({"op": "analyze", "analyzer": "gemini"})
+        with pytest.raises(RuntimeError):
+            AnalyzerDaemon(socket_path).bind()
+
+        assert client.request({"op": "shutdown"})["ok"]
+        client.close()
+        daemon.thread.join(5)
+        assert not daemon.thread.is_alive()
+        daemon.close()
+        assert not os.path.exists(socket_path)
+
+        message = encode_message({"op": "ping", "value": np.int64(3)}, CODEC_JSON)
+        assert HEADER.unpack(message[:HEADER.size])[0] == len(message) - HEADER.size
+        print("OK 服務生命週期")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_remote_forwards_timing_and_error_type():
+    """測試計時啟用時回傳服務端階段耗時、錯誤類型與類別名稱由服務端分析器決定"""
+    folder = tempfile.mkdtemp(prefix="test_daemon_")
+    daemon, _ = start_daemon(folder)
+    timer_was_enabled = pipeline_timer.enabled
+    try:
+        remote = connect_analyzer("ocr_rectangle", {"母礦": ["母礦"]}, socket_path=daemon.socket_path)
+        assert remote.analyzer_name == "_BrightnessAnalyzer"
+        assert remote.get_error_type("ERROR: timeout") == "OCR_RECTANGLE_ERROR"
+        assert remote.get_error_type("ERROR: quota") == "QUOTA" and remote.is_quota_error("quota")
+
+        pipeline_timer.configure(enabled=True)
+        pipeline_timer.reset()
+        remote.analyze(Image.new('RGB', (400, 30)))
+        stages = pipeline_timer.snapshot()
+        assert stages["ocr_recognize"]["count"] == 1 and stages["parse_match"]["count"] == 1
+
+        pipeline_timer.configure(enabled=False)
+        pipeline_timer.reset()
+        remote.analyze(Image.new('RGB', (400, 30)))
+        assert pipeline_timer.snapshot() == {}
+        remote.close()
+        print("OK 轉送階段耗時與錯誤類型")
+    finally:
+        pipeline_timer.configure(enabled=timer_was_enabled)
+        pipeline_timer.reset()
+        daemon.stop()
+        shutil.rmtree(folder)
+
+
+def test_remote_falls_back_to_local_analyzer():
+    """測試服務中斷且無法重新連線時改用本機分析器，未提供本機分析器時拋出錯誤"""
+    folder = tempfile.mkdtemp(prefix="test_daemon_")
+    daemon, _ = start_daemon(folder)
+    try:
+        remote = connect_analyzer("ocr_rectangle", {"母礦": ["母礦"]}, socket_path=daemon.socket_path,
+                                  fallback_factory=lambda: _LocalAnalyzer({"母礦": ["母礦"]}))
+        bare = connect_analyzer("ocr_rectangle", {}, socket_path=daemon.socket_path)
+        assert remote.analyze(Image.new('RGB', (400, 30)))[0].full_text == "400x30 0"
+
+        # 停止服務並中斷既有連線，模擬服務程序結束
+        daemon.stop()
+        remote.client.disconnect()
+        bare.client.disconnect()
+        result, raw = remote.analyze(Image.new('RGB', (400, 30), (50, 50, 50)))
+        assert result.full_text == "400x30 50" and remote.parse_result(raw).full_text == "400x30 50"
+        assert isinstance(remote.local_analyzer, _LocalAnalyzer) and remote.analyzer_name == "_LocalAnalyzer"
+        assert remote.get_error_type("quota") == "QUOTA"
+        with pytest.raises(OSError):
+            bare.analyze(Image.new('RGB', (400, 30)))
+        assert bare.get_error_type("ERROR") == "OCR_RECTANGLE_ERROR"
+        print("OK 服務中斷時改用本機分析器")
+    finally:
+        daemon.stop()
+        shutil.rmtree(folder)
+
+
+def test_clients_keep_their_own_box_detector():
+    """測試兩個監控程式共用服務時，白框快取不會把另一個連線的結果套用到本連線的畫面"""
+    folder = tempfile.mkdtemp(prefix="test_daemon_")
+    daemon = AnalyzerDaemon(os.path.join(folder, "analyzer.sock"),
+                            analyzer_factory=lambda analyzer_type: _BoxAnalyzer({})).start()
+    try:
+        first = connect_analyzer("ocr_rectangle", {}, socket_path=daemon.socket_path)
+        second = connect_analyzer("ocr_rectangle", {}, socket_path=daemon.socket_path)
+        # 第二個監控程式的畫面在同一位置也有白框，另外多一個白框
+        first_frame, second_frame = box_frame(50), box_frame(50, 300)
+        for _ in range(3):
+            assert first.analyze(first_frame)[1] == [[50, 10, 90, 26]]
+            assert second.analyze(second_frame)[1] == [[50, 10, 90, 26], [300, 10, 340, 26]]
+        first.close()
+        second.close()
+        print("OK 每個連線各自的白框檢測器")
+    finally:
+        daemon.stop()
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 常駐分析服務測試 ===")
+    test_remote_analyzer_round_trip()
+    test_daemon_lifecycle()
+    test_remote_forwards_timing_and_error_type()
+    test_remote_falls_back_to_local_analyzer()
+    test_clients_keep_their_own_box_detector()
+    print("所有測試通過")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試效能基準套件與合成廣播影像產生器"""
+
+import sys
+import os
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import numpy as np
+from benchmarks import BroadcastSpec, render_broadcast, generate_broadcast_set
+from benchmarks.run_benchmarks import run_benchmarks, compare_results
+
+
+def test_render_is_reproducible():
+    """測試相同規格產生相同影像，且包含白色頻道框"""
+    spec = BroadcastSpec(roi_width=800, roi_height=40, noise_level=8.0, seed=3)
+    a = np.asarray(render_broadcast(spec))
+    b = np.asarray(render_broadcast(spec))
+    assert a.shape == (40, 800, 3)
+    assert np.array_equal(a, b), "相同規格應產生相同影像"
+
+    clean = np.asarray(render_broadcast(BroadcastSpec()))
+    assert (clean.min(axis=2) == 255).sum() > 100, "影像應包含白色頻道框"
+    print("OK 合成影像可重現")
+
+
+def test_generate_broadcast_set():
+    """測試依ROI尺寸與雜訊強度產生影像集合"""
+    samples = generate_broadcast_set([(400, 30), (800, 40)], [0.0, 10.0], count=2)
+    assert len(samples) == 8
+    assert {image.size for _, image in samples} == {(400, 30), (800, 40)}
+    print(f"OK 產生 {len(samples)} 張影像")
+
+
+def test_white_box_is_detected():
+    """測試白框檢測器能找到合成影像中的頻道框"""
+    from rectangle_detector import RectangleDetectionStrategy
+    rectangles = RectangleDetectionStrategy().detect_white_rectangles(render_broadcast(BroadcastSpec()))
+    assert len(rectangles) == 1, f"應檢測到一個白框，實際: {len(rectangles)}"
+    print(f"OK 檢測到白框: {rectangles[0]['bbox']}")
+
+
+def test_run_benchmarks_json():
+    """測試基準結果格式與跨提交比較"""
+    report = run_benchmarks(iterations=1, roi_sizes=[(400, 30)], noise_levels=[0.0],
+                            samples_per_case=1, skip_ocr=True)
+    names = {entry["benchmark"] for entry in report["results"]}
+    assert "TextAnalyzer.find_matching_items" in names
+    assert "OCRAnalyzer.analyze" in report["skipped"]
+    for entry in report["results"]:
+        assert entry["p50_ms"] >= 0 and entry["count"] > 0
+
+    comparisons = compare_results(report, report)
+    assert comparisons and all(c["ratio"] == 1.0 for c in comparisons)
+    print(f"OK 基準項目: {len(report['results'])}")
+
+
+def test_compare_ocr_backends_summary():
+    """測試辨識後端比較以 torch 為基準計算一致率與延遲"""
+    from benchmarks.compare_ocr_backends import compare_backends
+    from ocr_backends import cached_model_path
+
+    def make_run(backend, texts, p50):
+        results = {("s", i): {"is_match": False, "full_text": text} for i, text in enumerate(texts)}
+        report = {"stage_latency": {"analyze_image": {"count": len(texts), "p50_ms": p50, "p95_ms": p50 * 2}},
+                  "pipeline_stages": {},
+                  "comparison": {"frames_compared": len(texts), "frames_changed": 1}}
+        return {"backend": backend, "actual_backend": backend, "reports": [report], "results": results}
+
+    summary = compare_backends([make_run("torch", ["a", "b", "c", "d"], 100.0),
+                                make_run("onnx_int8", ["a", "b", "c", "x"], 40.0)])
+    assert summary["torch"]["matches_baseline"] == 1.0
+    assert summary["onnx_int8"]["matches_baseline"] == 0.75
+    assert summary["onnx_int8"]["matches_recorded"] == 0.75
+    assert summary["onnx_int8"]["analyze_image"] == {"count": 4, "p50_ms": 40.0, "p95_ms": 80.0}
+    assert summary["onnx_int8"]["ocr_recognize"] == {"count": 0}
+
+    path = cached_model_path("cache", ["ch_tra", "en"], "onnx_int8")
+    assert os.path.dirname(path) == "cache" and path.endswith("_int8.onnx") and "ch_tra_en" in path
+    print("OK 辨識後端比較")
+
+
+def test_tune_torch_threads_recommendation():
+    """測試執行緒調校建議最快結果容許範圍內最少的執行緒數"""
+    from benchmarks.tune_torch_threads import default_thread_counts, recommend_threads
+    from ocr_backends import resolve_torch_runtime
+
+    assert default_thread_counts(6) == [1, 2, 4, 6]
+    assert default_thread_counts(1) == [1]
+    sweep = [{"threads": 1, "p50_ms": 300.0}, {"threads": 2, "p50_ms": 170.0},
+             {"threads": 4, "p50_ms": 160.0}, {"threads": 8, "p50_ms": 158.0}]
+    assert recommend_threads(sweep)["threads"] == 2
+    assert recommend_threads(sweep, tolerance=0.0)["threads"] == 8
+    assert recommend_threads([]) == {}
+
+    settings = resolve_torch_runtime("OCR_RECTANGLE", {"INTRA_OP_THREADS": 3})
+    assert settings["INTRA_OP_THREADS"] == 3 and settings["INFERENCE_MODE"] is True
+    print("OK 執行緒調校建議")
+
+
+def test_cpu_affinity_is_process_wide():
+    """測試從背景執行緒套用CPU親和性時，主執行緒與其他既有執行緒也一併受限"""
+    import threading
+    from ocr_backends import apply_torch_runtime
+
+    if not hasattr(os, "sched_setaffinity"):
+        print("SKIP 此平台不支援CPU親和性")
+        return
+    original = os.sched_getaffinity(0)
+    target = {min(original)}
+    release = threading.Event()
+    observed = {}
+
+    def worker():
+        release.wait(5)
+        observed["worker"] = os.sched_getaffinity(0)
+
+    waiting = threading.Thread(target=worker)
+    waiting.start()
+    loader = threading.Thread(target=lambda: observed.update(applied=apply_torch_runtime({"CPU_AFFINITY": sorted(target)})))
+    try:
+        loader.start()
+        loader.join()
+        release.set()
+        waiting.join()
+        assert observed["applied"]["cpu_affinity"] == sorted(target)
+        assert os.sched_getaffinity(0) == target
+        assert observed["worker"] == target
+    finally:
+        release.set()
+        os.sched_setaffinity(0, original)
+    print(f"OK CPU親和性套用到整個程序 {sorted(target)}")
+
+
+if __name__ == "__main__":
+    print("=== 效能基準套件測試 ===")
+    test_render_is_reproducible()
+    test_generate_broadcast_set()
+    test_white_box_is_detected()
+    test_run_benchmarks_json()
+    test_compare_ocr_backends_summary()
+    test_tune_torch_threads_recommendation()
+    test_cpu_affinity_is_process_wide()
+    print("所有測試通過")
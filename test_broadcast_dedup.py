@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試重複廣播去重索引"""
+
+import sys
+import os
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from broadcast_dedup import BroadcastDeduplicator, simhash, hamming_distance
+from text_analyzer import AnalysisResult
+
+
+def make_result(text, player="hihi5217", channel="1623", items=("母礦",)):
+    return AnalysisResult(
+        full_text=text,
+        is_match=True,
+        player_name=player,
+        channel_number=channel,
+        matched_items=[{"item_name": item, "keywords_found": [item]} for item in items]
+    )
+
+
+def test_simhash_tolerates_ocr_noise():
+    """測試模糊雜湊容忍少量OCR雜訊"""
+    a = simhash("hihi5217: 收購青銅母礦 鋼鐵母礦 大量收 價格私訊")
+    b = simhash("hihi5217 : 收購青銅母礦 鋼鐵母礦 大量收  價格私訊")
+    c = simhash("完全不同的廣播內容 WTS 披風 便宜賣")
+    assert a == b, "僅空白/標點差異應產生相同雜湊"
+    assert hamming_distance(a, c) > 6, "不同內容的雜湊距離應該很大"
+    print(f"OK 雜湊距離: 相同={hamming_distance(a, b)}, 不同={hamming_distance(a, c)}")
+
+
+def test_duplicate_updates_existing_entry():
+    """測試重複廣播更新既有記錄的次數和最後出現時間"""
+    dedup = BroadcastDeduplicator(window_seconds=600)
+    text = "hihi5217: 收購青銅母礦 鋼鐵母礦 大量收"
+
+    assert dedup.check(make_result(text), test_id=1, now=1000.0) is None, "第一次應該是新記錄"
+    entry = dedup.check(make_result(text + "!"), test_id=2, now=1060.0)
+    assert entry is not None, "相同廣播應該被判定為重複"
+    assert entry['test_id'] == 1 and entry['count'] == 2 and entry['last_seen'] == 1060.0
+
+    # 不同玩家或不同商品不應合併
+    assert dedup.check(make_result(text, player="other"), test_id=3, now=1070.0) is None
+    assert dedup.check(make_result(text, items=("催化劑",)), test_id=4, now=1080.0) is None
+    print("OK 重複廣播已合併到既有記錄")
+
+
+def test_sliding_window_expiry():
+    """測試超出滑動時間窗後重新視為新廣播"""
+    dedup = BroadcastDeduplicator(window_seconds=100)
+    text = "hihi5217: 收購母礦"
+
+    dedup.check(make_result(text), test_id=1, now=0.0)
+    assert dedup.check(make_result(text), test_id=2, now=90.0) is not None
+    # 時間窗從最後出現時間起算
+    assert dedup.check(make_result(text), test_id=3, now=180.0) is not None
+    assert dedup.check(make_result(text), test_id=4, now=400.0) is None, "超出時間窗應該是新記錄"
+    assert len(dedup) == 1
+    print("OK 滑動時間窗正確")
+
+
+if __name__ == "__main__":
+    print("=== 重複廣播去重測試 ===")
+    test_simhash_tolerates_ocr_noise()
+    test_duplicate_updates_existing_entry()
+    test_sliding_window_expiry()
+    print("所有測試通過")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試廣播全文搜尋"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from http.server import HTTPServer
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from scan_index import ScanIndex
+
+BROADCASTS = [
+    ("hihi5217", "收購 青銅母礦 一個500 私訊"),
+    ("Trader88", "WTB 盾牌防禦力60% 卷軸 x3"),
+    ("楓葉商人", "賣 披風 收 催化劑 歡迎密"),
+    ("小小盜賊", "WTS 乾淨披風 便宜賣"),
+]
+
+
+def build_index(folder, repeat=1):
+    """建立含有測試廣播的索引"""
+    index = ScanIndex(os.path.join(folder, "index.db"), batch_size=1000)
+    scan_id = 0
+    for _ in range(repeat):
+        for player, message in BROADCASTS:
+            scan_id += 1
+            index.add_scan("s1", scan_id, {"player_name": player, "full_text": f"{player} CH1623 : {message}",
+                                           "is_match": "收" in message})
+    index.flush()
+    return index
+
+
+def test_cjk_substring_search():
+    """測試中文子字串（含少於3字的詞）、價格與玩家名稱搜尋"""
+    folder = tempfile.mkdtemp(prefix="test_search_")
+    try:
+        index = build_index(folder)
+        assert index.fts_enabled
+        assert [r["player"] for r in index.search_text("青銅母礦")] == ["hihi5217"]
+        assert [r["player"] for r in index.search_text("母礦")] == ["hihi5217"], "2字詞應能搜尋"
+        assert [r["player"] for r in index.search_text("賣")] == ["小小盜賊", "楓葉商人"], "結果應按時間倒序"
+        assert [r["player"] for r in index.search_text("密")] == ["楓葉商人"], "行尾的單字應能搜尋"
+        assert [r["player"] for r in index.search_text("500")] == ["hihi5217"]
+        assert [r["player"] for r in index.search_text("wtb 60%")] == ["Trader88"], "多詞AND且不分大小寫"
+        assert index.search_text("披風 母礦") == []
+        assert [r["player"] for r in index.search_text("披風", matches_only=True)] == ["楓葉商人"]
+        index.close()
+        print("OK 中文子字串搜尋")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_rescan_updates_index_and_reports_truncation():
+    """測試重送同一掃描時更新列與全文索引，以及短詞展開截斷的回報"""
+    import scan_index
+    folder = tempfile.mkdtemp(prefix="test_search_")
+    try:
+        index = build_index(folder)
+        index.add_scan("s1", 1, {"player_name": "hihi5217", "full_text": "hihi5217 CH1623 : 收購 楓葉 一個300"})
+        index.flush()
+        assert index.stats()["scans"] == len(BROADCASTS), "重送不應新增列"
+        assert index.search_text("青銅母礦") == [], "舊文字應從全文索引移除"
+        assert [r["scan_id"] for r in index.search_text("楓葉 300")] == [1]
+
+        truncated = []
+        index.search_text("賣", truncated=truncated)
+        assert truncated == []
+        original = scan_index.MAX_SHORT_TERM_EXPANSION
+        scan_index.MAX_SHORT_TERM_EXPANSION = 1
+        try:
+            index.search_text("賣", truncated=truncated)
+        finally:
+            scan_index.MAX_SHORT_TERM_EXPANSION = original
+        assert truncated == ["賣"]
+        index.close()
+        print("OK 重送更新與截斷回報")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_incremental_and_latency():
+    """測試新掃描即時可搜尋，且大量資料下查詢延遲"""
+    folder = tempfile.mkdtemp(prefix="test_search_")
+    try:
+        index = build_index(folder, repeat=5000)
+        index.add_scan("s2", 1, {"player_name": "newbie", "full_text": "newbie : 收 獨特的新道具"})
+        index.flush()
+        assert [r["player"] for r in index.search_text("獨特")] == ["newbie"]
+
+        start = time.perf_counter()
+        for query in ("青銅母礦", "母礦", "披風 賣", "500"):
+            assert index.search_text(query, limit=50)
+        elapsed_ms = (time.perf_counter() - start) * 1000 / 4
+        index.close()
+        print(f"OK 20000行平均查詢 {elapsed_ms:.1f} ms")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_search_endpoint():
+    """測試配置API的 /api/search 端點"""
+    from config_api import ConfigAPIHandler
+    folder = tempfile.mkdtemp(prefix="test_search_")
+    server = HTTPServer(('localhost', 0), ConfigAPIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        ConfigAPIHandler.scan_index = build_index(folder)
+        url = f"http://localhost:{server.server_address[1]}/api/search?q={urllib.parse.quote('母礦')}"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            data = json.loads(response.read().decode('utf-8'))
+        assert data["success"] and data["results"][0]["player"] == "hihi5217"
+        assert data["truncatedTerms"] == []
+        print("OK /api/search 端點")
+    finally:
+        server.shutdown()
+        server.server_close()
+        ConfigAPIHandler.scan_index.close()
+        ConfigAPIHandler.scan_index = None
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 廣播全文搜尋測試 ===")
+    test_cjk_substring_search()
+    test_rescan_updates_index_and_reports_truncation()
+    test_incremental_and_latency()
+    test_search_endpoint()
+    print("所有測試通過")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試白框檢測調試資料的記錄與事後產生圖像"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import numpy as np
+from PIL import Image
+
+from debug_artifacts import DebugArtifactRecorder, frame_hash, load_metadata, render_overlays
+from rectangle_detector import RectangleDetectionDebugger, RectangleDetectionStrategy
+
+
+def make_image():
+    """建立深色背景、帶一個白框的RGB畫面"""
+    frame = np.full((60, 200, 3), 40, dtype=np.uint8)
+    frame[20:40, 50:110] = 255
+    return Image.fromarray(frame)
+
+
+def test_record_and_render():
+    """測試每幀只記錄中繼資料、相同畫面只保存一次、事後產生三種圖像"""
+    folder = tempfile.mkdtemp(prefix="test_debug_")
+    try:
+        recorder = DebugArtifactRecorder(folder)
+        image = make_image()
+        recorder.record(image, [(50, 20, 60, 20)], 245, contrast=1.5, sharpness=1.2)
+        recorder.record(image, [(50, 20, 60, 20)], 245, contrast=1.5, sharpness=1.2)
+        recorder.close()
+
+        entries = load_metadata(folder)
+        assert len(entries) == 2 and entries[0]["frame_hash"] == frame_hash(image)
+        assert entries[0]["rectangles"] == [[50, 20, 60, 20]] and entries[0]["threshold"] == 245
+        assert os.listdir(os.path.join(folder, "frames")) == [f"{frame_hash(image)}.png"]
+        assert not any(name.endswith(".png") for name in os.listdir(folder)), "記錄時不應產生圖像"
+
+        output = os.path.join(folder, "rendered")
+        assert render_overlays(folder, output, limit=1) == 1
+        names = sorted(os.listdir(output))
+        assert [name.split("_", 1)[1] for name in names] == ["binary.png", "masked.png", "rectangle_debug.png"]
+        binary = np.asarray(Image.open(os.path.join(output, names[0])))
+        assert binary[30, 80] == 255 and binary[5, 5] == 0
+        masked = np.asarray(Image.open(os.path.join(output, names[1])))
+        assert masked[30, 80].tolist() == [0, 0, 0]
+        print("OK 中繼資料記錄與事後產生圖像")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_detection_report_uses_config():
+    """測試檢測報告使用實際的檢測參數且預設不繪製圖片"""
+    folder = tempfile.mkdtemp(prefix="test_report_")
+    try:
+        image = make_image()
+        strategy = RectangleDetectionStrategy({"WHITE_THRESHOLD": 230})
+        rectangles = strategy.detect_white_rectangles(np.array(image))
+        vis_path, report_path = RectangleDetectionDebugger.save_detection_report(
+            image, rectangles, [], [], folder, config=strategy.config)
+        assert vis_path is None and os.listdir(folder) == [os.path.basename(report_path)]
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        assert report["detection_parameters"]["white_threshold"] == 230
+        assert report["frame_hash"] == frame_hash(image)
+        assert report["rectangles"][0]["bbox"] == [50, 20, 110, 40]
+        print("OK 檢測報告參數")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 調試資料測試 ===")
+    test_record_and_render()
+    test_detection_report_uses_config()
+    print("所有測試通過")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試由EasyOCR結果學習的字元模板辨識"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from glyph_recognizer import GlyphAtlas, GlyphRecognizer, align_cells
+from latin_ocr import load_font
+
+FONT = load_font(None, 14)
+VOCABULARY = ["WTB", "sell", "CH1623", "hihi5217", "Trader88", "cape", "buy", "100", "x3"]
+
+
+def render_line(words, width=400):
+    """渲染一行廣播，並返回模擬的高信心度EasyOCR結果"""
+    image = Image.new('RGB', (width, 30), (30, 30, 60))
+    draw = ImageDraw.Draw(image)
+    x = 5
+    results = []
+    for word in words:
+        draw.text((x, 7), word, fill=(240, 240, 240), font=FONT)
+        length = int(draw.textlength(word, font=FONT))
+        results.append({'text': word, 'confidence': 0.95,
+                        'bbox': [[x - 1, 2], [x + length + 1, 2], [x + length + 1, 28], [x - 1, 28]]})
+        x += length + 12
+    return image, results
+
+
+def test_learn_and_recognize():
+    """測試學習後不需EasyOCR即可辨識，未知字元時返回None"""
+    folder = tempfile.mkdtemp(prefix="test_glyph_")
+    try:
+        atlas_path = os.path.join(folder, "atlas.npz")
+        recognizer = GlyphRecognizer({"ATLAS_PATH": atlas_path, "VERIFY_EVERY": 0, "SAVE_EVERY": 1})
+        image, _ = render_line(["WTB", "sell"])
+        assert recognizer.recognize(image) is None, "模板庫為空時應交給EasyOCR"
+
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            recognizer.learn(*render_line(list(rng.choice(VOCABULARY, 4))))
+        assert os.path.exists(atlas_path)
+
+        for _ in range(10):
+            words = list(rng.choice(VOCABULARY, 4))
+            results = recognizer.recognize(render_line(words)[0])
+            assert [r['text'] for r in results] == words
+            assert all(r['confidence'] >= 0.85 for r in results)
+
+        # 沒學過的字元：交給EasyOCR
+        assert recognizer.recognize(render_line(["QZ"])[0]) is None
+
+        # 模板庫跨會話保存
+        reloaded = GlyphRecognizer({"ATLAS_PATH": atlas_path, "VERIFY_EVERY": 0})
+        assert len(reloaded.atlas) == len(recognizer.atlas)
+        assert [r['text'] for r in reloaded.recognize(render_line(["WTB", "100"])[0])] == ["WTB", "100"]
+        print(f"OK {recognizer.describe()}")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_verification_and_alignment():
+    """測試定期以EasyOCR驗證，以及片段與字元的對應"""
+    recognizer = GlyphRecognizer({"ATLAS_PATH": None, "VERIFY_EVERY": 2})
+    for _ in range(3):
+        recognizer.learn(*render_line(["WTB", "100"]))
+    image, results = render_line(["WTB", "100"])
+    assert recognizer.recognize(image) is not None
+    assert recognizer.recognize(image) is None, "第2幀應改用EasyOCR驗證"
+    recognizer.learn(image, results)
+    assert recognizer.stats["verified"] == 1 and recognizer.stats["agreed"] == 1
+
+    assert align_cells([[0, 5], [7, 12]], ["a", "b"]) == [[0, 5], [7, 12]]
+    # 等寬CJK字由多個片段組成時依字距分組
+    assert align_cells([[0, 5], [6, 12], [14, 26]], ["收", "購"]) == [[0, 12], [14, 26]]
+    assert align_cells([[0, 5], [6, 12], [14, 26]], ["a", "b"]) is None
+    assert align_cells([[0, 26]], ["收", "購"]) is None
+
+    atlas = GlyphAtlas()
+    atlas.add("a", np.ones(4, dtype=np.float32))
+    assert atlas.matrix(2)[0] == []
+    print("OK 驗證與片段對應")
+
+
+if __name__ == "__main__":
+    print("=== 字元模板辨識測試 ===")
+    test_learn_and_recognize()
+    test_verification_and_alignment()
+    print("所有測試通過")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試頻道編號的字型模板辨識"""
+
+import sys
+import os
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from latin_ocr import LatinGlyphEngine, load_font, otsu_threshold
+
+
+def render_channel_box(text, size=12, noise=0.0, seed=0):
+    """渲染白底深色數字的頻道框"""
+    image = Image.new('L', (size * len(text) + 10, size + 8), 255)
+    ImageDraw.Draw(image).text((5, 2), text, fill=40, font=load_font(None, size))
+    if noise:
+        pixels = np.asarray(image, dtype=np.float32) + np.random.default_rng(seed).normal(0, noise, (image.height, image.width))
+        image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    return image
+
+
+def test_recognize_channel_numbers():
+    """測試各尺寸的頻道編號在高信心度時都正確"""
+    engine = LatinGlyphEngine({"MIN_CONFIDENCE": 0.8})
+    rng = np.random.default_rng(1)
+    accepted = 0
+    for size in (11, 12, 13):
+        for _ in range(30):
+            text = str(rng.integers(1, 4000))
+            result, confidence = engine.recognize(render_channel_box(text, size))
+            if confidence >= engine.min_confidence:
+                assert result == text, f"高信心度結果錯誤: {text} -> {result} ({confidence:.2f})"
+                accepted += 1
+    assert accepted >= 70, f"高信心度比例過低: {accepted}/90"
+
+    result, confidence = engine.recognize(render_channel_box("1623", noise=8.0))
+    assert result == "1623" and confidence >= engine.min_confidence
+    print(f"OK 模板辨識 {accepted}/90 達到信心度門檻")
+
+
+def test_low_confidence_and_empty():
+    """測試非數字內容信心度低、空白區域返回空字串"""
+    engine = LatinGlyphEngine()
+    box = Image.new('L', (60, 20), 255)
+    ImageDraw.Draw(box).rectangle((10, 4, 40, 15), fill=40)
+    assert engine.recognize(box)[1] < engine.min_confidence
+    assert engine.recognize(Image.new('L', (60, 20), 255)) == ("", 0.0)
+
+    gray = np.array([[10] * 5 + [200] * 5], dtype=np.uint8)
+    assert 10 <= otsu_threshold(gray) < 200
+    print("OK 低信心度與空白區域")
+
+
+def test_engine_requires_font_and_never_overrides_easyocr():
+    """測試未指定遊戲字型時不啟用，且白框數字只在EasyOCR沒有讀到頻道時使用"""
+    from ocr_rectangle_analyzer import OCRRectangleAnalyzer
+
+    assert not LatinGlyphEngine().enabled
+    assert not LatinGlyphEngine({"ENABLED": True}).enabled
+    assert LatinGlyphEngine({"ENABLED": True, "FONT_PATH": "game.ttf"}).enabled
+
+    analyzer = OCRRectangleAnalyzer.__new__(OCRRectangleAnalyzer)
+    assert analyzer.resolve_channel_number("未知", "1623") == "1623"
+    assert analyzer.resolve_channel_number("CH1623", "1623") == "CH1623"
+    assert analyzer.resolve_channel_number("CHO225", "1623") == "CHO225"
+    assert analyzer.resolve_channel_number("CH1623", "") == "CH1623"
+    print("OK 未指定字型不啟用、不覆蓋EasyOCR頻道")
+
+
+if __name__ == "__main__":
+    print("=== 頻道編號模板辨識測試 ===")
+    test_recognize_channel_numbers()
+    test_low_confidence_and_empty()
+    test_engine_requires_font_and_never_overrides_easyocr()
+    print("所有測試通過")
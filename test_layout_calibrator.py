@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試版面學習與文字帶裁切"""
+
+import sys
+import os
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import numpy as np
+from PIL import Image
+
+from layout_calibrator import LayoutCalibrator
+
+
+def make_frame(text_end=300, text_rows=(40, 60), width=600, height=200):
+    """建立深色背景、文字列位於 text_rows、白框在左側的RGB畫面"""
+    frame = np.full((height, width, 3), 30, dtype=np.uint8)
+    frame[text_rows[0]:text_rows[1], 50:90] = 255
+    frame[text_rows[0] + 4:text_rows[1] - 4, 100:text_end:3] = 200
+    return Image.fromarray(frame)
+
+
+def test_calibrate_and_crop():
+    """測試校正期間不裁切，完成後只保留文字帶"""
+    calibrator = LayoutCalibrator(calibration_frames=3, revalidate_every=100, margin=5)
+    for _ in range(3):
+        image, cropped = calibrator.prepare(make_frame())
+        assert not cropped and image.size == (600, 200)
+    assert calibrator.band == (45, 35, 304, 65)
+
+    image, cropped = calibrator.prepare(make_frame())
+    assert cropped and image.size == (259, 30)
+    report = calibrator.report()
+    assert report["pixel_reduction"] > 0.9
+
+    calibrator.record_analysis(100.0, cropped=False)
+    calibrator.record_analysis(20.0, cropped=True)
+    assert calibrator.report()["time_reduction"] == 0.8
+    print(f"OK {calibrator.describe()}")
+
+
+def test_revalidate_expands_band():
+    """測試文字超出文字帶時擴大範圍，畫面尺寸改變時重新校正"""
+    calibrator = LayoutCalibrator(calibration_frames=2, revalidate_every=2, margin=0)
+    calibrator.prepare(make_frame())
+    calibrator.prepare(make_frame())
+    assert calibrator.band == (50, 40, 299, 60)
+
+    calibrator.prepare(make_frame(text_end=500))
+    assert calibrator.expansions == 0, "未到檢查間隔"
+    calibrator.prepare(make_frame(text_end=500))
+    assert calibrator.expansions == 1 and calibrator.band == (50, 40, 500, 60)
+
+    # 沒有文字的校正不產生文字帶
+    empty = LayoutCalibrator(calibration_frames=2)
+    blank = Image.fromarray(np.full((100, 100, 3), 30, dtype=np.uint8))
+    empty.prepare(blank)
+    empty.prepare(blank)
+    assert not empty.calibrated
+
+    calibrator.prepare(make_frame(width=700))
+    assert not calibrator.calibrated
+    print("OK 文字帶擴大與重新校正")
+
+
+if __name__ == "__main__":
+    print("=== 版面學習測試 ===")
+    test_calibrate_and_crop()
+    test_revalidate_expands_band()
+    print("所有測試通過")
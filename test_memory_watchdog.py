@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試記憶體監看與合併器的記錄釋放"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from memory_watchdog import MemoryWatchdog, estimate_size, get_rss_bytes
+from real_time_merger import RealTimeMerger
+
+
+def make_merger(folder, count=10):
+    """建立含有截圖記錄的合併器，每3筆有一筆匹配"""
+    from PIL import Image
+    merger = RealTimeMerger(folder)
+    merger.save_combined_results = lambda: None  # 測試不需要每次寫出JSON
+    for i in range(count):
+        screenshot_path = os.path.join(folder, f"monitor_{i:03d}.png")
+        Image.new('RGB', (200, 30), (i * 10, 0, 0)).save(screenshot_path)
+        is_match = i % 3 == 0
+        merger.add_test_result(i, screenshot_path, {"is_match": is_match, "full_text": f"text {i}"})
+    return merger
+
+
+def test_estimate_size():
+    """測試遞迴大小估算"""
+    small = estimate_size({"a": "x"})
+    large = estimate_size({"a": "x" * 100000, "b": ["y" * 1000] * 3})
+    assert large > small + 100000
+    print(f"OK 大小估算: {small} / {large}")
+
+
+def test_merger_release_and_spill():
+    """測試釋放影像與寫出舊記錄後仍可取得全部記錄"""
+    folder = tempfile.mkdtemp(prefix="test_memory_")
+    try:
+        merger = make_merger(folder, 10)
+        # 分段儲存會刪除未匹配截圖，只釋放匹配記錄的影像
+        assert merger.release_images(keep_recent=2, matches_only=True) > 0
+        assert all(bool(r['image_base64']) != r['has_match'] for r in merger.merged_results[:-2])
+        assert merger.release_images(keep_recent=2) > 0
+        assert all(r['image_base64'] is None for r in merger.merged_results[:-2])
+        assert all(r['image_base64'] for r in merger.merged_results[-2:])
+
+        spilled = merger.spill_records(keep_recent=2)
+        assert spilled == 5, f"應寫出5筆未匹配舊記錄，實際 {spilled}"
+        assert merger.total_count() == 10
+        assert all(r['has_match'] for r in merger.merged_results[:-2]), "匹配記錄應保留在記憶體"
+        assert sorted(r['test_id'] for r in merger.all_results()) == list(range(10))
+        print(f"OK 寫出 {spilled} 筆, 記憶體內剩 {len(merger.merged_results)} 筆")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_tracemalloc_starts_on_limit():
+    """測試預設不追蹤配置，超過上限後才啟動tracemalloc"""
+    import tracemalloc
+    watchdog = MemoryWatchdog(None, soft_limit_mb=None, hard_limit_mb=None)
+    watchdog.start()
+    try:
+        assert not tracemalloc.is_tracing(), "預設不應啟動tracemalloc"
+        assert watchdog.sample()["top_allocations"] == []
+        watchdog.soft_limit_bytes = 1
+        watchdog.sample()
+        assert tracemalloc.is_tracing()
+        assert watchdog.sample()["top_allocations"], "超過上限後應記錄配置位置"
+    finally:
+        watchdog.stop()
+    assert not tracemalloc.is_tracing()
+    print("OK 超過上限才啟動tracemalloc")
+
+
+def test_watchdog_limits_trigger_actions():
+    """測試超過上限時依序執行軟、硬上限動作並記錄到會話資料夾"""
+    folder = tempfile.mkdtemp(prefix="test_memory_")
+    try:
+        calls = []
+        watchdog = MemoryWatchdog(folder, soft_limit_mb=0.001, hard_limit_mb=None, use_tracemalloc=True)
+        watchdog.register_structure("queue", lambda: 3)
+        watchdog.register_action("soft", "release", lambda: calls.append("soft") or 1)
+        watchdog.register_action("hard", "spill", lambda: calls.append("hard") or 2)
+        watchdog.start()
+        try:
+            record = watchdog.sample()
+        finally:
+            watchdog.stop()
+        assert record["limit_level"] == "soft" and calls == ["soft"]
+        assert record["structures"]["queue"] == 3
+        assert record["top_allocations"], "應記錄tracemalloc配置位置"
+
+        watchdog.hard_limit_bytes = 1
+        assert watchdog.sample()["limit_level"] == "hard"
+        watchdog.stop()  # 超過上限時會重新啟動tracemalloc
+        assert calls == ["soft", "soft", "hard"], "硬上限應先執行軟上限動作"
+
+        with open(os.path.join(folder, "memory_samples.jsonl"), 'r', encoding='utf-8') as f:
+            assert len([json.loads(line) for line in f]) == 2
+        assert watchdog.maybe_sample() is None, "未達間隔不應取樣"
+        print(f"OK 上限動作: {calls}, RSS: {get_rss_bytes()}")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 記憶體監看測試 ===")
+    test_estimate_size()
+    test_merger_release_and_spill()
+    test_tracemalloc_starts_on_limit()
+    test_watchdog_limits_trigger_actions()
+    print("所有測試通過")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試測試結果合併工具的平行載入與串流報告"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from PIL import Image
+
+from test_results_merger import TestResultsMerger
+
+
+def make_test_folder(count=12):
+    """建立整合測試資料夾：每3筆中有1筆錯誤，其餘有分析結果"""
+    folder = tempfile.mkdtemp(prefix="test_merger_tool_")
+    for i in range(count):
+        base = os.path.join(folder, f"test_{i:03d}_20250101_120000_{i:03d}")
+        Image.new('RGB', (1600, 900), 'white').save(f"{base}_screenshot.png")
+        if i % 3 == 2:
+            with open(f"{base}_error.json", 'w', encoding='utf-8') as f:
+                json.dump({"error": f"錯誤 {i}"}, f, ensure_ascii=False)
+        else:
+            with open(f"{base}_analysis.json", 'w', encoding='utf-8') as f:
+                json.dump({"parsed_result": {"is_match": i == 0, "player_name": "hihi", "channel_number": "CH1",
+                                             "matched_items": [{"item_name": "催化劑"}] if i == 0 else [],
+                                             "confidence": 0.9, "full_text": "收催化劑"}}, f, ensure_ascii=False)
+    with open(os.path.join(folder, "test_summary.json"), 'w', encoding='utf-8') as f:
+        json.dump({"test_start_time": "20250101_120000", "total_runs": count}, f)
+    return folder
+
+
+def test_parallel_load_and_html_report():
+    """測試單次掃描索引、平行載入順序與縮圖報告"""
+    folder = make_test_folder()
+    try:
+        merger = TestResultsMerger(folder, max_workers=4)
+        assert merger.load_test_data()
+        assert len(merger.file_index) == 12
+        assert [r['test_id'] for r in merger.results] == list(range(12)), "結果應保持排序"
+        assert sum(r['has_error'] for r in merger.results) == 4
+        assert all(r['thumbnail_base64'] and r['image_base64'] is None for r in merger.results)
+
+        assert merger.generate_html_report()
+        html_path = os.path.join(folder, "test_report.html")
+        with open(html_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        assert html.count('class="test-item') == 12 and "{TEST_ITEMS}" not in html
+        assert "href='test_000_20250101_120000_000_screenshot.png'" in html
+        # 縮圖應遠小於嵌入原圖
+        full_size = sum(len(merger.image_to_base64(os.path.join(folder, r['screenshot_file']))) for r in merger.results)
+        assert os.path.getsize(html_path) < full_size
+        assert {"掃描目錄", "載入資料與縮圖", "寫出HTML報告"} <= set(merger.phase_times)
+        print(f"OK HTML報告 {os.path.getsize(html_path)} bytes, 階段: {merger.phase_times}")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_streamed_json_report():
+    """測試串流JSON報告包含完整base64圖片"""
+    folder = make_test_folder(count=5)
+    try:
+        merger = TestResultsMerger(folder, max_workers=1)
+        assert merger.load_test_data()
+        assert merger.generate_json_report()
+        with open(os.path.join(folder, "merged_results.json"), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        assert data["total_tests"] == 5 and len(data["results"]) == 5
+        assert data["summary"]["total_runs"] == 5
+        assert all(r["image_base64"] for r in data["results"])
+        assert merger.results[0]["image_base64"] is None, "完整圖片不應留在記憶體中"
+
+        result = merger.process_test_file(merger.file_index["test_002_20250101_120000_002"]["screenshot"])
+        assert result["has_error"] and not result["has_analysis"]
+        print("OK 串流JSON報告")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 合併工具測試 ===")
+    test_parallel_load_and_html_report()
+    test_streamed_json_report()
+    print("所有測試通過")
@@ -121,7 +121,7 @@ def test_with_screenshot():
         else:
             print("\nNO 未發現交易機會")
             
-        print(f"\n調試圖像已保存到: test_rectangle_debug/")
+        print(f"\n調試資料已保存到: test_rectangle_debug/ (執行 python debug_artifacts.py test_rectangle_debug 產生圖像)")
         
         return True
         
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試流程各階段計時工具"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import pipeline_timing
+from pipeline_timing import PipelineTimer, HISTOGRAM_BUCKETS_MS, pipeline_timer, timed_readtext
+
+
+class FakeReader:
+    """模擬 EasyOCR Reader 的公開 detect / recognize / readtext"""
+
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, img, min_size=20, text_threshold=0.7, low_text=0.4, reformat=True):
+        self.calls.append(("detect", {"min_size": min_size, "text_threshold": text_threshold, "low_text": low_text}))
+        return [[[0, 10, 0, 10]]], [[]]
+
+    def recognize(self, img_cv_grey, horizontal_list, free_list, detail=1, reformat=True):
+        self.calls.append(("recognize", {"horizontal_list": horizontal_list, "detail": detail}))
+        return [([[0, 0], [10, 0], [10, 10], [0, 10]], "text", 0.9)]
+
+    def readtext(self, image, **kwargs):
+        self.calls.append(("readtext", kwargs))
+        return [([[0, 0], [10, 0], [10, 10], [0, 10]], "text", 0.9)]
+
+
+def test_disabled_timer_records_nothing():
+    """測試停用時不記錄任何資料"""
+    timer = PipelineTimer(enabled=False)
+    with timer.span("capture"):
+        pass
+    assert timer.snapshot() == {}
+    print("OK 停用時不記錄")
+
+
+def test_span_percentiles():
+    """測試啟用時記錄各階段並計算百分位數"""
+    timer = PipelineTimer(enabled=True, window_size=100)
+    for duration in range(1, 101):
+        timer.record("ocr_recognize", float(duration))
+    with timer.span("capture"):
+        time.sleep(0.01)
+
+    snapshot = timer.snapshot()
+    assert snapshot["ocr_recognize"]["count"] == 100
+    assert 49 <= snapshot["ocr_recognize"]["p50_ms"] <= 51
+    assert 98 <= snapshot["ocr_recognize"]["p99_ms"] <= 100
+    assert snapshot["capture"]["p50_ms"] >= 9
+    print(f"OK 百分位數: {snapshot['ocr_recognize']}")
+
+
+def test_rolling_window_and_histogram():
+    """測試滾動視窗只保留最新樣本，直方圖累積所有樣本"""
+    timer = PipelineTimer(enabled=True, window_size=10)
+    for _ in range(50):
+        timer.record("persist", 1000.0)
+    for _ in range(10):
+        timer.record("persist", 1.0)
+
+    assert timer.snapshot()["persist"]["p99_ms"] == 1.0, "舊樣本應該被移出視窗"
+    buckets, count, total_ms = timer.histograms()["persist"]
+    assert count == 60 and sum(buckets) == 60
+    assert buckets[0] == 10 and buckets[HISTOGRAM_BUCKETS_MS.index(1000)] == 50
+    print("OK 滾動視窗與直方圖")
+
+
+def test_metrics_line_written():
+    """測試定期在會話資料夾輸出指標行"""
+    folder = tempfile.mkdtemp(prefix="test_timing_")
+    try:
+        timer = PipelineTimer(enabled=True, metrics_interval=3600)
+        timer.record("capture", 5.0)
+        assert not timer.maybe_write_metrics(folder), "未達間隔不應輸出"
+        assert timer.maybe_write_metrics(folder, {"scans": 1}, force=True)
+
+        with open(os.path.join(folder, "pipeline_metrics.jsonl"), 'r', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 1 and lines[0]["scans"] == 1 and "capture" in lines[0]["stages"]
+        print("OK 指標行已輸出")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_timed_readtext_uses_public_detect_and_recognize():
+    """測試計時時以公開的 detect / recognize 分段，參數依簽名分配；舊版本退回 readtext"""
+    original_version = pipeline_timing._easyocr_version
+    try:
+        pipeline_timing._easyocr_version = lambda: "1.7.1"
+        reader = FakeReader()
+        with pipeline_timer.capture() as stages:
+            results = timed_readtext(reader, "image", min_size=5, text_threshold=0.6, detail=1)
+        assert results[0][1] == "text"
+        assert [name for name, _ in stages] == ["ocr_detect", "ocr_recognize"]
+        assert reader.calls[0] == ("detect", {"min_size": 5, "text_threshold": 0.6, "low_text": 0.4})
+        assert reader.calls[1] == ("recognize", {"horizontal_list": [[0, 10, 0, 10]], "detail": 1})
+
+        pipeline_timing._easyocr_version = lambda: "1.3.2"
+        reader = FakeReader()
+        with pipeline_timer.capture() as stages:
+            timed_readtext(reader, "image", min_size=5)
+        assert [name for name, _ in stages] == ["ocr_recognize"]
+        assert reader.calls == [("readtext", {"min_size": 5})]
+        print("OK readtext 分段計時")
+    finally:
+        pipeline_timing._easyocr_version = original_version
+
+
+if __name__ == "__main__":
+    print("=== 流程計時工具測試 ===")
+    test_disabled_timer_records_nothing()
+    test_span_percentiles()
+    test_rolling_window_and_histogram()
+    test_metrics_line_written()
+    test_timed_readtext_uses_public_detect_and_recognize()
+    print("所有測試通過")
@@ -1,21 +1,66 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-"""測試結果合併工具 - 將測試結果和影像合併為方便調試的格式"""
+"""測試結果合併工具 - 將測試結果和影像合併為方便調試的格式
+
+只掃描一次資料夾建立 {測試名稱: 相關檔案} 索引，再以執行緒池平行載入
+JSON 與產生縮圖。HTML報告逐項串流寫出，並輸出各階段耗時。
+"""
 
 import os
+import io
 import json
 import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import re
 
+from PIL import Image
+
+# 測試檔案後綴 -> 索引欄位
+FILE_SUFFIXES = {
+    "_screenshot.png": "screenshot",
+    "_analysis.json": "analysis",
+    "_error.json": "error",
+    "_debug.txt": "debug"
+}
+
+
 class TestResultsMerger:
     """測試結果合併器"""
     
-    def __init__(self, test_folder_path):
+    def __init__(self, test_folder_path, max_workers=8, thumbnail_size=(480, 270), embed_full_images=False):
         self.test_folder = Path(test_folder_path)
         self.results = []
-        
+        self.summary = {"test_start_time": "未知", "total_runs": 0}
+        self.file_index = {}
+        self.max_workers = max_workers
+        self.thumbnail_size = thumbnail_size
+        self.embed_full_images = embed_full_images
+        self.phase_times = {}
+        
+    def record_phase(self, phase, start_time):
+        """記錄階段耗時（秒）"""
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + time.perf_counter() - start_time
+    
+    def print_phase_times(self):
+        """輸出各階段耗時"""
+        for phase, seconds in self.phase_times.items():
+            print(f"[TIME] {phase}: {seconds:.2f}s")
+    
+    def build_file_index(self):
+        """只掃描一次資料夾，建立 {測試名稱: {screenshot/analysis/error/debug: 路徑}} 索引"""
+        index = {}
+        with os.scandir(self.test_folder) as entries:
+            for entry in entries:
+                for suffix, kind in FILE_SUFFIXES.items():
+                    if entry.name.endswith(suffix):
+                        index.setdefault(entry.name[:-len(suffix)], {})[kind] = Path(entry.path)
+                        break
+        self.file_index = index
+        return index
+    
     def load_test_data(self):
         """載入測試資料夾中的所有文件"""
         print(f"載入測試資料夾: {self.test_folder}")
@@ -29,45 +74,36 @@ class TestResultsMerger:
         if summary_file.exists():
             with open(summary_file, 'r', encoding='utf-8') as f:
                 self.summary = json.load(f)
-        else:
-            self.summary = {"test_start_time": "未知", "total_runs": 0}
-        
-        # 獲取所有測試文件
-        screenshot_files = list(self.test_folder.glob("*_screenshot.png"))
         
-        print(f"找到 {len(screenshot_files)} 個截圖文件")
+        start_time = time.perf_counter()
+        index = self.build_file_index()
+        base_names = sorted(name for name, files in index.items() if "screenshot" in files)
+        self.record_phase("掃描目錄", start_time)
+        print(f"找到 {len(base_names)} 個截圖文件")
         
-        # 為每個截圖找到對應的分析結果
-        for screenshot_file in sorted(screenshot_files):
-            test_result = self.process_test_file(screenshot_file)
-            if test_result:
-                self.results.append(test_result)
+        # 平行載入分析結果與縮圖，map 保持原本的排序
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            loaded = executor.map(lambda name: self.process_entry(name, index[name]), base_names)
+            self.results = [result for result in loaded if result]
+        self.record_phase("載入資料與縮圖", start_time)
         
         print(f"成功載入 {len(self.results)} 個測試結果")
         return len(self.results) > 0
     
     def process_test_file(self, screenshot_file):
         """處理單個測試文件"""
-        base_name = screenshot_file.stem.replace("_screenshot", "")
-        
-        # 尋找對應的分析文件
-        analysis_file = None
-        error_file = None
-        debug_file = None
-        
-        for suffix in ["_analysis.json", "_error.json"]:
-            candidate = self.test_folder / f"{base_name}{suffix}"
-            if candidate.exists():
-                if suffix == "_analysis.json":
-                    analysis_file = candidate
-                elif suffix == "_error.json":
-                    error_file = candidate
-        
-        # 尋找debug文件
-        debug_candidate = self.test_folder / f"{base_name}_debug.txt"
-        if debug_candidate.exists():
-            debug_file = debug_candidate
-        
+        screenshot_file = Path(screenshot_file)
+        base_name = screenshot_file.name[:-len("_screenshot.png")]
+        files = self.file_index.get(base_name)
+        if files is None:
+            files = {kind: self.test_folder / f"{base_name}{suffix}" for suffix, kind in FILE_SUFFIXES.items()}
+            files = {kind: path for kind, path in files.items() if path.exists()}
+        files["screenshot"] = screenshot_file
+        return self.process_entry(base_name, files)
+    
+    def process_entry(self, base_name, files):
+        """依索引中的檔案建立單個測試結果"""
         # 提取測試ID和時間戳
         match = re.search(r'test_(\d+)_(\d+_\d+_\d+)', base_name)
         if match:
@@ -78,30 +114,20 @@ class TestResultsMerger:
             timestamp = "未知"
         
         # 載入分析結果
-        analysis_data = None
-        error_data = None
+        analysis_data = self.load_json(files.get("analysis"))
+        error_data = self.load_json(files.get("error"))
         debug_content = None
-        
-        if analysis_file:
-            with open(analysis_file, 'r', encoding='utf-8') as f:
-                analysis_data = json.load(f)
-        
-        if error_file:
-            with open(error_file, 'r', encoding='utf-8') as f:
-                error_data = json.load(f)
-        
-        if debug_file:
-            with open(debug_file, 'r', encoding='utf-8') as f:
+        if files.get("debug"):
+            with open(files["debug"], 'r', encoding='utf-8') as f:
                 debug_content = f.read()
         
-        # 轉換圖片為base64
-        image_base64 = self.image_to_base64(screenshot_file)
-        
+        screenshot_file = files["screenshot"]
         return {
             "test_id": test_id,
             "timestamp": timestamp,
             "screenshot_file": screenshot_file.name,
-            "image_base64": image_base64,
+            "thumbnail_base64": self.image_to_thumbnail(screenshot_file),
+            "image_base64": self.image_to_base64(screenshot_file) if self.embed_full_images else None,
             "analysis_data": analysis_data,
             "error_data": error_data,
             "debug_content": debug_content,
@@ -110,6 +136,13 @@ class TestResultsMerger:
             "has_debug": debug_content is not None
         }
     
+    def load_json(self, path):
+        """讀取JSON檔案，不存在時返回None"""
+        if not path:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
     def image_to_base64(self, image_path):
         """將圖片轉換為base64編碼"""
         try:
@@ -120,23 +153,40 @@ class TestResultsMerger:
             print(f"警告：無法讀取圖片 {image_path}: {e}")
             return None
     
+    def image_to_thumbnail(self, image_path):
+        """產生JPEG縮圖並轉換為base64編碼"""
+        try:
+            with Image.open(image_path) as image:
+                image.thumbnail(self.thumbnail_size)
+                buffer = io.BytesIO()
+                image.convert('RGB').save(buffer, format='JPEG', quality=75)
+                return base64.b64encode(buffer.getvalue()).decode('utf-8')
+        except Exception as e:
+            print(f"警告：無法產生縮圖 {image_path}: {e}")
+            return None
+    
     def generate_html_report(self, output_file="test_report.html"):
-        """生成HTML報告"""
+        """生成HTML報告（逐項串流寫出）"""
         if not self.results:
             print("沒有測試結果可以生成報告")
             return False
         
-        html_content = self.create_html_template()
-        
+        start_time = time.perf_counter()
+        header, footer = self.create_html_template().split("{TEST_ITEMS}")
         output_path = self.test_folder / output_file
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            f.write(header)
+            for result in sorted(self.results, key=lambda x: x['test_id']):
+                f.write(self.generate_test_item(result))
+            f.write(footer)
+        self.record_phase("寫出HTML報告", start_time)
         
         print(f"HTML報告已生成: {output_path}")
+        self.print_phase_times()
         return True
     
     def create_html_template(self):
-        """創建HTML模板"""
+        """創建HTML模板（測試項目位置為 {TEST_ITEMS}）"""
         # 統計信息
         total_tests = len(self.results)
         successful_tests = len([r for r in self.results if r['has_analysis']])
@@ -333,7 +383,7 @@ class TestResultsMerger:
     </div>
     
     <div class="results">
-        {self.generate_test_items()}
+        {{TEST_ITEMS}}
     </div>
     
     <script>
@@ -379,40 +429,51 @@ class TestResultsMerger:
     
     def generate_test_items(self):
         """生成測試項目的HTML"""
-        items_html = []
+        return '\n'.join(self.generate_test_item(result)
+                         for result in sorted(self.results, key=lambda x: x['test_id']))
+    
+    def generate_test_item(self, result):
+        """生成單個測試項目的HTML"""
+        # 判斷測試狀態
+        is_success = result['has_analysis']
+        is_error = result['has_error']
+        has_match = False
+        
+        if result['analysis_data'] and result['analysis_data'].get('parsed_result'):
+            has_match = result['analysis_data']['parsed_result'].get('is_match', False)
+        
+        # 設定樣式類
+        header_class = "success" if is_success else "error"
+        item_classes = ["test-item"]
+        if is_success:
+            item_classes.append("success")
+        if is_error:
+            item_classes.append("error")
+        if has_match:
+            item_classes.append("match")
+        
+        # 狀態徽章
+        if is_success:
+            status_badge = '<span class="status-badge status-success">分析成功</span>'
+        else:
+            status_badge = '<span class="status-badge status-error">分析失敗</span>'
         
-        for result in sorted(self.results, key=lambda x: x['test_id']):
-            # 判斷測試狀態
-            is_success = result['has_analysis']
-            is_error = result['has_error']
-            has_match = False
-            
-            if result['analysis_data'] and result['analysis_data'].get('parsed_result'):
-                has_match = result['analysis_data']['parsed_result'].get('is_match', False)
-            
-            # 設定樣式類
-            header_class = "success" if is_success else "error"
-            item_classes = ["test-item"]
-            if is_success:
-                item_classes.append("success")
-            if is_error:
-                item_classes.append("error")
-            if has_match:
-                item_classes.append("match")
-            
-            # 狀態徽章
-            if is_success:
-                status_badge = '<span class="status-badge status-success">分析成功</span>'
-            else:
-                status_badge = '<span class="status-badge status-error">分析失敗</span>'
-            
-            if has_match:
-                status_badge += ' <span class="status-badge status-success">找到匹配</span>'
-            
-            # 生成分析結果顯示
-            analysis_html = self.generate_analysis_html(result)
-            
-            item_html = f"""
+        if has_match:
+            status_badge += ' <span class="status-badge status-success">找到匹配</span>'
+        
+        # 生成分析結果顯示
+        analysis_html = self.generate_analysis_html(result)
+        
+        # 優先使用縮圖，點擊開啟原始截圖
+        if result.get('thumbnail_base64'):
+            image_html = (f"<a href='{result['screenshot_file']}' target='_blank'>"
+                          f"<img src='data:image/jpeg;base64,{result['thumbnail_base64']}' alt='測試截圖' loading='lazy'></a>")
+        elif result.get('image_base64'):
+            image_html = f"<img src='data:image/png;base64,{result['image_base64']}' alt='測試截圖'>"
+        else:
+            image_html = "<p>圖片載入失敗</p>"
+        
+        return f"""
         <div class="{' '.join(item_classes)}">
             <div class="test-header {header_class}">
                 <div>
@@ -426,7 +487,7 @@ class TestResultsMerger:
             <div class="test-content">
                 <div class="image-section">
                     <h4>截圖</h4>
-                    {"<img src='data:image/png;base64," + result['image_base64'] + "' alt='測試截圖'>" if result['image_base64'] else "<p>圖片載入失敗</p>"}
+                    {image_html}
                     <p style="font-size: 12px; color: #666; margin-top: 10px;">
                         文件: {result['screenshot_file']}
                     </p>
@@ -440,9 +501,6 @@ class TestResultsMerger:
             </div>
         </div>
 """
-            items_html.append(item_html)
-        
-        return '\n'.join(items_html)
     
     def generate_analysis_html(self, result):
         """生成分析結果HTML"""
@@ -516,23 +574,37 @@ class TestResultsMerger:
         return '\n'.join(html_parts)
     
     def generate_json_report(self, output_file="merged_results.json"):
-        """生成合併的JSON報告（包含base64圖片）"""
+        """生成合併的JSON報告（包含base64圖片，逐項串流寫出）"""
         if not self.results:
             print("沒有測試結果可以生成JSON報告")
             return False
         
-        merged_data = {
-            "summary": self.summary,
-            "generation_time": datetime.now().isoformat(),
-            "total_tests": len(self.results),
-            "results": self.results
-        }
+        def with_full_image(result):
+            if result.get('image_base64'):
+                return result
+            return dict(result, image_base64=self.image_to_base64(self.test_folder / result['screenshot_file']))
         
+        start_time = time.perf_counter()
         output_path = self.test_folder / output_file
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(merged_data, f, ensure_ascii=False, indent=2)
+            header = json.dumps({
+                "summary": self.summary,
+                "generation_time": datetime.now().isoformat(),
+                "total_tests": len(self.results)
+            }, ensure_ascii=False, indent=2)
+            f.write(header[:-2] + ',\n  "results": [\n')
+            # 原始圖片在執行緒池中分批編碼，寫出後即釋放
+            batch_size = self.max_workers * 4
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for start in range(0, len(self.results), batch_size):
+                    batch = self.results[start:start + batch_size]
+                    for i, result in enumerate(executor.map(with_full_image, batch), start):
+                        f.write((",\n" if i else "") + json.dumps(result, ensure_ascii=False, indent=2))
+            f.write("\n  ]\n}\n")
+        self.record_phase("寫出JSON報告", start_time)
         
         print(f"JSON報告已生成: {output_path}")
+        self.print_phase_times()
         return True
 
 def main():
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試執行期指標與 /metrics 端點"""
+
+import sys
+import os
+import threading
+import urllib.request
+from http.server import HTTPServer
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from runtime_metrics import RuntimeMetrics, runtime_metrics
+from pipeline_timing import PipelineTimer
+
+
+def test_counters_and_labels():
+    """測試計數器、標籤和量測值回呼"""
+    metrics = RuntimeMetrics()
+    metrics.inc("scans_total")
+    metrics.inc("scans_total")
+    metrics.inc("errors_total", error_type="API_QUOTA_EXCEEDED")
+    metrics.set_gauge("gemini_quota_exceeded", 1)
+    metrics.register_gauge("writer_backlog", lambda: 7, writer="alert")
+    metrics.register_gauge("writer_backlog", lambda: 1 / 0, writer="broken")
+
+    text = metrics.render_prometheus(PipelineTimer())
+    assert "maple_monitor_scans_total 2\n" in text
+    assert 'maple_monitor_errors_total{error_type="API_QUOTA_EXCEEDED"} 1\n' in text
+    assert "maple_monitor_gemini_quota_exceeded 1\n" in text
+    assert 'maple_monitor_writer_backlog{writer="alert"} 7\n' in text
+    assert 'writer="broken"' not in text, "回呼失敗的量測值應被略過"
+    assert "maple_monitor_matches_total 0\n" in text, "未更新的計數器應輸出0"
+    assert "# TYPE maple_monitor_scans_total counter" in text
+    print("OK 計數器與標籤")
+
+
+def test_histogram_exposition():
+    """測試延遲直方圖為累積值且以秒為單位"""
+    timer = PipelineTimer(enabled=True)
+    for duration in (0.5, 3.0, 3.0, 20000.0):
+        timer.record("ocr_recognize", duration)
+
+    text = RuntimeMetrics().render_prometheus(timer)
+    assert 'maple_monitor_stage_latency_seconds_bucket{stage="ocr_recognize",le="0.001"} 1\n' in text
+    assert 'maple_monitor_stage_latency_seconds_bucket{stage="ocr_recognize",le="0.005"} 3\n' in text
+    assert 'maple_monitor_stage_latency_seconds_bucket{stage="ocr_recognize",le="10"} 3\n' in text
+    assert 'maple_monitor_stage_latency_seconds_bucket{stage="ocr_recognize",le="+Inf"} 4\n' in text
+    assert 'maple_monitor_stage_latency_seconds_count{stage="ocr_recognize"} 4\n' in text
+    print("OK 延遲直方圖")
+
+
+def test_metrics_endpoint():
+    """測試配置API的 /metrics 端點"""
+    from config_api import ConfigAPIHandler
+
+    server = HTTPServer(('localhost', 0), ConfigAPIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        runtime_metrics.inc("scans_total")
+        url = f"http://localhost:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode('utf-8')
+            assert response.headers['Content-Type'].startswith('text/plain')
+        assert "maple_monitor_scans_total" in body
+        print("OK /metrics 端點")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    print("=== 執行期指標測試 ===")
+    test_counters_and_labels()
+    test_histogram_exposition()
+    test_metrics_endpoint()
+    print("所有測試通過")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試執行期取樣分析器"""
+
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from sampling_profiler import SamplingProfiler, ProfilerController, collapse_stack, validate_duration
+
+
+def busy_scan_loop(stop_event):
+    """模擬掃描執行緒的忙碌迴圈"""
+    while not stop_event.is_set():
+        sum(i * i for i in range(2000))
+
+
+def test_profiler_samples_target_thread():
+    """測試只取樣目標執行緒並輸出collapsed-stack格式"""
+    stop_event = threading.Event()
+    worker = threading.Thread(target=busy_scan_loop, args=(stop_event,), daemon=True)
+    worker.start()
+    folder = tempfile.mkdtemp(prefix="test_profile_")
+    try:
+        profiler = SamplingProfiler(worker.ident, sample_interval=0.001)
+        profiler.run(0.2)
+        assert profiler.sample_count > 10, f"樣本數過少: {profiler.sample_count}"
+        assert all("busy_scan_loop" in stack for stack in profiler.stack_counts), "應只包含目標執行緒的堆疊"
+
+        path = os.path.join(folder, "out.collapsed")
+        profiler.write_collapsed(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        stack, count = lines[0].rsplit(' ', 1)
+        assert ';' in stack and int(count) > 0
+        assert "test_sampling_profiler:busy_scan_loop" in stack.split(';'), "預設應記為 模組:函式"
+        print(f"OK 取樣 {profiler.sample_count} 次, 熱點: {profiler.top_functions(1)}")
+    finally:
+        stop_event.set()
+        worker.join()
+        shutil.rmtree(folder)
+
+
+def test_controller_writes_session_file():
+    """測試控制器在會話資料夾輸出檔案，且不允許重複啟動"""
+    stop_event = threading.Event()
+    worker = threading.Thread(target=busy_scan_loop, args=(stop_event,), daemon=True)
+    worker.start()
+    folder = tempfile.mkdtemp(prefix="test_profile_")
+    try:
+        controller = ProfilerController()
+        assert not controller.start(1)[0], "未綁定執行緒時不應啟動"
+
+        controller.attach(worker.ident, folder, sample_interval=0.001)
+        assert controller.start(0.2)[0]
+        assert not controller.start(0.2)[0], "進行中不應重複啟動"
+        controller.worker_thread.join(5)
+
+        status = controller.status()
+        assert not status["running"] and status["last_output"]
+        assert os.path.exists(status["last_output"]) and status["last_output"].endswith(".collapsed")
+        print(f"OK 輸出: {os.path.basename(status['last_output'])}")
+    finally:
+        stop_event.set()
+        worker.join()
+        shutil.rmtree(folder)
+
+
+def test_stops_when_thread_exits():
+    """測試目標執行緒結束時提前停止取樣"""
+    worker = threading.Thread(target=time.sleep, args=(0.05,))
+    worker.start()
+    profiler = SamplingProfiler(worker.ident, sample_interval=0.005)
+    start = time.perf_counter()
+    profiler.run(5)
+    worker.join()
+    assert time.perf_counter() - start < 2
+    print("OK 執行緒結束後停止取樣")
+
+
+def test_collapse_stack_line_numbers_optional():
+    """測試預設合併同一函式的不同行，include_lines 時附加行號"""
+    def leaf(include_lines):
+        return collapse_stack(sys._getframe(), include_lines=include_lines)
+
+    def caller(include_lines):
+        first = leaf(include_lines)
+        second = leaf(include_lines)
+        return first, second
+
+    first, second = caller(False)
+    assert first == second
+    assert first.endswith("test_sampling_profiler:caller;test_sampling_profiler:leaf")
+    first, second = caller(True)
+    assert first != second, "不同呼叫行應分開記錄"
+    assert first.split(';')[-1].startswith("test_sampling_profiler:leaf:")
+    print("OK 行號為可選")
+
+
+def test_invalid_duration_rejected():
+    """測試無效的取樣秒數以清楚的 ValueError 拒絕"""
+    assert validate_duration("2.5") == 2.5 and validate_duration(3) == 3.0
+    for value in ("abc", 0, -1, float("nan"), float("inf"), True, [30], {"s": 1}):
+        try:
+            validate_duration(value)
+        except ValueError as e:
+            assert "duration" in str(e)
+        else:
+            raise AssertionError(f"應拒絕 {value!r}")
+
+    controller = ProfilerController()
+    controller.attach(threading.get_ident(), tempfile.gettempdir())
+    try:
+        controller.start("abc")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("無效的 duration 應拋出 ValueError")
+    assert not controller.is_running()
+    print("OK 無效的取樣秒數被拒絕")
+
+
+if __name__ == "__main__":
+    print("=== 取樣分析器測試 ===")
+    test_profiler_samples_target_thread()
+    test_controller_writes_session_file()
+    test_stops_when_thread_exits()
+    test_collapse_stack_line_numbers_optional()
+    test_invalid_duration_rejected()
+    print("所有測試通過")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試掃描與匹配索引"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from scan_index import ScanIndex, infer_intent, parse_since, resolve_db_path, session_key
+
+
+def make_result(player, items, is_match=True, trade_type=None):
+    """建立分析結果字典"""
+    matched_items = [{"item_name": item, "keywords_found": [item]} for item in items]
+    if trade_type:
+        for item in matched_items:
+            item["trade_type"] = trade_type
+    return {"is_match": is_match, "player_name": player, "channel_number": "CH1623",
+            "matched_items": matched_items, "confidence": 0.9, "full_text": f"{player} 收 {' '.join(items)}",
+            "analysis_method": "OCR_Rectangle"}
+
+
+def test_batched_insert_and_query():
+    """測試批次寫入與按商品、意圖、時間查詢"""
+    folder = tempfile.mkdtemp(prefix="test_index_")
+    try:
+        index = ScanIndex(os.path.join(folder, "index.db"), batch_size=100, flush_interval=3600,
+                          buying_items={"強化石": ["收強化石"]})
+        now = time.time()
+        index.add_scan("s1", 1, make_result("hihi", ["青銅母礦", "鋼鐵母礦"]), timestamp=now - 3600)
+        index.add_scan("s1", 2, make_result("old", ["青銅母礦"]), timestamp=now - 86400)
+        index.add_scan("s1", 3, make_result("dup", ["青銅母礦"]), timestamp=now, is_duplicate=True)
+        index.add_scan("s1", 4, make_result("none", [], is_match=False), timestamp=now, error_type="OCR_ERROR")
+        index.add_scan("s1", 5, make_result("seller", ["強化石"]), timestamp=now)
+        assert index.pending_count() == 9, "未達批次大小前應暫存"
+        assert index.query_matches() == []
+
+        index.flush()
+        recent = index.query_matches(item="青銅母礦", intent="WTB", since=parse_since("6h"))
+        assert [row["player"] for row in recent] == ["hihi"], "重複廣播和超過時間範圍的記錄不應出現"
+        assert len(index.query_matches(item="母礦", contains=True)) == 3
+        assert index.query_matches(intent="WTS")[0]["item"] == "強化石"
+
+        stats = index.stats()
+        assert stats["scans"] == 5 and stats["matches"] == 4 and stats["duplicates"] == 1 and stats["errors"] == 1
+        index.close()
+        print(f"OK 查詢結果: {stats}")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_wal_mode_and_intent():
+    """測試WAL模式與交易意圖推斷"""
+    folder = tempfile.mkdtemp(prefix="test_index_")
+    try:
+        index = ScanIndex(os.path.join(folder, "index.db"))
+        mode = index.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+        index.close()
+        assert infer_intent({"item_name": "x", "trade_type": "buy"}) == "WTS"
+        assert infer_intent({"item_name": "x", "trade_type": "sell"}) == "WTB"
+        assert infer_intent({"item_name": "x"}) == "WTB"
+
+        # 相對路徑以會話根目錄為基準，絕對路徑不變
+        assert resolve_db_path("index.db", folder) == os.path.join(os.path.abspath(folder), "index.db")
+        assert resolve_db_path(os.path.join(folder, "a.db"), "/elsewhere") == os.path.join(folder, "a.db")
+        print("OK WAL模式與意圖推斷")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_import_session_folder():
+    """測試匯入已保存的監控會話資料夾"""
+    from PIL import Image
+    folder = tempfile.mkdtemp(prefix="test_index_")
+    try:
+        session = os.path.join(folder, "monitoring_session_20250101_120000")
+        os.makedirs(session)
+        for i in range(3):
+            timestamp = f"20250101_12000{i}_000"
+            screenshot = os.path.join(session, f"monitor_{i:03d}_{timestamp}.png")
+            Image.new('RGB', (10, 10)).save(screenshot)
+            with open(os.path.join(session, f"analysis_{timestamp}.json"), 'w', encoding='utf-8') as f:
+                json.dump({"monitoring_id": i, "timestamp": timestamp, "screenshot_path": screenshot,
+                           "result": make_result(f"p{i}", ["催化劑"], is_match=i != 1)}, f, ensure_ascii=False)
+
+        index = ScanIndex(os.path.join(folder, "index.db"))
+        assert index.import_folder(session) == 3
+        rows = index.query_matches(item="催化劑")
+        assert sorted(row["player"] for row in rows) == ["p0", "p2"]
+        assert rows[0]["session"] == os.path.realpath(session)
+
+        # 不同根目錄下同名的會話不會覆寫彼此的記錄
+        other = os.path.join(folder, "other", "monitoring_session_20250101_120000")
+        shutil.copytree(session, other)
+        assert index.import_folder(other) == 3
+        assert len(index.query_matches(item="催化劑")) == 4
+        assert session_key(os.path.join(other, "..", "..", "other", os.path.basename(other))) == session_key(other)
+        index.close()
+        print("OK 匯入會話資料夾")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_rescan_replaces_matches():
+    """測試重新寫入同一掃描時，舊匹配中不再出現的商品被移除"""
+    folder = tempfile.mkdtemp(prefix="test_index_")
+    try:
+        index = ScanIndex(os.path.join(folder, "index.db"), batch_size=100, flush_interval=3600)
+        index.add_scan("s1", 1, make_result("hihi", ["青銅母礦", "鋼鐵母礦"]))
+        index.flush()
+        index.add_scan("s1", 1, make_result("hihi", ["青銅母礦"]))
+        index.flush()
+        assert [row["item"] for row in index.query_matches()] == ["青銅母礦"]
+
+        # 同一批次內重送也只保留最新一次
+        index.add_scan("s1", 2, make_result("p2", ["青銅母礦", "鋼鐵母礦"]))
+        index.add_scan("s1", 2, make_result("p2", [], is_match=False))
+        assert index.pending_count() == 2
+        index.flush()
+        assert [row["scan_id"] for row in index.query_matches()] == [1]
+        assert index.stats()["scans"] == 2
+        index.close()
+        print("OK 重新掃描覆寫匹配")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 掃描索引測試 ===")
+    test_batched_insert_and_query()
+    test_wal_mode_and_intent()
+    test_import_session_folder()
+    test_rescan_replaces_matches()
+    print("所有測試通過")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試會話歷史的欄式匯出"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from session_export import (ColumnarExporter, ColumnarReader, PYARROW_AVAILABLE, PARQUET_AVAILABLE,
+                            session_rows)
+
+
+def make_session(root, name, players, item="催化劑", channel="CH1623"):
+    """建立包含分析結果的監控會話資料夾，第二筆掃描為未匹配"""
+    from PIL import Image
+    session = os.path.join(root, name)
+    os.makedirs(session)
+    for i, player in enumerate(players):
+        timestamp = f"{name[-15:]}_{i:03d}"
+        screenshot = os.path.join(session, f"monitor_{i:03d}_{timestamp}.png")
+        Image.new('RGB', (10, 10)).save(screenshot)
+        is_match = i != 1
+        result = {"is_match": is_match, "player_name": player, "channel_number": channel,
+                  "matched_items": [{"item_name": item}] if is_match else [], "confidence": 0.9}
+        with open(os.path.join(session, f"analysis_{timestamp}.json"), 'w', encoding='utf-8') as f:
+            json.dump({"monitoring_id": i, "timestamp": timestamp, "screenshot_path": screenshot,
+                       "result": result}, f, ensure_ascii=False)
+    return session
+
+
+def check_format(fmt):
+    """匯出兩個會話後增量追加第三個，檢查字典編碼與讀取結果"""
+    folder = tempfile.mkdtemp(prefix="test_export_")
+    try:
+        first = make_session(folder, "monitoring_session_20250101_120000", ["p0", "p1", "p2"])
+        second = make_session(folder, "monitoring_session_20250102_120000", ["p0", "p3"], item="強化石")
+        export_dir = os.path.join(folder, "history")
+
+        exporter = ColumnarExporter(export_dir, fmt)
+        assert exporter.append_sessions([first, second], {"強化石": ["收強化石"]}) == 5
+        assert exporter.append_sessions([first]) == 0, "已匯出的會話不應重複寫入"
+
+        third = make_session(folder, "monitoring_session_20250103_120000", ["p9"], channel="CH2000")
+        exporter = ColumnarExporter(export_dir, "numpy" if fmt != "numpy" else "auto")
+        assert exporter.format == fmt, "既有匯出應沿用原本的格式"
+        assert exporter.append_sessions([first, second, third]) == 1
+
+        reader = ColumnarReader(export_dir)
+        assert len(reader.manifest["parts"]) == 2
+        data = reader.read_columns()
+        assert len(data["ts"]) == 6 and int(data["is_match"].sum()) == 4
+        assert reader.decode("player", data["player"]).count("p0") == 2
+        assert reader.dictionaries["channel"] == ["CH1623", "CH2000"]
+        counts = reader.item_counts_by_channel()
+        assert counts == {("CH1623", "催化劑"): 2, ("CH1623", "強化石"): 1, ("CH2000", "催化劑"): 1}
+        assert reader.item_counts_by_channel(intent="WTS") == {("CH1623", "強化石"): 1}
+        print(f"OK {fmt} 格式: {counts}")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_numpy_export():
+    """測試NumPy結構化陣列後備格式"""
+    check_format("numpy")
+
+
+def test_arrow_exports():
+    """測試Arrow IPC與Parquet格式（需要pyarrow）"""
+    if not PYARROW_AVAILABLE:
+        print("SKIP 未安裝pyarrow")
+        return
+    check_format("arrow")
+    if PARQUET_AVAILABLE:
+        check_format("parquet")
+
+
+def test_session_rows():
+    """測試每個匹配商品展開為一列，未匹配掃描的商品為空"""
+    folder = tempfile.mkdtemp(prefix="test_export_")
+    try:
+        session = make_session(folder, "monitoring_session_20250101_120000", ["p0", "p1"])
+        rows = session_rows(session)
+        assert [(row["player"], row["item"], row["is_match"]) for row in rows] == \
+            [("p0", "催化劑", True), ("p1", None, False)]
+        assert rows[0]["intent"] == "WTB" and rows[1]["intent"] is None
+        print("OK 會話展開為列")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 欄式匯出測試 ===")
+    test_session_rows()
+    test_numpy_export()
+    test_arrow_exports()
+    print("所有測試通過")
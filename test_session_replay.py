@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試離線重播工具"""
+
+import sys
+import os
+import json
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from PIL import Image
+from session_replay import SessionReplayer, load_session_frames
+from text_analyzer import TextAnalyzer, AnalysisResult
+
+
+class FixedAnalyzer(TextAnalyzer):
+    """返回固定結果的測試分析器"""
+
+    def __init__(self):
+        super().__init__({"母礦": ["母礦"]})
+
+    def analyze_image(self, image):
+        return "hihi5217: 收購母礦"
+
+    def parse_result(self, raw_result):
+        matched_items, matched_keywords = self.find_matching_items(raw_result)
+        return AnalysisResult(full_text=raw_result, is_match=bool(matched_items), player_name="hihi5217",
+                              channel_number="1623", matched_items=matched_items,
+                              matched_keywords=matched_keywords, analysis_method="Fixed")
+
+
+def create_monitoring_session(folder):
+    """創建模擬的監控會話資料夾"""
+    recorded = [
+        ("20250101_120000_000", "hihi5217: 收購母礦", "hihi5217"),
+        ("20250101_120002_000", "hihi5217: 收購母礦", "hihl5217"),  # 舊記錄的玩家名稱不同
+    ]
+    for i, (timestamp, text, player) in enumerate(recorded, 1):
+        screenshot_path = os.path.join(folder, f"monitor_{i:03d}_{timestamp}.png")
+        Image.new('RGB', (200, 30), 'black').save(screenshot_path)
+        with open(os.path.join(folder, f"analysis_{timestamp}.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                "monitoring_id": i,
+                "timestamp": timestamp,
+                "result": {"full_text": text, "is_match": True, "player_name": player,
+                           "channel_number": "1623",
+                           "matched_items": [{"item_name": "母礦", "keywords_found": ["母礦"]}]},
+                "screenshot_path": screenshot_path
+            }, f, ensure_ascii=False)
+    # 沒有JSON的截圖
+    Image.new('RGB', (200, 30), 'black').save(os.path.join(folder, "monitor_003_20250101_120004_000.png"))
+
+
+def test_load_session_frames():
+    """測試載入監控會話畫面"""
+    folder = tempfile.mkdtemp(prefix="test_replay_")
+    try:
+        create_monitoring_session(folder)
+        frames = load_session_frames(folder)
+        assert [f["frame_id"] for f in frames] == [1, 2, 3]
+        assert frames[0]["recorded_result"] is not None and frames[2]["recorded_result"] is None
+        print("OK 載入3個畫面")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_replay_report():
+    """測試重播報告包含延遲、吞吐量和結果差異"""
+    folder = tempfile.mkdtemp(prefix="test_replay_")
+    try:
+        create_monitoring_session(folder)
+        report = SessionReplayer(FixedAnalyzer()).replay(folder)
+
+        assert report["frames_processed"] == 3
+        assert report["stage_latency"]["total"]["count"] == 3
+        assert "p95_ms" in report["stage_latency"]["analyze_image"]
+        assert report["throughput_fps"] > 0
+        assert report["comparison"]["frames_compared"] == 2
+        assert report["comparison"]["frames_changed"] == 1
+        assert report["comparison"]["field_diff_counts"]["player_name"] == 1
+        json.dumps(report, ensure_ascii=False, default=str)
+        print(f"OK 重播報告: {report['throughput_fps']} 幀/秒, 差異 {report['comparison']['frames_changed']}")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    print("=== 離線重播工具測試 ===")
+    test_load_session_frames()
+    test_replay_report()
+    print("所有測試通過")
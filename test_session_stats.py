@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試會話統計"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from runtime_metrics import RuntimeMetrics
+from scan_index import ScanIndex
+from session_stats import (columns_from_records, compute_session_stats, format_stats_summary,
+                           load_index_columns, publish_stats_metrics, value_counts)
+
+
+def make_result(player, items, channel="CH1623"):
+    """建立分析結果字典"""
+    return {"is_match": bool(items), "player_name": player, "channel_number": channel,
+            "matched_items": [{"item_name": item} for item in items], "confidence": 0.9, "full_text": player}
+
+
+def test_stats_from_index():
+    """測試從掃描索引計算匹配率、時間窗口、頻率與延遲"""
+    folder = tempfile.mkdtemp(prefix="test_stats_")
+    try:
+        index = ScanIndex(os.path.join(folder, "index.db"))
+        base = 1_700_000_000 // 300 * 300
+        index.add_scan("s1", 1, make_result("a", ["催化劑", "強化石"]), timestamp=base + 10, latency_ms=100)
+        index.add_scan("s1", 2, make_result("a", ["催化劑"]), timestamp=base + 20, is_duplicate=True, latency_ms=120)
+        index.add_scan("s1", 3, make_result("b", []), timestamp=base + 30, error_type="OCR_ERROR", latency_ms=300)
+        index.add_scan("s1", 4, make_result("c", ["催化劑"], "CH2000"), timestamp=base + 400, latency_ms=2000)
+        index.add_scan("s1", 5, make_result("d", []), timestamp=base + 410)
+        index.add_scan("other", 1, make_result("x", ["催化劑"]), timestamp=base + 10)
+        index.flush()
+
+        stats = compute_session_stats(*load_index_columns(index, session="s1"))
+        assert (stats["scans"], stats["analyzed"], stats["matches"], stats["duplicates"]) == (5, 4, 2, 1)
+        assert stats["match_rate"] == 50.0
+        assert stats["error_types"] == [("OCR_ERROR", 1)]
+        assert stats["top_items"] == [("催化劑", 2), ("強化石", 1)]
+        assert stats["top_channels"] == [("CH1623", 2), ("CH2000", 1)]
+        assert [(w["scans"], w["matches"]) for w in stats["windows"]] == [(2, 1), (2, 1)]
+        latency = stats["latency"]
+        assert latency["count"] == 4 and latency["max_ms"] == 2000 and latency["p50_ms"] == 210
+        assert latency["histogram"]["<=100"] == 1 and latency["histogram"]["<=2500"] == 1
+        assert "匹配率: 50.0%" in format_stats_summary(stats)
+        index.close()
+        print(f"OK 索引統計: {format_stats_summary(stats)}")
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_stats_from_records_and_metrics():
+    """測試合併器記錄與指標輸出使用相同的數字"""
+    records = [
+        {"timestamp": "20250101_120000_000", "has_match": True, "duplicate_count": 3,
+         "match_details": {"channel_number": "CH1", "matched_items": [{"item_name": "催化劑"}]}},
+        {"timestamp": "20250101_120001_000", "has_match": False, "analysis_result": {"channel_number": "CH1"}},
+        {"timestamp": "20250101_120002_000", "has_match": False,
+         "error_info": {"error_type": "ANALYSIS_ERROR"}},
+    ]
+    stats = compute_session_stats(*columns_from_records(records))
+    assert (stats["analyzed"], stats["matches"], stats["duplicates"], stats["errors"]) == (3, 1, 2, 1)
+    assert stats["match_rate"] == 33.3 and stats["latency"] == {"count": 0}
+
+    metrics = RuntimeMetrics()
+    publish_stats_metrics(stats, metrics)
+    assert abs(metrics.get("session_match_rate") - 0.333) < 1e-9
+    assert "maple_monitor_session_match_rate 0.333" in metrics.render_prometheus()
+
+    empty = compute_session_stats(*columns_from_records([]))
+    assert empty["match_rate"] == 0 and empty["windows"] == [] and empty["top_items"] == []
+    assert value_counts(["b", None, "a", "b"]) == [("b", 2), ("a", 1)]
+    print("OK 記錄統計與指標")
+
+
+if __name__ == "__main__":
+    print("=== 會話統計測試 ===")
+    test_stats_from_index()
+    test_stats_from_records_and_metrics()
+    print("所有測試通過")
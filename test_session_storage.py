@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試會話分段儲存、保留策略與磁碟預算"""
+
+import sys
+import os
+import shutil
+import tempfile
+import zipfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from session_storage import SessionStorage, ARCHIVE_NAME, MANIFEST_NAME
+
+
+def write_scan(storage, index, is_match, size=1000):
+    """模擬一次掃描寫出截圖與JSON"""
+    screenshot_path = storage.path_for(f"monitor_{index:03d}.png")
+    json_path = storage.path_for(f"analysis_{index:03d}.json")
+    for path in (screenshot_path, json_path):
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+    storage.commit_scan([screenshot_path, json_path], is_match)
+    return screenshot_path
+
+
+def test_rotation_retention_and_compression():
+    """測試輪替後保留匹配檔案、未匹配取樣並壓縮"""
+    root = tempfile.mkdtemp(prefix="test_storage_")
+    try:
+        session = os.path.join(root, "monitoring_session_20250101_000000")
+        storage = SessionStorage(session, max_files=8, max_mb=None, max_hours=None, non_match_keep_every=2)
+        paths = [write_scan(storage, i, is_match=(i == 1)) for i in range(5)]
+        storage.close()
+
+        first = os.path.join(session, "segment_0001")
+        assert os.path.dirname(paths[4]).endswith("segment_0002"), "第5次掃描應寫入新分段"
+        assert os.path.exists(paths[1]), "匹配截圖應保留在原位置"
+        assert not os.path.exists(paths[0]) and not os.path.exists(paths[2]) and not os.path.exists(paths[3])
+
+        with zipfile.ZipFile(os.path.join(first, ARCHIVE_NAME)) as archive:
+            names = sorted(archive.namelist())
+        # 未匹配掃描 0, 2, 3 中每2筆保留1筆: 0 和 3
+        assert names == ["analysis_000.json", "analysis_003.json", "monitor_000.png", "monitor_003.png"], names
+        assert os.path.exists(os.path.join(first, MANIFEST_NAME))
+        print(f"OK 輪替與保留: {storage.describe()}")
+    finally:
+        shutil.rmtree(root)
+
+
+def test_scan_files_stay_in_one_segment():
+    """測試時間上限在同一次掃描的兩個檔案之間到達時，兩個檔案仍在同一分段"""
+    root = tempfile.mkdtemp(prefix="test_storage_")
+    try:
+        session = os.path.join(root, "monitoring_session_20250101_000000")
+        storage = SessionStorage(session, max_files=None, max_mb=None, max_hours=1, compress=False)
+        write_scan(storage, 0, is_match=False)
+
+        screenshot_path = storage.path_for("monitor_001.png")
+        storage.segment.created_at -= 7200
+        json_path = storage.path_for("analysis_001.json")
+        assert os.path.dirname(screenshot_path) == os.path.dirname(json_path)
+        for path in (screenshot_path, json_path):
+            with open(path, 'wb') as f:
+                f.write(b"x")
+        storage.commit_scan([screenshot_path, json_path], True)
+
+        # 登記後才輪替，下一次掃描寫入新分段
+        assert os.path.dirname(write_scan(storage, 2, is_match=False)).endswith("segment_0002")
+        storage.close()
+        assert os.path.exists(screenshot_path) and os.path.exists(json_path)
+        print("OK 同一次掃描的檔案在同一分段")
+    finally:
+        shutil.rmtree(root)
+
+
+def test_disk_budget_keeps_matches():
+    """測試超過磁碟預算時只刪除未匹配資料"""
+    root = tempfile.mkdtemp(prefix="test_storage_")
+    try:
+        session = os.path.join(root, "monitoring_session_20250101_000000")
+        storage = SessionStorage(session, max_files=4, max_mb=None, max_hours=None,
+                                 non_match_keep_every=1, compress=False, disk_budget_mb=0.01)
+        match_paths = []
+        for i in range(8):
+            path = write_scan(storage, i, is_match=(i % 2 == 0), size=4000)
+            if i % 2 == 0:
+                match_paths.append(path)
+        storage.close()
+
+        assert storage.deleted_bytes > 0, "超過預算應刪除資料"
+        closed_match_paths = [p for p in match_paths if storage.segment.folder.name not in p]
+        assert all(os.path.exists(p) for p in closed_match_paths), "匹配檔案不應被刪除"
+        print(f"OK 磁碟預算清理 {storage.deleted_bytes} bytes")
+    finally:
+        shutil.rmtree(root)
+
+
+def test_merger_relative_screenshot_path():
+    """測試合併器記錄包含分段的相對路徑"""
+    from real_time_merger import RealTimeMerger
+    root = tempfile.mkdtemp(prefix="test_storage_")
+    try:
+        storage = SessionStorage(root, max_files=100)
+        merger = RealTimeMerger(root)
+        assert merger.relative_path(storage.path_for("monitor_001.png")) == "segment_0001/monitor_001.png"
+        print("OK 相對截圖路徑")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    print("=== 會話分段儲存測試 ===")
+    test_rotation_retention_and_compression()
+    test_scan_files_stay_in_one_segment()
+    test_disk_budget_keeps_matches()
+    test_merger_relative_screenshot_path()
+    print("所有測試通過")
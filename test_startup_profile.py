@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試啟動耗時記錄、背景分析器載入與延遲匯入"""
+
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+from startup_profile import StartupProfiler, BackgroundAnalyzerLoader, warmup_frame
+
+
+class _FakeAnalyzer:
+    """記錄預熱畫面的假分析器"""
+
+    def __init__(self):
+        self.warmed = []
+
+    def warm_up(self, image):
+        self.warmed.append(image.size)
+
+
+def test_profiler_report():
+    """測試階段時間點只記錄第一次、匯入耗時與報告輸出"""
+    profiler = StartupProfiler()
+    profiler.mark("roi_selected")
+    first = profiler.milestones["roi_selected"]
+    profiler.mark("roi_selected")
+    assert profiler.milestones["roi_selected"] == first
+
+    sys.modules.pop("colorsys", None)
+    assert profiler.timed_import("colorsys").__name__ == "colorsys"
+    profiler.timed_import("json")
+    assert "colorsys" in profiler.imports and "json" not in profiler.imports, "已載入的模組不應記錄"
+
+    with profiler.section("warmup_inference"):
+        pass
+    folder = tempfile.mkdtemp(prefix="test_startup_")
+    try:
+        with open(profiler.save(folder), 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        assert set(report) == {"imports_ms", "milestones_ms", "durations_ms", "heavy_modules_loaded"}
+        assert "warmup_inference" in report["durations_ms"]
+    finally:
+        shutil.rmtree(folder)
+    assert "import colorsys" in profiler.format_report()
+    print("OK 啟動耗時報告")
+
+
+def test_background_loader():
+    """測試背景建立並預熱分析器，建立失敗時返回None"""
+    profiler = StartupProfiler()
+    loader = BackgroundAnalyzerLoader(_FakeAnalyzer, profiler=profiler).start()
+    analyzer = loader.result(timeout=5)
+    assert analyzer.warmed == [warmup_frame().size]
+    assert {"analyzer_ready", "warmup_done"} <= set(profiler.milestones)
+
+    # 未啟動背景執行緒時於 result() 同步建立
+    assert BackgroundAnalyzerLoader(lambda: None, profiler=profiler).result() is None
+
+    def broken():
+        raise RuntimeError("model missing")
+    loader = BackgroundAnalyzerLoader(broken, profiler=profiler).start()
+    assert loader.result(timeout=5) is None and isinstance(loader.error, RuntimeError)
+    print("OK 背景載入分析器")
+
+
+def test_screen_monitor_defers_heavy_imports():
+    """測試匯入 screen_monitor 時不載入 pyautogui、tkinter 與分析器模組"""
+    code = ("import sys, screen_monitor; "
+            "print('loaded:' + ','.join(m for m in ('pyautogui', 'tkinter', 'easyocr', 'torch', 'cv2', "
+            "'ocr_rectangle_analyzer', 'gemini_analyzer') if m in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert output.returncode == 0, output.stderr
+    assert output.stdout.strip().splitlines()[-1] == "loaded:", f"不應載入: {output.stdout}"
+    print("OK 延遲匯入")
+
+
+if __name__ == "__main__":
+    print("=== 啟動耗時測試 ===")
+    test_profiler_report()
+    test_background_loader()
+    test_screen_monitor_defers_heavy_imports()
+    print("所有測試通過")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""測試共用白框檢測引擎的快取與區域搜尋"""
+
+import sys
+import os
+
+# 設置控制台編碼
+if sys.platform == "win32":
+    os.system('chcp 65001 > nul')
+
+import numpy as np
+
+from white_box_detector import WhiteBoxDetector
+
+
+def make_frame(box_x, width=400, height=60, text_value=80):
+    """建立深色背景、白框位於 box_x 的灰階畫面，text_value 模擬框外文字變化"""
+    frame = np.full((height, width), 40, dtype=np.uint8)
+    frame[20:40, box_x:box_x + 60] = 255
+    frame[25:35, 300:380] = text_value
+    return frame
+
+
+def test_reuse_band_and_full_search():
+    """測試白框不變時重用結果、移動少量時區域搜尋、消失後全圖搜尋"""
+    detector = WhiteBoxDetector({"FULL_SEARCH_EVERY": 100})
+
+    first = detector.detect(make_frame(100))
+    assert [r['bbox'] for r in first] == [(100, 20, 160, 40)]
+    assert detector.stats == {"reused": 0, "band": 0, "full": 1}
+
+    # 框外文字改變，白框區域不變
+    assert detector.detect(make_frame(100, text_value=200))[0]['bbox'] == (100, 20, 160, 40)
+    assert detector.stats["reused"] == 1
+
+    # 白框移動5像素：在上次位置附近找到
+    assert detector.detect(make_frame(105))[0]['bbox'] == (105, 20, 165, 40)
+    assert detector.stats["band"] == 1
+
+    # 白框移到帶狀區域外：區域搜尋落空後全圖搜尋
+    moved = detector.detect(make_frame(220))
+    assert [r['bbox'] for r in moved] == [(220, 20, 280, 40)]
+    assert detector.stats["full"] == 2
+
+    # 畫面尺寸改變時不使用上一幀
+    detector.detect(make_frame(220, width=500))
+    assert detector.stats["full"] == 3
+    print(f"OK 檢測統計: {detector.stats}")
+
+
+def test_band_edge_and_forced_full_search():
+    """測試白框貼齊帶狀區域邊界時改用全圖搜尋，以及強制全圖搜尋間隔"""
+    detector = WhiteBoxDetector({"SEARCH_BAND_MARGIN": 10, "FULL_SEARCH_EVERY": 2})
+    detector.detect(make_frame(100))
+    # 移動10像素：白框碰到帶狀區域右緣，只找到一部分
+    assert detector.detect(make_frame(110))[0]['bbox'] == (110, 20, 170, 40)
+    assert detector.stats == {"reused": 0, "band": 0, "full": 2}
+
+    detector.detect(make_frame(112))
+    detector.detect(make_frame(114))
+    assert detector.stats["band"] == 2
+    detector.detect(make_frame(116))
+    assert detector.stats["full"] == 3, "達到間隔後應強制全圖搜尋"
+    print("OK 邊界與強制全圖搜尋")
+
+
+def test_new_box_outside_band_triggers_full_search():
+    """測試上次白框不變或只移動少量時，其他位置出現的新白框仍會被找到"""
+    detector = WhiteBoxDetector({"FULL_SEARCH_EVERY": 100})
+    detector.detect(make_frame(100))
+
+    frame = make_frame(100)
+    frame[20:40, 250:290] = 255
+    assert [r['bbox'] for r in detector.detect(frame)] == [(100, 20, 160, 40), (250, 20, 290, 40)]
+
+    frame = make_frame(105)
+    frame[20:40, 250:290] = 255
+    frame[5:15, 20:50] = 255
+    assert [r['bbox'] for r in detector.detect(frame)] == [(20, 5, 50, 15), (105, 20, 165, 40), (250, 20, 290, 40)]
+
+    # 模擬聊天視窗：舊廣播上移、新廣播出現在其他位置，快取結果須與每幀全圖搜尋相同
+    for seed in range(10):
+        rng = np.random.default_rng(seed)
+        cached = WhiteBoxDetector()
+        fresh = WhiteBoxDetector({"REUSE_PREVIOUS_FRAME": False, "FULL_SEARCH_EVERY": 0})
+        boxes = []
+        for _ in range(300):
+            if rng.random() < 0.2:
+                boxes = [(x, y - 12) for x, y in boxes if y >= 22]
+            if rng.random() < 0.15 or not boxes:
+                boxes.append((int(rng.integers(0, 340)), int(rng.integers(10, 100))))
+            frame = np.full((120, 400), 40, dtype=np.uint8)
+            for x, y in boxes:
+                frame[y:y + 10, x:x + 40] = 255
+            frame[rng.integers(0, 110):, 380:] = rng.integers(0, 200)
+            assert [r['bbox'] for r in cached.detect(frame)] == [r['bbox'] for r in fresh.detect(frame)]
+        assert cached.stats["reused"] + cached.stats["band"] > 0
+    print(f"OK 帶狀區域外的新白框: {cached.stats}")
+
+
+def test_shared_threshold_and_strategy():
+    """測試三條檢測路徑使用相同的設定閾值"""
+    from rectangle_detector import RectangleDetectionStrategy
+    try:
+        from config import RECTANGLE_DETECTION_CONFIG
+    except ImportError:
+        RECTANGLE_DETECTION_CONFIG = {"WHITE_THRESHOLD": 245}
+    strategy = RectangleDetectionStrategy()
+    assert strategy.config["WHITE_THRESHOLD"] == RECTANGLE_DETECTION_CONFIG["WHITE_THRESHOLD"]
+
+    # 略低於閾值的灰白色不算白框
+    frame = make_frame(100)
+    frame[20:40, 100:160] = RECTANGLE_DETECTION_CONFIG["WHITE_THRESHOLD"] - 3
+    assert strategy.detect_white_rectangles(frame) == []
+    rgb = np.stack([make_frame(100)] * 3, axis=2)
+    assert strategy.detect_white_rectangles(rgb)[0]['bbox'] == (100, 20, 160, 40)
+    print("OK 共用閾值")
+
+
+def test_coarse_search_matches_full_resolution():
+    """測試縮小粗略定位的結果與原始解析度搜尋相同"""
+    rng = np.random.default_rng(0)
+    coarse = WhiteBoxDetector({"REUSE_PREVIOUS_FRAME": False, "FULL_SEARCH_EVERY": 0, "COARSE_SCALE": 2})
+    full = WhiteBoxDetector({"REUSE_PREVIOUS_FRAME": False, "FULL_SEARCH_EVERY": 0, "COARSE_SCALE": 1})
+    # 不做形態學處理時，1像素寬的筆畫也會被原始解析度搜尋找到
+    thin = {"MORPHOLOGY_KERNEL_SIZE": 1, "FILL_RATIO_THRESHOLD": 0}
+    thin_coarse = WhiteBoxDetector({**coarse.config, **thin})
+    thin_full = WhiteBoxDetector({**full.config, **thin})
+    for _ in range(50):
+        frame = rng.integers(0, 200, (120, 600), dtype=np.uint8)
+        for _ in range(rng.integers(0, 5)):
+            w, h = rng.integers(5, 80), rng.integers(5, 50)
+            x, y = rng.integers(0, 600 - w), rng.integers(0, 120 - h)
+            frame[y:y + h, x:x + w] = 255
+        # 零散的白色文字筆畫
+        for _ in range(10):
+            x, y = rng.integers(0, 595), rng.integers(0, 115)
+            frame[y:y + 3, x:x + 2] = 255
+        # 1像素寬的白色外框（平均縮小會被淡化到閾值以下）
+        for _ in range(rng.integers(0, 3)):
+            w, h = rng.integers(12, 40), rng.integers(10, 30)
+            x, y = rng.integers(0, 600 - w), rng.integers(0, 120 - h)
+            frame[y:y + h, x:x + w:w - 1] = 255
+            frame[y:y + h:h - 1, x:x + w] = 255
+        assert [r['bbox'] for r in coarse.detect(frame)] == [r['bbox'] for r in full.detect(frame)]
+        assert [r['bbox'] for r in thin_coarse.detect(frame)] == [r['bbox'] for r in thin_full.detect(frame)]
+
+    # 密集的白框：合併後變大的候選區域會與先前的區域重疊，不可重複回報同一個白框
+    for _ in range(500):
+        frame = rng.integers(0, 200, (150, 400), dtype=np.uint8)
+        for _ in range(rng.integers(4, 13)):
+            w, h = rng.integers(5, 80), rng.integers(5, 50)
+            x, y = rng.integers(0, 400 - w), rng.integers(0, 150 - h)
+            frame[y:y + h, x:x + w] = 255
+        bboxes = [r['bbox'] for r in coarse.detect(frame)]
+        assert len(bboxes) == len(set(bboxes)), f"重複的白框: {bboxes}"
+        assert bboxes == [r['bbox'] for r in full.detect(frame)]
+
+    # 相鄰的兩個白框在縮小後合併成同一個候選區域
+    frame = make_frame(100)
+    frame[20:40, 163:200] = 255
+    assert [r['bbox'] for r in coarse.detect(frame)] == [(100, 20, 160, 40), (163, 20, 200, 40)]
+    print("OK 粗略定位與原始解析度結果一致")
+
+
+def baseline_rectangles(gray):
+    """原本 OCR_Rectangle 的白框檢測：二值化後只以外接矩形面積與長寬比過濾"""
+    import cv2
+    _, binary = cv2.threshold(gray, 245, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    rectangles = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if 100 < w * h < 5000 and 0.2 < (w / h if h > 0 else 0) < 10:
+            rectangles.append((x, y, w, h))
+    return sorted(rectangles)
+
+
+def test_rectangle_analyzer_matches_baseline():
+    """測試 OCR_Rectangle 經共用檢測器找到的白框與原本的檢測結果相同"""
+    from PIL import Image
+    from benchmarks.synthetic_broadcast import generate_broadcast_set
+    from ocr_rectangle_analyzer import OCRRectangleAnalyzer
+
+    analyzer = OCRRectangleAnalyzer.__new__(OCRRectangleAnalyzer)
+    analyzer.box_detector = WhiteBoxDetector(OCRRectangleAnalyzer.BOX_DETECTOR_CONFIG)
+
+    images = [image for _, image in generate_broadcast_set([(800, 40), (600, 120)], [0.0, 8.0], count=5)]
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        frame = rng.integers(0, 200, (120, 600, 3), dtype=np.uint8)
+        for _ in range(rng.integers(1, 8)):
+            # 面積與長寬比落在過濾邊界附近的白框，以及只有外框的空心白框
+            w, h = rng.integers(3, 90), rng.integers(3, 80)
+            x, y = rng.integers(0, 600 - w), rng.integers(0, 120 - h)
+            frame[y:y + h, x:x + w] = 255
+            if rng.random() < 0.3 and w > 6 and h > 6:
+                frame[y + 2:y + h - 2, x + 2:x + w - 2] = 60
+        for _ in range(15):
+            x, y = rng.integers(0, 595), rng.integers(0, 115)
+            frame[y:y + 3, x:x + 2] = 255
+        images.append(Image.fromarray(frame))
+
+    for image in images:
+        analyzer.box_detector.reset()
+        gray, _ = analyzer.preprocess_image(image)
+        assert sorted(analyzer.detect_white_rectangles(gray)) == baseline_rectangles(gray)
+    print(f"OK OCR_Rectangle白框與原本結果一致 ({len(images)} 張)")
+
+
+if __name__ == "__main__":
+    print("=== 白框檢測引擎測試 ===")
+    test_reuse_band_and_full_search()
+    test_band_edge_and_forced_full_search()
+    test_new_box_outside_band_triggers_full_search()
+    test_shared_threshold_and_strategy()
+    test_coarse_search_matches_full_resolution()
+    test_rectangle_analyzer_matches_baseline()
+    print("所有測試通過")
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Any, Optional
 import json
 import re
+from pipeline_timing import pipeline_timer
 
 class AnalysisResult:
     """分析結果的標準化數據結構"""
@@ -47,6 +48,11 @@ class TextAnalyzer(ABC):
     def __init__(self, selling_items: Dict[str, List[str]]):
         self.selling_items = selling_items
         self.strategy_type = "BASE"  # 策略類型標識
+    
+    @property
+    def analyzer_name(self) -> str:
+        """報告中顯示的分析器類別名稱"""
+        return self.__class__.__name__
         
     @abstractmethod
     def analyze_image(self, image) -> str:
@@ -58,17 +64,22 @@ class TextAnalyzer(ABC):
         """解析原始結果為標準化格式"""
         pass
     
+    def warm_up(self, image) -> None:
+        """以合成畫面執行一次推論，讓模型在第一次掃描前完成初始化（預設不做事）"""
+        pass
+    
     def analyze(self, image) -> tuple[AnalysisResult, str]:
         """完整分析流程，返回(分析結果, 原始回應)"""
         try:
             raw_result = self.analyze_image(image)
-            parsed_result = self.parse_result(raw_result)
+            with pipeline_timer.span("parse_match"):
+                parsed_result = self.parse_result(raw_result)
             return parsed_result, raw_result
         except Exception as e:
             error_result = AnalysisResult(
                 full_text=f"分析錯誤: {str(e)}",
                 is_match=False,
-                analysis_method=self.__class__.__name__
+                analysis_method=self.analyzer_name
             )
             return error_result, f"ERROR: {str(e)}"
     
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""白色頻道框檢測引擎 - 所有白框檢測路徑共用，參數來自 RECTANGLE_DETECTION_CONFIG
+
+連續畫面中白框位置幾乎不變，因此每次檢測依序嘗試：
+    1. 重用：上次白框所在區域的像素與上一幀相同時，直接返回上次結果
+    2. 區域搜尋：只在上次位置周圍的帶狀區域內二值化與尋找輪廓
+    3. 全圖搜尋：區域搜尋沒有找到白框、尚無上次結果或達到強制全圖搜尋間隔時
+
+每一幀都先在縮小的畫面上找出所有白色候選區域：候選區域與上一幀不同時不重用結果，
+有候選區域落在帶狀區域外（例如新廣播出現在其他位置）時直接全圖搜尋，不會漏掉新的白框。
+
+全圖搜尋先在縮小 COARSE_SCALE 倍的畫面上找出白色候選區域，只在候選區域內以原始解析度
+做形態學處理與輪廓過濾。縮小時每格取最大值，1像素寬的白色筆畫與外框也不會被平均掉。
+"""
+
+import cv2
+import numpy as np
+
+try:
+    from config import RECTANGLE_DETECTION_CONFIG
+except ImportError:
+    RECTANGLE_DETECTION_CONFIG = {}
+
+DEFAULT_CONFIG = {
+    "WHITE_THRESHOLD": 245,
+    "MIN_RECTANGLE_AREA": 100,
+    "MAX_RECTANGLE_AREA": 5000,
+    "MIN_ASPECT_RATIO": 0.2,
+    "MAX_ASPECT_RATIO": 10,
+    "FILL_RATIO_THRESHOLD": 0.7,
+    "TEXT_ASSIGNMENT_TOLERANCE": 5,
+    "MORPHOLOGY_KERNEL_SIZE": 3,
+    "REUSE_PREVIOUS_FRAME": True,
+    "REUSE_MAX_DIFF": 2.0,
+    "SEARCH_BAND_MARGIN": 20,
+    "FULL_SEARCH_EVERY": 30,
+    "COARSE_SCALE": 2,
+}
+
+
+def to_grayscale(image) -> np.ndarray:
+    """將PIL圖片或numpy陣列（RGB或灰階）轉換為灰階陣列"""
+    if hasattr(image, 'convert'):
+        image = np.array(image.convert('RGB'))
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    return image
+
+
+class WhiteBoxDetector:
+    """帶有上一幀快取與區域搜尋的白框檢測器（每個分析器各自持有一個實例）"""
+
+    def __init__(self, config: dict = None):
+        self.config = {**DEFAULT_CONFIG, **RECTANGLE_DETECTION_CONFIG, **(config or {})}
+        kernel_size = self.config["MORPHOLOGY_KERNEL_SIZE"]
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size)) if kernel_size > 1 else None
+        self.stats = {"reused": 0, "band": 0, "full": 0}
+        self.reset()
+
+    @property
+    def threshold(self) -> int:
+        return self.config["WHITE_THRESHOLD"]
+
+    def reset(self):
+        """清除上一幀的狀態（例如ROI改變時）"""
+        self.previous_rectangles = []
+        self.previous_shape = None
+        self.previous_region = None
+        self.previous_patch = None
+        self.previous_windows = None
+        self.frames_since_full = 0
+
+    def detect(self, image) -> list:
+        """檢測白框，返回由左到右排序的矩形字典列表"""
+        gray = to_grayscale(image)
+        windows = self.coarse_candidates(gray)
+        region = self._previous_region(gray)
+        if region is not None:
+            # 帶狀區域外出現白色區域時，上次結果與區域搜尋都可能漏掉白框
+            band = self._band(gray, region)
+            if not all(self._inside(window, band) for window in windows):
+                region = None
+
+        if region is not None and windows == self.previous_windows and self._region_unchanged(gray, region):
+            self.stats["reused"] += 1
+            self.frames_since_full += 1
+            return list(self.previous_rectangles)
+
+        rectangles = []
+        if region is not None and self.frames_since_full < self.config["FULL_SEARCH_EVERY"]:
+            rectangles = self._search(gray, band)
+            # 白框碰到帶狀區域的邊界時可能只找到一部分，改用全圖搜尋
+            if any(self._touches_band_edge(r['bbox'], band, gray.shape) for r in rectangles):
+                rectangles = []
+            if rectangles:
+                self.stats["band"] += 1
+                self.frames_since_full += 1
+
+        if not rectangles:
+            rectangles = self._full_search(gray, windows)
+            self.stats["full"] += 1
+            self.frames_since_full = 0
+
+        self._remember(gray, rectangles, windows)
+        return rectangles
+
+    def _previous_region(self, gray):
+        """返回上次所有白框的聯集範圍 (x1, y1, x2, y2)，無法使用時返回None"""
+        if not self.previous_rectangles or gray.shape != self.previous_shape:
+            return None
+        return self.previous_region
+
+    def _region_unchanged(self, gray, region) -> bool:
+        """比較白框區域與上一幀的平均絕對差，且白色像素的位置完全相同
+
+        多個白框的聯集範圍很大時，新白框只改變少數像素，平均差會被稀釋。
+        """
+        if not self.config["REUSE_PREVIOUS_FRAME"] or self.previous_patch is None:
+            return False
+        x1, y1, x2, y2 = region
+        patch = gray[y1:y2, x1:x2]
+        if float(cv2.absdiff(patch, self.previous_patch).mean()) > self.config["REUSE_MAX_DIFF"]:
+            return False
+        return np.array_equal(patch > self.threshold, self.previous_patch > self.threshold)
+
+    def _band(self, gray, region):
+        """上次位置外擴 SEARCH_BAND_MARGIN 像素的搜尋範圍"""
+        margin = self.config["SEARCH_BAND_MARGIN"]
+        x1, y1, x2, y2 = region
+        height, width = gray.shape[:2]
+        return max(0, x1 - margin), max(0, y1 - margin), min(width, x2 + margin), min(height, y2 + margin)
+
+    @staticmethod
+    def _inside(window, band) -> bool:
+        x1, y1, x2, y2 = window
+        bx1, by1, bx2, by2 = band
+        return bx1 <= x1 and by1 <= y1 and x2 <= bx2 and y2 <= by2
+
+    @staticmethod
+    def _touches_band_edge(bbox, band, shape) -> bool:
+        """矩形是否貼齊帶狀區域內部的邊界（與整張圖重合的邊界不算）"""
+        height, width = shape[:2]
+        x1, y1, x2, y2 = bbox
+        bx1, by1, bx2, by2 = band
+        return ((x1 <= bx1 and bx1 > 0) or (y1 <= by1 and by1 > 0) or
+                (x2 >= bx2 and bx2 < width) or (y2 >= by2 and by2 < height))
+
+    def _remember(self, gray, rectangles, windows):
+        """保存本次結果、候選區域與白框區域的像素，供下一幀比較"""
+        self.previous_rectangles = rectangles
+        self.previous_windows = windows
+        self.previous_shape = gray.shape
+        if not rectangles:
+            self.previous_region = self.previous_patch = None
+            return
+        height, width = gray.shape[:2]
+        # 外擴1像素，讓白框邊緣的變化也能被偵測到
+        x1 = max(0, min(r['bbox'][0] for r in rectangles) - 1)
+        y1 = max(0, min(r['bbox'][1] for r in rectangles) - 1)
+        x2 = min(width, max(r['bbox'][2] for r in rectangles) + 1)
+        y2 = min(height, max(r['bbox'][3] for r in rectangles) + 1)
+        self.previous_region = (x1, y1, x2, y2)
+        self.previous_patch = gray[y1:y2, x1:x2].copy()
+
+    def white_mask(self, gray) -> np.ndarray:
+        """二值化並以形態學處理去除噪點、連接斷開的區域"""
+        _, mask = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        if self.kernel is not None:
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.kernel)
+        return mask
+
+    def coarse_candidates(self, gray) -> list:
+        """在縮小的畫面上找出白色區域，返回外擴後的原始解析度搜尋範圍（已合併重疊）"""
+        scale = self.config["COARSE_SCALE"]
+        height, width = gray.shape[:2]
+        small = self.max_pool(gray, scale)
+        _, mask = cv2.threshold(small, self.threshold, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        # 縮小後的外接矩形每邊最多少算 scale 個像素，外擴後仍小於最小面積的區域不可能是白框
+        min_area = self.config["MIN_RECTANGLE_AREA"]
+        boxes = [box for box in map(cv2.boundingRect, contours)
+                 if (box[2] + 2) * (box[3] + 2) * scale * scale > min_area]
+
+        pad = 2 * scale + self.config["MORPHOLOGY_KERNEL_SIZE"]
+        windows = []
+        for x, y, w, h in boxes:
+            window = [max(0, x * scale - pad), max(0, y * scale - pad),
+                      min(width, (x + w) * scale + pad), min(height, (y + h) * scale + pad)]
+            # 合併後範圍變大，可能又與先前檢查過的範圍重疊，重複合併直到沒有重疊
+            # （重疊的範圍會讓同一個白框被找到兩次）
+            merged = True
+            while merged:
+                merged = False
+                for other in windows:
+                    if window[0] < other[2] and other[0] < window[2] and window[1] < other[3] and other[1] < window[3]:
+                        windows.remove(other)
+                        window = [min(window[0], other[0]), min(window[1], other[1]),
+                                  max(window[2], other[2]), max(window[3], other[3])]
+                        merged = True
+                        break
+            windows.append(window)
+        return [tuple(int(v) for v in window) for window in windows]
+
+    @staticmethod
+    def max_pool(gray, scale: int) -> np.ndarray:
+        """以每個 scale x scale 區塊的最大值縮小畫面（不足一格的邊緣補0）"""
+        height, width = gray.shape[:2]
+        padded = np.pad(gray, ((0, -height % scale), (0, -width % scale)))
+        rows, cols = padded.shape[0] // scale, padded.shape[1] // scale
+        return padded.reshape(rows, scale, cols, scale).max(axis=(1, 3))
+
+    def _full_search(self, gray, windows=None) -> list:
+        """先粗略定位候選區域再以原始解析度確認，白框碰到候選範圍邊界時改為整張圖搜尋
+
+        windows 為本幀已算好的候選區域。
+        """
+        full_window = (0, 0, gray.shape[1], gray.shape[0])
+        if self.config["COARSE_SCALE"] <= 1 or min(gray.shape[:2]) < self.config["COARSE_SCALE"] * 8:
+            return self._search(gray, full_window)
+
+        rectangles = []
+        for window in self.coarse_candidates(gray) if windows is None else windows:
+            found = self._search(gray, window)
+            if any(self._touches_band_edge(r['bbox'], window, gray.shape) for r in found):
+                return self._search(gray, full_window)
+            rectangles.extend(found)
+        return sorted(rectangles, key=lambda r: r['center'][0])
+
+    def _search(self, gray, window) -> list:
+        """在指定範圍內尋找白框，座標轉換回整張圖"""
+        x0, y0, x1, y1 = window
+        mask = self.white_mask(np.ascontiguousarray(gray[y0:y1, x0:x1]))
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return sorted(self.filter_contours(contours, (x0, y0)), key=lambda r: r['center'][0])
+
+    def filter_contours(self, contours, offset=(0, 0)) -> list:
+        """依面積、長寬比與填充比率過濾出矩形，先用外接矩形排除不可能的輪廓再計算面積
+
+        FILL_RATIO_THRESHOLD 為0時只以外接矩形面積與長寬比過濾。
+        """
+        min_area = self.config["MIN_RECTANGLE_AREA"]
+        max_area = self.config["MAX_RECTANGLE_AREA"]
+        min_aspect_ratio = self.config["MIN_ASPECT_RATIO"]
+        max_aspect_ratio = self.config["MAX_ASPECT_RATIO"]
+        fill_threshold = self.config["FILL_RATIO_THRESHOLD"]
+        dx, dy = offset
+
+        rectangles = []
+        # 輪廓面積不超過外接矩形面積，且需大於 fill_threshold 倍的外接矩形面積
+        max_box_area = max_area / fill_threshold if fill_threshold > 0 else max_area
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if not min_area < w * h < max_box_area:
+                continue
+            aspect_ratio = w / h if h > 0 else 0
+            if not min_aspect_ratio < aspect_ratio < max_aspect_ratio:
+                continue
+            area = cv2.contourArea(contour)
+            fill_ratio = area / (w * h)
+            if fill_threshold > 0 and (not min_area < area < max_area or fill_ratio <= fill_threshold):
+                continue
+            x, y = x + dx, y + dy
+            rectangles.append({
+                'bbox': (x, y, x + w, y + h),
+                'center': (x + w // 2, y + h // 2),
+                'area': area,
+                'aspect_ratio': aspect_ratio,
+                'fill_ratio': fill_ratio,
+                'contour': contour + np.array([dx, dy], dtype=contour.dtype) if (dx or dy) else contour
+            })
+        return rectangles